@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List, Optional
 
 class TimeRange(BaseModel):
     """Time range model for API requests."""
@@ -12,4 +12,57 @@ class TimeRange(BaseModel):
                 "baseTime": 1609459200,
                 "validTime": [1609459200, 1609462800]
             }
-        }
\ No newline at end of file
+        }
+
+class PointCompareRequest(BaseModel):
+    """Locations, variables and base time of a batch point comparison."""
+    baseTime: int
+    cities: List[str] = []
+    points: List[List[float]] = []
+    variables: List[str] = ["t2m"]
+    leadHours: List[int] = [6, 12, 18, 24, 30]
+
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "baseTime": 1609804800,
+            "cities": ["Amsterdam", "Berlin"],
+            "points": [[50.11, 8.68]],
+            "variables": ["t2m"],
+        }
+    })
+
+class RegionAggregateRequest(BaseModel):
+    """Region (country or lat/lon box), statistics and base time of a region aggregate."""
+    baseTime: int
+    country: Optional[str] = None
+    bbox: Optional[List[float]] = None  # [min_lat, min_lon, max_lat, max_lon]
+    statistics: Dict[str, str] = {"t2m": "mean", "wind_speed": "max", "tp": "mean"}
+    leadHours: Optional[List[float]] = None
+    sources: List[str] = ["cerrora", "graphcast", "ground_truth"]
+
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "baseTime": 1609804800,
+            "country": "Germany",
+            "statistics": {"t2m": "mean", "wind_speed": "max", "tp": "mean"},
+        }
+    })
+
+class MetricsRequest(BaseModel):
+    """Base-time window, region and variables of a verification against the ground truth."""
+    start: Optional[int] = None  # first base time (epoch seconds)
+    end: Optional[int] = None  # last base time (epoch seconds)
+    variables: List[str] = ["t2m"]
+    models: List[str] = ["cerrora", "graphcast"]
+    country: Optional[str] = None
+    bbox: Optional[List[float]] = None  # [min_lat, min_lon, max_lat, max_lon]; neither: whole domain
+    perBaseTime: bool = False
+
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "start": 1609459200,
+            "end": 1610064000,
+            "variables": ["t2m", "10u"],
+            "country": "Germany",
+        }
+    })
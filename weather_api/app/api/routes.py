@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi import APIRouter, Query, HTTPException, Response
 from typing import List, Optional, Dict
 import pandas as pd
 import numpy as np
+import asyncio
 import logging
 import os
-from urllib.parse import urljoin
 from pydantic import BaseModel
 from typing import TypedDict
-from app.api.models import TimeRange
-from app.core.Utility.Utilities import process_data, process_url, filter_images, fetch_valid_times, \
-    fetch_temp_wind_data, fetch_geo_data, fetch_sea_level_data, temp_compare, get_country_polygon_from_osm
+from app.api.models import MetricsRequest, PointCompareRequest, RegionAggregateRequest, TimeRange
+from app.core.Utility.Utilities import process_data, filter_images, fetch_valid_times, \
+    fetch_temp_wind_data, fetch_geo_data, fetch_sea_level_data, fetch_rain_data, temp_compare, temp_compare_batch, \
+    get_capitals_coordinates, get_country_bounds, get_country_region, get_bbox_region, get_domain_region, \
+    get_region_key, region_aggregate
 from app.core.d_loader import DataLoader
+from app.core.events import bundle_path, event_bundle, event_bundle_member, load_events
+from app.core.geometry import country_geometries
+from app.core.grids import shared_grids
+from app.core.metrics import metrics_engine, verification_scores
+from app.core.points import columns_to_arrow, point_series
+from app.core.probe import probe_pixel
+from app.core.scheduling import get_profile
+from app.core.skill_archive import leaderboard, skill_archive, skill_timeseries
 from app.core.Visualization.CerroraVisualizer import CerroraVisualizer
 from app.core.Visualization.ExperimentalVisualizer import ExperimentalVisualizer
 from app.core.Visualization.GraphCastVisualizer import GraphCastVisualizer
@@ -29,22 +39,19 @@ graphcast_path_ssd = settings.GRAPHCAST_INTERPOLATED_ZARR_PATH
 _pred_ds = None
 _actual_ds = None
 _graphcast_ds = None
-_aug = None
-_uni_lon = None
-_uni_lat = None
 
 def get_pred_ds():
     """Lazy load prediction dataset."""
     global _pred_ds
     if _pred_ds is None:
         logger.info(f"Loading prediction dataset from {pred_path_ssd}")
-        _pred_ds = xr.open_zarr(pred_path_ssd)
+        _pred_ds = xr.open_zarr(pred_path_ssd, chunks=get_profile("point").chunks)
     return _pred_ds
 def get_graphcast_ds():
     global _graphcast_ds
     if _graphcast_ds is None:
         logger.info(f"Loading prediction dataset from {graphcast_path_ssd}")
-        _graphcast_ds = xr.open_zarr(graphcast_path_ssd)
+        _graphcast_ds = xr.open_zarr(graphcast_path_ssd, chunks=get_profile("point").chunks)
     return _graphcast_ds
 
 def get_actual_ds():
@@ -52,32 +59,16 @@ def get_actual_ds():
     global _actual_ds
     if _actual_ds is None:
         logger.info(f"Loading ground truth dataset from {gt_path_ssd}")
-        _actual_ds = xr.open_zarr(gt_path_ssd)
+        _actual_ds = xr.open_zarr(gt_path_ssd, chunks=get_profile("point").chunks)
     return _actual_ds
 
-def get_aug_dataset():
-    """Lazy load augmentation dataset."""
-    global _aug
-    if _aug is None:
-        logger.info(f"Loading augmentation dataset from {settings.CERRORA_EXAMPLE_ZARR_PATH}")
-        _aug = xr.open_zarr(settings.CERRORA_EXAMPLE_ZARR_PATH)
-    return _aug
-
 def get_uni_lon():
-    """Lazy load longitude values."""
-    global _uni_lon
-    if _uni_lon is None:
-        aug = get_aug_dataset()
-        _uni_lon = aug['longitude'].values
-    return _uni_lon
+    """Longitude grid, memory-mapped and shared by all workers."""
+    return shared_grids().longitude
 
 def get_uni_lat():
-    """Lazy load latitude values."""
-    global _uni_lat
-    if _uni_lat is None:
-        aug = get_aug_dataset()
-        _uni_lat = aug['latitude'].values
-    return _uni_lat
+    """Latitude grid, memory-mapped and shared by all workers."""
+    return shared_grids().latitude
 
 separator = os.sep
 logger = logging.getLogger("weather_api")
@@ -132,32 +123,28 @@ variable_map_cerrora: VariableMap = {
 
 
 class ModelManager:
+    """Models the API serves.
+
+    Selection is per request: every data route takes the model as a
+    parameter, so any worker can serve any request. ``default_model`` is
+    only what clients use until the user picks a model.
+    """
+
     def __init__(self):
         self.models = ["graphcast", "cerrora", "experimental"]
-        self.current_model = "cerrora"  # "graphcast"#
+        self.default_model = settings.DEFAULT_MODEL
 
-    ## the method below will have to be replaced/descard
-    def get_current_loaders(self):
-        if self.current_model == "graphcast":
+    def get_loaders(self, model_type: str):
+        if model_type == "graphcast":
             return graphcast_interpolated_loader, get_graphcast_interpolated_visualizer(), "graphcast"
-        elif self.current_model == "cerrora":
+        elif model_type == "cerrora":
             return cerrora_loader, get_cerrora_visualizer(), "cerrora"
-        elif self.current_model == "experimental":
+        elif model_type == "experimental":
             return experimental_loader, experimental_visualizer, "experimental"
         else:
-            raise HTTPException(
-                status_code=400, detail=f"Invalid model type: {self.current_model}"
-            )
-
-    # This one will also go i nthe future.
-    def switch_model(self, model_type: str):
-        if model_type not in self.models:
             raise HTTPException(
                 status_code=400, detail=f"Invalid model type: {model_type}"
             )
-        self.current_model = model_type
-
-        return self.get_current_loaders()
 
 
 model_manager = ModelManager()
@@ -168,7 +155,10 @@ router = APIRouter()
 @router.get("/temp_compare/{country}/{base_time}")
 async def compare_temp(country: str, base_time:int):
     #pdb.set_trace()
-    df_graphcast_res,df_pred_res,df_gt_res = temp_compare(graphcast_ds=get_graphcast_ds(),pred_ds=get_pred_ds(),gt_ds=get_actual_ds(),country_name=country,base_time=base_time)
+    df_graphcast_res,df_pred_res,df_gt_res = await asyncio.to_thread(
+        temp_compare, graphcast_ds=get_graphcast_ds(), pred_ds=get_pred_ds(), gt_ds=get_actual_ds(),
+        country_name=country, base_time=base_time,
+    )
 
     ground_truth_metrics:dict = df_gt_res[["forecast_time","temperature_2m"]].tail(6).reset_index(drop=True).to_dict();
 
@@ -178,27 +168,246 @@ async def compare_temp(country: str, base_time:int):
     #print("predicted_metrics",predicted_metrics)
     return  {"ground_truth": ground_truth_metrics,"cerrora":cerrora_metrics,"graphcast":graphcast_metrics}
 
-@router.get("/get_cordinates/{country_name}")
-async def get_cordinates(country_name: str):
-    res_metadata = get_country_polygon_from_osm(country_name)
-    return res_metadata
+@router.post("/temp_compare/batch")
+async def compare_temp_batch(request: PointCompareRequest):
+    """Compare the models at many cities and lat/lon points; columnar tables per source."""
+    capitals = get_capitals_coordinates()
+    unknown = [city for city in request.cities if city not in capitals]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown cities: {unknown}")
+    if any(len(point) != 2 for point in request.points):
+        raise HTTPException(status_code=400, detail="Points must be [latitude, longitude] pairs")
+    locations = {city: tuple(capitals[city]) for city in request.cities}
+    locations.update({f"{lat},{lon}": (lat, lon) for lat, lon in request.points})
+    if not locations:
+        raise HTTPException(status_code=400, detail="No cities or points given")
+
+    return await asyncio.to_thread(
+        temp_compare_batch,
+        graphcast_ds=get_graphcast_ds(), pred_ds=get_pred_ds(), gt_ds=get_actual_ds(),
+        locations=locations, base_time=request.baseTime,
+        variables=request.variables, lead_hours=request.leadHours,
+    )
+
+@router.get("/timeseries/{model_type}")
+async def get_timeseries(
+        model_type: str,
+        lat: float,
+        lon: float,
+        variable: str,
+        level: Optional[float] = None,
+        start: Optional[int] = Query(None, description="First base time (epoch seconds)"),
+        end: Optional[int] = Query(None, description="Last base time (epoch seconds)"),
+        output_format: str = Query("json", alias="format", pattern="^(json|arrow)$"),
+):
+    """Forecast (or ground truth, model_type=cerrora_gt) time series of any variable at a location.
+
+    One row per base time and lead time, as JSON columns or an Arrow IPC stream.
+    """
+    if model_type == "cerrora_gt":
+        data_loader = cerrora_gt_loader
+    else:
+        data_loader, _, model_type = get_current_loaders_v2(model_type)
+    try:
+        series = await asyncio.to_thread(point_series, data_loader, variable, lat, lon, start, end, level)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Not in the {model_type} store: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    metadata = {"model": model_type, "variable": variable, **series["point"]}
+    if output_format == "arrow":
+        try:
+            content = columns_to_arrow(series["columns"], metadata)
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        return Response(content=content, media_type="application/vnd.apache.arrow.stream")
+    return {**metadata, "columns": series["columns"]}
+
+def comparison_sources() -> Dict[str, DataLoader]:
+    """Loaders of the sources compared in point and region queries."""
+    return {
+        "cerrora": cerrora_loader,
+        "graphcast": graphcast_interpolated_loader,
+        "ground_truth": cerrora_gt_loader,
+    }
+
+async def resolve_region(country: Optional[str], bbox: Optional[List[float]], required: bool = True):
+    """Region weights of a country or lat/lon box (the whole domain if neither and not required)."""
+    if country is not None and bbox is not None:
+        raise HTTPException(status_code=400, detail="Give either a country or a bbox")
+    if bbox is not None and len(bbox) != 4:
+        raise HTTPException(status_code=400, detail="bbox must be [min_lat, min_lon, max_lat, max_lon]")
+    try:
+        if country is not None:
+            return await asyncio.to_thread(get_country_region, country)
+        if bbox is not None:
+            return await asyncio.to_thread(get_bbox_region, *bbox)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if required:
+        raise HTTPException(status_code=400, detail="Give either a country or a bbox")
+    return await asyncio.to_thread(get_domain_region)
+
+@router.post("/regions/aggregate")
+async def aggregate_region(request: RegionAggregateRequest):
+    """Country or lat/lon box statistics per lead time for each model and the ground truth."""
+    sources = comparison_sources()
+    unknown = [source for source in request.sources if source not in sources]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sources {unknown}, use {list(sources)}")
+    region = await resolve_region(request.country, request.bbox)
+    try:
+        return await asyncio.to_thread(
+            region_aggregate, {source: sources[source] for source in request.sources}, region,
+            request.baseTime, request.statistics, request.leadHours,
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/metrics")
+async def get_metrics(request: MetricsRequest):
+    """RMSE, bias, MAE and anomaly correlation of the models against the ground truth.
+
+    Per model, variable and lead time over the base times in [start, end],
+    for a country, a lat/lon box or the whole domain.
+    """
+    sources = comparison_sources()
+    forecasts = {model: sources[model] for model in request.models if model in sources and model != "ground_truth"}
+    if len(forecasts) != len(request.models):
+        raise HTTPException(status_code=400, detail=f"Unknown models {request.models}, use cerrora and graphcast")
+    region = await resolve_region(request.country, request.bbox, required=False)
+    try:
+        return await asyncio.to_thread(
+            verification_scores, metrics_engine(), forecasts, sources["ground_truth"], request.variables,
+            region, request.start, request.end, request.perBaseTime,
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Not in the stores: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def query_skill(variable: str, region: str, models: Optional[List[str]], start: Optional[int],
+                      end: Optional[int], lead_hours: Optional[List[float]]) -> pd.DataFrame:
+    """Rows of the skill archive for one variable and region; 404 if there are none."""
+    try:
+        key = await asyncio.to_thread(get_region_key, region)
+        frame = await asyncio.to_thread(
+            skill_archive().query, models, [variable], [key], start, end, lead_hours,
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if frame.empty:
+        raise HTTPException(status_code=404, detail=f"No archived scores of {variable} for {region}")
+    return frame
+
+@router.get("/skill/leaderboard")
+async def get_skill_leaderboard(
+        variable: str = Query(..., description="Variable name, e.g. t2m"),
+        region: str = Query("domain", description="domain, or a country name or ISO code"),
+        models: Optional[List[str]] = Query(None, description="Models to rank; default all archived"),
+        start: Optional[int] = Query(None, description="First base time (epoch seconds)"),
+        end: Optional[int] = Query(None, description="Last base time (epoch seconds)"),
+        leadHours: Optional[List[float]] = Query(None, description="Lead times to keep; default all"),
+):
+    """Models ranked by skill per lead time, pooled over the archived base times in [start, end]."""
+    frame = await query_skill(variable, region, models, start, end, leadHours)
+    return {"variable": variable, "region": region, **leaderboard(frame)}
+
+@router.get("/skill/timeseries")
+async def get_skill_timeseries(
+        variable: str = Query(..., description="Variable name, e.g. t2m"),
+        region: str = Query("domain", description="domain, or a country name or ISO code"),
+        models: Optional[List[str]] = Query(None, description="Models to include; default all archived"),
+        start: Optional[int] = Query(None, description="First base time (epoch seconds)"),
+        end: Optional[int] = Query(None, description="Last base time (epoch seconds)"),
+        leadHours: Optional[List[float]] = Query(None, description="Lead times pooled per base time; default all"),
+):
+    """Archived skill of each model per base time."""
+    frame = await query_skill(variable, region, models, start, end, leadHours)
+    return {"variable": variable, "region": region, "models": skill_timeseries(frame)}
 
+@router.get("/events")
+async def list_events():
+    """Extreme events with whether their precomputed bundle exists."""
+    try:
+        events = await asyncio.to_thread(load_events)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {
+        event_id: {**event.entry, "bundled": os.path.exists(bundle_path(event_id))}
+        for event_id, event in events.items()
+    }
+
+@router.get("/events/{event_id}")
+async def get_event_bundle(event_id: str):
+    """Precomputed bundle of an event: region, valid times, statistics, metrics and member names."""
+    try:
+        return await asyncio.to_thread(event_bundle, event_id)
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-# Dependency to get current data loader and visualizer
-async def get_current_loaders():
-    data_loader, visualizer, model_type = (
-        model_manager.get_current_loaders()
-    )  # return graphcast_loader, graphcast_visualizer, "graphcast"
-    return data_loader, visualizer, model_type
+@router.get("/events/{event_id}/{member:path}")
+async def get_event_bundle_member(event_id: str, member: str):
+    """A field (.npy) or cropped frame (.webp) of an event's bundle."""
+    try:
+        content, media_type = await asyncio.to_thread(event_bundle_member, event_id, member)
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=content, media_type=media_type)
+
+@router.get("/probe")
+def get_probe(
+        px: float = Query(..., description="Pixel column on the rendered map"),
+        py: float = Query(..., description="Pixel row on the rendered map"),
+        width: float = Query(..., gt=0, description="Rendered map width in pixels"),
+        height: float = Query(..., gt=0, description="Rendered map height in pixels"),
+        baseTime: int = Query(..., description="Forecast base time (epoch seconds)"),
+        validTime: int = Query(..., description="Valid time (epoch seconds)"),
+        variables: Optional[List[str]] = Query(None, description="name or name@level; default all surface variables"),
+):
+    """Values of Cerrora, GraphCast and the ground truth under a pixel of the map.
+
+    The pixel is mapped onto the grid arithmetically and the values are read
+    from the hot field store, so hovering can probe many times per second.
+    """
+    sources = comparison_sources()
+    # Every visualizer draws the same extent; this one is built without the grids
+    return probe_pixel(
+        sources, shared_grids(), graphcast_visualizer.extent,
+        px, py, width, height, baseTime, validTime, variables,
+    )
+
+@router.get("/get_cordinates/{country_name}")
+async def get_cordinates(country_name: str, refresh: bool = False):
+    """Bounding box of a country (name or ISO code) from the local boundaries.
+
+    With ``refresh`` the box is first refreshed from the Overpass API; if
+    that fails the local box is returned.
+    """
+    try:
+        if refresh:
+            geometries = await asyncio.to_thread(country_geometries)
+            try:
+                return await geometries.refresh(country_name)
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                logger.warning(f"Could not refresh {country_name} from the remote APIs: {e}")
+        return await asyncio.to_thread(get_country_bounds, country_name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
 
 
 def get_current_loaders_v2(model_type: str) -> tuple[DataLoader, GraphCastVisualizer, str] | tuple[DataLoader, CerroraVisualizer, str] | tuple[DataLoader, ExperimentalVisualizer, str]:
-    if model_type == "graphcast":
-        return graphcast_interpolated_loader, get_graphcast_interpolated_visualizer(), "graphcast"
-    elif model_type == "cerrora":
-        return cerrora_loader, get_cerrora_visualizer(), "cerrora"
-    elif model_type == "experimental":
-        return experimental_loader, experimental_visualizer, "experimental"
+    return model_manager.get_loaders(model_type)
 
 
 # Ensure image output directory exists
@@ -262,25 +471,28 @@ class ModelTypeRequest(BaseModel):
 
 @router.post("/switch-model")
 async def switch_model(request: ModelTypeRequest):
-    """Switch the current model type."""
-    try:
-        model_manager.switch_model(request.model_type)
-        return {
-            "status": "success",
-            "message": f"Switched to {request.model_type} model",
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Validate a model choice for the client to keep as its default.
+
+    The server keeps no selected model: clients send the model with every
+    data request.
+    """
+    if request.model_type not in model_manager.models:
+        raise HTTPException(status_code=400, detail=f"Invalid model type: {request.model_type}")
+    return {
+        "status": "success",
+        "model_type": request.model_type,
+        "message": f"Switched to {request.model_type} model",
+    }
 
 
 """
-    To let the client know the current model on browser refresh
+    The model clients start with (e.g. on browser refresh without a stored choice)
 """
 
 
 @router.get("/current-model")
 def get_current_model():
-    return model_manager.current_model;
+    return model_manager.default_model
 
 
 @router.get("/data/{model_variable}/{base_time}")
@@ -380,77 +592,20 @@ async def get_geo_data(
 """
 
 
-@router.post("/data/rain")
-async def get_rain_data(
-        time_range: TimeRange,
-        loaders: tuple = Depends(get_current_loaders)
-):
+@router.post("/data/rain/{model_type}")
+async def get_rain_data(time_range: TimeRange, model_type: str):
     """Generate precipitation visualization for specified time range."""
-    data_loader, visualizer, model_type = loaders
-    try:
-        # First check for existing images
-        existing_images = get_existing_images(time_range, "rain", model_type)
-        # Check if all images exist
-        if len(existing_images) == len(time_range.validTime):
-            logger.info("All rain images found in cache")
-            return {"images": [
-                {"timestamp": img["timestamp"],
-                 "url": urljoin(f"{settings.BASE_URL}/", img["url"])}
-                for img in existing_images
-            ]}
-
-        # If not all images exist, generate missing ones
-        images_info = []
-        base_datetime = pd.to_datetime(time_range.baseTime, unit='s')
-        base_datetime = pd.Timestamp(base_datetime).to_datetime64()
-
-        # Load data once for all images
-        if model_type == 'graphcast':
-            ds_rain = data_loader.get_variable_data('total_precipitation_6hr')
-        elif model_type == 'cerrora':
-            ds_rain = data_loader.get_variable_data('tp')
-        else:
-            raise HTTPException(status_code=400, detail="Invalid model type")
-
-        for valid_time in time_range.validTime:
-            valid_datetime = pd.to_datetime(valid_time, unit='s')
-            timestamp_base = int(pd.Timestamp(base_datetime).timestamp())
-            timestamp_valid = int(valid_datetime.timestamp())
-
-            # Check for cached image
-            cached_url = get_cached_image_path(timestamp_base, timestamp_valid, "rain", model_type)
-            if cached_url:
-                images_info.append({
-                    "timestamp": f"{timestamp_base}_{timestamp_valid}",
-                    "url": urljoin(f"{settings.BASE_URL}/", cached_url)
-                })
-                continue
-
-            # Generate new image
-            time_difference = pd.Timedelta(valid_datetime - base_datetime)
-            data_rain = ds_rain.sel(time=base_datetime, method="nearest")
-            data_rain = data_rain.sel(
-                prediction_timedelta=time_difference,
-                method="nearest"
-            )
-
-            url = visualizer.create_rain_plot(
-                data_rain,
-                timestamp_base,
-                timestamp_valid
-            )
-
-            if url:
-                images_info.append({
-                    "timestamp": f"{timestamp_base}_{timestamp_valid}",
-                    "url": process_url(url, model_type)  # url
-                })
+    loaders: tuple = get_current_loaders_v2(model_type)
+    return await fetch_rain_data(time_range=time_range, loaders=loaders)
 
-        return {"images": images_info}
 
-    except Exception as e:
-        logger.error(f"Error generating precipitation visualization: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+@router.post("/data/rain")
+async def get_rain_data_default(
+        time_range: TimeRange,
+        model_type: str = Query(settings.DEFAULT_MODEL, alias="modelType"),
+):
+    """Generate precipitation visualization; the model is a query parameter."""
+    return await get_rain_data(time_range, model_type)
 
 
 """
@@ -543,28 +698,14 @@ async def get_base_times(
             min_range, max_range, incrementor = (6, 31, 6)
             lead_time = [np.timedelta64(h, "h") for h in range(min_range, max_range, incrementor)]
             freq = "12h"
-        ds = data_loader.get_zarr_subset(
-            query_time, [variable], lead_time=lead_time, freq=freq
-        )
-        if ds is None:
-            logger.error(
-                f"No data found for variable {variable} at query time {query_time}"
-            )
-            return []
-        if "time" not in ds:
-            logger.error(f"No time dimension found in dataset for variable {variable}")
-            return []
-        times = ds["time"].values
+        catalog = data_loader.catalog
+        catalog.require_variables([variable])
+        catalog.require_leads(lead_time)
+        times = data_loader._create_date_range(query_time, freq)
         if len(times) == 0:
             logger.warning(f"No time values found for variable {variable}")
             return []
-        return [
-            {
-                "label": pd.to_datetime(str(time)).strftime("%a %d %b %Y %H UTC"),
-                "value": str(int(pd.to_datetime(str(time)).timestamp())),
-            }
-            for time in times
-        ]
+        return catalog.time_entries(times)
     except Exception as e:
         logger.error(
             f"Error getting base times: {e}", exc_info=True
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List, Union
+from typing import Any, Dict, List, Optional, Union
 import os
 
 class Settings(BaseSettings):
@@ -40,6 +40,92 @@ class Settings(BaseSettings):
         "EXPERIMENTAL_ZARR_PATH"
     )
 
+    # Time-series-optimized copies of the stores (app.tools.rechunk), keyed by model type
+    TIMESERIES_ZARR_PATHS: Dict[str, str] = {}
+
+    # Object store backends: any fsspec URL (gs://, s3://, http(s)://) can be a store path
+    S3_ENDPOINT_URL: Optional[str] = os.getenv("S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO
+    S3_REGION: Optional[str] = os.getenv("S3_REGION")
+    S3_ANON: bool = False
+    # Per-protocol tuning; JSON objects when set from the environment
+    STORAGE_BLOCK_SIZES: Dict[str, int] = {
+        "gs": 8 * 1024 * 1024,
+        "s3": 8 * 1024 * 1024,
+        "http": 2 * 1024 * 1024,
+    }
+    STORAGE_CONCURRENCY: Dict[str, int] = {"gs": 32, "s3": 64, "http": 16}
+    STORAGE_OPTIONS: Dict[str, Dict[str, Any]] = {}  # extra fsspec options per protocol
+
+    # Chunk cache for remote zarr stores (RAM LRU over local .npy files)
+    CHUNK_CACHE_ENABLED: bool = True
+    CHUNK_CACHE_DIR: str = "chunk_cache"
+    CHUNK_CACHE_MEMORY_BYTES: int = 512 * 1024 * 1024  # 512MB
+    CHUNK_CACHE_DISK_BYTES: int = 20 * 1024 * 1024 * 1024  # 20GB
+    GRID_CACHE_DIR: str = "grid_cache"  # memory-mapped coordinate grids shared by workers
+
+    # Decoded fields in shared memory, shared by all workers on the host
+    HOT_FIELDS_ENABLED: bool = True
+    HOT_FIELDS_NAME: str = "weather_api_hot"  # prefix of the shared memory segments
+    HOT_FIELDS_MAX_BYTES: int = 1024 * 1024 * 1024  # 1GB, must fit in /dev/shm
+    HOT_FIELDS_SLOTS: int = 1024
+    HOT_FIELDS_TTL_S: float = 6 * 3600.0
+    HOT_FIELDS_EVICT_INTERVAL_S: float = 30.0
+
+    # Concurrent chunk fetching for remote zarr stores (default for STORAGE_CONCURRENCY)
+    FETCH_CONCURRENCY: int = 32
+    FETCH_PREFETCH_WINDOW: int = 4  # chunks ahead along prediction_timedelta
+
+    # Hedged reads: duplicate a chunk read that exceeds the store's latency percentile
+    HEDGE_ENABLED: bool = True
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_INITIAL_DELAY_MS: float = 200.0
+    HEDGE_MAX_RATIO: float = 0.1
+
+    # Coordinate lookups: how far a requested time/lead may be from a stored step (seconds)
+    TIME_INDEX_TOLERANCE_S: int = 3600
+    LEAD_INDEX_TOLERANCE_S: int = 3600
+
+    # Store catalog: seconds between checks of a store's metadata fingerprint
+    CATALOG_REFRESH_S: float = 60.0
+
+    # Read single frames straight from zarr instead of through xarray/dask
+    DIRECT_READ_ENABLED: bool = True
+
+    # Dask chunking and scheduling per workload. chunks: {} keeps the store's
+    # chunks, "auto" merges them, None opens without dask. scheduler: threads,
+    # synchronous, processes or distributed (local cluster, needs `distributed`)
+    DASK_PROFILES: Dict[str, Dict[str, Any]] = {
+        "default": {"chunks": {}, "scheduler": "threads"},
+        "field": {"chunks": {}, "scheduler": "threads", "num_workers": 8},
+        "point": {"chunks": None, "scheduler": "synchronous"},
+        "batch": {"chunks": "auto", "scheduler": "threads"},
+    }
+
+    # Model clients use until the user picks one; requests always name their model
+    DEFAULT_MODEL: str = "cerrora"
+
+    # Country boundaries for name, code and location lookups: a GeoPackage, GeoJSON
+    # file or shapefile, bundled at deploy time by app.tools.bundle_countries from
+    # Natural Earth admin 0 countries at this resolution; never downloaded at runtime
+    COUNTRY_BOUNDARIES_PATH: str = "data/countries.gpkg"
+    COUNTRY_BOUNDARIES_RESOLUTION: str = "50m"
+    GEOMETRY_REFRESH_TIMEOUT_S: float = 10.0  # optional refresh from the remote APIs
+    # Region weights of lat/lon boxes kept in memory (domain and countries are always kept)
+    REGION_CACHE_BOXES: int = 256
+
+    # Verification metrics: cached per-base-time error sums and the ground truth
+    # climatology (mean of this many evenly spread times) of the anomaly correlation
+    METRICS_CACHE_DIR: str = "metrics_cache"
+    METRICS_CACHE_ENTRIES: int = 100_000
+    CLIMATOLOGY_SAMPLES: int = 365
+    # Precomputed skill scores (app.tools.build_skill_archive), partitioned Parquet; needs pyarrow
+    SKILL_ARCHIVE_DIR: str = "skill_archive"
+
+    # Extreme events (the UI's dataset) and their precomputed bundles (app.tools.build_event_bundles)
+    EXTREME_EVENTS_PATH: str = "../weather_ui/extreme_events_dataset.json"
+    EVENT_BUNDLE_DIR: str = "event_bundles"
+    EVENT_FRAME_DPI: int = 100  # cropped frames are rendered at this DPI, 6 inches on the long side
+
     # Server Settings
     HOST: str = "0.0.0.0"
     PORT: int = 8999
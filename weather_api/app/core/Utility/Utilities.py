@@ -4,20 +4,27 @@ import logging
 from fastapi import HTTPException
 import pandas as pd
 import logging
-from typing import List,Optional
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
 import numpy as np
+import shapely
 import xarray as xr
 from app.api.models import TimeRange
 import os
 from app.config import settings
 import httpx
-import requests
 import random
 import pdb
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 from datetime import datetime, timezone
 from app.core.d_loader import DataLoader
+from app.core.geometry import country_geometries
+from app.core.grids import shared_grids
+from app.core.regions import STATISTICS, RegionWeights, cached_region_weights, domain_weights
+from app.core.points import POINT_LEAD_HOURS, forecast_point_series, forecast_points, observed_point_series, \
+    observed_points
 
 logger = logging.getLogger("weather_api")
 
@@ -120,13 +127,9 @@ async def process_data(
 
         # Load data once for all images
         if model_type == "graphcast":
-            ds_variable_data = data_loader.get_variable_data(
-                graph_cast_variable_type
-            )  # define as parameter
+            variable_name = graph_cast_variable_type  # define as parameter
         elif model_type == "cerrora":
-            ds_variable_data = data_loader.get_variable_data(
-                cerrora_variable_type
-            )  # define as parameter
+            variable_name = cerrora_variable_type  # define as parameter
         else:
             raise HTTPException(status_code=400, detail="Invalid model type")
 
@@ -152,20 +155,14 @@ async def process_data(
                 continue
 
             # Generate new image
-            time_difference = pd.Timedelta(valid_datetime - base_datetime)
-            ds_variable_data = ds_variable_data.sel(
-                time=base_datetime, method="nearest"
-            )
-            ds_variable_data = ds_variable_data.sel(
-                prediction_timedelta=time_difference, method="nearest"
-            )
+            frame_data = data_loader.get_frame(variable_name, timestamp_base, timestamp_valid)
 
             if plot_type == "geo":
-                if "level" in ds_variable_data.dims:
-                    ds_variable_data = ds_variable_data.sel(level=500) / 9.80665
+                if "level" in frame_data.dims:
+                    frame_data = frame_data.sel(level=500) / 9.80665
 
             url = visualizer.create_geo_plot(
-                ds_variable_data, timestamp_base, timestamp_valid
+                frame_data, timestamp_base, timestamp_valid
             )
 
             if url:
@@ -260,17 +257,14 @@ async def fetch_valid_times(variableType: Optional[str], query_time: Optional[st
 
         logger.info(f"Initial time_slice: {time_slice}")
 
-        # Get data subset
+        # Check the request against the store's catalog
         try:
-            ds = data_loader.get_zarr_subset(
-                time_slice=time_slice,
-                variables=[variable],
-                lead_time=LEAD_TIMES,
-                freq=freq,
-            )
-            logger.info(f"Successfully loaded zarr subset with dimensions: {ds.dims}")
+            catalog = data_loader.catalog
+            catalog.require_variables([variable])
+            catalog.require_leads(LEAD_TIMES)
+            catalog.require_times(data_loader._create_date_range(time_slice, freq))
         except Exception as e:
-            logger.error(f"Error loading zarr subset: {str(e)}")
+            logger.error(f"Error checking store catalog: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error loading data: {str(e)}")
 
         # Process times efficiently using vectorized operations
@@ -367,9 +361,6 @@ async def fetch_temp_wind_data(
     """Get temperature and wind data visualization for the specified time range."""
     data_loader, visualizer, model_type = loaders
     gt_data_loader = None
-    gt_ds_temp = None
-    gt_ds_wind_u = None
-    gt_ds_wind_v = None
 
     try:
         # First check for existing images
@@ -391,26 +382,10 @@ async def fetch_temp_wind_data(
         base_datetime = pd.to_datetime(time_range.baseTime, unit="s")
         base_datetime = pd.Timestamp(base_datetime).to_datetime64()
 
-        # Load data once for all images
+        # Frames are read one at a time below
         if model_type == "cerrora":
             gt_data_loader = DataLoader(model_type="cerrora_gt")
 
-            ds_temp = data_loader.get_variable_data("t2m")  # ("2t")
-            ds_wind_u = data_loader.get_variable_data("10u")
-            ds_wind_v = data_loader.get_variable_data("10v")
-
-            gt_ds_temp = gt_data_loader.get_variable_data("t2m")
-            gt_ds_wind_u = gt_data_loader.get_variable_data("10u")
-            gt_ds_wind_v = gt_data_loader.get_variable_data("10v")
-            # pass
-        else:
-            #ds_temp = data_loader.get_variable_data("2m_temperature")
-            #ds_wind_u = data_loader.get_variable_data("10m_u_component_of_wind")
-            #ds_wind_v = data_loader.get_variable_data("10m_v_component_of_wind")
-            ds_temp = data_loader.get_variable_data("t2m") 
-            ds_wind_u = data_loader.get_variable_data("10u")
-            ds_wind_v = data_loader.get_variable_data("10v")
-
         track = 0
         for valid_time in time_range.validTime:
             valid_datetime = pd.to_datetime(valid_time, unit="s")
@@ -429,22 +404,17 @@ async def fetch_temp_wind_data(
                     }
                 )
                 continue
-            time_difference = pd.Timedelta(valid_datetime - base_datetime)
             if gt_data_loader is not None:
-                gt_data_temp = gt_ds_temp.sel(time=valid_datetime, method="nearest") - 273.15
-                gt_data_wind_u = gt_ds_wind_u.sel(time=valid_datetime, method="nearest")
-                gt_data_wind_v = gt_ds_wind_v.sel(time=valid_datetime, method="nearest")
+                gt_data_temp = gt_data_loader.get_field("t2m", timestamp_valid) - 273.15
+                gt_data_wind_u = gt_data_loader.get_field("10u", timestamp_valid)
+                gt_data_wind_v = gt_data_loader.get_field("10v", timestamp_valid)
 
                 visualizer.create_temp_wind_plot(gt_data_temp, gt_data_wind_u, gt_data_wind_v, timestamp_base, timestamp_valid,reverse=False)
 
             # Generate new image
-            data_temp = ds_temp.sel(time=base_datetime, method="nearest")
-            data_wind_u = ds_wind_u.sel(time=base_datetime, method="nearest")
-            data_wind_v = ds_wind_v.sel(time=base_datetime, method="nearest")
-
-            data_temp = (data_temp.sel(prediction_timedelta=time_difference, method="nearest") - 273.15)
-            data_wind_u = data_wind_u.sel(prediction_timedelta=time_difference, method="nearest")
-            data_wind_v = data_wind_v.sel(prediction_timedelta=time_difference, method="nearest")
+            data_temp = data_loader.get_frame("t2m", timestamp_base, timestamp_valid) - 273.15
+            data_wind_u = data_loader.get_frame("10u", timestamp_base, timestamp_valid)
+            data_wind_v = data_loader.get_frame("10v", timestamp_base, timestamp_valid)
             url = visualizer.create_temp_wind_plot(
                 data_temp, data_wind_u, data_wind_v, timestamp_base, timestamp_valid
             )
@@ -472,7 +442,6 @@ async def fetch_geo_data(time_range: TimeRange,loaders: tuple):
     data_loader, visualizer, model_type = loaders
 
     gt_data_loader = None
-    gt_ds_geo = None;
     try:
         # First check for existing images
         existing_images = get_existing_images(time_range, "geo", model_type)
@@ -488,15 +457,10 @@ async def fetch_geo_data(time_range: TimeRange,loaders: tuple):
         images_info = []
         base_datetime = pd.to_datetime(time_range.baseTime, unit='s')
         base_datetime = pd.Timestamp(base_datetime).to_datetime64()
-        # Load data once for all images
-        if model_type == 'graphcast':
-            #ds_geo = data_loader.get_variable_data('geopotential')
-            ds_geo = data_loader.get_variable_data('z')
-        elif model_type == 'cerrora':
-            ds_geo = data_loader.get_variable_data('z')
+        # Frames are read one at a time below
+        if model_type == 'cerrora':
             gt_data_loader = DataLoader(model_type="cerrora_gt")
-            gt_ds_geo = gt_data_loader.get_variable_data("z")
-        else:
+        elif model_type != 'graphcast':
             raise HTTPException(status_code=400, detail="Invalid model type")
         for valid_time in time_range.validTime:
             valid_datetime = pd.to_datetime(valid_time, unit='s')
@@ -511,14 +475,9 @@ async def fetch_geo_data(time_range: TimeRange,loaders: tuple):
                 })
                 continue
             # Generate new image
-            time_difference = pd.Timedelta(valid_datetime - base_datetime)
-            data_geo = ds_geo.sel(time=base_datetime, method="nearest")
-            data_geo = data_geo.sel(
-                prediction_timedelta=time_difference,
-                method="nearest"
-            )
+            data_geo = data_loader.get_frame('z', timestamp_base, timestamp_valid)
             if model_type == "cerrora":
-                gt_data_geo = gt_ds_geo.sel(time=valid_datetime,method="nearest")
+                gt_data_geo = gt_data_loader.get_field("z", timestamp_valid)
 
             if 'level' in data_geo.dims:
                 data_geo = data_geo.sel(level=500) / 9.80665
@@ -554,7 +513,6 @@ async def fetch_sea_level_data(time_range: TimeRange,loaders: tuple):
     """Generate mean sea level pressure visualization for specified time range."""
     data_loader, visualizer, model_type = loaders
     gt_data_loader = None
-    gt_ds_slp = None
     gt_data_slp = None
     try:
         # First check for existing images
@@ -574,16 +532,10 @@ async def fetch_sea_level_data(time_range: TimeRange,loaders: tuple):
         base_datetime = pd.to_datetime(time_range.baseTime, unit='s')
         base_datetime = pd.Timestamp(base_datetime).to_datetime64()
 
-        # Load data once for all images
-        if model_type == 'graphcast':
-            #ds_slp = data_loader.get_variable_data('mean_sea_level_pressure')
-            ds_slp = data_loader.get_variable_data('msl')
-        elif model_type == 'cerrora':
-
-            ds_slp = data_loader.get_variable_data('msl')
+        # Frames are read one at a time below
+        if model_type == 'cerrora':
             gt_data_loader = DataLoader(model_type="cerrora_gt")
-            gt_ds_slp = gt_data_loader.get_variable_data("msl")
-        else:
+        elif model_type != 'graphcast':
             raise HTTPException(status_code=400, detail="Invalid model type")
 
         for valid_time in time_range.validTime:
@@ -600,16 +552,11 @@ async def fetch_sea_level_data(time_range: TimeRange,loaders: tuple):
                 })
                 continue
             if gt_data_loader is not None:
-                gt_data_slp = gt_ds_slp.sel(time=valid_datetime,method="nearest")
+                gt_data_slp = gt_data_loader.get_field("msl", timestamp_valid)
                 visualizer.create_sea_level_plot(gt_data_slp, timestamp_base, timestamp_valid,reverse=False)
 
             # Generate new image
-            time_difference = pd.Timedelta(valid_datetime - base_datetime)
-            data_slp = ds_slp.sel(time=base_datetime, method="nearest")
-            data_slp = data_slp.sel(
-                prediction_timedelta=time_difference,
-                method="nearest"
-            )
+            data_slp = data_loader.get_frame('msl', timestamp_base, timestamp_valid)
 
             url = visualizer.create_sea_level_plot(data_slp,timestamp_base,timestamp_valid)
 
@@ -625,49 +572,135 @@ async def fetch_sea_level_data(time_range: TimeRange,loaders: tuple):
         logger.error(f"Error generating sea level pressure visualization: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_country_code(country_name:str):
-    response = requests.get(f"https://www.apicountries.com/name/{country_name}",timeout=10)
-    return response.json()[0]["alpha2Code"]
 
-def get_country_polygon_from_osm(country_name):
-    country_code = get_country_code(country_name)
-    query = f"""
-    [out:json];
-    relation["admin_level"="2"]["ISO3166-1"="{country_code}"];
-    out geom;
+async def fetch_rain_data(time_range: TimeRange, loaders: tuple):
+    """Generate precipitation visualization for specified time range."""
+    data_loader, visualizer, model_type = loaders
+    try:
+        # First check for existing images
+        existing_images = get_existing_images(time_range, "rain", model_type)
+        # Check if all images exist
+        if len(existing_images) == len(time_range.validTime):
+            logger.info("All rain images found in cache")
+            return {"images": [
+                {"timestamp": img["timestamp"],
+                 "url": urljoin(f"{settings.BASE_URL}/", img["url"])}
+                for img in existing_images
+            ]}
+
+        # If not all images exist, generate missing ones
+        images_info = []
+        base_datetime = pd.to_datetime(time_range.baseTime, unit='s')
+        base_datetime = pd.Timestamp(base_datetime).to_datetime64()
+
+        if model_type == 'graphcast':
+            rain_variable = 'total_precipitation_6hr'
+        elif model_type == 'cerrora':
+            rain_variable = 'tp'
+        else:
+            raise HTTPException(status_code=400, detail="Invalid model type")
+
+        for valid_time in time_range.validTime:
+            valid_datetime = pd.to_datetime(valid_time, unit='s')
+            timestamp_base = int(pd.Timestamp(base_datetime).timestamp())
+            timestamp_valid = int(valid_datetime.timestamp())
+
+            # Check for cached image
+            cached_url = get_cached_image_path(timestamp_base, timestamp_valid, "rain", model_type)
+            if cached_url:
+                images_info.append({
+                    "timestamp": f"{timestamp_base}_{timestamp_valid}",
+                    "url": urljoin(f"{settings.BASE_URL}/", cached_url)
+                })
+                continue
+
+            # Generate new image
+            data_rain = data_loader.get_frame(rain_variable, timestamp_base, timestamp_valid)
+
+            url = visualizer.create_rain_plot(
+                data_rain,
+                timestamp_base,
+                timestamp_valid
+            )
+
+            if url:
+                images_info.append({
+                    "timestamp": f"{timestamp_base}_{timestamp_valid}",
+                    "url": process_url(url, model_type)  # url
+                })
+
+        return {"images": images_info}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating precipitation visualization: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def get_country_code(country_name: str) -> str:
+    """
+    ISO alpha-2 code of a country, from the local boundaries.
+
+    Args:
+        country_name: Country name or ISO code
+
+    Returns:
+        str: ISO alpha-2 code
+
+    Raises:
+        KeyError: If the country is unknown
     """
-    r = requests.get("https://overpass-api.de/api/interpreter", params={"data": query})
-    data = r.json()
+    return country_geometries().country_code(country_name)
 
-    if not data["elements"]:
-        return None
 
-    # First match
-    return data["elements"][0]["bounds"]
-    
-def get_city_coordinates(city_name):
+def get_country_bounds(country_name: str) -> Dict[str, float]:
     """
-    Get coordinates for a European capital city from the JSON file.
-    
+    Bounding box of a country, from the local boundaries.
+
     Args:
-        city_name: Name of the city
-        
+        country_name: Country name or ISO code
+
     Returns:
-        List [latitude, longitude] or None if city not found
+        Dict with minlat, minlon, maxlat and maxlon
+
+    Raises:
+        KeyError: If the country is unknown
+    """
+    return country_geometries().bounds(country_name)
+
+
+@lru_cache(maxsize=1)
+def get_capitals_coordinates() -> Dict[str, List[float]]:
+    """
+    Load the European capitals coordinates file once per process.
+
+    Returns:
+        Dict mapping city name to [latitude, longitude] (empty if the file is unusable)
     """
     json_file_path = os.path.join(os.path.dirname(__file__), "../../../european_capitals_coordinates.json")
-    
+
     try:
         with open(json_file_path, 'r') as f:
-            coordinates_data = json.load(f)
-        
-        return coordinates_data.get(city_name)
+            return json.load(f)
     except FileNotFoundError:
         logger.error(f"European capitals coordinates file not found at {json_file_path}")
-        return None
+        return {}
     except json.JSONDecodeError:
         logger.error(f"Error decoding JSON from {json_file_path}")
-        return None
+        return {}
+
+
+def get_city_coordinates(city_name):
+    """
+    Get coordinates for a European capital city from the JSON file.
+    
+    Args:
+        city_name: Name of the city
+        
+    Returns:
+        List [latitude, longitude] or None if city not found
+    """
+    return get_capitals_coordinates().get(city_name)
 
 # def pred_data_sort_lat_long(data_source,start_lat=47.0,end_lat=55.0,start_lon=5.0, end_lon=15.0,start_date="2021-01-05",end_date="2021-01-05",usr_lat=0,usr_lon=0,temp_var='t2m',base_time=None): #2021-01-05T01:00:00
 #     # Select data by base_time if provided, otherwise use date range
@@ -715,31 +748,9 @@ def pred_data_sort_lat_long(data_source, xy, temp_var='t2m', base_time=None):
         DataFrame with columns: time, forecast_time, temperature_2m
     """
     if base_time is not None:
-        base_time_dt = pd.Timestamp(base_time, unit='s')
-        target_times = [base_time_dt + pd.Timedelta(hours=h) for h in [6, 12, 18, 24, 30]]
-        
-        results = []
-        for target_time in target_times:
-            try:
-                # Select base time (time when forecast was made)
-                time_data = data_source.sel(time=base_time_dt, method='nearest')
-                # Calculate prediction timedelta
-                timedelta = (target_time - base_time_dt).total_seconds() / 3600  # hours
-                timedelta_str = f"{int(timedelta)} hours"
-                
-                # Get temperature value at xy for this prediction timedelta
-                temp_value = time_data.sel(prediction_timedelta=timedelta_str, method='nearest')[temp_var].values[::-1,:][xy]
-                
-                results.append({
-                    'time': base_time_dt,
-                    'forecast_time': target_time,
-                    'temperature_2m': float(temp_value)
-                })
-            except (KeyError, ValueError, IndexError) as e:
-                logger.warning(f"Could not get prediction for {target_time}: {e}")
-                continue
-        
-        df = pd.DataFrame(results)
+        # One read of the point across all leads; the field is stored upside down
+        df = forecast_point_series(data_source, temp_var, xy, base_time, flip_y=True)
+        df = df.rename(columns={"value": "temperature_2m"})
     else:
         # If no base_time provided, get all available data at xy
         temp_data = data_source[temp_var].isel(y=xy[0], x=xy[1])
@@ -877,28 +888,9 @@ def gt_data_sort_lat_long(data_source, xy, temp_var='t2m', base_time=None):
         DataFrame with columns: time, forecast_time, temperature_2m
     """
     if base_time is not None:
-        base_time_dt = pd.Timestamp(base_time, unit='s')
-        # Calculate target times: base_time + [6h, 12h, 18h, 24h, 30h]
-        target_times = [base_time_dt + pd.Timedelta(hours=h) for h in [6, 12, 18, 24, 30]]
-        
-        results = []
-        for target_time in target_times:
-            try:
-                # For ground truth, time represents the actual observation time
-                time_data = data_source.sel(time=target_time, method='nearest')
-                # Get temperature value at xy
-                temp_value = time_data[temp_var].values[xy]
-                
-                results.append({
-                    'time': target_time,
-                    'forecast_time': target_time,
-                    'temperature_2m': float(temp_value)
-                })
-            except (KeyError, ValueError, IndexError) as e:
-                logger.warning(f"Could not get ground truth for {target_time}: {e}")
-                continue
-        
-        df = pd.DataFrame(results)
+        valid_times = [int(base_time) + hours * 3600 for hours in POINT_LEAD_HOURS]
+        df = observed_point_series(data_source, temp_var, xy, valid_times)
+        df = df.rename(columns={"value": "temperature_2m"})
     else:
         # If no base_time provided, get all available data at xy
         temp_data = data_source[temp_var].isel(y=xy[0], x=xy[1])
@@ -928,12 +920,305 @@ def temp_compare(graphcast_ds,pred_ds,gt_ds,country_name,base_time):
     # Get exact coordinates from the city
     lat = res_metadata[0]
     lon = res_metadata[1]
-    # Find xy indices from ground truth dataset
-    xy = np.unravel_index((np.abs(gt_ds.longitude.values - lon) + np.abs(gt_ds.latitude.values - lat)).argmin(), gt_ds.longitude.values.shape)
+    # Find xy indices on the shared grids; fall back to the ground truth's own grid if it differs
+    rows, cols = grid_indices(gt_ds, [lat], [lon])
+    xy = (int(rows[0]), int(cols[0]))
     
-    # Get data for all three models using the same xy indices
-    ground_truth_res = gt_data_sort_lat_long(data_source=gt_ds, xy=xy, base_time=base_time)
-    cerrora_res = pred_data_sort_lat_long(pred_ds, xy=xy, base_time=base_time)
-    graphcast_res = pred_data_sort_lat_long(graphcast_ds, xy=xy, base_time=base_time)
+    # Get data for all three models using the same xy indices; the reads are independent
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        ground_truth_future = pool.submit(gt_data_sort_lat_long, data_source=gt_ds, xy=xy, base_time=base_time)
+        cerrora_future = pool.submit(pred_data_sort_lat_long, pred_ds, xy=xy, base_time=base_time)
+        graphcast_future = pool.submit(pred_data_sort_lat_long, graphcast_ds, xy=xy, base_time=base_time)
+        ground_truth_res = ground_truth_future.result()
+        cerrora_res = cerrora_future.result()
+        graphcast_res = graphcast_future.result()
+
+    return (graphcast_res,cerrora_res,ground_truth_res)
+
+
+def grid_indices(gt_ds, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nearest grid indices of many points on the ground truth's grid.
+
+    Args:
+        gt_ds: Ground truth dataset with 2D latitude/longitude
+        lats: Latitudes in degrees
+        lons: Longitudes in degrees
+
+    Returns:
+        Tuple of row and column index arrays
+    """
+    grids = shared_grids()
+    if grids.shape == gt_ds.longitude.shape:
+        return grids.nearest_indices(lats, lons)
+    # The shared grids come from another store; scan the ground truth's own grid
+    longitude, latitude = gt_ds.longitude.values, gt_ds.latitude.values
+    nearest = [
+        np.unravel_index((np.abs(longitude - lon) + np.abs(latitude - lat)).argmin(), longitude.shape)
+        for lat, lon in zip(lats, lons)
+    ]
+    return np.array([n[0] for n in nearest], dtype=np.int64), np.array([n[1] for n in nearest], dtype=np.int64)
+
+
+def _points_table(locations, times, values: Dict[str, np.ndarray]) -> dict:
+    """Columnar table with one row per (location, time); NaN becomes null."""
+    table = {
+        "location": [name for name in locations for _ in times],
+        "forecast_time": [t.isoformat() for _ in locations for t in times],
+    }
+    for variable, array in values.items():
+        # (times, points) -> point-major rows
+        column = np.asarray(array, dtype=float).T.ravel()
+        table[variable] = [None if np.isnan(v) else float(v) for v in column]
+    return table
+
+
+def _source_points(read, variables: List[str], n_points: int):
+    """Read every variable of one source; variables it lacks become NaN columns."""
+    times, values = [], {}
+    for variable in variables:
+        try:
+            times, values[variable] = read(variable)
+        except KeyError as e:
+            logger.warning(f"Variable {variable} not available: {e}")
+            values[variable] = None
+    for variable, array in values.items():
+        if array is None:
+            values[variable] = np.full((len(times), n_points), np.nan)
+    return times, values
+
+
+def temp_compare_batch(graphcast_ds, pred_ds, gt_ds, locations: Dict[str, Tuple[float, float]], base_time: int,
+                       variables: List[str], lead_hours=POINT_LEAD_HOURS) -> dict:
+    """
+    Compare Cerrora, GraphCast and ground truth at many locations in one pass.
+
+    Each source is read with one pointwise selection over all locations and
+    leads per variable, and the three sources are read concurrently.
+
+    Args:
+        graphcast_ds: GraphCast (interpolated) forecast dataset
+        pred_ds: Cerrora forecast dataset
+        gt_ds: Ground truth dataset
+        locations: Location name to (latitude, longitude)
+        base_time: Forecast base time in seconds since epoch
+        variables: Variable names to read
+        lead_hours: Lead times in hours
+
+    Returns:
+        Dict with the locations' grid points and a columnar table per source
+    """
+    names = list(locations)
+    lats = np.array([locations[name][0] for name in names], dtype=float)
+    lons = np.array([locations[name][1] for name in names], dtype=float)
+    rows, cols = grid_indices(gt_ds, lats, lons)
+    valid_times = [int(base_time) + int(hours * 3600) for hours in lead_hours]
+
+    def read_forecast(ds):
+        return _source_points(
+            lambda variable: forecast_points(ds, variable, rows, cols, base_time, lead_hours, flip_y=True),
+            variables, len(names))
+
+    def read_truth():
+        return _source_points(
+            lambda variable: observed_points(gt_ds, variable, rows, cols, valid_times),
+            variables, len(names))
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = {
+            "ground_truth": pool.submit(read_truth),
+            "cerrora": pool.submit(read_forecast, pred_ds),
+            "graphcast": pool.submit(read_forecast, graphcast_ds),
+        }
+        results = {source: future.result() for source, future in futures.items()}
+
+    return {
+        "locations": {
+            "location": names,
+            "latitude": lats.tolist(),
+            "longitude": lons.tolist(),
+            "row": rows.tolist(),
+            "col": cols.tolist(),
+        },
+        **{source: _points_table(names, times, values) for source, (times, values) in results.items()},
+    }
+
+
+# Box corners are snapped to this many decimals (0.01 degrees, well below the
+# ~5.5 km grid spacing) before their weights are computed and cached
+BBOX_DECIMALS = 2
+
+# Variables derived from several stored ones
+DERIVED_VARIABLES: Dict[str, Tuple[Tuple[str, ...], Callable[..., np.ndarray]]] = {
+    "wind_speed": (("10u", "10v"), np.hypot),
+}
+
+
+def get_country_region(country_name: str) -> RegionWeights:
+    """
+    Grid cells and area weights of a country (cached per country).
+
+    Args:
+        country_name: Country name or ISO code
+
+    Returns:
+        RegionWeights of the country
+
+    Raises:
+        KeyError: If the country is unknown
+    """
+    country = country_geometries().lookup(country_name)
+    return cached_region_weights(get_region_key(country_name), shared_grids(), country.geometry)
+
+
+def get_region_key(region: str) -> str:
+    """
+    Key of a region in the skill archive and region caches: ``domain`` or the country's ISO alpha-3 code.
+
+    Raises:
+        KeyError: If the region is neither the domain nor a known country
+    """
+    if region == "domain":
+        return region
+    country = country_geometries().lookup(region)
+    return country.iso_a3 or country.name
+
+
+def get_domain_region() -> RegionWeights:
+    """
+    Every grid cell with its area weight (cached).
+    """
+    return domain_weights(shared_grids())
+
 
-    return (graphcast_res,cerrora_res,ground_truth_res)
\ No newline at end of file
+def get_bbox_region(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> RegionWeights:
+    """
+    Grid cells and area weights of a latitude/longitude box (cached per box).
+
+    The corners are snapped to BBOX_DECIMALS decimals first, so boxes that
+    differ by float noise share one cache entry.
+
+    Raises:
+        ValueError: If the box is empty
+    """
+    # + 0.0 turns -0.0 into 0.0, so both give the same key
+    min_lat, min_lon, max_lat, max_lon = (round(float(v), BBOX_DECIMALS) + 0.0 for v in (min_lat, min_lon, max_lat, max_lon))
+    if min_lat >= max_lat or min_lon >= max_lon:
+        raise ValueError(f"Empty box [{min_lat}, {min_lon}, {max_lat}, {max_lon}]")
+    key = f"bbox:{min_lat},{min_lon},{max_lat},{max_lon}"
+    return cached_region_weights(key, shared_grids(), shapely.box(min_lon, min_lat, max_lon, max_lat), bounded=True)
+
+
+def region_window(loader: DataLoader, region: RegionWeights, variable: str, indexer: Dict[str, int]) -> np.ndarray:
+    """Values of a (possibly derived) variable in the region's window."""
+    inputs, combine = DERIVED_VARIABLES.get(variable, ((variable,), None))
+    loader.catalog.require_variables(inputs)
+    if any("level" in loader.catalog.variables[name].dims for name in inputs):
+        raise ValueError(f"{variable} has a level dimension; region statistics need surface variables")
+    n_rows = loader.catalog.variables[inputs[0]].shape[-2]
+    window = region.window_indexer(n_rows, loader.settings.flip_y)
+    values = [np.asarray(loader.read_indexed(name, {**indexer, **window}), dtype=np.float64) for name in inputs]
+    return combine(*values) if combine else values[0]
+
+
+def _region_series(read, statistics: Dict[str, str], region: RegionWeights, flip_y: bool, n_leads: int) -> dict:
+    """One reduced series per variable; variables a source lacks become nulls."""
+    series = {}
+    for variable, statistic in statistics.items():
+        try:
+            reduced = region.reduce(read(variable), statistic, flip_y)
+        except KeyError as e:
+            logger.warning(f"Variable {variable} not available: {e}")
+            reduced = np.full(n_leads, np.nan)
+        series[variable] = [None if np.isnan(v) else float(v) for v in reduced]
+    return series
+
+
+def region_aggregate(loaders: Dict[str, DataLoader], region: RegionWeights, base_time: int,
+                     statistics: Dict[str, str], lead_hours: Optional[List[float]] = None) -> dict:
+    """
+    Region statistics per lead time for forecasts and ground truth.
+
+    Each forecast variable is read as one window spanning all lead times of
+    the base time and reduced over the region's cells in one weighted
+    operation; the ground truth is read at the matching valid times.
+
+    Args:
+        loaders: Loader per source; stores without lead times are ground truth
+        region: Region cells and weights
+        base_time: Forecast base time in seconds since epoch
+        statistics: Statistic (mean, max or min) per variable; ``wind_speed``
+            is derived from 10u and 10v
+        lead_hours: Lead times in hours (default: every lead of the first forecast)
+
+    Returns:
+        Dict with the region and, per source, lead_hours, valid_time and a
+        series per variable
+
+    Raises:
+        ValueError: If a statistic is unknown
+    """
+    unknown = {s for s in statistics.values() if s not in STATISTICS}
+    if unknown:
+        raise ValueError(f"Unknown statistics {sorted(unknown)}, use one of {STATISTICS}")
+    if lead_hours is None:
+        forecast = next((loader for loader in loaders.values() if len(loader.catalog.leads)), None)
+        lead_hours = (forecast.catalog.leads / 3600).tolist() if forecast else list(POINT_LEAD_HOURS)
+    valid_times = [int(base_time) + int(round(hours * 3600)) for hours in lead_hours]
+    window_shape = region.shape
+
+    def lookups(index_map, values) -> Tuple[List[int], List[int]]:
+        """Positions of the values found in the index map and their indices."""
+        found, indices = [], []
+        for i, value in enumerate(values):
+            try:
+                indices.append(index_map.lookup(value))
+                found.append(i)
+            except KeyError:
+                continue
+        return found, indices
+
+    def read_source(loader: DataLoader) -> dict:
+        index_maps = loader.catalog.index_maps
+        if len(loader.catalog.leads):
+            time_index = index_maps.time.lookup(base_time)
+            found, lead_indices = lookups(index_maps.lead, [int(round(hours * 3600)) for hours in lead_hours])
+
+            def read(variable):
+                # One window over every lead of the base time
+                window = region_window(loader, region, variable, {"time": time_index})
+                values = np.full((len(lead_hours),) + window_shape, np.nan)
+                values[found] = window[lead_indices]
+                return values
+        else:
+            found, time_indices = lookups(index_maps.time, valid_times)
+
+            def read(variable):
+                values = np.full((len(lead_hours),) + window_shape, np.nan)
+                for i, time_index in zip(found, time_indices):
+                    values[i] = region_window(loader, region, variable, {"time": time_index})
+                return values
+
+        return _region_series(read, statistics, region, loader.settings.flip_y, len(lead_hours))
+
+    with ThreadPoolExecutor(max_workers=max(len(loaders), 1)) as pool:
+        futures = {source: pool.submit(read_source, loader) for source, loader in loaders.items()}
+        results = {}
+        for source, future in futures.items():
+            try:
+                results[source] = future.result()
+            except KeyError as e:
+                logger.warning(f"Could not aggregate {source} for base time {base_time}: {e}")
+                results[source] = {variable: [None] * len(lead_hours) for variable in statistics}
+
+    return {
+        "region": {
+            "name": region.name,
+            "cells": region.cells,
+            "area_km2": region.area_km2,
+        },
+        **{
+            source: {"lead_hours": list(lead_hours), "valid_time": valid_times, **series}
+            for source, series in results.items()
+        },
+    }
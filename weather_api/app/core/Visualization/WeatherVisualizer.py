@@ -8,6 +8,7 @@ from typing import Tuple, Optional
 import logging
 from urllib.parse import urljoin
 from app.config import settings
+from app.core.grids import lambert_projection
 import cartopy.util as cutil
 
 logger = logging.getLogger("weather_api")
@@ -22,12 +23,7 @@ class WeatherVisualizer:
         try: #
             logger.info("Initializing WeatherVisualizer...")
             # Cache the projection
-            self.projection = ccrs.LambertConformal(
-                central_longitude=8,
-                central_latitude=50,
-                standard_parallels=(50, 50),
-                globe=ccrs.Globe(semimajor_axis=6371229),
-            )
+            self.projection = lambert_projection()
             logger.info("Created Lambert Conformal projection")
 
             # Cache the corner coordinates and their projections
@@ -0,0 +1,229 @@
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from zarr.core.buffer import default_buffer_prototype
+from zarr.core.sync import sync
+
+from app.config import settings
+from app.core.index_maps import IndexMaps
+from app.core.storage import open_zarr_dataset
+from app.core.zarr_layout import COMMITTED_TIME_ATTR, V2_ATTRS_KEY, V2_CONSOLIDATED_KEY, V3_METADATA_KEY
+
+logger = logging.getLogger("weather_api")
+
+# Documents whose content changes whenever arrays are added, resized or rewritten
+_FINGERPRINT_KEYS = (V2_CONSOLIDATED_KEY, V3_METADATA_KEY, ".zgroup", V2_ATTRS_KEY)
+
+TIME_LABEL_FORMAT = "%a %d %b %Y %H UTC"
+
+
+@dataclass(frozen=True)
+class VariableInfo:
+    """Shape and encoding of one data variable."""
+
+    dims: Tuple[str, ...]
+    shape: Tuple[int, ...]
+    chunks: Optional[Tuple[int, ...]]
+    dtype: str
+    # Time entries holding data, for copies still being extended (None: all)
+    committed_times: Optional[int] = None
+
+
+def fingerprint_document(store) -> Tuple[Optional[str], str]:
+    """Key and hash of the store's root metadata document.
+
+    Args:
+        store: zarr store
+
+    Returns:
+        Tuple[Optional[str], str]: Key of the first metadata document found
+        and its sha1, or (None, "") if there is none
+    """
+    prototype = default_buffer_prototype()
+    for key in _FINGERPRINT_KEYS:
+        buffer = sync(store.get(key, prototype))
+        if buffer is not None:
+            return key, hashlib.sha1(buffer.to_bytes()).hexdigest()
+    return None, ""
+
+
+def store_fingerprint(store) -> str:
+    """Hash of the store's root metadata document.
+
+    Args:
+        store: zarr store
+
+    Returns:
+        str: sha1 of the first metadata document found, or "" if there is none
+    """
+    return fingerprint_document(store)[1]
+
+
+def time_entry(seconds: int) -> dict:
+    """Label/value pair of a time as served to the frontend."""
+    timestamp = pd.Timestamp(int(seconds), unit="s")
+    return {"label": timestamp.strftime(TIME_LABEL_FORMAT), "value": str(int(seconds))}
+
+
+@dataclass
+class StoreCatalog:
+    """Coordinates and variables of one zarr store, read from its metadata.
+
+    Building it reads the consolidated metadata and the index coordinates
+    (time, lead time, level and other dimension coordinates) only; no data
+    chunks and no dask graphs.
+    """
+
+    path: str
+    fingerprint: str
+    variables: Dict[str, VariableInfo]
+    times: np.ndarray
+    leads: np.ndarray
+    levels: Optional[np.ndarray]
+    coords: Dict[str, np.ndarray]
+    index_maps: IndexMaps
+    loaded_at: float
+
+    @classmethod
+    def from_store(cls, path: str, store, fingerprint: Optional[str] = None) -> "StoreCatalog":
+        """Read the catalog of a store.
+
+        Args:
+            path: Path or URL the store was opened from
+            store: zarr store
+            fingerprint: Fingerprint of the store, if already known
+
+        Returns:
+            StoreCatalog: Catalog of the store
+        """
+        if fingerprint is None:
+            fingerprint = store_fingerprint(store)
+        ds = open_zarr_dataset(store, chunks=None)
+        committed = ds.attrs.get(COMMITTED_TIME_ATTR, {})
+        variables = {
+            name: VariableInfo(
+                dims=tuple(var.dims),
+                shape=tuple(var.shape),
+                chunks=tuple(var.encoding["chunks"]) if var.encoding.get("chunks") else None,
+                dtype=str(var.dtype),
+                committed_times=committed.get(name),
+            )
+            for name, var in ds.data_vars.items()
+        }
+        index_maps = IndexMaps.from_dataset(ds)
+        empty = np.array([], dtype=np.int64)
+        return cls(
+            path=path,
+            fingerprint=fingerprint,
+            variables=variables,
+            times=index_maps.time.values if index_maps.time is not None else empty,
+            leads=index_maps.lead.values if index_maps.lead is not None else empty,
+            levels=ds["level"].values if "level" in ds.coords else None,
+            coords={
+                dim: ds[dim].values
+                for dim in ds.dims
+                if dim in ds.coords and dim not in ("time", "prediction_timedelta")
+            },
+            index_maps=index_maps,
+            loaded_at=time.monotonic(),
+        )
+
+    def require_variables(self, variables: Iterable[str]) -> None:
+        """Raise KeyError for a variable the store does not hold."""
+        for name in variables:
+            if name not in self.variables:
+                raise KeyError(name)
+
+    def require_leads(self, lead_times: Iterable[np.timedelta64]) -> None:
+        """Raise KeyError for a lead time the store does not hold."""
+        for lead in lead_times:
+            seconds = int(np.timedelta64(lead, "s").astype(np.int64))
+            if self.index_maps.lead is None or seconds not in self.index_maps.lead:
+                raise KeyError(f"prediction_timedelta={lead} not found")
+
+    def require_times(self, times: pd.DatetimeIndex) -> np.ndarray:
+        """Check that every time is in the store.
+
+        Args:
+            times: Times to look up
+
+        Returns:
+            np.ndarray: The times in epoch seconds
+
+        Raises:
+            KeyError: If a time is not in the store
+        """
+        seconds = times.values.astype("datetime64[s]").astype(np.int64)
+        for value in seconds.tolist():
+            if self.index_maps.time is None or value not in self.index_maps.time:
+                raise KeyError(f"time={pd.Timestamp(value, unit='s')} not found")
+        return seconds
+
+    def time_entries(self, times: pd.DatetimeIndex) -> List[dict]:
+        """Label/value entries of times that are all in the store.
+
+        Raises:
+            KeyError: If a time is not in the store
+        """
+        return [time_entry(value) for value in self.require_times(times).tolist()]
+
+
+class CatalogService:
+    """Per-store catalogs, rebuilt when a store's fingerprint changes.
+
+    The fingerprint is re-read at most every ``refresh_seconds``; in between
+    the catalog is served from memory.
+    """
+
+    def __init__(self, refresh_seconds: float = 60.0):
+        self.refresh_seconds = refresh_seconds
+        self._catalogs: Dict[str, StoreCatalog] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, store) -> StoreCatalog:
+        """Catalog of the store at path.
+
+        Args:
+            path: Path or URL the store was opened from
+            store: zarr store
+
+        Returns:
+            StoreCatalog: Current catalog of the store
+        """
+        now = time.monotonic()
+        catalog = self._catalogs.get(path)
+        if catalog is not None and now - self._checked_at[path] < self.refresh_seconds:
+            return catalog
+
+        with self._lock:
+            catalog = self._catalogs.get(path)
+            if catalog is not None and now - self._checked_at[path] < self.refresh_seconds:
+                return catalog
+            fingerprint = store_fingerprint(store)
+            if catalog is None or catalog.fingerprint != fingerprint:
+                if catalog is not None:
+                    logger.info(f"Metadata of {path} changed, rebuilding its catalog")
+                catalog = StoreCatalog.from_store(path, store, fingerprint)
+                self._catalogs[path] = catalog
+            self._checked_at[path] = now
+            return catalog
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop the catalog of one store, or of all stores."""
+        with self._lock:
+            if path is None:
+                self._catalogs.clear()
+                self._checked_at.clear()
+            else:
+                self._catalogs.pop(path, None)
+                self._checked_at.pop(path, None)
+
+
+catalog_service = CatalogService(refresh_seconds=settings.CATALOG_REFRESH_S)
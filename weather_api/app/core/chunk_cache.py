@@ -0,0 +1,523 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+import numpy as np
+from numcodecs import get_codec
+from numcodecs.compat import ensure_contiguous_ndarray
+from zarr.abc.store import OffsetByteRequest, RangeByteRequest, SuffixByteRequest
+from zarr.storage import WrapperStore
+
+from app.core.catalog import fingerprint_document
+from app.core.fetch import ConcurrentFetchStore
+
+logger = logging.getLogger("weather_api")
+
+_ARRAY_META_KEY = ".zarray"
+_CONSOLIDATED_META_KEY = ".zmetadata"
+# Chunk files no index references are swept once they are this old; younger
+# ones may belong to another process that has not flushed its index yet
+ORPHAN_GRACE_SECONDS = 3600.0
+
+
+def _byte_view(array: np.ndarray) -> np.ndarray:
+    """Flat uint8 view of a contiguous array, without copying it."""
+    return array.reshape(-1, order="A").view(np.uint8)
+
+
+class MemoryChunkTier:
+    """Thread-safe LRU of chunk bytes bounded by total size in bytes.
+
+    Values are ``bytes`` or flat uint8 arrays (views of decoded chunks).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes | np.ndarray]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> "Optional[bytes | np.ndarray]":
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: "bytes | np.ndarray") -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._nbytes -= len(previous)
+            self._entries[key] = value
+            self._nbytes += len(value)
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+
+class DiskChunkTier:
+    """Size-capped directory of decoded chunks stored as ``.npy`` files.
+
+    Entries are tracked in ``index.json`` next to the chunk files so the cache
+    survives restarts. Every worker process sharing the directory keeps its
+    own copy of the index and merges it with the file under an exclusive
+    ``flock`` when flushing, so entries other workers added or evicted are not
+    lost. Chunk files no index references (left by crashed workers) are swept
+    on start. Reads return read-only memory maps.
+    """
+
+    INDEX_FILE = "index.json"
+    LOCK_FILE = "index.lock"
+
+    def __init__(self, directory: str, max_bytes: int, flush_every: int = 32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self._index: Dict[str, dict] = {}
+        self._nbytes = 0
+        self._dirty = 0
+        # Keys this process removed since its last flush
+        self._removed: Set[str] = set()
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @staticmethod
+    def _filename(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npy"
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the exclusive lock on the directory's index across processes."""
+        with open(os.path.join(self.directory, self.LOCK_FILE), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_index(self) -> Dict[str, dict]:
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        try:
+            with open(index_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Discarding unreadable chunk cache index {index_path}: {e}")
+            return {}
+
+    def _load_index(self) -> None:
+        """Load the persisted index, dropping entries whose files are gone, and sweep orphaned files."""
+        with self._file_lock():
+            for key, entry in self._read_index().items():
+                if os.path.exists(os.path.join(self.directory, entry["file"])):
+                    self._index[key] = entry
+                    self._nbytes += entry["nbytes"]
+            swept = self._sweep_orphans()
+        logger.info(
+            f"Loaded chunk cache index with {len(self._index)} entries "
+            f"({self._nbytes} bytes) from {self.directory}, swept {swept} orphaned files"
+        )
+
+    def _sweep_orphans(self) -> int:
+        """Remove chunk and temporary files older than ORPHAN_GRACE_SECONDS that the index does not reference."""
+        referenced = {entry["file"] for entry in self._index.values()}
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        swept = 0
+        for name in os.listdir(self.directory):
+            if name in referenced or not (name.endswith(".npy") or name.endswith(".tmp")):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    swept += 1
+            except FileNotFoundError:
+                pass
+        return swept
+
+    def flush(self) -> None:
+        """Merge the index with the persisted one and persist it atomically."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            with self._file_lock():
+                self._merge_locked(self._read_index())
+                self._evict_locked()
+                with open(tmp_path, "w") as f:
+                    json.dump(self._index, f)
+                os.replace(tmp_path, index_path)
+        except OSError as e:
+            logger.warning(f"Could not persist chunk cache index in {self.directory}: {e}")
+            return
+        self._removed.clear()
+        self._dirty = 0
+
+    def _merge_locked(self, persisted: Dict[str, dict]) -> None:
+        """Adopt the entries other processes persisted, keeping this process's changes."""
+        merged: Dict[str, dict] = {}
+        for key, entry in persisted.items():
+            if key in self._removed:
+                continue
+            ours = self._index.get(key)
+            merged[key] = ours if ours is not None and ours["atime"] >= entry["atime"] else entry
+        for key, entry in self._index.items():
+            # Not persisted: added here since the last flush, or evicted by another process
+            if key not in merged and os.path.exists(os.path.join(self.directory, entry["file"])):
+                merged[key] = entry
+        self._index = merged
+        self._nbytes = sum(entry["nbytes"] for entry in merged.values())
+
+    def _mark_dirty_locked(self) -> None:
+        self._dirty += 1
+        if self._dirty >= self.flush_every:
+            self._flush_locked()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            entry["atime"] = time.time()
+        try:
+            return np.load(os.path.join(self.directory, entry["file"]), mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cached chunk {key}: {e}")
+            self.discard(key)
+            return None
+
+    def put(self, key: str, array: np.ndarray) -> None:
+        if array.nbytes > self.max_bytes:
+            return
+        filename = self._filename(key)
+        path = os.path.join(self.directory, filename)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # The directory may have been swept as stale by another process
+            logger.warning(f"Not caching chunk {key} on disk: {e}")
+            return
+
+        with self._lock:
+            self._removed.discard(key)
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._nbytes -= previous["nbytes"]
+            self._index[key] = {
+                "file": filename,
+                "nbytes": int(array.nbytes),
+                "atime": time.time(),
+            }
+            self._nbytes += int(array.nbytes)
+            self._evict_locked()
+            self._mark_dirty_locked()
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry is None:
+                return
+            self._removed.add(key)
+            self._nbytes -= entry["nbytes"]
+            self._remove_file(entry["file"])
+            self._mark_dirty_locked()
+
+    def _evict_locked(self) -> None:
+        if self._nbytes <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["atime"]):
+            if self._nbytes <= self.max_bytes:
+                break
+            del self._index[key]
+            self._removed.add(key)
+            self._nbytes -= entry["nbytes"]
+            self._remove_file(entry["file"])
+
+    def _remove_file(self, filename: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for key, entry in self._index.items():
+                self._removed.add(key)
+                self._remove_file(entry["file"])
+            self._index.clear()
+            self._nbytes = 0
+            self._flush_locked()
+
+
+class CachedStore(WrapperStore):
+    """Zarr store wrapper that caches chunks in RAM and on local disk.
+
+    Zarr v2 arrays are served uncompressed: their metadata is rewritten to drop
+    the compressor and filters, chunks are decoded once on the way in and kept
+    on disk as memory-mappable ``.npy`` files. Chunks of arrays that cannot be
+    decoded here (other formats, ranged reads) are only kept in the RAM tier.
+
+    The disk tier lives in ``<cache_dir>/<namespace>/<fingerprint>``, the
+    fingerprint being that of the store's root metadata (as in the catalog).
+    When a metadata read shows the store was rewritten, both tiers move to the
+    new fingerprint and the directories of older ones are removed, so chunks
+    of a replaced store are never served.
+
+    Wrapping a ``ConcurrentFetchStore`` routes its lead-time read-ahead
+    through the cache: chunks already cached are not fetched again, and
+    fetched ones go to both tiers.
+    """
+
+    def __init__(
+            self,
+            store,
+            cache_dir: str,
+            memory_bytes: int,
+            disk_bytes: int,
+            namespace: Optional[str] = None,
+            fingerprint: Optional[Tuple[Optional[str], str]] = None,
+    ):
+        super().__init__(store)
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.namespace = namespace or self._default_namespace(store)
+        # (metadata key, sha1) the disk tier belongs to
+        self._fingerprint_key, self.fingerprint = fingerprint or fingerprint_document(store)
+        self._switch_lock = threading.Lock()
+        self.memory = MemoryChunkTier(memory_bytes)
+        self.disk = self._disk_tier(self.fingerprint)
+        self._array_meta: Dict[str, dict] = {}
+        self.hits = {"memory": 0, "disk": 0, "miss": 0}
+        # The wrapped store's read-ahead, scheduled on cache hits too
+        self._read_ahead: Optional[ConcurrentFetchStore] = None
+        if isinstance(store, ConcurrentFetchStore):
+            store.prefetch_reader = self._prefetch
+            self._read_ahead = store
+
+    def _with_store(self, store):
+        return type(self)(
+            store,
+            cache_dir=self.cache_dir,
+            memory_bytes=self.memory_bytes,
+            disk_bytes=self.disk_bytes,
+            namespace=self.namespace,
+            fingerprint=(self._fingerprint_key, self.fingerprint),
+        )
+
+    def _disk_tier(self, fingerprint: str) -> DiskChunkTier:
+        directory = os.path.join(self.cache_dir, self.namespace, fingerprint[:16] or "unversioned")
+        return DiskChunkTier(directory, self.disk_bytes)
+
+    def _check_fingerprint(self, key: str, data: bytes) -> None:
+        """Move to a new disk tier if the store's root metadata document changed."""
+        if key != self._fingerprint_key:
+            return
+        fingerprint = hashlib.sha1(data).hexdigest()
+        with self._switch_lock:
+            if fingerprint == self.fingerprint:
+                return
+            logger.info(f"Metadata of {self._store!r} changed, dropping its cached chunks")
+            previous = self.disk
+            self.fingerprint = fingerprint
+            self.disk = self._disk_tier(fingerprint)
+            self.memory.clear()
+            shutil.rmtree(previous.directory, ignore_errors=True)
+
+    @staticmethod
+    def _default_namespace(store) -> str:
+        return hashlib.sha1(str(store).encode("utf-8")).hexdigest()[:16]
+
+    def __repr__(self) -> str:
+        return f"CachedStore({self._store!r}, namespace={self.namespace!r})"
+
+    @property
+    def supports_writes(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        self.disk.flush()
+        super().close()
+
+    async def get(self, key, prototype, byte_range=None):
+        basename = key.rsplit("/", 1)[-1]
+        if basename == _CONSOLIDATED_META_KEY or basename == _ARRAY_META_KEY:
+            return await self._get_metadata(key, prototype, byte_range)
+        if basename.startswith(".z") or basename == "zarr.json":
+            buffer = await self._store.get(key, prototype, byte_range)
+            if buffer is not None and byte_range is None and key == self._fingerprint_key:
+                self._check_fingerprint(key, buffer.to_bytes())
+            return buffer
+
+        array_path = self._resolve_array(key)
+        cache_key, decodable = self._cache_key(key, byte_range, array_path)
+        if cache_key is None:
+            return await self._store.get(key, prototype, byte_range)
+
+        cached = self.memory.get(cache_key)
+        if cached is not None:
+            self.hits["memory"] += 1
+            self._schedule_read_ahead(key, prototype, byte_range)
+            return prototype.buffer.from_bytes(cached)
+
+        if decodable:
+            array = await asyncio.to_thread(self.disk.get, cache_key)
+            if array is not None:
+                self.hits["disk"] += 1
+                self._schedule_read_ahead(key, prototype, byte_range)
+                # A view of the memory map: the chunk is paged in, never copied
+                data = _byte_view(array)
+                self.memory.put(cache_key, data)
+                return prototype.buffer.from_bytes(data)
+
+        self.hits["miss"] += 1
+        buffer = await self._store.get(key, prototype, byte_range)
+        if buffer is None:
+            return None
+        data = await self._keep(cache_key, array_path if decodable else None, buffer)
+        return prototype.buffer.from_bytes(data)
+
+    async def _keep(self, cache_key: str, array_path: Optional[str], buffer) -> "bytes | np.ndarray":
+        """Cache a fetched chunk, decoded in both tiers if array_path is given; returns what to serve."""
+        # Kept already if the wrapped store's read-ahead fetched it
+        kept = self.memory.get(cache_key)
+        if kept is not None:
+            return kept
+        data = buffer.to_bytes()
+        if array_path is not None:
+            array = self._decode(self._array_meta[array_path], data)
+            await asyncio.to_thread(self.disk.put, cache_key, array)
+            data = _byte_view(array)
+        self.memory.put(cache_key, data)
+        return data
+
+    def _schedule_read_ahead(self, key: str, prototype, byte_range) -> None:
+        # Misses reach the wrapped store, which schedules its read-ahead itself
+        if self._read_ahead is not None and byte_range is None:
+            self._read_ahead.schedule_prefetch(key, prototype)
+
+    async def _prefetch(self, key, prototype):
+        """Read a chunk ahead for the wrapped store, unless it is cached, and cache it."""
+        array_path = self._resolve_array(key)
+        cache_key, decodable = self._cache_key(key, None, array_path)
+        if cache_key in self.memory or (decodable and cache_key in self.disk):
+            return None
+        buffer = await self._store.fetch(key, prototype)
+        if buffer is not None:
+            await self._keep(cache_key, array_path if decodable else None, buffer)
+        return buffer
+
+    async def get_partial_values(self, prototype, key_ranges):
+        return await asyncio.gather(
+            *(self.get(key, prototype, byte_range) for key, byte_range in key_ranges)
+        )
+
+    async def _get_metadata(self, key, prototype, byte_range):
+        buffer = await self._store.get(key, prototype, byte_range)
+        if buffer is None or byte_range is not None:
+            return buffer
+        raw = buffer.to_bytes()
+        self._check_fingerprint(key, raw)
+        document = json.loads(raw)
+        prefix = key.rsplit("/", 1)[0] if "/" in key else ""
+
+        if key.endswith(_CONSOLIDATED_META_KEY):
+            metadata = document.get("metadata", {})
+            for meta_key, meta in metadata.items():
+                if meta_key.rsplit("/", 1)[-1] == _ARRAY_META_KEY:
+                    parts = [prefix] + meta_key.split("/")[:-1]
+                    array_path = "/".join(p for p in parts if p)
+                    metadata[meta_key] = self._register_array(array_path, meta)
+        else:
+            document = self._register_array(prefix, document)
+
+        return prototype.buffer.from_bytes(json.dumps(document).encode("utf-8"))
+
+    def _register_array(self, array_path: str, meta: dict) -> dict:
+        """Remember how to decode an array's chunks and return the served metadata."""
+        if meta.get("zarr_format") != 2 or np.dtype(meta["dtype"]).hasobject:
+            return meta
+        self._array_meta[array_path] = dict(meta)
+        served = dict(meta)
+        served["compressor"] = None
+        served["filters"] = None
+        return served
+
+    def _resolve_array(self, key: str) -> Optional[str]:
+        """Find the registered array a chunk key belongs to (longest match)."""
+        match = None
+        for array_path in self._array_meta:
+            prefix = f"{array_path}/" if array_path else ""
+            if key.startswith(prefix) and (match is None or len(array_path) > len(match)):
+                match = array_path
+        return match
+
+    @staticmethod
+    def _cache_key(key: str, byte_range, array_path: Optional[str]) -> Tuple[Optional[str], bool]:
+        """Return the cache key for a read and whether it can go to the disk tier."""
+        if byte_range is None:
+            return key, array_path is not None
+        if isinstance(byte_range, RangeByteRequest):
+            return f"{key}@{byte_range.start}-{byte_range.end}", False
+        # Shard indexes of sharded v3 arrays are read from the end of the shard
+        if isinstance(byte_range, SuffixByteRequest):
+            return f"{key}@-{byte_range.suffix}", False
+        if isinstance(byte_range, OffsetByteRequest):
+            return f"{key}@{byte_range.offset}-", False
+        return None, False
+
+    @staticmethod
+    def _decode(meta: dict, data: bytes) -> np.ndarray:
+        """Decode a raw v2 chunk into an array of its chunk shape."""
+        buffer = data
+        if meta.get("compressor"):
+            buffer = get_codec(meta["compressor"]).decode(buffer)
+        for codec_config in reversed(meta.get("filters") or []):
+            buffer = get_codec(codec_config).decode(buffer)
+        array = ensure_contiguous_ndarray(buffer).view(np.dtype(meta["dtype"]))
+        return array.reshape(meta["chunks"], order=meta.get("order", "C"))
@@ -1,14 +1,27 @@
+import hashlib
+import os
 import xarray as xr
-import gcsfs
 from app.config import settings
 import logging
 import zarr
+from zarr.storage import FsspecStore, LocalStore
 import pandas as pd
 import numpy as np
-from typing import List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
 
+from app.core.catalog import StoreCatalog, VariableInfo, catalog_service
+from app.core.chunk_cache import CachedStore
+from app.core.direct_read import Indexer, read_selection, selection_for
+from app.core.fetch import ConcurrentFetchStore, RequestLimiter
+from app.core.hedging import HedgedStore
+from app.core.hot_fields import hot_fields
+from app.core.index_maps import IndexMaps
+from app.core.scheduling import DEFAULT_WORKLOAD, WorkloadProfile, get_profile
+from app.core.storage import BackendConfig, is_remote_path, open_remote_mapper, open_zarr_dataset
+from app.core.zarr_layout import selection_read_bytes
+
 logger = logging.getLogger("weather_api")
 
 
@@ -29,11 +42,18 @@ class ModelSettings:
     zarr_path: str
     lead_time: Optional[List[np.timedelta64]]
     fixed_time_slice: Optional[slice]
+    # Fields stored upside down relative to the shared coordinate grids
+    flip_y: bool = False
 
 
 class DataLoader:
     """Handles loading and processing of weather data with model-specific configurations."""
 
+    # Opened stores, keyed by zarr path
+    _stores: Dict[str, object] = {}
+    # Root zarr groups for direct reads, keyed by zarr path: (fingerprint, group)
+    _groups: Dict[str, Tuple[str, zarr.Group]] = {}
+
     def __init__(self, model_type: Union[str, ModelType] = ModelType.CERRORA):
         """Initialize the data loader with model type.
 
@@ -43,7 +63,10 @@ class DataLoader:
         self.model_type = ModelType(model_type)  # Ensures valid model type
         self.settings = self._get_model_settings()
         self._dataset = None
+        self._profile_datasets: Dict[str, xr.Dataset] = {}
         self._fs = None
+        self._index_maps = None
+        self._catalog_fingerprint = None
 
     def _get_model_settings(self) -> ModelSettings:
         settings_map = {
@@ -53,7 +76,8 @@ class DataLoader:
                 use_cache=True,
                 zarr_path=settings.GRAPHCAST_INTERPOLATED_ZARR_PATH,
                 lead_time=None,
-                fixed_time_slice=None
+                fixed_time_slice=None,
+                flip_y=True
             ),
             ModelType.CERRORA: ModelSettings(
                 resolution=0.5,
@@ -65,7 +89,8 @@ class DataLoader:
                     "2021-01-04T00:00:00.000000000", "2021-01-07T06:00:00.000000000"
                  #   "2008-07-01T06:00:00.000000000",
                   #  "2008-07-05T06:00:00.000000000"
-                )
+                ),
+                flip_y=True
             ),
             ModelType.CERRORA_GT: ModelSettings(
                 resolution=0.5,
@@ -96,31 +121,464 @@ class DataLoader:
             self._dataset = self._load_dataset()
         return self._dataset
 
-    def _load_dataset(self) -> xr.Dataset:
+    def dataset_for(self, workload: Optional[str] = None) -> xr.Dataset:
+        """Get the dataset chunked for a workload's profile.
+
+        Profiles with the same chunks share one opened dataset.
+
+        Args:
+            workload: Workload name from Settings.DASK_PROFILES
+
+        Returns:
+            xr.Dataset: Dataset opened with the profile's chunks
+        """
+        profile = get_profile(workload)
+        if profile.chunks_key == get_profile(DEFAULT_WORKLOAD).chunks_key:
+            return self.dataset
+        if profile.chunks_key not in self._profile_datasets:
+            self._profile_datasets[profile.chunks_key] = self._load_dataset(profile)
+        return self._profile_datasets[profile.chunks_key]
+
+    @property
+    def catalog(self) -> StoreCatalog:
+        """Coordinates and variables of the store, read from its metadata only.
+
+        If the store's metadata changed since the dataset was opened, the
+        dataset is reopened on next access.
+        """
+        catalog = catalog_service.get(self.settings.zarr_path, self.store)
+        if self._catalog_fingerprint != catalog.fingerprint:
+            if self._catalog_fingerprint is not None:
+                self.dataset = None
+            self._catalog_fingerprint = catalog.fingerprint
+        return catalog
+
+    @property
+    def index_maps(self) -> IndexMaps:
+        """Time and lead-time lookup tables, built once per dataset open."""
+        if self._index_maps is None:
+            self._index_maps = IndexMaps.from_dataset(self.dataset)
+        return self._index_maps
+
+    def frame_indexer(self, base_time: int, valid_time: int) -> Dict[str, int]:
+        """Get the integer indexer of a forecast frame.
+
+        Args:
+            base_time: Forecast base time in epoch seconds
+            valid_time: Valid time in epoch seconds
+
+        Returns:
+            Dict[str, int]: Indexer for ``isel``
+
+        Raises:
+            KeyError: If the base or lead time is not in the dataset
+        """
+        return self.index_maps.frame_indexer(base_time, valid_time)
+
+    def valid_time_indexer(self, valid_time: int) -> Dict[str, int]:
+        """Get the integer indexer of a ground truth field.
+
+        Args:
+            valid_time: Valid time in epoch seconds
+
+        Returns:
+            Dict[str, int]: Indexer for ``isel``
+
+        Raises:
+            KeyError: If the time is not in the dataset
+        """
+        return self.index_maps.valid_time_indexer(valid_time)
+
+    @property
+    def zarr_group(self) -> zarr.Group:
+        """Root zarr group of the store, reopened when its metadata changes."""
+        return self._group_at(self.settings.zarr_path, self.catalog.fingerprint)
+
+    def _catalog_at(self, path: str) -> StoreCatalog:
+        return catalog_service.get(path, self._store_at(path))
+
+    def _group_at(self, path: str, fingerprint: Optional[str] = None) -> zarr.Group:
+        if fingerprint is None:
+            fingerprint = self._catalog_at(path).fingerprint
+        cached = DataLoader._groups.get(path)
+        if cached is None or cached[0] != fingerprint:
+            cached = (fingerprint, zarr.open_group(self._store_at(path), mode="r"))
+            DataLoader._groups[path] = cached
+        return cached[1]
+
+    def read_frame(
+            self,
+            variable: str,
+            base_time: int,
+            valid_time: int,
+            out: Optional[np.ndarray] = None,
+            **indexers: Union[int, slice],
+    ) -> np.ndarray:
+        """Read one forecast frame straight from zarr, bypassing xarray and dask.
+
+        Args:
+            variable: Name of the variable
+            base_time: Forecast base time in epoch seconds
+            valid_time: Valid time in epoch seconds
+            out: Optional preallocated buffer to read into
+            **indexers: Integer indices or slices of further dimensions (e.g. level)
+
+        Returns:
+            np.ndarray: The frame's values
+
+        Raises:
+            KeyError: If the variable, base or lead time is not in the store
+        """
+        indexer = self.catalog.index_maps.frame_indexer(base_time, valid_time)
+        indexer.update(indexers)
+        return self._read_direct(variable, indexer, out)
+
+    def read_field(
+            self,
+            variable: str,
+            valid_time: int,
+            out: Optional[np.ndarray] = None,
+            **indexers: Union[int, slice],
+    ) -> np.ndarray:
+        """Read one analysis/ground truth field straight from zarr.
+
+        Args:
+            variable: Name of the variable
+            valid_time: Valid time in epoch seconds
+            out: Optional preallocated buffer to read into
+            **indexers: Integer indices or slices of further dimensions
+
+        Returns:
+            np.ndarray: The field's values
+
+        Raises:
+            KeyError: If the variable or time is not in the store
+        """
+        indexer = self.catalog.index_maps.valid_time_indexer(valid_time)
+        indexer.update(indexers)
+        return self._read_direct(variable, indexer, out)
+
+    def get_frame(self, variable: str, base_time: int, valid_time: int) -> xr.DataArray:
+        """Get one forecast frame with model-specific processing.
+
+        Uses the direct zarr read path if DIRECT_READ_ENABLED is set and
+        xarray's lazy selection otherwise.
+
+        Args:
+            variable: Name of the variable
+            base_time: Forecast base time in epoch seconds
+            valid_time: Valid time in epoch seconds
+
+        Returns:
+            xr.DataArray: The frame, with the remaining dimension coordinates
+        """
+        if not settings.DIRECT_READ_ENABLED:
+            data = self.get_variable_data(variable, workload="field")
+            (frame,) = get_profile("field").compute(data.isel(self.frame_indexer(base_time, valid_time)))
+            return frame
+        indexer = self.catalog.index_maps.frame_indexer(base_time, valid_time)
+        return self._apply_model_specific_processing(self._direct_data_array(variable, indexer))
+
+    def get_field(self, variable: str, valid_time: int) -> xr.DataArray:
+        """Get one analysis/ground truth field with model-specific processing.
+
+        Args:
+            variable: Name of the variable
+            valid_time: Valid time in epoch seconds
+
+        Returns:
+            xr.DataArray: The field, with the remaining dimension coordinates
+        """
+        if not settings.DIRECT_READ_ENABLED:
+            data = self.get_variable_data(variable, workload="field")
+            (frame,) = get_profile("field").compute(data.isel(self.valid_time_indexer(valid_time)))
+            return frame
+        indexer = self.catalog.index_maps.valid_time_indexer(valid_time)
+        return self._apply_model_specific_processing(self._direct_data_array(variable, indexer))
+
+    @property
+    def layout_paths(self) -> Dict[str, str]:
+        """Store path of each layout of the model's data.
+
+        "spatial" is the main store (one field per chunk); "timeseries" is
+        the optional copy written by ``app.tools.rechunk``.
+        """
+        paths = {"spatial": self.settings.zarr_path}
+        timeseries_path = settings.TIMESERIES_ZARR_PATHS.get(self.model_type.value)
+        if timeseries_path:
+            paths["timeseries"] = timeseries_path
+        return paths
+
+    def layout_for(self, variable: str, indexer: Indexer) -> str:
+        """Pick the layout that reads the fewest chunk bytes for a selection.
+
+        A layout is only considered if it holds the whole selection, so a
+        time-series copy that lags behind the main store, or is being
+        extended, is skipped for the times it has not copied yet.
+
+        Args:
+            variable: Name of the variable
+            indexer: Integer index or slice per dimension
+
+        Returns:
+            str: Store path of the chosen layout
+        """
+        best_path = self.settings.zarr_path
+        best_cost = None
+        for name, path in self.layout_paths.items():
+            try:
+                catalog = self.catalog if name == "spatial" else self._catalog_at(path)
+            except Exception as e:
+                logger.warning(f"Layout {name} of {self.model_type.value} unavailable: {e}")
+                continue
+            info = catalog.variables.get(variable)
+            if info is None or not info.chunks:
+                continue
+            selection = selection_for(info.dims, indexer)
+            if not self._selection_fits(info, selection):
+                continue
+            cost = selection_read_bytes(
+                info.shape, info.chunks, np.dtype(info.dtype).itemsize, selection
+            )
+            if best_cost is None or cost < best_cost:
+                best_path, best_cost = path, cost
+        return best_path
+
+    @staticmethod
+    def _selection_fits(info: VariableInfo, selection: Tuple) -> bool:
+        """Whether a selection lies in the part of a variable that holds data.
+
+        Along time that is the committed extent of a copy being written,
+        which may be shorter than the array.
+        """
+        for dim, extent, item in zip(info.dims, info.shape, selection):
+            committed = extent
+            if dim == "time" and info.committed_times is not None:
+                committed = min(extent, info.committed_times)
+            if isinstance(item, slice):
+                stop = extent if item.stop is None else item.stop + extent if item.stop < 0 else item.stop
+                if stop > committed:
+                    return False
+            else:
+                index = item + extent if item < 0 else item
+                if not 0 <= index < committed:
+                    return False
+        return True
+
+    def read_indexed(
+            self,
+            variable: str,
+            indexer: Indexer,
+            out: Optional[np.ndarray] = None,
+            shared: bool = False,
+    ) -> np.ndarray:
+        """Read any integer/slice selection from the cheapest layout.
+
+        Args:
+            variable: Name of the variable
+            indexer: Integer index or slice per dimension
+            out: Optional preallocated buffer to read into
+            shared: Serve the selection from (and add it to) the shared hot
+                field store; the result is then a read-only view and ``out``
+                is not used
+
+        Returns:
+            np.ndarray: The selected values
+
+        Raises:
+            KeyError: If the variable is not in the store
+        """
+        if shared:
+            return self._read_shared(variable, indexer)
+        return self._read_direct(variable, indexer, out)
+
+    def read_point_series(
+            self,
+            variable: str,
+            row: int,
+            col: int,
+            start: Optional[int] = None,
+            end: Optional[int] = None,
+            **indexers: Union[int, slice],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Read one grid point over a range of times and all lead times.
+
+        The selection goes to the cheapest layout (the time-series copy, if
+        registered, holds it in a few chunks) and through the shared hot
+        field store, so repeated queries of a point are served from memory.
+
+        Args:
+            variable: Name of the variable
+            row: y index on the shared coordinate grids
+            col: x index on the shared coordinate grids
+            start: First time in epoch seconds (inclusive), or None for the first stored
+            end: Last time in epoch seconds (inclusive), or None for the last stored
+            **indexers: Integer indices of further dimensions (e.g. level)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Times in epoch seconds and values of
+            shape (times, leads), or (times,) for stores without lead times
+
+        Raises:
+            KeyError: If the variable is not in the store
+        """
+        catalog = self.catalog
+        catalog.require_variables([variable])
+        info = catalog.variables[variable]
+        times = catalog.times
+        first = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        stop = len(times) if end is None else int(np.searchsorted(times, end, side="right"))
+        if self.settings.flip_y:
+            row = info.shape[info.dims.index("y")] - 1 - row
+        if stop <= first:
+            shape = (0,) + ((len(catalog.leads),) if "prediction_timedelta" in info.dims else ())
+            return times[:0], np.empty(shape)
+        indexer = {"time": slice(first, stop), "y": int(row), "x": int(col), **indexers}
+        return times[first:stop], np.asarray(self._read_shared(variable, indexer), dtype=float)
+
+    def _read_direct(self, variable: str, indexer: Indexer, out: Optional[np.ndarray]) -> np.ndarray:
+        catalog = self.catalog
+        catalog.require_variables([variable])
+        path = self.layout_for(variable, indexer)
+        group = self.zarr_group if path == self.settings.zarr_path else self._group_at(path)
+        return read_selection(group[variable], catalog.variables[variable].dims, indexer, out)
+
+    def _read_shared(self, variable: str, indexer: Indexer) -> np.ndarray:
+        """Direct read through the host's shared hot field store.
+
+        Returns a read-only view onto shared memory when the field is (or
+        could be) stored there, so workers share one decoded copy.
+        """
+        store = hot_fields()
+        if store is None:
+            return self._read_direct(variable, indexer, None)
+        selection = ",".join(f"{dim}={indexer[dim]}" for dim in sorted(indexer))
+        key = f"{self.model_type.value}|{self.settings.zarr_path}|{self.catalog.fingerprint}|{variable}|{selection}"
+        values = store.get(key)
+        if values is None:
+            values = self._read_direct(variable, indexer, None)
+            shared = store.put(key, values)
+            if shared is not None:
+                values = shared
+        return values
+
+    def _direct_data_array(self, variable: str, indexer: Indexer) -> xr.DataArray:
+        values = self._read_shared(variable, indexer)
+        catalog = self.catalog
+        dims = [dim for dim in catalog.variables[variable].dims if not isinstance(indexer.get(dim), int)]
+        coords = {dim: catalog.coords[dim] for dim in dims if dim in catalog.coords}
+        return xr.DataArray(values, dims=dims, coords=coords, name=variable)
+
+    @property
+    def store(self):
+        """The zarr store holding the model's data.
+
+        Stores are shared by every loader of the same path, so their chunk
+        caches and connection pools are not duplicated.
+        """
+        return self._store_at(self.settings.zarr_path)
+
+    @classmethod
+    def reset_after_fork(cls) -> None:
+        """Drop remote stores (and their groups) inherited from a parent process.
+
+        Their network clients and event loops belong to the parent. Catalogs
+        and local stores stay usable in the child and are kept.
+        """
+        for path in [path for path in cls._stores if is_remote_path(path)]:
+            del cls._stores[path]
+            cls._groups.pop(path, None)
+
+    def _store_at(self, path: str):
+        if path not in DataLoader._stores:
+            DataLoader._stores[path] = self._open_store(path)
+        return DataLoader._stores[path]
+
+    def _open_store(self, path: Optional[str] = None):
+        """Open a zarr store from the configured storage backend.
+
+        Args:
+            path: Store path or URL (defaults to the model's zarr path)
+
+        Returns:
+            The zarr store (wrapped with the remote read path for object stores)
+        """
+        path = path or self.settings.zarr_path
+        if self._is_remote_path(path):
+            fs, mapper, backend = open_remote_mapper(path)
+            if path == self.settings.zarr_path:
+                self._fs = fs
+            logger.info(f"Using {backend.protocol} object store backend")
+            return self._wrap_remote_store(mapper, backend, path)
+        logger.info("Using local storage backend")
+        return LocalStore(path, read_only=True)
+
+    def _load_dataset(self, profile: Optional[WorkloadProfile] = None) -> xr.Dataset:
         """Load the dataset from the configured storage backend.
 
+        Args:
+            profile: Workload profile whose chunks to use (defaults to "default")
+
         Returns:
             xr.Dataset: Loaded dataset
 
         Raises:
             RuntimeError: If dataset loading fails
         """
+        profile = profile or get_profile(DEFAULT_WORKLOAD)
         try:
-            if self._is_gcs_path(self.settings.zarr_path):
-                logger.info("Using Google Cloud Storage backend")
-                self._fs = gcsfs.GCSFileSystem()
-                store = self._fs.get_mapper(self.settings.zarr_path)
-                dset = xr.open_zarr(store,consolidated=True)
-                return dset
-                #return xr.open_zarr(store, consolidated=True)
-            else:
-                logger.info("Using local storage backend")
-                store = zarr.DirectoryStore(self.settings.zarr_path)
-                return xr.open_zarr(store, chunks="auto")
+            return open_zarr_dataset(self.store, chunks=profile.chunks)
         except Exception as e:
             logger.error(f"Failed to load dataset from {self.settings.zarr_path}: {e}")
             raise RuntimeError(f"Dataset loading failed: {e}")
 
+    def _wrap_remote_store(self, mapper, backend: BackendConfig, path: Optional[str] = None):
+        """Build the read path for a remote store mapper.
+
+        Slow reads are hedged, chunks are fetched concurrently (with
+        lead-time prefetch) and, if enabled, kept in the RAM/disk chunk cache.
+
+        Args:
+            mapper: fsspec mapper of the remote zarr store
+            backend: Tuning of the store's backend
+            path: Store path or URL (defaults to the model's zarr path)
+
+        Returns:
+            The wrapped zarr store
+        """
+        path = path or self.settings.zarr_path
+        # zarr caps concurrent chunk requests itself; let ours be the limit
+        if zarr.config.get("async.concurrency") < backend.concurrency:
+            zarr.config.set({"async.concurrency": backend.concurrency})
+        store = FsspecStore.from_mapper(mapper, read_only=True)
+        # Shared by the fetches and the hedged backup requests
+        limiter = RequestLimiter(backend.concurrency)
+        if settings.HEDGE_ENABLED:
+            store = HedgedStore(
+                store,
+                name=path,
+                percentile=settings.HEDGE_PERCENTILE,
+                initial_delay=settings.HEDGE_INITIAL_DELAY_MS / 1000.0,
+                max_hedge_ratio=settings.HEDGE_MAX_RATIO,
+                limiter=limiter,
+            )
+        store = ConcurrentFetchStore(
+            store,
+            concurrency=backend.concurrency,
+            prefetch_window=settings.FETCH_PREFETCH_WINDOW,
+            limiter=limiter,
+        )
+        if not settings.CHUNK_CACHE_ENABLED:
+            return store
+        namespace = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+        return CachedStore(
+            store,
+            cache_dir=os.path.abspath(settings.CHUNK_CACHE_DIR),
+            memory_bytes=settings.CHUNK_CACHE_MEMORY_BYTES,
+            disk_bytes=settings.CHUNK_CACHE_DISK_BYTES,
+            namespace=namespace,
+        )
+
     @staticmethod
     def _is_gcs_path(path: str) -> bool:
         """Check if the path is a Google Cloud Storage path.
@@ -133,29 +591,43 @@ class DataLoader:
         """
         return path.startswith("gs://")
 
-    def get_variable_data(self, variable_name: str) -> xr.DataArray:
+    @staticmethod
+    def _is_remote_path(path: str) -> bool:
+        """Check if the path is an fsspec URL of a remote object store.
+
+        Args:
+            path: Path to check
+
+        Returns:
+            bool: True for gs://, s3://, http(s):// and other remote URLs
+        """
+        return is_remote_path(path)
+
+    def get_variable_data(self, variable_name: str, workload: Optional[str] = None) -> xr.DataArray:
         """Get processed data for a specific variable.
 
         Args:
             variable_name: Name of the variable to retrieve
+            workload: Workload whose chunking profile to use
 
         Returns:
             xr.DataArray: Processed data for the requested variable
         """
-        data = self._load_raw_data(variable_name)
+        data = self._load_raw_data(variable_name, workload)
 
         return self._apply_model_specific_processing(data)
 
-    def _load_raw_data(self, variable_name: str) -> xr.DataArray:
+    def _load_raw_data(self, variable_name: str, workload: Optional[str] = None) -> xr.DataArray:
         """Load raw data for a variable from the dataset.
 
         Args:
             variable_name: Name of the variable to load
+            workload: Workload whose chunking profile to use
 
         Returns:
             xr.DataArray: Raw data array for the variable
         """
-        return self.dataset[variable_name]
+        return self.dataset_for(workload)[variable_name]
 
     def _apply_model_specific_processing(self, data: xr.DataArray) -> xr.DataArray:
         """Apply model-specific processing to the data.
@@ -199,7 +671,8 @@ class DataLoader:
             variables: Optional[List[str]] = None,
             lead_time: Optional[List[np.timedelta64]] = None,
             levels: Optional[List[int]] = None,
-            freq: str = "12h"
+            freq: str = "12h",
+            workload: Optional[str] = None
     ) -> xr.Dataset:
         """Get a subset of data with model-specific processing.
 
@@ -209,6 +682,7 @@ class DataLoader:
             lead_time: Optional list of lead times (defaults to model's lead_time if None)
             levels: Optional list of levels to select
             freq: Frequency string for date range generation
+            workload: Workload whose chunking profile to use
 
         Returns:
             xr.Dataset: Subset of the dataset with requested parameters
@@ -216,10 +690,11 @@ class DataLoader:
         # Use model defaults if parameters are None
         time_slice = time_slice or self.settings.fixed_time_slice
         lead_time = lead_time or self.settings.lead_time
-        variables = variables or list(self.dataset.data_vars.keys())
+        dataset = self.dataset_for(workload)
+        variables = variables or list(dataset.data_vars.keys())
 
         date_range = self._create_date_range(time_slice, freq)
-        ds_subset = self.dataset[variables]
+        ds_subset = dataset[variables]
 
         if levels:
             ds_subset = ds_subset.sel(level=levels)
@@ -300,3 +775,5 @@ class DataLoader:
     @dataset.setter
     def dataset(self, value):
         self._dataset = value
+        self._profile_datasets = {}
+        self._index_maps = None
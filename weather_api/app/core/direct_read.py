@@ -0,0 +1,113 @@
+import base64
+import logging
+import struct
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import zarr
+from zarr.core.buffer import default_buffer_prototype
+
+logger = logging.getLogger("weather_api")
+
+Indexer = Dict[str, Union[int, slice]]
+
+
+def selection_for(dims: Sequence[str], indexer: Indexer) -> Tuple[Union[int, slice], ...]:
+    """Positional zarr selection for a dims-keyed indexer (missing dims are whole)."""
+    unknown = set(indexer) - set(dims)
+    if unknown:
+        raise KeyError(f"Dimensions {sorted(unknown)} not in {tuple(dims)}")
+    return tuple(indexer.get(dim, slice(None)) for dim in dims)
+
+
+def selection_shape(shape: Sequence[int], selection: Sequence[Union[int, slice]]) -> Tuple[int, ...]:
+    """Shape of the result of a basic selection (integer axes are dropped)."""
+    result = []
+    for size, item in zip(shape, selection):
+        if isinstance(item, slice):
+            result.append(len(range(*item.indices(size))))
+    return tuple(result)
+
+
+def attr_fill_value(value):
+    """Decode a ``_FillValue`` attribute; xarray stores float ones base64-packed in zarr v3."""
+    if isinstance(value, str):
+        return struct.unpack("<d", base64.standard_b64decode(value))[0]
+    return value
+
+
+def decode_values(values: np.ndarray, array: zarr.Array) -> np.ndarray:
+    """Apply the CF masking and scaling xarray would, in place where possible.
+
+    The array's own fill value is a mask only in zarr v2, where xarray reads
+    it as ``_FillValue``; in zarr v3 it is the value of unwritten chunks
+    (0 by default) and only the attributes mask.
+
+    Args:
+        values: Raw values read from the array
+        array: Array the values were read from
+
+    Returns:
+        np.ndarray: Decoded values
+    """
+    attrs = array.attrs
+    fill_values = [attr_fill_value(attrs.get("_FillValue")), attrs.get("missing_value")]
+    if array.metadata.zarr_format == 2:
+        fill_values.append(array.fill_value)
+    fill_values = [v for v in fill_values if v is not None and not (np.isscalar(v) and np.isnan(v))]
+    scale = attrs.get("scale_factor")
+    offset = attrs.get("add_offset")
+
+    if fill_values and not np.issubdtype(values.dtype, np.floating):
+        # Integer fields with a fill value decode to float, as in xarray
+        values = values.astype(np.float32)
+    if scale is not None or offset is not None:
+        if not np.issubdtype(values.dtype, np.floating):
+            values = values.astype(np.float32)
+        mask = np.isin(values, fill_values) if fill_values else None
+        if scale is not None:
+            values *= scale
+        if offset is not None:
+            values += offset
+        if mask is not None:
+            values[mask] = np.nan
+    elif fill_values and np.issubdtype(values.dtype, np.floating):
+        values[np.isin(values, fill_values)] = np.nan
+    return values
+
+
+def read_selection(
+        array: zarr.Array,
+        dims: Sequence[str],
+        indexer: Indexer,
+        out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Read a selection of a zarr array straight into a NumPy buffer.
+
+    Only the chunks overlapping the selection are fetched; there is no dask
+    graph, scheduler or index alignment in between.
+
+    Args:
+        array: zarr array to read
+        dims: Dimension names of the array
+        indexer: Integer index or slice per dimension
+        out: Preallocated buffer of the selection's shape and the array's dtype
+
+    Returns:
+        np.ndarray: The selected (decoded) values
+
+    Raises:
+        ValueError: If ``out`` does not fit the selection
+    """
+    selection = selection_for(dims, indexer)
+    shape = selection_shape(array.shape, selection)
+    if out is None:
+        out = np.empty(shape, dtype=array.dtype)
+    elif out.shape != shape or out.dtype != array.dtype:
+        raise ValueError(
+            f"Buffer of shape {out.shape} and dtype {out.dtype} does not fit "
+            f"selection of shape {shape} and dtype {array.dtype}"
+        )
+    buffer = default_buffer_prototype().nd_buffer.from_numpy_array(out)
+    array.get_basic_selection(selection, out=buffer)
+    return decode_values(out, array)
@@ -0,0 +1,406 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import zipfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from app.config import settings
+from app.core.d_loader import DataLoader
+from app.core.geometry import country_geometries
+from app.core.grids import shared_grids
+from app.core.metrics import metrics_engine, verification_scores
+from app.core.regions import RegionWeights
+from app.core.Utility.Utilities import DERIVED_VARIABLES, get_bbox_region, region_window
+
+logger = logging.getLogger("weather_api")
+
+# Bumped whenever the bundle layout changes, so older bundles are rebuilt
+BUNDLE_VERSION = 1
+MANIFEST_MEMBER = "bundle.json"
+
+# Variables extracted per event type; unknown types get the 2 m temperature
+EVENT_VARIABLES = {
+    "heatwave": ("t2m",),
+    "windstorm": ("10u", "10v", "wind_speed"),
+    "rainfall": ("tp",),
+    "cyclone": ("10u", "10v", "wind_speed", "tp"),
+}
+# Region statistics computed per variable and time
+EVENT_STATISTICS = {
+    "t2m": ("mean", "max", "min"),
+    "10u": ("mean",),
+    "10v": ("mean",),
+    "wind_speed": ("mean", "max"),
+    "tp": ("mean", "max"),
+}
+# Display units and colour scales of the cropped frames, as in the full-domain map visualizers
+FRAME_STYLES = {
+    "t2m": {"offset": -273.15, "scale": 1.0, "units": "°C", "levels": np.linspace(-50, 50, 41), "cmap": "RdBu_r"},
+    "wind_speed": {"offset": 0.0, "scale": 1.0, "units": "m/s", "levels": np.linspace(0, 40, 41), "cmap": "YlOrRd"},
+    "tp": {"offset": 0.0, "scale": 1e-3, "units": "m", "levels": np.linspace(0, 0.15, 20), "cmap": "seismic"},
+}
+MEDIA_TYPES = {".json": "application/json", ".npy": "application/octet-stream", ".webp": "image/webp"}
+
+
+@dataclass(frozen=True)
+class ExtremeEvent:
+    """One entry of the extreme events dataset."""
+
+    event_id: str
+    types: Tuple[str, ...]
+    start_time: str
+    end_time: str
+    lat_slice: Tuple[float, float]
+    lon_slice: Tuple[float, float]
+    entry: dict
+
+    @classmethod
+    def from_entry(cls, event_id: str, entry: dict) -> "ExtremeEvent":
+        return cls(
+            event_id=event_id,
+            types=tuple(entry["type"]),
+            start_time=entry["start_time"],
+            end_time=entry["end_time"],
+            lat_slice=(float(min(entry["lat_slice"])), float(max(entry["lat_slice"]))),
+            lon_slice=(float(min(entry["lon_slice"])), float(max(entry["lon_slice"]))),
+            entry=entry,
+        )
+
+    @property
+    def start(self) -> int:
+        """Start of the event in epoch seconds (midnight UTC of the start day)."""
+        return int(pd.Timestamp(self.start_time, tz="UTC").timestamp())
+
+    @property
+    def end(self) -> int:
+        """End of the event in epoch seconds (exclusive: midnight after the end day)."""
+        return int((pd.Timestamp(self.end_time, tz="UTC") + pd.Timedelta(days=1)).timestamp())
+
+    @property
+    def variables(self) -> List[str]:
+        """Variables relevant to the event's types, in a stable order."""
+        variables = []
+        for event_type in self.types:
+            for variable in EVENT_VARIABLES.get(event_type, ("t2m",)):
+                if variable not in variables:
+                    variables.append(variable)
+        return variables
+
+    @property
+    def digest(self) -> str:
+        """Hash of the event definition; a changed definition invalidates its bundle."""
+        return hashlib.sha1(json.dumps(self.entry, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_events(path: Optional[str] = None) -> Dict[str, ExtremeEvent]:
+    """Events of the extreme events dataset (EXTREME_EVENTS_PATH).
+
+    Raises:
+        FileNotFoundError: If the dataset does not exist
+    """
+    with open(path or settings.EXTREME_EVENTS_PATH) as f:
+        entries = json.load(f)
+    return {event_id: ExtremeEvent.from_entry(event_id, entry) for event_id, entry in entries.items()}
+
+
+def bundle_path(event_id: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or settings.EVENT_BUNDLE_DIR, f"{event_id}.zip")
+
+
+def _to_list(values) -> list:
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def _npy(values: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(values, dtype=np.float32))
+    return buffer.getvalue()
+
+
+def read_event_window(loader: DataLoader, region: RegionWeights, variable: str, time_index: int) -> np.ndarray:
+    """Values of a (possibly derived) variable in the region's window, rows in grid order.
+
+    Returns:
+        np.ndarray: (leads, rows, cols) for forecasts, (rows, cols) for the ground truth
+    """
+    values = region_window(loader, region, variable, {"time": time_index})
+    return values[..., ::-1, :] if loader.settings.flip_y else values
+
+
+def onset_base_time(base_times: np.ndarray, event: ExtremeEvent) -> Optional[int]:
+    """Latest forecast base time at or before the event's start, or None."""
+    before = np.asarray(base_times, dtype=np.int64)
+    before = before[before <= event.start]
+    return int(before.max()) if len(before) else None
+
+
+def region_statistics(region: RegionWeights, values: np.ndarray, variable: str) -> dict:
+    """Region statistics of a variable per time.
+
+    Args:
+        region: Region cells and weights
+        values: Window values in grid order, shaped (times, rows, cols)
+        variable: Variable name (selects the statistics)
+
+    Returns:
+        dict: A series per statistic
+    """
+    return {
+        statistic: _to_list(region.reduce(values, statistic))
+        for statistic in EVENT_STATISTICS.get(variable, ("mean",))
+    }
+
+
+def _peak(stats: dict, valid_times: List[int], variable: str) -> Optional[dict]:
+    series = np.array([np.nan if v is None else v for v in stats.get("max", [])], dtype=np.float64)
+    if not len(series) or np.isnan(series).all():
+        return None
+    i = int(np.nanargmax(series))
+    peak = {"value": float(series[i]), "valid_time": valid_times[i]}
+    if variable in FRAME_STYLES:
+        # Same conversion as the frames, so the page shows the peak in the frames' units
+        style = FRAME_STYLES[variable]
+        peak["display"] = float(series[i] * style["scale"] + style["offset"])
+        peak["units"] = style["units"]
+    return peak
+
+
+def render_frame(values: np.ndarray, latitude: np.ndarray, longitude: np.ndarray, variable: str) -> bytes:
+    """Render a cropped frame of the event region as WebP.
+
+    Country borders are drawn when the boundaries bundle
+    (COUNTRY_BOUNDARIES_PATH) exists; nothing is downloaded.
+
+    Args:
+        values: Field in the region's window, grid order
+        latitude: Latitudes of the window
+        longitude: Longitudes of the window
+        variable: Variable name (selects the colour scale)
+
+    Returns:
+        bytes: The image
+    """
+    style = FRAME_STYLES[variable]
+    min_lon, max_lon = float(np.nanmin(longitude)), float(np.nanmax(longitude))
+    min_lat, max_lat = float(np.nanmin(latitude)), float(np.nanmax(latitude))
+    aspect = max(max_lon - min_lon, 1e-6) * np.cos(np.radians((min_lat + max_lat) / 2)) / max(max_lat - min_lat, 1e-6)
+    figsize = (6.0, 6.0 / aspect) if aspect >= 1 else (6.0 * aspect, 6.0)
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.contourf(longitude, latitude, values * style["scale"] + style["offset"], levels=style["levels"],
+                cmap=style["cmap"], extend="both")
+    if os.path.exists(settings.COUNTRY_BOUNDARIES_PATH):
+        for country in country_geometries().countries_in(min_lat, min_lon, max_lat, max_lon):
+            boundary = country.geometry.boundary
+            for line in getattr(boundary, "geoms", [boundary]):
+                x, y = line.xy
+                ax.plot(x, y, color="black", linewidth=0.5)
+    ax.set_xlim(min_lon, max_lon)
+    ax.set_ylim(min_lat, max_lat)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="webp", dpi=settings.EVENT_FRAME_DPI, facecolor="white")
+    return buffer.getvalue()
+
+
+def _source_fields(loader: DataLoader, region: RegionWeights, variable: str, event: ExtremeEvent,
+                   base_time: Optional[int]) -> Tuple[List[int], np.ndarray]:
+    """Valid times and window fields of a source inside the event.
+
+    Forecasts give the leads of ``base_time`` valid during the event, the
+    ground truth its times during the event.
+    """
+    catalog = loader.catalog
+    if len(catalog.leads):
+        valid_times = base_time + np.asarray(catalog.leads, dtype=np.int64)
+        kept = np.flatnonzero((valid_times >= event.start) & (valid_times < event.end))
+        fields = read_event_window(loader, region, variable, catalog.index_maps.time.lookup(base_time))
+        return valid_times[kept].tolist(), fields[kept]
+    times = np.asarray(catalog.times, dtype=np.int64)
+    kept = np.flatnonzero((times >= event.start) & (times < event.end))
+    fields = [read_event_window(loader, region, variable, int(i)) for i in kept]
+    return times[kept].tolist(), np.stack(fields) if fields else np.empty((0,) + region.shape)
+
+
+def build_event_bundle(
+        event: ExtremeEvent,
+        forecasts: Dict[str, DataLoader],
+        truth: DataLoader,
+        directory: Optional[str] = None,
+        frames: bool = True,
+) -> str:
+    """Precompute everything an event page shows into one zip bundle.
+
+    The bundle holds, for the event's lat/lon box:
+
+    - ``fields/<source>/<variable>.npy``: window fields (float32, grid order)
+      of each model's forecast from the base time at the event's onset, and
+      of the ground truth, at their valid times during the event;
+      ``fields/latitude.npy`` and ``fields/longitude.npy`` locate the cells
+    - ``frames/<source>/<variable>/<valid_time>.webp``: cropped frames
+    - ``bundle.json``: the event, the region, each source's valid times,
+      region statistics per time with peaks, and verification scores per
+      lead pooled over the base times during the event
+
+    Args:
+        event: The event
+        forecasts: Forecast loader per model
+        truth: Ground truth loader
+        directory: Bundle directory (default EVENT_BUNDLE_DIR)
+        frames: Whether to render the frames
+
+    Returns:
+        str: Path of the bundle
+    """
+    min_lat, max_lat = event.lat_slice
+    min_lon, max_lon = event.lon_slice
+    region = get_bbox_region(min_lat, min_lon, max_lat, max_lon)
+    sources = {**forecasts, "ground_truth": truth}
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "event_id": event.event_id,
+        "event": event.entry,
+        "digest": event.digest,
+        "start": event.start,
+        "end": event.end,
+        "fingerprints": {source: loader.catalog.fingerprint for source, loader in sources.items()},
+        "covered": region.cells > 0,
+        "region": {"cells": region.cells, "area_km2": region.area_km2, "shape": list(region.shape)},
+        "variables": event.variables,
+        "sources": {},
+        "stats": {},
+        "peaks": {},
+        "metrics": {},
+        "fields": {},
+        "frames": {},
+    }
+    members: Dict[str, bytes] = {}
+    if region.cells:
+        rows, cols = slice(*region.rows), slice(*region.cols)
+        grids = shared_grids()
+        latitude = np.asarray(grids.latitude[rows, cols], dtype=np.float64)
+        longitude = np.asarray(grids.longitude[rows, cols], dtype=np.float64)
+        members["fields/latitude.npy"] = _npy(latitude)
+        members["fields/longitude.npy"] = _npy(longitude)
+        for source, loader in sources.items():
+            base_time = onset_base_time(loader.catalog.times, event) if len(loader.catalog.leads) else None
+            if len(loader.catalog.leads) and base_time is None:
+                logger.warning(f"Event {event.event_id}: {source} has no forecast before the event")
+                continue
+            manifest["sources"][source] = {"base_time": base_time, "valid_times": []}
+            for variable in event.variables:
+                try:
+                    valid_times, fields = _source_fields(loader, region, variable, event, base_time)
+                except KeyError as e:
+                    logger.warning(f"Event {event.event_id}: {source} has no {variable} ({e})")
+                    continue
+                manifest["sources"][source]["valid_times"] = valid_times
+                member = f"fields/{source}/{variable}.npy"
+                members[member] = _npy(fields)
+                manifest["fields"].setdefault(source, {})[variable] = member
+                stats = region_statistics(region, fields, variable)
+                manifest["stats"].setdefault(source, {})[variable] = stats
+                manifest["peaks"].setdefault(source, {})[variable] = _peak(stats, valid_times, variable)
+                if frames and variable in FRAME_STYLES:
+                    names = []
+                    for valid_time, values in zip(valid_times, fields):
+                        name = f"frames/{source}/{variable}/{valid_time}.webp"
+                        members[name] = render_frame(values, latitude, longitude, variable)
+                        names.append(name)
+                    manifest["frames"].setdefault(source, {})[variable] = names
+        for variable in event.variables:
+            if variable in DERIVED_VARIABLES:
+                continue  # scored through its components
+            try:
+                scores = verification_scores(
+                    metrics_engine(), forecasts, truth, [variable], region, event.start, event.end - 1,
+                )
+            except KeyError as e:
+                logger.warning(f"Event {event.event_id}: no scores for {variable} ({e})")
+                continue
+            for model, by_variable in scores.items():
+                manifest["metrics"].setdefault(model, {}).update(by_variable)
+
+    path = bundle_path(event.event_id, directory)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    suffix = f".{os.getpid()}.tmp"
+    with zipfile.ZipFile(path + suffix, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr(MANIFEST_MEMBER, json.dumps(manifest))
+        for name, content in members.items():
+            # Frames are compressed images already
+            bundle.writestr(name, content, compress_type=zipfile.ZIP_STORED if name.endswith(".webp") else None)
+    os.replace(path + suffix, path)
+    logger.info(f"Event bundle {path}: {len(members)} members, {os.path.getsize(path) / 1e6:.1f} MB")
+    return path
+
+
+def bundle_is_current(event: ExtremeEvent, sources: Dict[str, DataLoader], directory: Optional[str] = None) -> bool:
+    """Whether the event's bundle exists and was built from the same event definition and stores."""
+    try:
+        manifest = _read_manifest(bundle_path(event.event_id, directory))
+    except KeyError:
+        return False
+    fingerprints = {source: loader.catalog.fingerprint for source, loader in sources.items()}
+    return (
+        manifest.get("version") == BUNDLE_VERSION
+        and manifest.get("digest") == event.digest
+        and manifest.get("fingerprints") == fingerprints
+    )
+
+
+_manifests: Dict[str, Tuple[float, dict]] = {}
+_manifests_lock = threading.Lock()
+
+
+def _read_manifest(path: str) -> dict:
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        raise KeyError(f"No bundle at {path}")
+    with _manifests_lock:
+        cached = _manifests.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with zipfile.ZipFile(path) as bundle:
+        manifest = json.loads(bundle.read(MANIFEST_MEMBER))
+    with _manifests_lock:
+        _manifests[path] = (mtime, manifest)
+    return manifest
+
+
+def event_bundle(event_id: str) -> dict:
+    """Manifest of an event's bundle.
+
+    Raises:
+        KeyError: If the event is unknown or its bundle has not been built
+    """
+    if event_id not in load_events():
+        raise KeyError(f"Unknown event: {event_id}")
+    return _read_manifest(bundle_path(event_id))
+
+
+def event_bundle_member(event_id: str, member: str) -> Tuple[bytes, str]:
+    """Content and media type of one member (field, frame) of an event's bundle.
+
+    Raises:
+        KeyError: If the event, its bundle or the member does not exist
+    """
+    if event_id not in load_events():
+        raise KeyError(f"Unknown event: {event_id}")
+    path = bundle_path(event_id)
+    if not os.path.exists(path):
+        raise KeyError(f"Event {event_id} has no bundle")
+    with zipfile.ZipFile(path) as bundle:
+        content = bundle.read(member)
+    return content, MEDIA_TYPES.get(os.path.splitext(member)[1], "application/octet-stream")
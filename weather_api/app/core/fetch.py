@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from zarr.storage import WrapperStore
+
+from app.core.zarr_layout import V2_ATTRS_KEY, METADATA_KEYS, ChunkLayout, layouts_from_metadata
+
+logger = logging.getLogger("weather_api")
+
+LEAD_TIME_DIM = "prediction_timedelta"
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    """Mark failures of unused prefetches as retrieved."""
+    if not task.cancelled():
+        task.exception()
+
+
+class RequestLimiter:
+    """Cap on the requests in flight against one remote store.
+
+    Shared by the wrappers of the store (the fetch store's reads and the
+    hedging store's backup requests), so together they never exceed it.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the event loop zarr runs reads on
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def __aenter__(self) -> None:
+        await self._get_semaphore().acquire()
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._get_semaphore().release()
+
+
+class ConcurrentFetchStore(WrapperStore):
+    """Zarr store wrapper that fetches chunks concurrently and prefetches ahead.
+
+    All reads share one semaphore, so at most ``concurrency`` requests are in
+    flight against the wrapped store (and its pooled connection) at any time.
+    When a chunk of an array with a lead-time dimension is read, the next
+    ``prefetch_window`` chunks along that axis are requested in the
+    background, which turns the per-lead-time loops into pipelined reads.
+    Works with any fsspec filesystem behind ``FsspecStore``.
+
+    A cache wrapping this store sets ``prefetch_reader`` and calls
+    ``schedule_prefetch`` on its hits: read-ahead then goes through the
+    cache, which skips chunks it holds and keeps the ones fetched (see
+    ``CachedStore``), and only reads still in flight are tracked here.
+    """
+
+    def __init__(
+            self,
+            store,
+            concurrency: int = 32,
+            prefetch_window: int = 0,
+            prefetch_dim: str = LEAD_TIME_DIM,
+            limiter: Optional[RequestLimiter] = None,
+    ):
+        super().__init__(store)
+        self.concurrency = concurrency
+        self.prefetch_window = prefetch_window
+        self.prefetch_dim = prefetch_dim
+        self.limiter = limiter or RequestLimiter(concurrency)
+        # Reads a chunk ahead of time; returns its buffer, or None if there was nothing to fetch
+        self.prefetch_reader: Optional[Callable[[str, object], Awaitable[object]]] = None
+        self._layouts: Dict[str, ChunkLayout] = {}
+        self._prefetched: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+        self.stats = {"requests": 0, "prefetched": 0, "prefetch_hits": 0}
+
+    def _with_store(self, store):
+        return type(self)(
+            store,
+            concurrency=self.concurrency,
+            prefetch_window=self.prefetch_window,
+            prefetch_dim=self.prefetch_dim,
+            limiter=self.limiter,
+        )
+
+    def __repr__(self) -> str:
+        return f"ConcurrentFetchStore({self._store!r}, concurrency={self.concurrency})"
+
+    @property
+    def _max_prefetched(self) -> int:
+        return max(self.prefetch_window * 8, self.concurrency)
+
+    async def fetch(self, key, prototype, byte_range=None):
+        """Read from the wrapped store within the concurrency limit, without read-ahead."""
+        async with self.limiter:
+            self.stats["requests"] += 1
+            return await self._store.get(key, prototype, byte_range)
+
+    async def get(self, key, prototype, byte_range=None):
+        basename = key.rsplit("/", 1)[-1]
+        if basename in METADATA_KEYS:
+            buffer = await self.fetch(key, prototype, byte_range)
+            if buffer is not None and byte_range is None:
+                self._observe_metadata(key, buffer.to_bytes())
+            return buffer
+
+        if byte_range is not None:
+            return await self.fetch(key, prototype, byte_range)
+
+        task = self._prefetched.pop(key, None)
+        if task is not None:
+            self.stats["prefetch_hits"] += 1
+            self.schedule_prefetch(key, prototype)
+            try:
+                buffer = await task
+                if buffer is not None:
+                    return buffer
+            except Exception as e:
+                logger.debug(f"Prefetch of {key} failed, fetching again: {e}")
+
+        self.schedule_prefetch(key, prototype)
+        return await self.fetch(key, prototype)
+
+    async def get_partial_values(self, prototype, key_ranges):
+        return await asyncio.gather(
+            *(self.get(key, prototype, byte_range) for key, byte_range in key_ranges)
+        )
+
+    async def _get_many(self, requests):
+        requests = list(requests)
+        buffers = await asyncio.gather(
+            *(self.get(key, prototype, byte_range) for key, prototype, byte_range in requests)
+        )
+        for (key, _, _), buffer in zip(requests, buffers):
+            yield key, buffer
+
+    def _observe_metadata(self, key: str, raw: bytes) -> None:
+        """Record chunk layouts from metadata documents passing through."""
+        if key.rsplit("/", 1)[-1] == V2_ATTRS_KEY:
+            path = key.rsplit("/", 1)[0] if "/" in key else ""
+            if path in self._layouts:
+                try:
+                    self._layouts[path].dims = json.loads(raw).get("_ARRAY_DIMENSIONS")
+                except ValueError:
+                    pass
+            return
+        self._layouts.update(layouts_from_metadata(key, raw))
+
+    def _find_layout(self, key: str):
+        path = key.rsplit("/", 1)[0] if "/" in key else ""
+        while True:
+            layout = self._layouts.get(path)
+            if layout is not None:
+                coords = layout.parse_key(key)
+                if coords is not None:
+                    return layout, coords
+            if not path:
+                return None, None
+            path = path.rsplit("/", 1)[0] if "/" in path else ""
+
+    def schedule_prefetch(self, key: str, prototype) -> None:
+        """Start background reads of the next chunks along the prefetch axis."""
+        if self.prefetch_window <= 0:
+            return
+        layout, coords = self._find_layout(key)
+        if layout is None:
+            return
+        axis = layout.axis(self.prefetch_dim)
+        if axis is None:
+            return
+
+        n_chunks = layout.grid[axis]
+        for step in range(1, self.prefetch_window + 1):
+            if coords[axis] + step >= n_chunks:
+                break
+            ahead = list(coords)
+            ahead[axis] += step
+            ahead_key = layout.chunk_key(tuple(ahead))
+            if ahead_key in self._prefetched:
+                continue
+            reader = self.prefetch_reader or self.fetch
+            task = asyncio.ensure_future(reader(ahead_key, prototype))
+            task.add_done_callback(_consume_exception)
+            if self.prefetch_reader is not None:
+                # The reader keeps the result; drop the task once done
+                task.add_done_callback(lambda done, ahead_key=ahead_key: self._forget_prefetch(ahead_key, done))
+            self._prefetched[ahead_key] = task
+            self.stats["prefetched"] += 1
+
+        while len(self._prefetched) > self._max_prefetched:
+            _, stale = self._prefetched.popitem(last=False)
+            stale.cancel()
+
+    def _forget_prefetch(self, key: str, task: asyncio.Task) -> None:
+        if self._prefetched.get(key) is task:
+            del self._prefetched[key]
+
+    def close(self) -> None:
+        for task in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
+        super().close()
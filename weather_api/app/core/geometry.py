@@ -0,0 +1,243 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import httpx
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+from app.config import settings
+
+logger = logging.getLogger("weather_api")
+
+# Natural Earth columns naming a country, most specific first; any of them finds it
+NAME_COLUMNS = ("NAME", "NAME_EN", "NAME_LONG", "ADMIN", "FORMAL_EN", "SOVEREIGNT")
+# Natural Earth leaves ISO_A2/ISO_A3 at -99 for a few countries (France, Norway);
+# the *_EH columns fill them in
+ISO_A2_COLUMNS = ("ISO_A2_EH", "ISO_A2")
+ISO_A3_COLUMNS = ("ISO_A3_EH", "ISO_A3")
+# Columns kept by the bundle tool
+BUNDLE_COLUMNS = NAME_COLUMNS + ISO_A2_COLUMNS + ISO_A3_COLUMNS
+
+COUNTRY_CODE_URL = "https://www.apicountries.com/name/{name}"
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+
+def boundaries_path() -> str:
+    """Path of the bundled country boundaries; they are never downloaded at runtime.
+
+    Returns:
+        str: COUNTRY_BOUNDARIES_PATH
+
+    Raises:
+        RuntimeError: If the file does not exist
+    """
+    path = settings.COUNTRY_BOUNDARIES_PATH
+    if not os.path.exists(path):
+        raise RuntimeError(
+            f"Country boundaries {path!r} (COUNTRY_BOUNDARIES_PATH) not found; "
+            f"bundle them with `python -m app.tools.bundle_countries --output {path}`"
+        )
+    return path
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.casefold().split())
+
+
+def _code(row, columns: Tuple[str, ...]) -> str:
+    for column in columns:
+        value = row.get(column)
+        if isinstance(value, str) and value and value != "-99":
+            return value
+    return ""
+
+
+@dataclass(frozen=True)
+class Country:
+    """One country's boundary and codes."""
+
+    name: str
+    iso_a2: str
+    iso_a3: str
+    geometry: BaseGeometry
+
+    @property
+    def bounds(self) -> Dict[str, float]:
+        """Bounding box in the Overpass ``bounds`` format."""
+        min_lon, min_lat, max_lon, max_lat = self.geometry.bounds
+        return {"minlat": min_lat, "minlon": min_lon, "maxlat": max_lat, "maxlon": max_lon}
+
+
+class CountryGeometries:
+    """In-memory country boundaries with a name/code index and an R-tree.
+
+    Every lookup is answered locally: names and ISO codes go through a
+    dictionary, locations and boxes through a packed R-tree (``STRtree``)
+    over the boundaries. Bounding boxes can optionally be refreshed from the
+    remote APIs the service replaces.
+    """
+
+    def __init__(self, countries: List[Country]):
+        self.countries = countries
+        self.tree = shapely.STRtree([country.geometry for country in countries])
+        self.index: Dict[str, int] = {}
+        self._remote_bounds: Dict[int, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, frame: gpd.GeoDataFrame) -> "CountryGeometries":
+        """Build the service from a GeoDataFrame with Natural Earth columns.
+
+        Args:
+            frame: Country boundaries; column names are matched case-insensitively
+
+        Returns:
+            CountryGeometries: The service
+        """
+        frame = frame.rename(columns={column: column.upper() for column in frame.columns if column != "geometry"})
+        frame = frame.to_crs("EPSG:4326") if frame.crs is not None else frame
+        countries = []
+        names = []
+        for _, row in frame.iterrows():
+            if row.geometry is None or row.geometry.is_empty:
+                continue
+            row_names = [row[column] for column in NAME_COLUMNS if isinstance(row.get(column), str) and row[column]]
+            if not row_names:
+                continue
+            countries.append(Country(row_names[0], _code(row, ISO_A2_COLUMNS), _code(row, ISO_A3_COLUMNS), row.geometry))
+            names.append(row_names)
+        service = cls(countries)
+        # Codes first, then names in column order, so a country's own name wins over
+        # another one's long or sovereign name ("Denmark" vs. Greenland's sovereign)
+        for i, country in enumerate(countries):
+            for code in (country.iso_a2, country.iso_a3):
+                if code:
+                    service.index.setdefault(_normalize(code), i)
+        for rank in range(len(NAME_COLUMNS)):
+            for i, row_names in enumerate(names):
+                if rank < len(row_names):
+                    service.index.setdefault(_normalize(row_names[rank]), i)
+        return service
+
+    @classmethod
+    def from_file(cls, path: str) -> "CountryGeometries":
+        """Load boundaries from a GeoPackage, GeoJSON file or shapefile."""
+        frame = gpd.read_file(path)
+        service = cls.from_frame(frame)
+        logger.info(f"Loaded {len(service.countries)} country boundaries from {path}")
+        return service
+
+    def lookup(self, name: str) -> Country:
+        """Country by name or ISO alpha-2/alpha-3 code (case-insensitive).
+
+        Raises:
+            KeyError: If no country has that name or code
+        """
+        try:
+            return self.countries[self.index[_normalize(name)]]
+        except KeyError:
+            raise KeyError(f"Unknown country: {name}")
+
+    def country_code(self, name: str) -> str:
+        """ISO alpha-2 code of a country."""
+        return self.lookup(name).iso_a2
+
+    def bounds(self, name: str) -> Dict[str, float]:
+        """Bounding box of a country (refreshed from Overpass if ``refresh`` was called)."""
+        i = self.index.get(_normalize(name))
+        if i is None:
+            raise KeyError(f"Unknown country: {name}")
+        return self._remote_bounds.get(i) or self.countries[i].bounds
+
+    def country_at(self, lat: float, lon: float) -> Optional[Country]:
+        """Country containing a location, or None (e.g. at sea)."""
+        matches = self.tree.query(shapely.Point(lon, lat), predicate="intersects")
+        return self.countries[int(np.min(matches))] if len(matches) else None
+
+    def countries_in(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Country]:
+        """Countries intersecting a latitude/longitude box."""
+        matches = self.tree.query(shapely.box(min_lon, min_lat, max_lon, max_lat), predicate="intersects")
+        return [self.countries[i] for i in np.sort(matches)]
+
+    async def refresh(self, name: str, client: Optional[httpx.AsyncClient] = None) -> Dict[str, float]:
+        """Refresh a country's bounding box from the Overpass API.
+
+        The country code comes from the local index, or from apicountries.com
+        for names the boundaries do not know.
+
+        Args:
+            name: Country name or code
+            client: HTTP client; defaults to the shared pooled client
+
+        Returns:
+            Dict[str, float]: The refreshed bounding box
+
+        Raises:
+            KeyError: If the country is unknown locally or remotely
+            httpx.HTTPError: If a remote API cannot be reached
+        """
+        client = client or http_client()
+        i = self.index.get(_normalize(name))
+        code = self.countries[i].iso_a2 if i is not None else ""
+        if not code:
+            response = await client.get(COUNTRY_CODE_URL.format(name=name))
+            response.raise_for_status()
+            code = response.json()[0]["alpha2Code"]
+            i = self.index.get(_normalize(code))
+            if i is None:
+                raise KeyError(f"Unknown country: {name}")
+        query = f'[out:json];relation["admin_level"="2"]["ISO3166-1"="{code}"];out bb;'
+        response = await client.get(OVERPASS_URL, params={"data": query})
+        response.raise_for_status()
+        elements = response.json()["elements"]
+        if not elements:
+            raise KeyError(f"No boundary relation for {code}")
+        bounds = {key: float(elements[0]["bounds"][key]) for key in ("minlat", "minlon", "maxlat", "maxlon")}
+        with self._lock:
+            self._remote_bounds[i] = bounds
+        return bounds
+
+
+_geometries: Optional[CountryGeometries] = None
+_geometries_lock = threading.Lock()
+_client: Optional[httpx.AsyncClient] = None
+
+
+def country_geometries() -> CountryGeometries:
+    """Get the process's country boundaries, loading them on first use."""
+    global _geometries
+    with _geometries_lock:
+        if _geometries is None:
+            _geometries = CountryGeometries.from_file(boundaries_path())
+        return _geometries
+
+
+def reset_country_geometries() -> None:
+    """Forget the loaded boundaries (e.g. after replacing the bundle)."""
+    global _geometries
+    with _geometries_lock:
+        _geometries = None
+
+
+def http_client() -> httpx.AsyncClient:
+    """Pooled client for the remote geometry APIs (created on first use)."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=settings.GEOMETRY_REFRESH_TIMEOUT_S,
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the pooled client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
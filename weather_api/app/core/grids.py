@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cartopy.crs as ccrs
+import numpy as np
+
+from app.config import settings
+from app.core.catalog import catalog_service, store_fingerprint
+from app.core.storage import open_store, open_zarr_dataset
+
+logger = logging.getLogger("weather_api")
+
+MANIFEST_FILE = "grids.json"
+# Grid points per axis sampled to fit the map plane -> index transform
+_FIT_SAMPLES = 64
+# Hill-climbing passes of the nearest-point refinement
+_MAX_REFINE_PASSES = 32
+
+
+def lambert_projection() -> ccrs.LambertConformal:
+    """Lambert Conformal projection of the CERRA domain, as drawn on the maps."""
+    return ccrs.LambertConformal(
+        central_longitude=8,
+        central_latitude=50,
+        standard_parallels=(50, 50),
+        globe=ccrs.Globe(semimajor_axis=6371229),
+    )
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """Points on the unit sphere; chord distance between them orders like great-circle distance."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def fit_plane_to_index(x: np.ndarray, y: np.ndarray) -> dict:
+    """Fit the affine map from map plane coordinates to fractional grid indices.
+
+    On a grid that is regular in the Lambert projection the fit is exact; on
+    any other smooth grid it is a first guess, and ``radius`` (its largest
+    error in grid cells over the sample) sizes the search window around it.
+
+    Args:
+        x: 2D map plane x of the grid points (metres)
+        y: 2D map plane y of the grid points (metres)
+
+    Returns:
+        dict: ``coefficients`` (2x3, rows for row/column) and ``radius``
+    """
+    rows = np.unique(np.linspace(0, x.shape[0] - 1, _FIT_SAMPLES).round().astype(int))
+    cols = np.unique(np.linspace(0, x.shape[1] - 1, _FIT_SAMPLES).round().astype(int))
+    row_index, col_index = np.meshgrid(rows, cols, indexing="ij")
+    sample_x = np.asarray(x[np.ix_(rows, cols)], dtype=np.float64).ravel()
+    sample_y = np.asarray(y[np.ix_(rows, cols)], dtype=np.float64).ravel()
+    design = np.column_stack([sample_x, sample_y, np.ones_like(sample_x)])
+    targets = np.column_stack([row_index.ravel(), col_index.ravel()]).astype(np.float64)
+    coefficients, *_ = np.linalg.lstsq(design, targets, rcond=None)
+    error = np.abs(design @ coefficients - targets).max()
+    return {"coefficients": coefficients.T.tolist(), "radius": int(np.ceil(error)) + 1}
+
+
+def export_grids(source: str, directory: str) -> dict:
+    """Write a store's 2D coordinate grids and derived arrays as .npy files.
+
+    Every file is written under a temporary name and renamed into place, and
+    the manifest is written last, so workers racing to export (or reading
+    while another exports) never see a partial set.
+
+    Args:
+        source: Store path or URL with 2D ``longitude``/``latitude`` coordinates
+        directory: Output directory
+
+    Returns:
+        dict: The manifest (source, fingerprint, shape, file names)
+    """
+    store = open_store(source)
+    ds = open_zarr_dataset(store, chunks=None)
+    longitude = np.ascontiguousarray(ds["longitude"].values, dtype=np.float64)
+    latitude = np.ascontiguousarray(ds["latitude"].values, dtype=np.float64)
+    # Grid points on the map plane (metres), as the maps are drawn
+    points = lambert_projection().transform_points(ccrs.PlateCarree(), longitude, latitude)
+    arrays = {
+        "longitude": longitude,
+        "latitude": latitude,
+        "x": np.ascontiguousarray(points[..., 0]),
+        "y": np.ascontiguousarray(points[..., 1]),
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    suffix = f".{os.getpid()}.tmp"
+    for name, array in arrays.items():
+        path = os.path.join(directory, f"{name}.npy")
+        with open(path + suffix, "wb") as f:
+            np.save(f, array)
+        os.replace(path + suffix, path)
+
+    manifest = {
+        "source": source,
+        "fingerprint": store_fingerprint(store),
+        "shape": list(longitude.shape),
+        "files": {name: f"{name}.npy" for name in arrays},
+        "plane_to_index": fit_plane_to_index(arrays["x"], arrays["y"]),
+    }
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + suffix, "w") as f:
+        json.dump(manifest, f)
+    os.replace(path + suffix, path)
+    logger.info(f"Exported coordinate grids of {source} ({longitude.shape}) to {directory}")
+    return manifest
+
+
+class SharedGrids:
+    """Read-only, memory-mapped coordinate grids.
+
+    The arrays are mapped with ``np.load(mmap_mode="r")``, so every worker
+    process shares the page cache's single physical copy and opening them
+    costs no zarr access and no decoding.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self.directory = directory
+        self.arrays: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(directory, filename), mmap_mode="r")
+            for name, filename in self.manifest["files"].items()
+        }
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(self.manifest["shape"])
+
+    @property
+    def longitude(self) -> np.ndarray:
+        return self.arrays["longitude"]
+
+    @property
+    def latitude(self) -> np.ndarray:
+        return self.arrays["latitude"]
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.arrays["x"]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.arrays["y"]
+
+    @property
+    def plane_to_index(self) -> dict:
+        """Persisted map plane -> index fit (fitted here for exports that predate it)."""
+        if "plane_to_index" not in self.manifest:
+            self.manifest["plane_to_index"] = fit_plane_to_index(self.x, self.y)
+        return self.manifest["plane_to_index"]
+
+    def plane_indices(self, x, y) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Grid indices of map plane positions, by the affine fit alone (no search).
+
+        Exact on grids that are regular in the Lambert projection, which is
+        what the maps are drawn in.
+
+        Args:
+            x: Map plane x in metres
+            y: Map plane y in metres (same shape as x)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Row and column indices
+            (clipped to the grid) and whether each position lies on the grid
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        coefficients = np.asarray(self.plane_to_index["coefficients"])
+        fractional_rows = coefficients[0, 0] * x + coefficients[0, 1] * y + coefficients[0, 2]
+        fractional_cols = coefficients[1, 0] * x + coefficients[1, 1] * y + coefficients[1, 2]
+        n_rows, n_cols = self.shape
+        inside = (
+            (fractional_rows > -0.5) & (fractional_rows < n_rows - 0.5)
+            & (fractional_cols > -0.5) & (fractional_cols < n_cols - 0.5)
+        )
+        rows = np.clip(np.rint(fractional_rows), 0, n_rows - 1).astype(np.int64)
+        cols = np.clip(np.rint(fractional_cols), 0, n_cols - 1).astype(np.int64)
+        return rows, cols, inside
+
+    def nearest_index(self, lat: float, lon: float) -> Tuple[int, int]:
+        """Grid index closest to a point (great-circle distance).
+
+        Args:
+            lat: Latitude in degrees
+            lon: Longitude in degrees
+
+        Returns:
+            Tuple[int, int]: (row, column) of the closest grid point
+        """
+        rows, cols = self.nearest_indices([lat], [lon])
+        return int(rows[0]), int(cols[0])
+
+    def nearest_indices(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        """Grid indices closest to many points at once.
+
+        Each point is projected onto the map plane and mapped to fractional
+        grid indices by the persisted affine fit; the nearest grid point by
+        chord distance between unit vectors is then searched in a window
+        around that guess, moving the window until the best point is inside
+        it. Points outside the domain get the closest edge point.
+
+        Args:
+            lat: Latitudes in degrees
+            lon: Longitudes in degrees (same shape as lat)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row and column indices, shaped like lat
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        shape = lat.shape
+        lat, lon = lat.ravel(), lon.ravel()
+        n_rows, n_cols = self.shape
+
+        points = lambert_projection().transform_points(ccrs.PlateCarree(), lon, lat)
+        rows, cols, _ = self.plane_indices(points[:, 0], points[:, 1])
+
+        radius = int(self.plane_to_index["radius"])
+        offsets = np.arange(-radius, radius + 1)
+        d_rows, d_cols = (o.ravel() for o in np.meshgrid(offsets, offsets, indexing="ij"))
+        targets = unit_vectors(lat, lon)
+        pending = np.arange(len(lat))
+        for _ in range(_MAX_REFINE_PASSES):
+            if not len(pending):
+                break
+            window_rows = np.clip(rows[pending, None] + d_rows, 0, n_rows - 1)
+            window_cols = np.clip(cols[pending, None] + d_cols, 0, n_cols - 1)
+            candidates = unit_vectors(self.latitude[window_rows, window_cols], self.longitude[window_rows, window_cols])
+            distance = ((candidates - targets[pending, None, :]) ** 2).sum(axis=-1)
+            best = distance.argmin(axis=1)
+            new_rows = window_rows[np.arange(len(pending)), best]
+            new_cols = window_cols[np.arange(len(pending)), best]
+            moved = (new_rows != rows[pending]) | (new_cols != cols[pending])
+            rows[pending], cols[pending] = new_rows, new_cols
+            # Points whose best candidate moved may have a closer one beyond the window
+            pending = pending[moved]
+        return rows.reshape(shape), cols.reshape(shape)
+
+
+_grids: Optional[SharedGrids] = None
+_grids_checked_at = 0.0
+_grids_store = None
+_grids_lock = threading.Lock()
+
+
+def _read_manifest(directory: str) -> dict:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _source_fingerprint(source: str) -> str:
+    """Fingerprint of the grids' source store, as held by the catalog service."""
+    global _grids_store
+    if _grids_store is None or _grids_store[0] != source:
+        _grids_store = (source, open_store(source))
+    return catalog_service.get(source, _grids_store[1]).fingerprint
+
+
+def shared_grids() -> SharedGrids:
+    """Get the process's mapped coordinate grids, exporting them on first use.
+
+    Grids are exported from CERRORA_EXAMPLE_ZARR_PATH into GRID_CACHE_DIR
+    when no export of that store exists there; mapping an existing export
+    does not touch the store. Afterwards, every CATALOG_REFRESH_S, the
+    export's fingerprint is compared with the store's catalog, and the grids
+    are re-exported (or remapped, if another worker already re-exported
+    them) when the store was rewritten.
+
+    Returns:
+        SharedGrids: The mapped grids
+    """
+    global _grids, _grids_checked_at
+    with _grids_lock:
+        directory = settings.GRID_CACHE_DIR
+        source = settings.CERRORA_EXAMPLE_ZARR_PATH
+        now = time.monotonic()
+        if _grids is None:
+            if _read_manifest(directory).get("source") != source:
+                export_grids(source, directory)
+            _grids = SharedGrids(directory)
+            _grids_checked_at = now
+        elif now - _grids_checked_at >= settings.CATALOG_REFRESH_S:
+            _grids_checked_at = now
+            fingerprint = _source_fingerprint(source)
+            if _grids.manifest.get("fingerprint") != fingerprint:
+                exported = _read_manifest(directory)
+                if exported.get("source") != source or exported.get("fingerprint") != fingerprint:
+                    logger.info(f"Metadata of {source} changed, re-exporting its coordinate grids")
+                    export_grids(source, directory)
+                _grids = SharedGrids(directory)
+        return _grids
+
+
+def reset_shared_grids() -> None:
+    """Forget the mapped grids (e.g. after a re-export)."""
+    global _grids
+    with _grids_lock:
+        _grids = None
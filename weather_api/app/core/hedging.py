@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+
+from zarr.storage import WrapperStore
+
+from app.core.fetch import RequestLimiter
+
+logger = logging.getLogger("weather_api")
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with percentile estimates.
+
+    Buckets grow by ``growth`` from ``min_seconds`` up to ``max_seconds``, so
+    the relative error of a percentile is bounded by the bucket width.
+    """
+
+    def __init__(self, min_seconds: float = 1e-4, max_seconds: float = 60.0, growth: float = 1.2):
+        self.min_seconds = min_seconds
+        self.growth = growth
+        n_buckets = int(math.ceil(math.log(max_seconds / min_seconds, growth))) + 1
+        self._counts: List[int] = [0] * n_buckets
+        self._count = 0
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.min_seconds:
+            return 0
+        index = int(math.log(seconds / self.min_seconds, self.growth)) + 1
+        return min(index, len(self._counts) - 1)
+
+    def _upper_bound(self, bucket: int) -> float:
+        return self.min_seconds * self.growth ** bucket
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._counts[self._bucket(seconds)] += 1
+            self._count += 1
+            self._total += seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the upper bound of the bucket holding the q-th percentile."""
+        with self._lock:
+            if self._count == 0:
+                return None
+            target = q / 100.0 * self._count
+            seen = 0
+            for bucket, n in enumerate(self._counts):
+                seen += n
+                if seen >= target and n:
+                    return self._upper_bound(bucket)
+            return self._upper_bound(len(self._counts) - 1)
+
+    def snapshot(self) -> dict:
+        """Summary suitable for logging or a stats endpoint."""
+        return {
+            "count": self._count,
+            "mean": self._total / self._count if self._count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+# Per-store histograms, keyed by store name
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def get_latency_histogram(name: str) -> LatencyHistogram:
+    """Get (or create) the latency histogram of a store."""
+    with _histograms_lock:
+        if name not in _histograms:
+            _histograms[name] = LatencyHistogram()
+        return _histograms[name]
+
+
+def latency_snapshots() -> Dict[str, dict]:
+    """Summaries of every store's read latencies."""
+    with _histograms_lock:
+        return {name: histogram.snapshot() for name, histogram in _histograms.items()}
+
+
+class HedgedStore(WrapperStore):
+    """Zarr store wrapper that hedges slow reads with a duplicate request.
+
+    A read that has not finished after the store's ``percentile`` latency is
+    issued a second time; whichever copy finishes first wins and the other is
+    cancelled. Until ``min_samples`` reads have been observed the threshold is
+    ``initial_delay``. At most ``max_hedge_ratio`` of reads are hedged so a
+    struggling backend is not hit with twice the load. Backup requests take
+    a slot of ``limiter`` (the store's concurrency limit, which the primary
+    request already holds one of), so hedging never exceeds it either.
+    """
+
+    def __init__(
+            self,
+            store,
+            name: str,
+            percentile: float = 95.0,
+            initial_delay: float = 0.2,
+            min_delay: float = 0.005,
+            max_delay: float = 2.0,
+            min_samples: int = 20,
+            max_hedge_ratio: float = 0.1,
+            limiter: Optional[RequestLimiter] = None,
+    ):
+        super().__init__(store)
+        self.name = name
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.limiter = limiter
+        self.histogram = get_latency_histogram(name)
+        self.stats = {"reads": 0, "hedged": 0, "hedge_wins": 0}
+
+    def _with_store(self, store):
+        return type(self)(
+            store,
+            name=self.name,
+            percentile=self.percentile,
+            initial_delay=self.initial_delay,
+            min_delay=self.min_delay,
+            max_delay=self.max_delay,
+            min_samples=self.min_samples,
+            max_hedge_ratio=self.max_hedge_ratio,
+            limiter=self.limiter,
+        )
+
+    def __repr__(self) -> str:
+        return f"HedgedStore({self._store!r}, name={self.name!r})"
+
+    def hedge_delay(self) -> float:
+        """Current hedging threshold in seconds."""
+        if self.histogram.count < self.min_samples:
+            return self.initial_delay
+        delay = self.histogram.percentile(self.percentile)
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def _may_hedge(self) -> bool:
+        return self.stats["hedged"] < self.max_hedge_ratio * max(self.stats["reads"], 1)
+
+    async def _timed_get(self, key, prototype, byte_range):
+        start = time.perf_counter()
+        try:
+            return await self._store.get(key, prototype, byte_range)
+        finally:
+            # Cancelled losers still count, as a lower bound of their latency
+            self.histogram.record(time.perf_counter() - start)
+
+    async def _backup_get(self, key, prototype, byte_range):
+        if self.limiter is None:
+            return await self._timed_get(key, prototype, byte_range)
+        async with self.limiter:
+            return await self._timed_get(key, prototype, byte_range)
+
+    async def get(self, key, prototype, byte_range=None):
+        self.stats["reads"] += 1
+        primary = asyncio.ensure_future(self._timed_get(key, prototype, byte_range))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            if done or not self._may_hedge():
+                return await primary
+
+            self.stats["hedged"] += 1
+            logger.debug(f"Hedging slow read of {key} on {self.name}")
+            backup = asyncio.ensure_future(self._backup_get(key, prototype, byte_range))
+            tasks.add(backup)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is backup:
+                        self.stats["hedge_wins"] += 1
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def get_partial_values(self, prototype, key_ranges):
+        return await asyncio.gather(
+            *(self.get(key, prototype, byte_range) for key, byte_range in key_ranges)
+        )
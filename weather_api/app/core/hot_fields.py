@@ -0,0 +1,365 @@
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger("weather_api")
+
+MAX_NDIM = 4
+# Where Linux exposes POSIX shared memory segments as files
+SHM_DIR = "/dev/shm"
+
+_HEADER_DTYPE = np.dtype([("generation", "<u8"), ("nbytes", "<u8")])
+_SLOT_DTYPE = np.dtype([
+    ("key", "S40"),  # sha1 of the field key; empty while the slot is free
+    ("segment", "S48"),
+    ("dtype", "S8"),
+    ("ndim", "u1"),
+    ("shape", "<u4", (MAX_NDIM,)),
+    ("nbytes", "<u8"),
+    ("created", "<f8"),
+    ("last_used", "<f8"),
+])
+
+
+def _untrack(shm: SharedMemory) -> SharedMemory:
+    # Segments outlive the worker that created or attached them; keep the
+    # resource tracker from unlinking them when that worker exits
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _map_readonly(segment: str) -> mmap.mmap:
+    # Views made with np.frombuffer keep the mapping alive, so it outlives both
+    # this process's handle and the segment's name
+    fd = os.open(os.path.join(SHM_DIR, segment), os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+
+
+def _view(mapping: mmap.mmap, shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+    count = int(np.prod(shape, dtype=np.int64))
+    return np.frombuffer(mapping, dtype=dtype, count=count).reshape(shape)
+
+
+def _shm_free_bytes() -> int:
+    stats = os.statvfs(SHM_DIR)
+    return stats.f_bavail * stats.f_frsize
+
+
+def _unlink(name: str) -> None:
+    try:
+        shm = SharedMemory(name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+class HotFieldStore:
+    """Decoded fields in POSIX shared memory, shared by all worker processes.
+
+    Each field lives in its own shared memory segment. A fixed-size index
+    segment maps field keys to segments; it is only read and written under
+    an exclusive ``flock`` on a lock file, so any process may insert, look up
+    or evict. Readers get read-only NumPy views onto a mapping of the segment
+    (no copy). Evicting a field unlinks its segment's name only: views that
+    are still in use stay mapped until their process drops them. The index
+    generation advances on every insert and eviction; a process that sees
+    it change drops its mappings of segments no longer in the index.
+
+    Segments are only created when /dev/shm has room for them: shared
+    memory is allocated lazily, so writing to a segment that does not fit
+    raises SIGBUS instead of an error.
+
+    Budget and age limits are enforced by ``evict``, which runs on insert
+    and periodically in the eviction daemon (one per host, see
+    ``start_daemon``).
+    """
+
+    def __init__(self, name: str, max_bytes: int, slots: int = 1024, ttl_seconds: float = 0.0):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.slots = slots
+        self.ttl_seconds = ttl_seconds
+        self.hits = {"hit": 0, "miss": 0}
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._thread_lock = threading.Lock()
+        self._index_shm: Optional[SharedMemory] = None
+        # Read-only mappings of field segments in this process, by segment name
+        self._mapped: Dict[str, mmap.mmap] = {}
+        # Index generation when the mappings were last pruned
+        self._pruned_generation = -1
+        self._daemon: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @contextmanager
+    def _locked(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Hold the cross-process lock; yields the (header, slots) index views."""
+        with self._thread_lock, open(self._lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self._index()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _index(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._index_shm is None:
+            size = _HEADER_DTYPE.itemsize + self.slots * _SLOT_DTYPE.itemsize
+            if size > _shm_free_bytes() and not os.path.exists(os.path.join(SHM_DIR, f"{self.name}_index")):
+                raise OSError(f"{SHM_DIR} has no room for the hot field index ({size} bytes)")
+            try:
+                self._index_shm = _untrack(SharedMemory(f"{self.name}_index", create=True, size=size))
+                self._index_shm.buf[:size] = bytes(size)
+            except FileExistsError:
+                self._index_shm = _untrack(SharedMemory(f"{self.name}_index"))
+        buf = self._index_shm.buf
+        header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=buf)
+        n_slots = (len(buf) - _HEADER_DTYPE.itemsize) // _SLOT_DTYPE.itemsize
+        slots = np.ndarray((n_slots,), dtype=_SLOT_DTYPE, buffer=buf, offset=_HEADER_DTYPE.itemsize)
+        return header, slots
+
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest().encode("ascii")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Look up a field.
+
+        Args:
+            key: Field key
+
+        Returns:
+            Optional[np.ndarray]: Read-only view of the shared field, or None
+        """
+        digest = self._digest(key)
+        with self._locked() as (header, slots):
+            self._prune_locked(header, slots)
+            found = np.flatnonzero(slots["key"] == digest)
+            if not len(found):
+                self.hits["miss"] += 1
+                return None
+            slot = slots[found[0]]
+            slot["last_used"] = time.time()
+            segment = slot["segment"].decode("ascii")
+            shape = tuple(int(n) for n in slot["shape"][:slot["ndim"]])
+            dtype = np.dtype(slot["dtype"].decode("ascii"))
+            # Map while holding the lock, so the segment cannot be unlinked in between
+            mapping = self._mapped.get(segment)
+            if mapping is None:
+                mapping = self._mapped[segment] = _map_readonly(segment)
+        self.hits["hit"] += 1
+        return _view(mapping, shape, dtype)
+
+    def put(self, key: str, values: np.ndarray) -> Optional[np.ndarray]:
+        """Copy a field into shared memory.
+
+        Fields larger than the budget, with more than MAX_NDIM dimensions or
+        of object dtype are not stored.
+
+        Args:
+            key: Field key
+            values: Field values
+
+        Returns:
+            Optional[np.ndarray]: Read-only view of the stored field, or None
+        """
+        values = np.asarray(values)
+        if values.nbytes > self.max_bytes or values.ndim > MAX_NDIM or values.dtype.hasobject:
+            return None
+        digest = self._digest(key)
+        with self._locked() as (header, slots):
+            if (slots["key"] == digest).any():
+                existing = True
+            else:
+                existing = False
+                header["generation"] += 1
+                segment = f"{self.name}_{int(header['generation']):x}"
+                if values.nbytes > _shm_free_bytes():
+                    logger.warning(f"Not storing hot field {key}: {values.nbytes} bytes do not fit in {SHM_DIR}")
+                    return None
+                try:
+                    shm = _untrack(SharedMemory(segment, create=True, size=max(values.nbytes, 1)))
+                except OSError as e:
+                    logger.warning(f"Could not store hot field {key}: {e}")
+                    return None
+                np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[...] = values
+                shm.close()
+                mapping = self._mapped[segment] = _map_readonly(segment)
+
+                free = np.flatnonzero(slots["key"] == b"")
+                if not len(free):
+                    self._evict_slot(header, slots, int(np.argmin(slots["last_used"])))
+                    free = np.flatnonzero(slots["key"] == b"")
+                slot = slots[free[0]]
+                now = time.time()
+                shape = np.zeros(MAX_NDIM, dtype="<u4")
+                shape[:values.ndim] = values.shape
+                slot["segment"] = segment.encode("ascii")
+                slot["dtype"] = values.dtype.str.encode("ascii")
+                slot["ndim"] = values.ndim
+                slot["shape"] = shape
+                slot["nbytes"] = values.nbytes
+                slot["created"] = now
+                slot["last_used"] = now
+                slot["key"] = digest
+                header["nbytes"] += values.nbytes
+                evicted = self._evict_locked(header, slots)
+        if existing:
+            return self.get(key)
+        if evicted:
+            self._forget_evicted()
+        return _view(mapping, values.shape, values.dtype)
+
+    def evict(self) -> int:
+        """Drop expired fields, then least recently used ones over the budget.
+
+        Returns:
+            int: Number of fields evicted
+        """
+        with self._locked() as (header, slots):
+            evicted = self._evict_locked(header, slots)
+        self._forget_evicted()
+        return evicted
+
+    def _evict_locked(self, header: np.ndarray, slots: np.ndarray) -> int:
+        evicted = 0
+        used = slots["key"] != b""
+        if self.ttl_seconds:
+            for i in np.flatnonzero(used & (slots["created"] < time.time() - self.ttl_seconds)):
+                self._evict_slot(header, slots, int(i))
+                evicted += 1
+        while header["nbytes"] > self.max_bytes:
+            used = np.flatnonzero(slots["key"] != b"")
+            if not len(used):
+                break
+            self._evict_slot(header, slots, int(used[np.argmin(slots["last_used"][used])]))
+            evicted += 1
+        return evicted
+
+    def _evict_slot(self, header: np.ndarray, slots: np.ndarray, i: int) -> None:
+        slot = slots[i]
+        _unlink(slot["segment"].decode("ascii"))
+        header["nbytes"] -= slot["nbytes"]
+        header["generation"] += 1
+        slots[i] = np.zeros((), dtype=_SLOT_DTYPE)
+
+    def _forget_evicted(self) -> None:
+        """Drop this process's mappings of evicted segments.
+
+        The memory is returned once the last view of a segment is gone.
+        """
+        with self._locked() as (header, slots):
+            self._prune_locked(header, slots)
+
+    def _prune_locked(self, header: np.ndarray, slots: np.ndarray) -> None:
+        """Drop mappings of segments evicted (by any process) since the last pruning."""
+        generation = int(header["generation"])
+        if generation == self._pruned_generation:
+            return
+        live = {segment.decode("ascii") for segment in slots["segment"][slots["key"] != b""]}
+        for segment in [s for s in self._mapped if s not in live]:
+            del self._mapped[segment]
+        self._pruned_generation = generation
+
+    def stats(self) -> dict:
+        """Fields, bytes and this process's hit counts."""
+        with self._locked() as (header, slots):
+            fields = int((slots["key"] != b"").sum())
+            nbytes = int(header["nbytes"])
+        return {"fields": fields, "bytes": nbytes, **self.hits}
+
+    def clear(self) -> None:
+        """Evict every field."""
+        with self._locked() as (header, slots):
+            for i in np.flatnonzero(slots["key"] != b""):
+                self._evict_slot(header, slots, int(i))
+        self._forget_evicted()
+
+    def destroy(self) -> None:
+        """Evict every field and remove the index segment."""
+        self.clear()
+        with self._locked():
+            self._index_shm.close()
+            self._index_shm = None
+            _unlink(f"{self.name}_index")
+
+    def start_daemon(self, interval: float) -> None:
+        """Run ``evict`` every ``interval`` seconds in this process.
+
+        Every worker may call this; a non-blocking ``flock`` elects one
+        daemon per host and the others stand by, taking over if it exits.
+
+        Args:
+            interval: Seconds between eviction passes
+        """
+        if self._daemon is not None:
+            return
+        self._stop.clear()
+        self._daemon = threading.Thread(target=self._run_daemon, args=(interval,), daemon=True)
+        self._daemon.start()
+
+    def stop_daemon(self) -> None:
+        """Stop this process's eviction daemon (or stand-by) thread."""
+        self._stop.set()
+        if self._daemon is not None:
+            self._daemon.join()
+            self._daemon = None
+
+    def _run_daemon(self, interval: float) -> None:
+        with open(f"{self._lock_path}.daemon", "a+") as daemon_lock:
+            while True:
+                try:
+                    fcntl.flock(daemon_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if self._stop.wait(interval):
+                        return
+            logger.info(f"Hot field eviction daemon running in process {os.getpid()}")
+            while not self._stop.wait(interval):
+                try:
+                    evicted = self.evict()
+                    if evicted:
+                        logger.info(f"Evicted {evicted} hot fields")
+                except Exception as e:
+                    logger.warning(f"Hot field eviction failed: {e}")
+
+
+_store: Optional[HotFieldStore] = None
+
+
+def hot_fields() -> Optional[HotFieldStore]:
+    """The host's hot field store, or None if HOT_FIELDS_ENABLED is off."""
+    global _store
+    if not settings.HOT_FIELDS_ENABLED:
+        return None
+    if _store is None:
+        store = HotFieldStore(
+            settings.HOT_FIELDS_NAME,
+            max_bytes=settings.HOT_FIELDS_MAX_BYTES,
+            slots=settings.HOT_FIELDS_SLOTS,
+            ttl_seconds=settings.HOT_FIELDS_TTL_S,
+        )
+        try:
+            store.stats()  # creates or attaches the index
+        except OSError as e:
+            logger.warning(f"Hot field store unavailable, reading fields directly: {e}")
+            return None
+        if store.max_bytes > _shm_free_bytes():
+            logger.warning(f"HOT_FIELDS_MAX_BYTES exceeds the free space of {SHM_DIR}; fields that do not fit are skipped")
+        _store = store
+    return _store
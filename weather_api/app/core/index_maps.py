@@ -0,0 +1,163 @@
+import logging
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+import xarray as xr
+
+from app.config import settings
+
+logger = logging.getLogger("weather_api")
+
+
+class CoordinateIndexMap:
+    """Lookup table from integer coordinate values to positional indices.
+
+    Exact matches are a dict lookup. Other values are matched to the nearest
+    coordinate only if it lies within ``tolerance``; anything further away
+    raises KeyError instead of silently snapping to an unrelated step.
+    """
+
+    def __init__(self, name: str, values: np.ndarray, tolerance: int = 0):
+        self.name = name
+        self.values = np.asarray(values, dtype=np.int64)
+        self.tolerance = tolerance
+        self._exact: Dict[int, int] = {}
+        for index, value in enumerate(self.values.tolist()):
+            self._exact.setdefault(value, index)
+        self._order = np.argsort(self.values, kind="stable")
+        self._sorted = self.values[self._order]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, value: int) -> bool:
+        return int(value) in self._exact
+
+    def lookup(self, value: int, tolerance: Optional[int] = None) -> int:
+        """Return the index of ``value``, within the tolerance.
+
+        Args:
+            value: Coordinate value to look up
+            tolerance: Override of the map's tolerance
+
+        Returns:
+            int: Position of the matching coordinate
+
+        Raises:
+            KeyError: If no coordinate lies within the tolerance
+        """
+        value = int(value)
+        index = self._exact.get(value)
+        if index is not None:
+            return index
+
+        tolerance = self.tolerance if tolerance is None else tolerance
+        if len(self._sorted) == 0 or tolerance <= 0:
+            raise KeyError(f"{self.name}={value} not found")
+
+        position = int(np.searchsorted(self._sorted, value))
+        candidates = [p for p in (position - 1, position) if 0 <= p < len(self._sorted)]
+        best = min(candidates, key=lambda p: abs(int(self._sorted[p]) - value))
+        distance = abs(int(self._sorted[best]) - value)
+        if distance > tolerance:
+            raise KeyError(f"{self.name}={value} not found within tolerance {tolerance}")
+        logger.info(f"Matched {self.name}={value} to {int(self._sorted[best])} (off by {distance})")
+        return int(self._order[best])
+
+
+class TimeIndexMap(CoordinateIndexMap):
+    """Epoch seconds to ``time`` index."""
+
+    @classmethod
+    def from_coordinate(cls, coordinate: xr.DataArray, tolerance: int = 0) -> "TimeIndexMap":
+        seconds = coordinate.values.astype("datetime64[s]").astype(np.int64)
+        return cls("time", seconds, tolerance)
+
+
+class LeadIndexMap(CoordinateIndexMap):
+    """Lead time in hours to ``prediction_timedelta`` index.
+
+    Values are kept in seconds so leads that are not whole hours still map.
+    """
+
+    @classmethod
+    def from_coordinate(cls, coordinate: xr.DataArray, tolerance: int = 0) -> "LeadIndexMap":
+        seconds = coordinate.values.astype("timedelta64[s]").astype(np.int64)
+        return cls("prediction_timedelta", seconds, tolerance)
+
+    def lookup_hours(self, hours: float, tolerance: Optional[int] = None) -> int:
+        return self.lookup(int(round(hours * 3600)), tolerance)
+
+    @property
+    def hours(self) -> np.ndarray:
+        return self.values / 3600.0
+
+
+@dataclass
+class IndexMaps:
+    """Index maps of one opened dataset."""
+
+    time: Optional[TimeIndexMap]
+    lead: Optional[LeadIndexMap]
+
+    @classmethod
+    def from_dataset(cls, ds) -> "IndexMaps":
+        """Build the maps from a dataset's coordinates (no chunk reads).
+
+        Args:
+            ds: Dataset or DataArray with ``time`` and/or ``prediction_timedelta``
+
+        Returns:
+            IndexMaps: Maps for the coordinates present
+        """
+        time_map = None
+        lead_map = None
+        if "time" in ds.coords:
+            time_map = TimeIndexMap.from_coordinate(ds["time"], settings.TIME_INDEX_TOLERANCE_S)
+        if "prediction_timedelta" in ds.coords:
+            lead_map = LeadIndexMap.from_coordinate(
+                ds["prediction_timedelta"], settings.LEAD_INDEX_TOLERANCE_S
+            )
+        return cls(time=time_map, lead=lead_map)
+
+    def frame_indexer(self, base_time: int, valid_time: int) -> Dict[str, int]:
+        """Integer indexer of the forecast issued at base_time for valid_time.
+
+        Args:
+            base_time: Forecast base time in epoch seconds
+            valid_time: Valid time in epoch seconds
+
+        Returns:
+            Dict usable with ``isel``
+        """
+        return {
+            "time": self.time.lookup(base_time),
+            "prediction_timedelta": self.lead.lookup(int(valid_time) - int(base_time)),
+        }
+
+    def valid_time_indexer(self, valid_time: int) -> Dict[str, int]:
+        """Integer indexer of an analysis/ground truth field at valid_time."""
+        return {"time": self.time.lookup(valid_time)}
+
+
+_index_maps: Dict[int, IndexMaps] = {}
+
+
+def get_index_maps(ds) -> IndexMaps:
+    """Index maps of a dataset, built once per dataset object.
+
+    Args:
+        ds: Opened xarray Dataset
+
+    Returns:
+        IndexMaps: Cached maps for the dataset
+    """
+    key = id(ds)
+    maps = _index_maps.get(key)
+    if maps is None:
+        maps = IndexMaps.from_dataset(ds)
+        _index_maps[key] = maps
+        weakref.finalize(ds, _index_maps.pop, key, None)
+    return maps
@@ -0,0 +1,350 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.d_loader import DataLoader
+from app.core.regions import RegionWeights
+from app.core.scheduling import get_profile
+
+logger = logging.getLogger("weather_api")
+
+METRICS = ("rmse", "bias", "mae", "acc")
+# Area-weighted sums per (base time, lead); every metric of any base-time
+# window follows from their totals, so they are what gets cached
+SUMS = ("weight", "error", "squared", "absolute", "cross", "forecast_anomaly", "truth_anomaly")
+
+
+@dataclass
+class MetricSums:
+    """Area-weighted error sums of a forecast against the ground truth.
+
+    ``sums`` holds one (base times, leads) array per name in ``SUMS``; pairs
+    without ground truth have zero weight.
+    """
+
+    base_times: np.ndarray
+    lead_hours: np.ndarray
+    sums: Dict[str, np.ndarray]
+
+    def scores(self, per_base_time: bool = False) -> Dict[str, np.ndarray]:
+        """RMSE, bias (forecast - truth), MAE and anomaly correlation.
+
+        Args:
+            per_base_time: Keep the base time axis instead of pooling the window
+
+        Returns:
+            Dict[str, np.ndarray]: Scores per lead, or per (base time, lead);
+            NaN where there is no ground truth
+        """
+        return scores_from_sums(
+            self.sums if per_base_time else {name: values.sum(axis=0) for name, values in self.sums.items()}
+        )
+
+
+def scores_from_sums(sums: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """RMSE, bias, MAE and anomaly correlation from (pooled) error sums.
+
+    Args:
+        sums: Array per name in ``SUMS``, all of the same shape
+
+    Returns:
+        Dict[str, np.ndarray]: Each metric, NaN where the weight is zero
+    """
+    covered = sums["weight"] > 0
+    weight = np.where(covered, sums["weight"], np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        acc = sums["cross"] / np.sqrt(sums["forecast_anomaly"] * sums["truth_anomaly"])
+        return {
+            "rmse": np.sqrt(sums["squared"] / weight),
+            "bias": sums["error"] / weight,
+            "mae": sums["absolute"] / weight,
+            "acc": np.where(covered, acc, np.nan),
+        }
+
+
+def _truth_indices(truth: DataLoader, valid_times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Ground truth time index of every valid time (0 where missing) and whether it exists."""
+    time_map = truth.catalog.index_maps.time
+    indices = np.zeros(valid_times.shape, dtype=np.int64)
+    present = np.zeros(valid_times.shape, dtype=bool)
+    for position, valid_time in np.ndenumerate(valid_times):
+        try:
+            indices[position] = time_map.lookup(int(valid_time))
+            present[position] = True
+        except KeyError:
+            continue
+    return indices, present
+
+
+def _window(loader: DataLoader, variable: str, region: RegionWeights, workload: str = "batch"):
+    """Lazy (dask) values of a variable in the region's window, rows in grid order."""
+    data = loader.get_variable_data(variable, workload)
+    if "level" in data.dims:
+        raise ValueError(f"{variable} has a level dimension; metrics need surface variables")
+    window = data.isel(**region.window_indexer(data.sizes["y"], loader.settings.flip_y))
+    if loader.settings.flip_y:
+        window = window.isel(y=slice(None, None, -1))
+    return window
+
+
+def climatology(truth: DataLoader, variable: str) -> np.ndarray:
+    """Per-cell mean of the ground truth, the reference of the anomaly correlation.
+
+    The mean is taken over at most CLIMATOLOGY_SAMPLES ground truth times
+    spread evenly over the store, computed once per store and variable and
+    saved under METRICS_CACHE_DIR for other workers.
+
+    Args:
+        truth: Ground truth loader
+        variable: Variable name
+
+    Returns:
+        np.ndarray: Climatology on the grids, rows in grid order
+    """
+    catalog = truth.catalog
+    key = f"{catalog.fingerprint}_{variable}"
+    with _climatology_lock:
+        if key in _climatologies:
+            return _climatologies[key]
+    path = os.path.join(settings.METRICS_CACHE_DIR, f"climatology_{key}.npy")
+    if os.path.exists(path):
+        values = np.load(path)
+    else:
+        samples = np.unique(np.linspace(0, len(catalog.times) - 1, settings.CLIMATOLOGY_SAMPLES).round().astype(int))
+        data = truth.get_variable_data(variable, "batch").isel(time=samples)
+        if truth.settings.flip_y:
+            data = data.isel(y=slice(None, None, -1))
+        (mean,) = get_profile("batch").compute(data.mean("time", skipna=True))
+        values = np.asarray(mean.values, dtype=np.float64)
+        os.makedirs(settings.METRICS_CACHE_DIR, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        with open(path + suffix, "wb") as f:
+            np.save(f, values)
+        os.replace(path + suffix, path)
+        logger.info(f"Computed {variable} climatology from {len(samples)} ground truth times")
+    with _climatology_lock:
+        _climatologies[key] = values
+    return values
+
+
+_climatologies: Dict[str, np.ndarray] = {}
+_climatology_lock = threading.Lock()
+
+
+def metric_sums(
+        forecast: DataLoader,
+        truth: DataLoader,
+        variable: str,
+        base_times: Sequence[int],
+        region: RegionWeights,
+        reference: Optional[np.ndarray] = None,
+) -> MetricSums:
+    """Error sums of a forecast over base times and all leads, in one dask pass.
+
+    The forecast window of all base times and leads and the matching ground
+    truth are reduced over the region with the area weights as chunked dask
+    reductions, computed together with the "batch" profile's scheduler.
+
+    Args:
+        forecast: Forecast loader
+        truth: Ground truth loader
+        variable: Variable name (same in both stores)
+        base_times: Base times in epoch seconds, all in the forecast store
+        region: Region cells and weights
+        reference: Climatology on the grids (default: ``climatology``)
+
+    Returns:
+        MetricSums: Sums per (base time, lead)
+
+    Raises:
+        KeyError: If the variable or a base time is not in the stores
+        ValueError: If the variable has a level dimension
+    """
+    catalog = forecast.catalog
+    catalog.require_variables([variable])
+    truth.catalog.require_variables([variable])
+    base_times = np.asarray(base_times, dtype=np.int64)
+    leads = np.asarray(catalog.leads, dtype=np.int64)
+    time_indices = [catalog.index_maps.time.lookup(int(t)) for t in base_times]
+    truth_indices, present = _truth_indices(truth, base_times[:, None] + leads[None, :])
+    if reference is None:
+        reference = climatology(truth, variable)
+    rows, cols = slice(*region.rows), slice(*region.cols)
+
+    predicted = _window(forecast, variable, region).isel(time=time_indices)
+    predicted = predicted.transpose("time", "prediction_timedelta", "y", "x").data
+    observed = _window(truth, variable, region).isel(time=truth_indices.ravel())
+    # Ground truth of every (base time, lead); missing times read a placeholder and get no weight below
+    observed = observed.transpose("time", "y", "x").data.reshape(predicted.shape)
+    reference = reference[rows, cols]
+    valid = ~np.isnan(predicted) & ~np.isnan(observed) & ~np.isnan(reference)
+    weights = np.where(valid, region.dense_weights(), 0.0)
+    predicted = np.where(valid, predicted, 0.0)
+    observed = np.where(valid, observed, 0.0)
+    error = predicted - observed
+    predicted_anomaly = predicted - np.nan_to_num(reference)
+    observed_anomaly = observed - np.nan_to_num(reference)
+    terms = {
+        "weight": weights,
+        "error": weights * error,
+        "squared": weights * error ** 2,
+        "absolute": weights * np.abs(error),
+        "cross": weights * predicted_anomaly * observed_anomaly,
+        "forecast_anomaly": weights * predicted_anomaly ** 2,
+        "truth_anomaly": weights * observed_anomaly ** 2,
+    }
+    lazy = {name: term.sum(axis=(-2, -1)) for name, term in terms.items()}
+    (computed,) = get_profile("batch").compute(lazy)
+    return MetricSums(
+        base_times=base_times,
+        lead_hours=leads / 3600,
+        sums={name: np.where(present, np.asarray(values, dtype=np.float64), 0.0) for name, values in computed.items()},
+    )
+
+
+class MetricsEngine:
+    """Verification metrics with the per-base-time sums cached.
+
+    Sums are cached per (forecast store, ground truth store, variable,
+    region, base time) as long as neither store's fingerprint changes, so a
+    window's metrics only compute the base times not seen before.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[tuple, Tuple[np.ndarray, Dict[str, np.ndarray]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"hit": 0, "miss": 0}
+
+    def sums(
+            self,
+            forecast: DataLoader,
+            truth: DataLoader,
+            variable: str,
+            region: RegionWeights,
+            start: Optional[int] = None,
+            end: Optional[int] = None,
+    ) -> MetricSums:
+        """Sums of every forecast base time in [start, end].
+
+        Args:
+            forecast: Forecast loader
+            truth: Ground truth loader
+            variable: Variable name
+            region: Region cells and weights
+            start: First base time in epoch seconds (inclusive), or None
+            end: Last base time in epoch seconds (inclusive), or None
+
+        Returns:
+            MetricSums: Sums per (base time, lead)
+        """
+        times = np.asarray(forecast.catalog.times, dtype=np.int64)
+        if start is not None:
+            times = times[times >= start]
+        if end is not None:
+            times = times[times <= end]
+        prefix = (
+            forecast.settings.zarr_path, forecast.catalog.fingerprint,
+            truth.settings.zarr_path, truth.catalog.fingerprint, variable, region.name, region.rows, region.cols,
+        )
+        rows: Dict[int, Tuple[np.ndarray, Dict[str, np.ndarray]]] = {}
+        with self._lock:
+            for t in times.tolist():
+                entry = self._cache.get(prefix + (t,))
+                if entry is not None:
+                    self._cache.move_to_end(prefix + (t,))
+                    rows[t] = entry
+            self.hits["hit"] += len(rows)
+            self.hits["miss"] += len(times) - len(rows)
+        missing = [t for t in times.tolist() if t not in rows]
+        if missing:
+            computed = metric_sums(forecast, truth, variable, missing, region)
+            with self._lock:
+                for i, t in enumerate(missing):
+                    entry = (computed.lead_hours, {name: values[i] for name, values in computed.sums.items()})
+                    rows[t] = entry
+                    self._cache[prefix + (t,)] = entry
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        lead_hours = np.asarray(forecast.catalog.leads, dtype=np.int64) / 3600
+        return MetricSums(
+            base_times=times,
+            lead_hours=lead_hours,
+            sums={
+                name: np.stack([rows[t][1][name] for t in times.tolist()]) if len(times)
+                else np.zeros((0, len(lead_hours)))
+                for name in SUMS
+            },
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+def verification_scores(
+        engine: MetricsEngine,
+        forecasts: Dict[str, DataLoader],
+        truth: DataLoader,
+        variables: List[str],
+        region: RegionWeights,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        per_base_time: bool = False,
+) -> dict:
+    """Scores of each forecast and variable per lead time over a base-time window.
+
+    Args:
+        engine: Metrics engine holding the cached sums
+        forecasts: Forecast loader per model
+        truth: Ground truth loader
+        variables: Variable names
+        region: Region cells and weights
+        start: First base time in epoch seconds (inclusive), or None
+        end: Last base time in epoch seconds (inclusive), or None
+        per_base_time: Also return the scores of every base time
+
+    Returns:
+        dict: Per model and variable, lead_hours, the number of base times and
+        each metric (lists per lead; nested per base time if requested)
+    """
+    def to_list(values: np.ndarray) -> list:
+        return np.where(np.isnan(values), None, values).tolist()
+
+    result = {}
+    for model, forecast in forecasts.items():
+        result[model] = {}
+        for variable in variables:
+            sums = engine.sums(forecast, truth, variable, region, start, end)
+            scores = {
+                "lead_hours": sums.lead_hours.tolist(),
+                "base_times": len(sums.base_times),
+                **{name: to_list(values) for name, values in sums.scores().items()},
+            }
+            if per_base_time:
+                scores["per_base_time"] = {
+                    "base_time": sums.base_times.tolist(),
+                    **{name: to_list(values) for name, values in sums.scores(per_base_time=True).items()},
+                }
+            result[model][variable] = scores
+    return result
+
+
+_engine: Optional[MetricsEngine] = None
+_engine_lock = threading.Lock()
+
+
+def metrics_engine() -> MetricsEngine:
+    """The process's metrics engine."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = MetricsEngine(settings.METRICS_CACHE_ENTRIES)
+        return _engine
@@ -0,0 +1,269 @@
+import json
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from app.core.d_loader import DataLoader
+from app.core.grids import shared_grids
+from app.core.index_maps import get_index_maps
+from app.core.scheduling import get_profile
+
+logger = logging.getLogger("weather_api")
+
+# Lead times (hours) of the point comparisons
+POINT_LEAD_HOURS = (6, 12, 18, 24, 30)
+
+
+def _grid_indexer(data: xr.DataArray, rows, cols, flip_y: bool) -> dict:
+    rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+    cols = np.atleast_1d(np.asarray(cols, dtype=np.int64))
+    if flip_y:
+        # Same points as indexing the field flipped upside down (values[::-1, :])
+        rows = data.sizes["y"] - 1 - rows
+    # Pointwise (vectorized) selection: one value per (row, col) pair
+    return {"y": xr.DataArray(rows, dims="point"), "x": xr.DataArray(cols, dims="point")}
+
+
+def forecast_points(
+        ds: xr.Dataset,
+        variable: str,
+        rows: Sequence[int],
+        cols: Sequence[int],
+        base_time: int,
+        lead_hours: Sequence[float] = POINT_LEAD_HOURS,
+        flip_y: bool = False,
+) -> Tuple[List[pd.Timestamp], np.ndarray]:
+    """Values of many grid points of a forecast at several lead times.
+
+    All points and leads are read with a single ``isel``, so only the chunks
+    holding the points are fetched and decoded, never the full fields.
+
+    Args:
+        ds: Forecast dataset with time, prediction_timedelta, y and x
+        variable: Variable name
+        rows: y index of each grid point
+        cols: x index of each grid point
+        base_time: Forecast base time in epoch seconds
+        lead_hours: Lead times in hours; leads missing from the store are skipped
+        flip_y: Whether the indices address the field flipped along y
+
+    Returns:
+        Tuple[List[pd.Timestamp], np.ndarray]: Forecast times of the leads found
+        and values of shape (leads, points)
+    """
+    index_maps = get_index_maps(ds)
+    base = pd.Timestamp(base_time, unit="s")
+    n_points = len(np.atleast_1d(rows))
+    try:
+        time_index = index_maps.time.lookup(base_time)
+    except KeyError as e:
+        logger.warning(f"Could not get forecast for base time {base}: {e}")
+        return [], np.empty((0, n_points))
+
+    lead_indices: List[int] = []
+    forecast_times = []
+    for hours in lead_hours:
+        try:
+            lead_indices.append(index_maps.lead.lookup_hours(hours))
+        except KeyError as e:
+            logger.warning(f"Could not get forecast for {base + pd.Timedelta(hours=hours)}: {e}")
+            continue
+        forecast_times.append(base + pd.Timedelta(hours=hours))
+
+    data = ds[variable]
+    points = data.isel(time=time_index, prediction_timedelta=lead_indices, **_grid_indexer(data, rows, cols, flip_y))
+    # Dask-backed point datasets compute with the point profile's scheduler, in this call only
+    (points,) = get_profile("point").compute(points)
+    return forecast_times, np.asarray(points.transpose("prediction_timedelta", "point").values, dtype=float)
+
+
+def observed_points(
+        ds: xr.Dataset,
+        variable: str,
+        rows: Sequence[int],
+        cols: Sequence[int],
+        valid_times: Sequence[int],
+) -> Tuple[List[pd.Timestamp], np.ndarray]:
+    """Values of many grid points of an analysis (ground truth) at several times.
+
+    Args:
+        ds: Dataset with time, y and x
+        variable: Variable name
+        rows: y index of each grid point
+        cols: x index of each grid point
+        valid_times: Valid times in epoch seconds; times missing from the store are skipped
+
+    Returns:
+        Tuple[List[pd.Timestamp], np.ndarray]: Times found and values of shape (times, points)
+    """
+    index_maps = get_index_maps(ds)
+    time_indices: List[int] = []
+    times = []
+    for valid_time in valid_times:
+        timestamp = pd.Timestamp(valid_time, unit="s")
+        try:
+            time_indices.append(index_maps.time.lookup(valid_time))
+        except KeyError as e:
+            logger.warning(f"Could not get ground truth for {timestamp}: {e}")
+            continue
+        times.append(timestamp)
+
+    data = ds[variable]
+    points = data.isel(time=time_indices, **_grid_indexer(data, rows, cols, flip_y=False))
+    (points,) = get_profile("point").compute(points)
+    return times, np.asarray(points.transpose("time", "point").values, dtype=float)
+
+
+def forecast_point_series(
+        ds: xr.Dataset,
+        variable: str,
+        yx: Tuple[int, int],
+        base_time: int,
+        lead_hours: Sequence[float] = POINT_LEAD_HOURS,
+        flip_y: bool = False,
+) -> pd.DataFrame:
+    """Values of one grid point of a forecast at several lead times.
+
+    Args:
+        ds: Forecast dataset with time, prediction_timedelta, y and x
+        variable: Variable name
+        yx: (y, x) index of the grid point
+        base_time: Forecast base time in epoch seconds
+        lead_hours: Lead times in hours; leads missing from the store are skipped
+        flip_y: Whether yx indexes the field flipped along y
+
+    Returns:
+        pd.DataFrame: Columns time, forecast_time and value, one row per lead
+    """
+    forecast_times, values = forecast_points(ds, variable, [yx[0]], [yx[1]], base_time, lead_hours, flip_y)
+    return pd.DataFrame({
+        "time": [pd.Timestamp(base_time, unit="s")] * len(forecast_times),
+        "forecast_time": forecast_times,
+        "value": values[:, 0],
+    })
+
+
+def observed_point_series(
+        ds: xr.Dataset,
+        variable: str,
+        yx: Tuple[int, int],
+        valid_times: Sequence[int],
+) -> pd.DataFrame:
+    """Values of one grid point of an analysis (ground truth) at several times.
+
+    Args:
+        ds: Dataset with time, y and x
+        variable: Variable name
+        yx: (y, x) index of the grid point
+        valid_times: Valid times in epoch seconds; times missing from the store are skipped
+
+    Returns:
+        pd.DataFrame: Columns time, forecast_time and value (both times are the valid time)
+    """
+    times, values = observed_points(ds, variable, [yx[0]], [yx[1]], valid_times)
+    return pd.DataFrame({"time": times, "forecast_time": times, "value": values[:, 0]})
+
+
+def point_series(
+        loader: DataLoader,
+        variable: str,
+        lat: float,
+        lon: float,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        level: Optional[float] = None,
+) -> dict:
+    """Long-format time series of one location: every base time in range × every lead.
+
+    Args:
+        loader: Loader of the model (or ground truth) store
+        variable: Variable name in the store's catalog
+        lat: Latitude in degrees
+        lon: Longitude in degrees
+        start: First base time in epoch seconds (inclusive), or None
+        end: Last base time in epoch seconds (inclusive), or None
+        level: Level value for variables with a level dimension
+
+    Returns:
+        dict: ``point`` metadata and ``columns`` base_time, lead_hours,
+        valid_time (epoch seconds) and value; ground truth rows have lead 0
+
+    Raises:
+        KeyError: If the variable or level is not in the store
+        ValueError: If the level is missing or not applicable, or the
+            variable is not on the shared grid
+    """
+    catalog = loader.catalog
+    catalog.require_variables([variable])
+    info = catalog.variables[variable]
+    grids = shared_grids()
+    if "y" not in info.dims or "x" not in info.dims or (
+            info.shape[info.dims.index("y")], info.shape[info.dims.index("x")]) != tuple(grids.shape):
+        raise ValueError(f"{variable} is not on the {tuple(grids.shape)} coordinate grid")
+
+    indexers = {}
+    if "level" in info.dims:
+        if level is None:
+            raise ValueError(f"{variable} needs a level, one of {catalog.levels.tolist()}")
+        matches = np.flatnonzero(np.isclose(catalog.levels, level))
+        if not len(matches):
+            raise KeyError(f"level {level} not in {catalog.levels.tolist()}")
+        indexers["level"] = int(matches[0])
+    elif level is not None:
+        raise ValueError(f"{variable} has no level dimension")
+
+    row, col = grids.nearest_index(lat, lon)
+    times, values = loader.read_point_series(variable, row, col, start, end, **indexers)
+    if "prediction_timedelta" in info.dims:
+        leads = catalog.leads
+    else:
+        leads = np.zeros(1, dtype=np.int64)
+        values = values[:, None]
+    base_times = np.repeat(times, len(leads))
+    lead_seconds = np.tile(leads, len(times))
+    values = values.ravel()
+    return {
+        "point": {
+            "latitude": lat,
+            "longitude": lon,
+            "grid_latitude": float(grids.latitude[row, col]),
+            "grid_longitude": float(grids.longitude[row, col]),
+            "row": row,
+            "col": col,
+            "level": level,
+        },
+        "columns": {
+            "base_time": base_times.tolist(),
+            "lead_hours": (lead_seconds / 3600).tolist(),
+            "valid_time": (base_times + lead_seconds).tolist(),
+            "value": [None if np.isnan(v) else float(v) for v in values],
+        },
+    }
+
+
+def columns_to_arrow(columns: Dict[str, list], metadata: dict) -> bytes:
+    """Serialize columns as an Arrow IPC stream (needs the optional pyarrow package).
+
+    Args:
+        columns: Equal-length columns
+        metadata: JSON-serializable metadata stored in the schema
+
+    Returns:
+        bytes: Arrow IPC stream
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError(f"Arrow output requires the 'pyarrow' package: {e}")
+
+    table = pa.table(columns).replace_schema_metadata({"metadata": json.dumps(metadata)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
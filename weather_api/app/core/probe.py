@@ -0,0 +1,168 @@
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.catalog import StoreCatalog
+from app.core.d_loader import DataLoader
+from app.core.grids import SharedGrids
+
+logger = logging.getLogger("weather_api")
+
+# (label, variable, level index or None)
+ProbeVariable = Tuple[str, str, Optional[int]]
+
+
+def pixel_to_plane(
+        px: float,
+        py: float,
+        width: float,
+        height: float,
+        extent: Sequence[float],
+) -> Tuple[float, float]:
+    """Map plane position of a pixel of a rendered map.
+
+    The maps are saved without axes or padding, so the image spans exactly
+    the visualizer's extent; pixel rows count down from the top.
+
+    Args:
+        px: Pixel column (fractional values allowed)
+        py: Pixel row
+        width: Image width in pixels
+        height: Image height in pixels
+        extent: [x_min, x_max, y_min, y_max] of the map in metres
+
+    Returns:
+        Tuple[float, float]: Lambert x and y in metres of the pixel's centre
+    """
+    x_min, x_max, y_min, y_max = extent
+    x = x_min + (px + 0.5) / width * (x_max - x_min)
+    y = y_max - (py + 0.5) / height * (y_max - y_min)
+    return x, y
+
+
+def probe_variables(catalog: StoreCatalog, shape: Tuple[int, ...], requested: Optional[List[str]]) -> List[ProbeVariable]:
+    """Variables of a store to probe.
+
+    Args:
+        catalog: Catalog of the store
+        shape: Shape of the coordinate grid
+        requested: ``name`` or ``name@level`` items, or None for every
+            variable on the grid without a level dimension
+
+    Returns:
+        List[ProbeVariable]: Variables found in the store; others are skipped
+    """
+    def on_grid(info) -> bool:
+        return info.dims[-2:] == ("y", "x") and tuple(info.shape[-2:]) == tuple(shape)
+
+    if requested is None:
+        return [
+            (name, name, None) for name, info in catalog.variables.items()
+            if on_grid(info) and "level" not in info.dims
+        ]
+    variables = []
+    for item in requested:
+        name, _, level = item.partition("@")
+        info = catalog.variables.get(name)
+        if info is None or not on_grid(info):
+            continue
+        if "level" in info.dims:
+            if not level or catalog.levels is None:
+                continue
+            matches = np.flatnonzero(np.isclose(catalog.levels, float(level)))
+            if len(matches):
+                variables.append((item, name, int(matches[0])))
+        elif not level:
+            variables.append((item, name, None))
+    return variables
+
+
+def probe_source(
+        loader: DataLoader,
+        grids: SharedGrids,
+        row: int,
+        col: int,
+        base_time: int,
+        valid_time: int,
+        requested: Optional[List[str]] = None,
+) -> Dict[str, Optional[float]]:
+    """Values of one grid point in a model's frame (or the ground truth field).
+
+    Fields are read whole through the shared hot field store, so after the
+    first probe of a frame every worker answers from shared memory.
+
+    Args:
+        loader: Loader of the source
+        grids: Shared coordinate grids the indices refer to
+        row: Grid row
+        col: Grid column
+        base_time: Forecast base time in epoch seconds
+        valid_time: Valid time in epoch seconds
+        requested: Variables to probe, see ``probe_variables``
+
+    Returns:
+        Dict[str, Optional[float]]: Value per variable label (None if unavailable)
+    """
+    catalog = loader.catalog
+    if len(catalog.leads):
+        indexer = catalog.index_maps.frame_indexer(base_time, valid_time)
+    else:
+        indexer = catalog.index_maps.valid_time_indexer(valid_time)
+    values = {}
+    for label, variable, level in probe_variables(catalog, grids.shape, requested):
+        field_indexer = dict(indexer) if level is None else {**indexer, "level": level}
+        field = loader.read_indexed(variable, field_indexer, shared=True)
+        field_row = field.shape[0] - 1 - row if loader.settings.flip_y else row
+        value = float(field[field_row, col])
+        values[label] = None if np.isnan(value) else value
+    return values
+
+
+def probe_pixel(
+        sources: Dict[str, DataLoader],
+        grids: SharedGrids,
+        extent: Sequence[float],
+        px: float,
+        py: float,
+        width: float,
+        height: float,
+        base_time: int,
+        valid_time: int,
+        requested: Optional[List[str]] = None,
+) -> dict:
+    """Values of every source at a pixel of a rendered map.
+
+    Args:
+        sources: Loader per source name
+        grids: Shared coordinate grids
+        extent: Map extent in metres, see ``pixel_to_plane``
+        px: Pixel column
+        py: Pixel row
+        width: Image width in pixels
+        height: Image height in pixels
+        base_time: Forecast base time in epoch seconds
+        valid_time: Valid time in epoch seconds
+        requested: Variables to probe, see ``probe_variables``
+
+    Returns:
+        dict: Grid point, its coordinates and the values per source; sources
+        that cannot be read have no values
+    """
+    start = time.perf_counter()
+    x, y = pixel_to_plane(px, py, width, height, extent)
+    rows, cols, inside = grids.plane_indices(x, y)
+    row, col = int(rows), int(cols)
+    result = {"inside": bool(inside), "row": row, "col": col, "values": {}}
+    if inside:
+        result["latitude"] = float(grids.latitude[row, col])
+        result["longitude"] = float(grids.longitude[row, col])
+        for name, loader in sources.items():
+            try:
+                result["values"][name] = probe_source(loader, grids, row, col, base_time, valid_time, requested)
+            except Exception as e:
+                # Hovering fires many probes; keep a missing frame out of the warnings
+                logger.debug(f"Could not probe {name}: {e}")
+    result["server_ms"] = (time.perf_counter() - start) * 1e3
+    return result
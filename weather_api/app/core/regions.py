@@ -0,0 +1,228 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+from app.config import settings
+from app.core.grids import SharedGrids, unit_vectors
+
+logger = logging.getLogger("weather_api")
+
+# Radius of the sphere the CERRA grid is defined on (km)
+EARTH_RADIUS_KM = 6371.229
+# Reductions over a region's cells
+STATISTICS = ("mean", "max", "min")
+
+
+def cell_areas(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Approximate area of each cell of a curvilinear grid (km^2).
+
+    The area is the cross product of the grid's unit vector steps along the
+    rows and columns, which is exact to first order on any smooth grid.
+
+    Args:
+        latitude: 2D latitude of the cell centres in degrees
+        longitude: 2D longitude of the cell centres in degrees
+
+    Returns:
+        np.ndarray: Cell areas, shaped like the grids
+    """
+    points = unit_vectors(latitude, longitude)
+    if min(points.shape[:2]) < 2:
+        # No steps to measure; weight the cells equally
+        return np.ones(points.shape[:2])
+    row_step, col_step = np.gradient(points, axis=0), np.gradient(points, axis=1)
+    return np.linalg.norm(np.cross(row_step, col_step), axis=-1) * EARTH_RADIUS_KM ** 2
+
+
+@dataclass(frozen=True)
+class RegionWeights:
+    """Cells of a region on the grids as sparse index/weight arrays.
+
+    The region is read as one rectangular window of the grids; ``indices``
+    are flat indices of the member cells within that window and ``weights``
+    their area weights, normalized to sum to one.
+    """
+
+    name: str
+    rows: Tuple[int, int]
+    cols: Tuple[int, int]
+    indices: np.ndarray
+    weights: np.ndarray
+    area_km2: float
+
+    @property
+    def cells(self) -> int:
+        return len(self.indices)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Rows and columns of the region's window."""
+        return self.rows[1] - self.rows[0], self.cols[1] - self.cols[0]
+
+    def dense_weights(self) -> np.ndarray:
+        """Weights over the whole window, zero outside the region."""
+        dense = np.zeros(self.shape)
+        dense.flat[self.indices] = self.weights
+        return dense
+
+    def window_indexer(self, n_rows: int, flip_y: bool = False) -> Dict[str, slice]:
+        """Indexer of the region's window in a field.
+
+        Args:
+            n_rows: Rows of the field
+            flip_y: Whether the field is stored upside down relative to the grids
+                (read the window, then reverse its rows)
+
+        Returns:
+            Dict[str, slice]: y and x slices
+        """
+        start, stop = self.rows
+        if flip_y:
+            start, stop = n_rows - stop, n_rows - start
+        return {"y": slice(start, stop), "x": slice(*self.cols)}
+
+    def reduce(self, values: np.ndarray, statistic: str = "mean", flip_y: bool = False) -> np.ndarray:
+        """Reduce windows of the region to one value per leading index.
+
+        Args:
+            values: Window values of shape (..., rows, cols)
+            statistic: ``mean`` (area weighted), ``max`` or ``min``
+            flip_y: Whether the window rows are stored upside down
+
+        Returns:
+            np.ndarray: Values of shape values.shape[:-2]; NaN cells are skipped
+            and regions without valid cells give NaN
+        """
+        if statistic not in STATISTICS:
+            raise ValueError(f"Unknown statistic {statistic}, use one of {STATISTICS}")
+        if flip_y:
+            values = values[..., ::-1, :]
+        leading = values.shape[:-2]
+        cells = np.asarray(values, dtype=np.float64).reshape(leading + (-1,))[..., self.indices]
+        valid = ~np.isnan(cells)
+        if statistic == "mean":
+            # Weights of NaN cells are dropped and the rest renormalized
+            weights = np.where(valid, self.weights, 0.0)
+            total = weights.sum(axis=-1)
+            weighted = np.einsum("...i,...i->...", np.where(valid, cells, 0.0), weights)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return weighted / np.where(total > 0, total, np.nan)
+        fill = -np.inf if statistic == "max" else np.inf
+        if not self.cells:
+            return np.full(leading, np.nan)
+        reduced = getattr(np.where(valid, cells, fill), statistic)(axis=-1)
+        return np.where(np.isinf(reduced), np.nan, reduced)
+
+
+def region_weights(name: str, grids: SharedGrids, geometry: BaseGeometry) -> RegionWeights:
+    """Cells of the grids whose centres lie in a polygon, with their area weights.
+
+    Args:
+        name: Name of the region
+        grids: Shared coordinate grids
+        geometry: Region in longitude/latitude degrees
+
+    Returns:
+        RegionWeights: Sparse membership and weights (no cells if the region
+        misses the grids)
+    """
+    min_lon, min_lat, max_lon, max_lat = geometry.bounds
+    latitude, longitude = grids.latitude, grids.longitude
+    # Cells in the region's bounding box bound the window; only those are tested
+    candidate_rows, candidate_cols = np.nonzero(
+        (latitude >= min_lat) & (latitude <= max_lat) & (longitude >= min_lon) & (longitude <= max_lon)
+    )
+    if not len(candidate_rows):
+        return RegionWeights(name, (0, 0), (0, 0), np.empty(0, np.int64), np.empty(0), 0.0)
+    rows = (int(candidate_rows.min()), int(candidate_rows.max()) + 1)
+    cols = (int(candidate_cols.min()), int(candidate_cols.max()) + 1)
+    window_lat = np.asarray(latitude[rows[0]:rows[1], cols[0]:cols[1]], dtype=np.float64)
+    window_lon = np.asarray(longitude[rows[0]:rows[1], cols[0]:cols[1]], dtype=np.float64)
+    shapely.prepare(geometry)
+    inside = shapely.contains_xy(geometry, window_lon, window_lat).ravel()
+    indices = np.flatnonzero(inside)
+    # Measure the areas with one cell of margin so window edges get central differences too
+    top, left = max(rows[0] - 1, 0), max(cols[0] - 1, 0)
+    margin = (slice(top, rows[1] + 1), slice(left, cols[1] + 1))
+    areas = cell_areas(np.asarray(latitude[margin], dtype=np.float64), np.asarray(longitude[margin], dtype=np.float64))
+    areas = areas[rows[0] - top:rows[1] - top, cols[0] - left:cols[1] - left].ravel()[indices]
+    area = float(areas.sum())
+    weights = areas / area if area > 0 else np.full(len(indices), 1.0 / max(len(indices), 1))
+    return RegionWeights(name, rows, cols, indices, weights, area)
+
+
+# Domain and country weights stay cached; weights of client-chosen boxes are
+# an LRU of at most Settings.REGION_CACHE_BOXES entries
+_regions: Dict[tuple, RegionWeights] = {}
+_boxes: "OrderedDict[tuple, RegionWeights]" = OrderedDict()
+_regions_lock = threading.Lock()
+
+
+def domain_weights(grids: SharedGrids) -> RegionWeights:
+    """Every cell of the grids with its area weight (cached per grids export)."""
+    def build() -> RegionWeights:
+        n_rows, n_cols = grids.shape
+        areas = cell_areas(np.asarray(grids.latitude, dtype=np.float64), np.asarray(grids.longitude, dtype=np.float64))
+        area = float(areas.sum())
+        return RegionWeights("domain", (0, n_rows), (0, n_cols), np.arange(n_rows * n_cols), areas.ravel() / area, area)
+
+    return _cached("domain", grids, build)
+
+
+def cached_region_weights(
+        key: str,
+        grids: SharedGrids,
+        geometry: Optional[BaseGeometry] = None,
+        bounded: bool = False,
+) -> RegionWeights:
+    """Region weights, computed once per region and grids export.
+
+    Args:
+        key: Name identifying the region (e.g. an ISO code or a box)
+        grids: Shared coordinate grids
+        geometry: Region polygon; needed on the first call for a key
+        bounded: Keep the weights in the bounded LRU of boxes instead of
+            permanently (for regions clients can choose freely)
+
+    Returns:
+        RegionWeights: The cached weights
+
+    Raises:
+        KeyError: If the region is not cached and no geometry is given
+    """
+    def build() -> RegionWeights:
+        if geometry is None:
+            raise KeyError(f"Region {key} has no weights yet")
+        return region_weights(key, grids, geometry)
+
+    return _cached(key, grids, build, bounded)
+
+
+def _cached(key: str, grids: SharedGrids, build: Callable[[], RegionWeights], bounded: bool = False) -> RegionWeights:
+    cache_key = (key, grids.directory, grids.manifest.get("source"), grids.manifest.get("fingerprint"))
+    cache = _boxes if bounded else _regions
+    with _regions_lock:
+        region = cache.get(cache_key)
+        if region is not None and bounded:
+            _boxes.move_to_end(cache_key)
+    if region is None:
+        region = build()
+        logger.info(f"Region {key}: {region.cells} cells, {region.area_km2:.0f} km^2")
+        with _regions_lock:
+            cache[cache_key] = region
+            while len(_boxes) > settings.REGION_CACHE_BOXES:
+                _boxes.popitem(last=False)
+    return region
+
+
+def reset_regions() -> None:
+    """Forget the cached region weights."""
+    with _regions_lock:
+        _regions.clear()
+        _boxes.clear()
@@ -0,0 +1,141 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Union
+
+import dask
+
+from app.config import settings
+
+logger = logging.getLogger("weather_api")
+
+SCHEDULERS = ("threads", "synchronous", "processes", "distributed")
+DEFAULT_WORKLOAD = "default"
+
+Chunks = Union[str, Dict[str, int], None]
+
+
+@dataclass(frozen=True)
+class WorkloadProfile:
+    """How data of one kind of request is chunked and computed.
+
+    ``chunks`` is passed to ``xr.open_zarr``: ``{}`` keeps the store's own
+    chunks, ``"auto"`` lets dask merge them and ``None`` opens the arrays
+    without dask at all (lazy indexing only, best for point reads).
+    """
+
+    name: str
+    chunks: Chunks = None
+    scheduler: str = "threads"
+    num_workers: Optional[int] = None
+    threads_per_worker: Optional[int] = None
+    memory_limit: Optional[str] = None
+
+    @property
+    def chunks_key(self) -> str:
+        """Hashable form of ``chunks``, for caching opened datasets."""
+        if isinstance(self.chunks, dict):
+            return repr(sorted(self.chunks.items()))
+        return repr(self.chunks)
+
+    def compute_options(self) -> Dict[str, Any]:
+        """Keyword arguments that make ``dask.compute`` use this profile's scheduler."""
+        if self.scheduler == "distributed":
+            return {"scheduler": get_client(self).get}
+        options: Dict[str, Any] = {"scheduler": self.scheduler}
+        if self.num_workers and self.scheduler != "synchronous":
+            options["num_workers"] = self.num_workers
+        return options
+
+    def compute(self, *collections: Any) -> Tuple[Any, ...]:
+        """Compute dask collections (or xarray objects) with this profile's scheduler.
+
+        The scheduler is passed to this call only rather than set in the
+        global dask config, so concurrent requests with different profiles
+        don't change each other's scheduler.
+
+        Args:
+            *collections: Objects to compute together
+
+        Returns:
+            Tuple[Any, ...]: The computed objects, in order
+        """
+        return dask.compute(*collections, **self.compute_options())
+
+
+def get_profile(workload: Optional[str] = None) -> WorkloadProfile:
+    """Look up a workload's profile in Settings.DASK_PROFILES.
+
+    Unknown workloads use the "default" profile.
+
+    Args:
+        workload: Workload name (e.g. "point", "field")
+
+    Returns:
+        WorkloadProfile: The workload's profile
+
+    Raises:
+        ValueError: If the profile names an unknown scheduler
+    """
+    profiles = settings.DASK_PROFILES
+    name = workload if workload in profiles else DEFAULT_WORKLOAD
+    options = dict(profiles.get(name, {}))
+    profile = WorkloadProfile(name=name, **options)
+    if profile.scheduler not in SCHEDULERS:
+        raise ValueError(
+            f"Unknown dask scheduler {profile.scheduler!r} in profile {name!r}, "
+            f"expected one of {SCHEDULERS}"
+        )
+    return profile
+
+
+# Local distributed clients, keyed by (workers, threads per worker, memory limit)
+_clients: Dict[Tuple[Any, ...], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(profile: WorkloadProfile):
+    """Get (or start) the local distributed client of a profile.
+
+    Args:
+        profile: Profile with scheduler "distributed"
+
+    Returns:
+        distributed.Client: Client of an in-process local cluster
+
+    Raises:
+        RuntimeError: If the distributed package is not installed
+    """
+    try:
+        from distributed import Client, LocalCluster
+    except ImportError as e:
+        raise RuntimeError(
+            f"Profile {profile.name!r} uses the distributed scheduler, "
+            f"which requires the 'distributed' package: {e}"
+        )
+
+    key = (profile.num_workers, profile.threads_per_worker, profile.memory_limit)
+    with _clients_lock:
+        if key not in _clients:
+            logger.info(f"Starting local dask cluster for profile {profile.name!r}")
+            cluster = LocalCluster(
+                n_workers=profile.num_workers,
+                threads_per_worker=profile.threads_per_worker,
+                memory_limit=profile.memory_limit or "auto",
+                processes=True,
+                dashboard_address=None,
+            )
+            _clients[key] = Client(cluster, set_as_default=False)
+        return _clients[key]
+
+
+def close_clients() -> None:
+    """Shut down every local cluster started by get_client."""
+    with _clients_lock:
+        for client in _clients.values():
+            cluster = client.cluster
+            client.close()
+            if cluster is not None:
+                cluster.close()
+        _clients.clear()
+
@@ -0,0 +1,334 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.core.d_loader import DataLoader
+from app.core.metrics import METRICS, SUMS, MetricSums, metric_sums, scores_from_sums
+from app.core.regions import RegionWeights
+
+logger = logging.getLogger("weather_api")
+
+MANIFEST_FILE = "_manifest.json"
+PARTITION_FILE = "part-0.parquet"
+# Held by one update at a time across processes; dot files are not read as data
+LOCK_FILE = ".update.lock"
+# Hive partitioning of the archive; month is the base time's UTC month
+PARTITION_COLUMNS = ("model", "variable", "region", "month")
+
+
+def _pyarrow():
+    """Import pyarrow and its dataset/parquet modules (optional dependency).
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError(f"The skill archive requires the 'pyarrow' package: {e}")
+    return pyarrow
+
+
+def month_of(base_time: int) -> str:
+    return pd.Timestamp(int(base_time), unit="s").strftime("%Y-%m")
+
+
+def partition_key(model: str, variable: str, region: str, month: str) -> str:
+    """Relative directory of a partition, e.g. ``model=cerrora/variable=t2m/region=domain/month=2021-01``."""
+    return "/".join(f"{name}={value}" for name, value in zip(PARTITION_COLUMNS, (model, variable, region, month)))
+
+
+def truth_counts(truth_times: np.ndarray, base_times: np.ndarray, leads: np.ndarray) -> np.ndarray:
+    """Number of leads of each base time whose valid time has ground truth."""
+    valid_times = np.asarray(base_times, dtype=np.int64)[:, None] + np.asarray(leads, dtype=np.int64)[None, :]
+    return np.isin(valid_times, np.asarray(truth_times, dtype=np.int64)).sum(axis=1)
+
+
+def plan_updates(
+        recorded: Dict[str, Dict[str, int]],
+        model: str,
+        variable: str,
+        region: str,
+        forecast_times: np.ndarray,
+        truth_times: np.ndarray,
+        leads: np.ndarray,
+) -> Dict[str, List[int]]:
+    """Base times to compute, per partition.
+
+    A base time is computed when the archive does not have it yet, or when
+    the ground truth now covers more of its leads than when it was computed.
+
+    Args:
+        recorded: Per partition key, the ground truth lead count of every
+            archived base time (the manifest's ``partitions``)
+        model: Model name
+        variable: Variable name
+        region: Region key
+        forecast_times: Base times in the forecast store (epoch seconds)
+        truth_times: Times in the ground truth store (epoch seconds)
+        leads: Lead times of the forecast store (seconds)
+
+    Returns:
+        Dict[str, List[int]]: Base times per partition key; partitions that are
+        up to date are absent
+    """
+    forecast_times = np.asarray(forecast_times, dtype=np.int64)
+    counts = truth_counts(truth_times, forecast_times, leads)
+    plan: Dict[str, List[int]] = {}
+    for base_time, count in zip(forecast_times.tolist(), counts.tolist()):
+        if not count:
+            continue  # nothing to verify yet
+        key = partition_key(model, variable, region, month_of(base_time))
+        archived = recorded.get(key, {}).get(str(base_time))
+        if archived is None or count > archived:
+            plan.setdefault(key, []).append(base_time)
+    return plan
+
+
+def skill_rows(sums: MetricSums) -> pd.DataFrame:
+    """Long-format archive rows of error sums: one per (base time, lead) with ground truth.
+
+    Returns:
+        pd.DataFrame: base_time, lead_hours, valid_time, the metrics and the sums
+    """
+    n_base, n_leads = sums.sums["weight"].shape
+    base_times = np.repeat(np.asarray(sums.base_times, dtype=np.int64), n_leads)
+    lead_hours = np.tile(np.asarray(sums.lead_hours, dtype=np.float64), n_base)
+    rows = {
+        "base_time": base_times,
+        "lead_hours": lead_hours,
+        "valid_time": base_times + np.round(lead_hours * 3600).astype(np.int64),
+        **{name: values.ravel() for name, values in sums.scores(per_base_time=True).items()},
+        **{name: sums.sums[name].ravel() for name in SUMS},
+    }
+    frame = pd.DataFrame(rows)
+    return frame[frame["weight"] > 0].reset_index(drop=True)
+
+
+class SkillArchive:
+    """Per (model, variable, lead, base time, region) scores in a partitioned Parquet dataset.
+
+    Every row also stores the error sums its scores come from, so
+    leaderboards over any window pool the sums instead of averaging scores.
+    ``_manifest.json`` records, per partition, how much ground truth each
+    archived base time was verified against; ``update`` only computes what
+    is new. Updates hold an exclusive ``flock`` on the archive directory, so
+    concurrent runs (the tool and a server, or several workers) never
+    interleave their manifest and partition writes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the archive's lock in this process and across processes."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, LOCK_FILE), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {"partitions": {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        with open(self.manifest_path + suffix, "w") as f:
+            json.dump(manifest, f)
+        os.replace(self.manifest_path + suffix, self.manifest_path)
+
+    def update(
+            self,
+            model: str,
+            forecast: DataLoader,
+            truth: DataLoader,
+            variable: str,
+            region: RegionWeights,
+    ) -> Dict[str, int]:
+        """Compute and write the partitions with new base times or new ground truth.
+
+        Each partition is written (and the manifest saved) as soon as it is
+        computed, so an interrupted update resumes where it stopped.
+
+        Args:
+            model: Model name of the archive rows
+            forecast: Forecast loader
+            truth: Ground truth loader
+            variable: Variable name
+            region: Region cells and weights; its name is the region key
+
+        Returns:
+            Dict[str, int]: Base times computed per partition key
+
+        Raises:
+            RuntimeError: If pyarrow is not installed
+        """
+        _pyarrow()
+        with self._locked():
+            manifest = self.manifest()
+            plan = plan_updates(
+                manifest["partitions"], model, variable, region.name,
+                forecast.catalog.times, truth.catalog.times, forecast.catalog.leads,
+            )
+            counts = dict(zip(
+                forecast.catalog.times.tolist(),
+                truth_counts(truth.catalog.times, forecast.catalog.times, forecast.catalog.leads).tolist(),
+            ))
+            for key, base_times in sorted(plan.items()):
+                rows = skill_rows(metric_sums(forecast, truth, variable, base_times, region))
+                self._write_partition(key, rows, base_times)
+                recorded = manifest["partitions"].setdefault(key, {})
+                recorded.update({str(t): counts[t] for t in base_times})
+                self._save_manifest(manifest)
+                logger.info(f"Skill archive: {len(base_times)} base times of {key}")
+            return {key: len(base_times) for key, base_times in plan.items()}
+
+    def _write_partition(self, key: str, rows: pd.DataFrame, replaced: Sequence[int]) -> None:
+        pa = _pyarrow()
+        directory = os.path.join(self.directory, key)
+        path = os.path.join(directory, PARTITION_FILE)
+        if os.path.exists(path):
+            archived = pa.parquet.read_table(path).to_pandas()
+            rows = pd.concat([archived[~archived["base_time"].isin(list(replaced))], rows], ignore_index=True)
+        rows = rows.sort_values(["base_time", "lead_hours"]).reset_index(drop=True)
+        os.makedirs(directory, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        pa.parquet.write_table(pa.Table.from_pandas(rows, preserve_index=False), path + suffix)
+        os.replace(path + suffix, path)
+
+    def query(
+            self,
+            models: Optional[Iterable[str]] = None,
+            variables: Optional[Iterable[str]] = None,
+            regions: Optional[Iterable[str]] = None,
+            start: Optional[int] = None,
+            end: Optional[int] = None,
+            lead_hours: Optional[Iterable[float]] = None,
+    ) -> pd.DataFrame:
+        """Archive rows matching the filters.
+
+        Filters on the partition columns prune whole directories (base times
+        through ``month``); the others are pushed down to the Parquet row
+        group statistics.
+
+        Args:
+            models: Models to keep (None: all)
+            variables: Variables to keep
+            regions: Region keys to keep
+            start: First base time in epoch seconds (inclusive)
+            end: Last base time in epoch seconds (inclusive)
+            lead_hours: Lead times to keep
+
+        Returns:
+            pd.DataFrame: Matching rows with the partition columns
+
+        Raises:
+            RuntimeError: If pyarrow is not installed
+        """
+        pa = _pyarrow()
+        columns = [*PARTITION_COLUMNS[:-1], "base_time", "lead_hours", "valid_time", *METRICS, *SUMS]
+        if not os.path.isdir(self.directory):
+            return pd.DataFrame(columns=columns)
+        field = pa.dataset.field
+        predicates = []
+        for name, values in (("model", models), ("variable", variables), ("region", regions)):
+            if values is not None:
+                predicates.append(field(name).isin(list(values)))
+        if start is not None:
+            predicates += [field("month") >= month_of(start), field("base_time") >= int(start)]
+        if end is not None:
+            predicates += [field("month") <= month_of(end), field("base_time") <= int(end)]
+        if lead_hours is not None:
+            predicates.append(field("lead_hours").isin([float(h) for h in lead_hours]))
+        expression = None
+        for predicate in predicates:
+            expression = predicate if expression is None else expression & predicate
+        dataset = pa.dataset.dataset(
+            self.directory, format="parquet",
+            partitioning=pa.dataset.partitioning(
+                pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor="hive",
+            ),
+        )
+        return dataset.to_table(filter=expression, columns=columns).to_pandas()
+
+
+def _pooled_scores(frame: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    pooled = frame.groupby(by, sort=True)[list(SUMS)].sum()
+    scores = scores_from_sums({name: pooled[name].to_numpy() for name in SUMS})
+    return pooled.assign(**scores, count=frame.groupby(by, sort=True).size()).reset_index()
+
+
+def _column(values) -> list:
+    return [None if pd.isna(v) else float(v) for v in values]
+
+
+def leaderboard(frame: pd.DataFrame) -> dict:
+    """Scores of every model per lead time, pooled over the rows, and the models ranked by RMSE.
+
+    Args:
+        frame: Rows from ``SkillArchive.query``
+
+    Returns:
+        dict: ``lead_hours``, per model each metric per lead, and ``ranking``
+        (models by RMSE pooled over all leads)
+    """
+    lead_hours = sorted(frame["lead_hours"].unique().tolist())
+    per_lead = _pooled_scores(frame, ["model", "lead_hours"])
+    overall = _pooled_scores(frame, ["model"]).sort_values("rmse")
+    models = {}
+    for model, scores in per_lead.groupby("model", sort=True):
+        scores = scores.set_index("lead_hours").reindex(lead_hours)
+        models[model] = {
+            **{name: _column(scores[name]) for name in METRICS},
+            "base_times": int(frame.loc[frame["model"] == model, "base_time"].nunique()),
+        }
+    return {"lead_hours": lead_hours, "models": models, "ranking": overall["model"].tolist()}
+
+
+def skill_timeseries(frame: pd.DataFrame) -> dict:
+    """Scores of every model per base time, pooled over the leads in the rows.
+
+    Args:
+        frame: Rows from ``SkillArchive.query``
+
+    Returns:
+        dict: Per model, columns base_time and each metric
+    """
+    series = _pooled_scores(frame, ["model", "base_time"])
+    return {
+        model: {"base_time": rows["base_time"].astype(int).tolist(), **{name: _column(rows[name]) for name in METRICS}}
+        for model, rows in series.groupby("model", sort=True)
+    }
+
+
+_archive: Optional[SkillArchive] = None
+
+
+def skill_archive() -> SkillArchive:
+    """The archive at SKILL_ARCHIVE_DIR."""
+    global _archive
+    if _archive is None or _archive.directory != settings.SKILL_ARCHIVE_DIR:
+        _archive = SkillArchive(settings.SKILL_ARCHIVE_DIR)
+    return _archive
@@ -0,0 +1,135 @@
+import copy
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Tuple
+
+import fsspec
+import xarray as xr
+from fsspec.utils import get_protocol
+from zarr.storage import FsspecStore, LocalStore
+
+from app.config import settings
+
+logger = logging.getLogger("weather_api")
+
+LOCAL_PROTOCOLS = ("file", "local")
+
+# Name of the block size argument of each filesystem implementation
+_BLOCK_SIZE_OPTION = {
+    "s3": "default_block_size",
+    "gs": "block_size",
+    "gcs": "block_size",
+    "http": "block_size",
+    "https": "block_size",
+}
+
+# Protocols that share their settings entries
+_PROTOCOL_ALIASES = {"s3a": "s3", "gcs": "gs", "https": "http"}
+
+
+@dataclass
+class BackendConfig:
+    """Per-backend tuning for a remote zarr store."""
+
+    protocol: str
+    storage_options: Dict[str, Any] = field(default_factory=dict)
+    concurrency: int = 32
+
+
+def is_remote_path(path: str) -> bool:
+    """Check if a store path is an fsspec URL of a non-local filesystem.
+
+    Args:
+        path: Store path or URL
+
+    Returns:
+        bool: True for gs://, s3://, http(s):// and other remote URLs
+    """
+    return get_protocol(path) not in LOCAL_PROTOCOLS
+
+
+def backend_config(protocol: str) -> BackendConfig:
+    """Collect fsspec options and concurrency for a protocol from Settings.
+
+    Args:
+        protocol: fsspec protocol of the store URL (e.g. "gs", "s3")
+
+    Returns:
+        BackendConfig: Options to open the filesystem with
+    """
+    key = _PROTOCOL_ALIASES.get(protocol, protocol)
+    options = copy.deepcopy(settings.STORAGE_OPTIONS.get(key, {}))
+    concurrency = settings.STORAGE_CONCURRENCY.get(key, settings.FETCH_CONCURRENCY)
+
+    block_size = settings.STORAGE_BLOCK_SIZES.get(key)
+    if block_size and protocol in _BLOCK_SIZE_OPTION:
+        options.setdefault(_BLOCK_SIZE_OPTION[protocol], block_size)
+
+    if key == "s3":
+        client_kwargs = options.setdefault("client_kwargs", {})
+        if settings.S3_ENDPOINT_URL:
+            client_kwargs.setdefault("endpoint_url", settings.S3_ENDPOINT_URL)
+        if settings.S3_REGION:
+            client_kwargs.setdefault("region_name", settings.S3_REGION)
+        # One connection per in-flight request, reused across requests
+        options.setdefault("config_kwargs", {}).setdefault("max_pool_connections", concurrency)
+        if settings.S3_ANON:
+            options.setdefault("anon", True)
+
+    return BackendConfig(protocol=protocol, storage_options=options, concurrency=concurrency)
+
+
+def open_remote_mapper(url: str) -> Tuple[fsspec.AbstractFileSystem, fsspec.FSMap, BackendConfig]:
+    """Open the filesystem of a remote store URL with its backend options.
+
+    fsspec caches filesystem instances per options, so every store on the
+    same backend shares one client and its connection pool.
+
+    Args:
+        url: fsspec URL of the zarr store
+
+    Returns:
+        Tuple of (filesystem, mapper for the store root, backend config)
+    """
+    config = backend_config(get_protocol(url))
+    fs, root = fsspec.core.url_to_fs(url, **config.storage_options)
+    return fs, fs.get_mapper(root), config
+
+
+def open_store(path: str, read_only: bool = True):
+    """Open a plain zarr store for a local path or any fsspec URL.
+
+    Unlike DataLoader's stores there is no caching or hedging; this is meant
+    for tools that read or write whole stores.
+
+    Args:
+        path: Local path or fsspec URL
+        read_only: Open the store read-only
+
+    Returns:
+        The zarr store
+    """
+    if not is_remote_path(path):
+        return LocalStore(path, read_only=read_only)
+    _, mapper, _ = open_remote_mapper(path)
+    return FsspecStore.from_mapper(mapper, read_only=read_only)
+
+
+def open_zarr_dataset(store, **kwargs) -> xr.Dataset:
+    """Open a zarr store, preferring its consolidated metadata.
+
+    Reading consolidated metadata costs one request; without it every array
+    and group document is fetched separately, so the fallback is logged.
+
+    Args:
+        store: zarr store or mapper
+        **kwargs: Passed on to xr.open_zarr
+
+    Returns:
+        xr.Dataset: Opened dataset
+    """
+    try:
+        return xr.open_zarr(store, consolidated=True, **kwargs)
+    except (KeyError, FileNotFoundError, ValueError) as e:
+        logger.warning(f"No consolidated metadata in {store}, reading per-array metadata: {e}")
+        return xr.open_zarr(store, consolidated=False, **kwargs)
@@ -0,0 +1,201 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numcodecs
+from zarr.codecs import BloscCodec, ZstdCodec
+
+V2_ARRAY_KEY = ".zarray"
+V2_ATTRS_KEY = ".zattrs"
+V2_CONSOLIDATED_KEY = ".zmetadata"
+V3_METADATA_KEY = "zarr.json"
+METADATA_KEYS = (V2_ARRAY_KEY, V2_ATTRS_KEY, V2_CONSOLIDATED_KEY, ".zgroup", V3_METADATA_KEY)
+# Root attribute of a copy written by app.tools.rechunk: per variable, the time
+# entries that hold copied data (the arrays may already be extended past it)
+COMMITTED_TIME_ATTR = "committed_time"
+
+# Compressor names understood by compressors_for
+COMPRESSORS = ("blosc-lz4", "zstd-1", "zstd-3", "zstd-9", "none")
+
+
+@dataclass
+class ChunkLayout:
+    """Chunk grid of a single zarr array and how its chunk keys are spelled."""
+
+    path: str
+    shape: Tuple[int, ...]
+    chunks: Tuple[int, ...]
+    dims: Optional[List[str]]
+    separator: str = "."
+    key_prefix: str = ""
+
+    @property
+    def grid(self) -> Tuple[int, ...]:
+        """Number of chunks along each axis."""
+        return tuple(-(-s // c) if c else 0 for s, c in zip(self.shape, self.chunks))
+
+    def axis(self, dim: str) -> Optional[int]:
+        if not self.dims or dim not in self.dims:
+            return None
+        return self.dims.index(dim)
+
+    def chunk_key(self, coords: Tuple[int, ...]) -> str:
+        """Build the store key of the chunk at the given grid coordinates."""
+        name = self.separator.join(str(c) for c in coords) if coords else "0"
+        prefix = f"{self.path}/" if self.path else ""
+        return f"{prefix}{self.key_prefix}{name}"
+
+    def parse_key(self, key: str) -> Optional[Tuple[int, ...]]:
+        """Return the grid coordinates of a chunk key, or None if it is not one."""
+        prefix = f"{self.path}/{self.key_prefix}" if self.path else self.key_prefix
+        if not key.startswith(prefix):
+            return None
+        parts = key[len(prefix):].split(self.separator)
+        if len(parts) != max(len(self.shape), 1) or not all(p.isdigit() for p in parts):
+            return None
+        return tuple(int(p) for p in parts) if self.shape else ()
+
+    def chunk_slices(self, coords: Tuple[int, ...]) -> Tuple[slice, ...]:
+        """Index ranges of the array covered by a chunk."""
+        return tuple(
+            slice(c * size, min((c + 1) * size, extent))
+            for c, size, extent in zip(coords, self.chunks, self.shape)
+        )
+
+
+def _join(prefix: str, path: str) -> str:
+    return "/".join(p for p in (prefix.strip("/"), path.strip("/")) if p)
+
+
+def layout_from_v2(path: str, zarray: dict, zattrs: Optional[dict] = None) -> ChunkLayout:
+    """Build a layout from v2 ``.zarray``/``.zattrs`` documents."""
+    return ChunkLayout(
+        path=path,
+        shape=tuple(zarray["shape"]),
+        chunks=tuple(zarray["chunks"]),
+        dims=(zattrs or {}).get("_ARRAY_DIMENSIONS"),
+        separator=zarray.get("dimension_separator") or ".",
+    )
+
+
+def layout_from_v3(path: str, meta: dict) -> Optional[ChunkLayout]:
+    """Build a layout from a v3 array ``zarr.json`` document."""
+    if meta.get("node_type") != "array":
+        return None
+    grid = meta.get("chunk_grid", {}).get("configuration", {})
+    encoding = meta.get("chunk_key_encoding", {})
+    separator = encoding.get("configuration", {}).get("separator")
+    if encoding.get("name") == "v2":
+        return ChunkLayout(
+            path=path,
+            shape=tuple(meta["shape"]),
+            chunks=tuple(grid.get("chunk_shape", meta["shape"])),
+            dims=meta.get("dimension_names"),
+            separator=separator or ".",
+        )
+    return ChunkLayout(
+        path=path,
+        shape=tuple(meta["shape"]),
+        chunks=tuple(grid.get("chunk_shape", meta["shape"])),
+        dims=meta.get("dimension_names"),
+        separator=separator or "/",
+        key_prefix="c" + (separator or "/"),
+    )
+
+
+def layouts_from_metadata(key: str, raw: bytes) -> Dict[str, ChunkLayout]:
+    """Extract array layouts from a metadata document read from a store.
+
+    Understands consolidated v2 metadata (``.zmetadata``), a v2 ``.zarray``
+    and v3 ``zarr.json`` documents including their consolidated metadata.
+
+    Args:
+        key: Store key the document was read from
+        raw: Raw document bytes
+
+    Returns:
+        Dict mapping array paths to their chunk layout
+    """
+    basename = key.rsplit("/", 1)[-1]
+    prefix = key.rsplit("/", 1)[0] if "/" in key else ""
+    try:
+        document = json.loads(raw)
+    except ValueError:
+        return {}
+
+    layouts = {}
+    if basename == V2_CONSOLIDATED_KEY:
+        metadata = document.get("metadata", {})
+        for meta_key, meta in metadata.items():
+            if meta_key.rsplit("/", 1)[-1] != V2_ARRAY_KEY:
+                continue
+            array_path = _join(prefix, meta_key.rsplit("/", 1)[0] if "/" in meta_key else "")
+            attrs_key = meta_key[: -len(V2_ARRAY_KEY)] + V2_ATTRS_KEY
+            layouts[array_path] = layout_from_v2(array_path, meta, metadata.get(attrs_key))
+    elif basename == V2_ARRAY_KEY:
+        layouts[prefix] = layout_from_v2(prefix, document)
+    elif basename == V3_METADATA_KEY:
+        layout = layout_from_v3(prefix, document)
+        if layout is not None:
+            layouts[prefix] = layout
+        consolidated = (document.get("consolidated_metadata") or {}).get("metadata", {})
+        for child_path, meta in consolidated.items():
+            layout = layout_from_v3(_join(prefix, child_path), meta)
+            if layout is not None:
+                layouts[layout.path] = layout
+    return layouts
+
+
+def selection_read_bytes(
+        shape: Tuple[int, ...],
+        chunks: Tuple[int, ...],
+        itemsize: int,
+        selection: Tuple,
+) -> int:
+    """Bytes of the chunks a basic selection overlaps, before decompression.
+
+    Args:
+        shape: Array shape
+        chunks: Chunk shape
+        itemsize: Bytes per element
+        selection: One integer or slice per axis
+
+    Returns:
+        int: Total size of the overlapped chunks
+    """
+    total = itemsize
+    for extent, size, item in zip(shape, chunks, selection):
+        if isinstance(item, slice):
+            start, stop, _ = item.indices(extent)
+            count = max(0, -(-stop // size) - start // size) if stop > start else 0
+        else:
+            count = 1
+        total *= count * size
+    return total
+
+
+def compressors_for(name: str, zarr_format: int = 3) -> Optional[Tuple]:
+    """Compressor codecs for a name like "blosc-lz4", "zstd-3" or "none".
+
+    Args:
+        name: Compressor name (blosc-<cname> or zstd-<level>)
+        zarr_format: 2 for numcodecs codecs, 3 for zarr v3 codecs
+
+    Returns:
+        Tuple of codecs, or None for no compression
+
+    Raises:
+        ValueError: If the name is not understood
+    """
+    if name == "none":
+        return None
+    kind, _, option = name.partition("-")
+    if kind == "blosc" and option:
+        if zarr_format == 2:
+            return (numcodecs.Blosc(cname=option, clevel=5, shuffle=numcodecs.Blosc.SHUFFLE),)
+        return (BloscCodec(cname=option, clevel=5, shuffle="shuffle"),)
+    if kind == "zstd" and option.isdigit():
+        if zarr_format == 2:
+            return (numcodecs.Zstd(level=int(option)),)
+        return (ZstdCodec(level=int(option)),)
+    raise ValueError(f"Unknown compressor {name!r}, expected e.g. {COMPRESSORS}")
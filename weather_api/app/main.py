@@ -14,6 +14,9 @@ import asyncio
 
 from app.config import settings
 from app.api.routes import router as api_router
+from app.core.geometry import close_http_client
+from app.core.hot_fields import hot_fields
+from app.core.scheduling import close_clients
 from app.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -119,10 +122,18 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     async def startup_event():
         logger.info("Starting up the application...")
+        store = hot_fields()
+        if store is not None:
+            store.start_daemon(settings.HOT_FIELDS_EVICT_INTERVAL_S)
 
     @app.on_event("shutdown")
     async def shutdown_event():
         logger.info("Shutting down the application...")
+        close_clients()
+        await close_http_client()
+        store = hot_fields()
+        if store is not None:
+            store.stop_daemon()
 
     return app
 
@@ -0,0 +1,234 @@
+"""Pre-fork server: preload the app and its read-only state once, then fork workers.
+
+The master imports ``app.main`` (which builds the routes' loaders and
+visualizers), opens the store catalogs, maps the coordinate grids and loads
+the basemap geometries, freezes the garbage collector and binds the socket.
+Forked workers share all of those pages copy-on-write and serve the
+inherited socket with uvicorn. Workers that exit are restarted.
+"""
+import gc
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+logger = logging.getLogger("weather_api")
+
+_MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """Resident memory of a process in bytes (Linux).
+
+    ``Pss`` divides shared pages among the processes sharing them, so the
+    sum of the workers' Pss is their real footprint; ``Rss`` counts every
+    shared page in full for each worker.
+
+    Args:
+        pid: Process id
+
+    Returns:
+        Dict[str, int]: Rss, Pss, shared and private bytes
+    """
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in _MEMORY_FIELDS:
+                memory[name.lower()] = int(value.split()[0]) * 1024
+    return memory
+
+
+def preload_state() -> Dict[str, float]:
+    """Build the read-only state workers would otherwise each build.
+
+    Every step is optional: a store or basemap that cannot be loaded is
+    logged and left to the workers to load on demand.
+
+    Returns:
+        Dict[str, float]: Seconds spent per step
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    from app.main import app  # noqa: F401  (builds routes, loaders and visualizers)
+    from app.api import routes
+    from app.core.d_loader import DataLoader
+    timings["app"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name, loader in vars(routes).items():
+        if isinstance(loader, DataLoader):
+            try:
+                loader.catalog
+            except Exception as e:
+                logger.warning(f"Could not preload the catalog of {name}: {e}")
+    timings["catalogs"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    visualizers = [routes.graphcast_visualizer, routes.experimental_visualizer]
+    try:
+        visualizers += [routes.get_cerrora_visualizer(), routes.get_graphcast_interpolated_visualizer()]
+    except Exception as e:
+        logger.warning(f"Could not preload the coordinate grids: {e}")
+    timings["grids"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    features = {}
+    for visualizer in visualizers:
+        for attr in ("coastlines", "borders", "land"):
+            feature = getattr(visualizer, attr, None)
+            if feature is not None:
+                features[(feature.category, feature.name, feature.scale)] = feature
+    for key, feature in features.items():
+        try:
+            # cartopy caches Natural Earth geometries per (category, name, scale)
+            list(feature.geometries())
+        except Exception as e:
+            logger.warning(f"Could not preload basemap {key}: {e}")
+    timings["basemaps"] = time.perf_counter() - start
+    return timings
+
+
+class _Worker(uvicorn.Server):
+    """uvicorn server that reports to the master once it is serving."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        await super().startup(sockets=sockets)
+        os.write(self.ready_fd, f"{os.getpid()}\n".encode())
+
+
+class PreforkServer:
+    """Master process of the pre-fork server."""
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            workers: int,
+            preload: bool = True,
+            log_level: str = "warning",
+            report_path: Optional[str] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.workers = max(workers, 1)
+        self.preload = preload
+        self.log_level = log_level
+        self.report_path = report_path
+        self.children: Dict[int, int] = {}  # pid -> worker slot
+        self.stopping = False
+        self.timings: Dict[str, float] = {}
+        self.socket: Optional[socket.socket] = None
+        self._ready_r, self._ready_w = os.pipe()
+
+    def run(self) -> None:
+        """Preload, fork the workers and supervise them until stopped."""
+        start = time.perf_counter()
+        if self.preload:
+            self.timings = preload_state()
+            # Keep the collector from touching (and so copying) the preloaded objects
+            gc.freeze()
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(2048)
+        self.socket.set_inheritable(True)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for slot in range(self.workers):
+            self._spawn(slot)
+        ready = self._wait_ready(len(self.children))
+        self._report(time.perf_counter() - start, ready)
+        self._supervise()
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = slot
+            return
+        # Worker
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            os.close(self._ready_r)
+            from app.core.d_loader import DataLoader
+            DataLoader.reset_after_fork()
+            if not self.preload:
+                preload_state()
+            from app.main import app
+            config = uvicorn.Config(app, log_level=self.log_level, lifespan="on")
+            _Worker(config, self._ready_w).run(sockets=[self.socket])
+        finally:
+            os._exit(0)
+
+    def _wait_ready(self, count: int, timeout: float = 300.0) -> List[int]:
+        """Pids of the workers that reported ready, in order."""
+        ready: List[int] = []
+        buffer = b""
+        deadline = time.monotonic() + timeout
+        while len(ready) < count and time.monotonic() < deadline and not self.stopping:
+            readable, _, _ = select.select([self._ready_r], [], [], 0.5)
+            if readable:
+                buffer += os.read(self._ready_r, 4096)
+                *lines, buffer = buffer.split(b"\n")
+                ready += [int(line) for line in lines if line]
+        return ready
+
+    def _report(self, seconds: float, ready: List[int]) -> None:
+        memory = {}
+        for pid in [os.getpid()] + ready:
+            try:
+                memory[pid] = process_memory(pid)
+            except OSError:
+                continue
+        master = memory.pop(os.getpid(), {})
+        report = {
+            "workers": self.workers,
+            "preload": self.preload,
+            "ready": len(ready),
+            "startup_seconds": seconds,
+            "preload_seconds": self.timings,
+            "master": master,
+            "worker_memory": memory,
+        }
+        pss = sum(m.get("pss", 0) for m in memory.values())
+        logger.warning(
+            f"{len(ready)}/{self.workers} workers serving on {self.host}:{self.port} after {seconds:.1f}s "
+            f"(workers' Pss {pss / 1e6:.0f} MB)"
+        )
+        if self.report_path:
+            with open(self.report_path + ".tmp", "w") as f:
+                json.dump(report, f)
+            os.replace(self.report_path + ".tmp", self.report_path)
+
+    def _supervise(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot = self.children.pop(pid, None)
+            if slot is not None and not self.stopping:
+                logger.warning(f"Worker {pid} exited (status {status}), restarting")
+                self._spawn(slot)
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,130 @@
+"""Benchmark concurrent chunk fetching against a local HTTP stand-in for GCS.
+
+Example:
+    python -m app.tools.bench_fetch --latency-ms 20 --concurrency 1 4 16 64
+"""
+import argparse
+import functools
+import http.server
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import zarr
+from zarr.storage import FsspecStore
+
+from app.core.fetch import ConcurrentFetchStore
+
+logger = logging.getLogger("weather_api")
+
+
+class LatencyRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that sleeps before answering, like a remote GET."""
+
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(directory: str, latency: float) -> http.server.ThreadingHTTPServer:
+    """Serve a directory over HTTP on a free local port."""
+    handler = type("Handler", (LatencyRequestHandler,), {"latency": latency})
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(handler, directory=directory)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_sample_store(path: str, n_times: int, n_leads: int, size: int) -> None:
+    """Write a synthetic forecast store with one chunk per (time, lead) field."""
+    times = pd.date_range("2021-01-01", periods=n_times, freq="12h")
+    leads = pd.to_timedelta(np.arange(1, n_leads + 1) * 6, unit="h")
+    data = np.random.rand(n_times, n_leads, size, size).astype("float32")
+    ds = xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), data)},
+        coords={"time": times, "prediction_timedelta": leads},
+    )
+    ds.to_zarr(
+        path,
+        mode="w",
+        zarr_format=2,
+        consolidated=True,
+        encoding={"t2m": {"chunks": (1, 1, size, size)}},
+    )
+
+
+def run_benchmark(url: str, concurrency: int, prefetch_window: int, repeats: int) -> dict:
+    """Read every lead time of the first base time, one field at a time."""
+    zarr.config.set({"async.concurrency": max(concurrency, 1)})
+    timings = []
+    nbytes = 0
+    for _ in range(repeats):
+        store = ConcurrentFetchStore(
+            FsspecStore.from_url(url, read_only=True),
+            concurrency=concurrency,
+            prefetch_window=prefetch_window,
+        )
+        ds = xr.open_zarr(store, consolidated=True)
+        start = time.perf_counter()
+        # Whole-array read: many chunk requests issued at once
+        values = ds.t2m.values
+        # Per-frame loop as in the image endpoints: benefits from prefetch
+        for lead in range(ds.sizes["prediction_timedelta"]):
+            ds.t2m.isel(time=0, prediction_timedelta=lead).values
+        timings.append(time.perf_counter() - start)
+        nbytes = values.nbytes
+    elapsed = float(np.median(timings))
+    return {
+        "concurrency": concurrency,
+        "prefetch": prefetch_window,
+        "seconds": elapsed,
+        "mb_per_s": nbytes / elapsed / 1e6,
+    }
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Concurrent chunk fetch benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--prefetch", type=int, default=4, help="Lead-time prefetch window")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Injected latency per GET")
+    parser.add_argument("--times", type=int, default=4)
+    parser.add_argument("--leads", type=int, default=8)
+    parser.add_argument("--size", type=int, default=256, help="Grid points per side")
+    parser.add_argument("--repeats", type=int, default=3)
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        write_sample_store(os.path.join(tmp, "bench.zarr"), args.times, args.leads, args.size)
+        server = start_server(tmp, args.latency_ms / 1000.0)
+        url = f"http://127.0.0.1:{server.server_address[1]}/bench.zarr"
+        try:
+            print(f"{'concurrency':>11} {'prefetch':>8} {'seconds':>8} {'MB/s':>8}")
+            for concurrency in args.concurrency:
+                result = run_benchmark(url, concurrency, args.prefetch, args.repeats)
+                print(
+                    f"{result['concurrency']:>11} {result['prefetch']:>8} "
+                    f"{result['seconds']:>8.3f} {result['mb_per_s']:>8.1f}"
+                )
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
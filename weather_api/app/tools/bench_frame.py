@@ -0,0 +1,89 @@
+"""Measure per-frame read overhead of the xarray/dask path against direct zarr reads.
+
+Example:
+    python -m app.tools.bench_frame --size 1069 --reads 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import zarr
+from zarr.storage import LocalStore
+
+from app.core.catalog import StoreCatalog
+from app.core.direct_read import read_selection
+from app.tools.bench_fetch import write_sample_store
+
+
+def frame_times(ds: xr.Dataset, reads: int):
+    """(base, valid) epoch-second pairs cycling through the store's frames."""
+    bases = ds["time"].values.astype("datetime64[s]").astype(np.int64)
+    leads = ds["prediction_timedelta"].values.astype("timedelta64[s]").astype(np.int64)
+    pairs = [(int(b), int(b + l)) for b in bases for l in leads]
+    return [pairs[i % len(pairs)] for i in range(reads)]
+
+
+def bench_xarray(path: str, pairs) -> list:
+    """Per-frame seconds of open_zarr(chunks="auto") + two .sel calls."""
+    ds = xr.open_zarr(path, chunks="auto")
+    timings = []
+    for base, valid in pairs:
+        start = time.perf_counter()
+        frame = ds["t2m"].sel(time=pd.Timestamp(base, unit="s"), method="nearest")
+        frame = frame.sel(prediction_timedelta=pd.Timedelta(seconds=valid - base), method="nearest")
+        frame.values
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_direct(path: str, pairs) -> list:
+    """Per-frame seconds of catalog lookups + a read into a reused buffer."""
+    store = LocalStore(path, read_only=True)
+    catalog = StoreCatalog.from_store(path, store)
+    array = zarr.open_group(store, mode="r")["t2m"]
+    dims = catalog.variables["t2m"].dims
+    out = np.empty(array.shape[2:], dtype=array.dtype)
+    timings = []
+    for base, valid in pairs:
+        start = time.perf_counter()
+        read_selection(array, dims, catalog.index_maps.frame_indexer(base, valid), out=out)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(name: str, timings: list) -> None:
+    ms = np.array(timings) * 1000.0
+    print(f"{name:>8} {np.median(ms):>10.2f} {np.percentile(ms, 95):>10.2f} {ms.min():>10.2f}")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Single-frame read overhead benchmark")
+    parser.add_argument("--times", type=int, default=2)
+    parser.add_argument("--leads", type=int, default=5)
+    parser.add_argument("--size", type=int, default=1069, help="Grid points per side")
+    parser.add_argument("--reads", type=int, default=20, help="Frames read per path")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.zarr")
+        write_sample_store(path, args.times, args.leads, args.size)
+        pairs = frame_times(xr.open_zarr(path), args.reads)
+        # Warm the OS page cache so both paths read from memory
+        bench_direct(path, pairs[:1])
+
+        print(f"{'path':>8} {'p50 ms':>10} {'p95 ms':>10} {'min ms':>10}")
+        summarize("xarray", bench_xarray(path, pairs))
+        summarize("direct", bench_direct(path, pairs))
+
+
+if __name__ == "__main__":
+    main()
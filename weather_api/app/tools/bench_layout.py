@@ -0,0 +1,307 @@
+"""Benchmark chunk shapes, codecs, sharding and dtypes for a forecast store.
+
+A sample of one variable is read from the store and rewritten under every
+combination of the requested layouts. Each copy is then read with the access
+patterns of the API endpoints, and the tool reports latency, throughput,
+size and (for lossy dtypes) the largest error. The layout with the lowest
+weighted latency is written as a recommendation that app.tools.rechunk
+accepts via ``--recommendation``.
+
+Access patterns are a JSON list of
+``{"name": ..., "indexer": {dim: index | [start, stop]}, "weight": ...}``
+with indices into the sample; without one, the endpoints' default patterns
+are used.
+
+Example:
+    python -m app.tools.bench_layout /data/cerrora.zarr t2m --sample-times 8 \\
+        --tiles 0 32 64 --time-chunks 1 8 --compressors blosc-lz4 zstd-3 none --output layout.json
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import zarr
+from zarr.storage import LocalStore
+
+from app.core.direct_read import Indexer, read_selection
+from app.core.storage import open_store, open_zarr_dataset
+from app.core.zarr_layout import COMPRESSORS, compressors_for
+
+DTYPES = ("float32", "float16", "int16")
+SHARDS = ("none", "field")
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """One storage layout to benchmark.
+
+    ``tile`` 0 keeps whole spatial fields per chunk; ``shards`` "field" packs
+    all chunks of a time block's spatial field into one shard file.
+    """
+
+    tile: int
+    time_chunk: int
+    compressor: str
+    shards: str = "none"
+    dtype: str = "float32"
+
+    @property
+    def name(self) -> str:
+        tile = "field" if self.tile == 0 else f"tile{self.tile}"
+        return f"{tile}-t{self.time_chunk}-{self.compressor}-{self.shards}-{self.dtype}"
+
+
+@dataclass
+class AccessPattern:
+    """Selection one endpoint makes, with its share of the traffic."""
+
+    name: str
+    indexer: Indexer
+    weight: float = 1.0
+
+
+@dataclass
+class Result:
+    candidate: Candidate
+    nbytes: int
+    seconds: Dict[str, float] = field(default_factory=dict)
+    mb_per_s: Dict[str, float] = field(default_factory=dict)
+    max_error: float = 0.0
+
+    def weighted_seconds(self, patterns: Sequence[AccessPattern]) -> float:
+        return sum(p.weight * self.seconds[p.name] for p in patterns)
+
+
+def default_patterns(dims: Tuple[str, ...], shape: Tuple[int, ...]) -> List[AccessPattern]:
+    """Access patterns of the current endpoints for a sample's dims."""
+    sizes = dict(zip(dims, shape))
+    y_dim, x_dim = dims[-2], dims[-1]
+    point = {y_dim: sizes[y_dim] // 2, x_dim: sizes[x_dim] // 2}
+    extra = {dim: 0 for dim in dims[:-2] if dim not in ("time", "prediction_timedelta")}
+    region = {
+        y_dim: slice(sizes[y_dim] // 4, sizes[y_dim] // 2),
+        x_dim: slice(sizes[x_dim] // 4, sizes[x_dim] // 2),
+    }
+    return [
+        # /data/* image endpoints: one field
+        AccessPattern("frame", {"time": 0, "prediction_timedelta": 0, **extra}),
+        # /temp_compare: every lead of one base time at a point
+        AccessPattern("point_leads", {"time": 0, **point, **extra}),
+        # Point time series across base times
+        AccessPattern("point_series", {**point, **extra}),
+        # Regional aggregates: a box of one field
+        AccessPattern("region", {"time": 0, "prediction_timedelta": 0, **region, **extra}),
+    ]
+
+
+def load_patterns(path: str) -> List[AccessPattern]:
+    """Read access patterns from a JSON file ([start, stop] lists become slices)."""
+    with open(path) as f:
+        entries = json.load(f)
+    patterns = []
+    for entry in entries:
+        indexer: Dict[str, Union[int, slice]] = {
+            dim: slice(*value) if isinstance(value, list) else int(value)
+            for dim, value in entry["indexer"].items()
+        }
+        patterns.append(AccessPattern(entry["name"], indexer, float(entry.get("weight", 1.0))))
+    return patterns
+
+
+def load_sample(source: str, variable: str, sample_times: int) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """Decoded values of the first base times of a variable."""
+    ds = open_zarr_dataset(open_store(source), chunks=None)
+    var = ds[variable]
+    if "time" in var.dims:
+        var = var.isel(time=slice(0, sample_times))
+    return np.ascontiguousarray(var.values), tuple(var.dims)
+
+
+def candidate_chunks(dims: Tuple[str, ...], shape: Tuple[int, ...], candidate: Candidate) -> Tuple[int, ...]:
+    chunks = []
+    for axis, (dim, size) in enumerate(zip(dims, shape)):
+        if dim == "time":
+            chunks.append(min(candidate.time_chunk, size))
+        elif dim == "prediction_timedelta":
+            chunks.append(1 if candidate.tile == 0 else size)
+        elif axis >= len(dims) - 2:
+            chunks.append(size if candidate.tile == 0 else min(candidate.tile, size))
+        else:
+            chunks.append(1)
+    return tuple(chunks)
+
+
+def candidate_shards(dims, shape, chunks, candidate: Candidate) -> Optional[Tuple[int, ...]]:
+    if candidate.shards == "none":
+        return None
+    # Whole spatial field of a chunk's time/lead block, rounded up to whole chunks
+    return tuple(
+        -(-size // chunk) * chunk if axis >= len(dims) - 2 else chunk
+        for axis, (size, chunk) in enumerate(zip(shape, chunks))
+    )
+
+
+def encode(sample: np.ndarray, dtype: str) -> Tuple[np.ndarray, dict, object]:
+    """Values, CF attributes and fill value of the sample stored as dtype."""
+    if dtype != "int16":
+        return sample.astype(dtype), {}, np.nan
+    finite = sample[np.isfinite(sample)]
+    low, high = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 1.0)
+    scale = (high - low) / 65533 or 1.0
+    offset = (high + low) / 2
+    packed = np.round((sample - offset) / scale)
+    packed = np.where(np.isfinite(packed), packed, -32768).astype("int16")
+    attrs = {"scale_factor": scale, "add_offset": offset, "_FillValue": -32768}
+    return packed, attrs, -32768
+
+
+def write_candidate(directory: str, sample: np.ndarray, dims, candidate: Candidate) -> Tuple[str, int]:
+    """Write the sample under a candidate layout; returns (path, bytes on disk)."""
+    path = os.path.join(directory, f"{candidate.name}.zarr")
+    values, attrs, fill_value = encode(sample, candidate.dtype)
+    chunks = candidate_chunks(dims, sample.shape, candidate)
+    array = zarr.create_array(
+        LocalStore(path),
+        name="sample",
+        shape=sample.shape,
+        dtype=values.dtype,
+        chunks=chunks,
+        shards=candidate_shards(dims, sample.shape, chunks, candidate),
+        compressors=compressors_for(candidate.compressor, zarr_format=3),
+        fill_value=fill_value,
+        dimension_names=dims,
+        attributes=attrs,
+        zarr_format=3,
+        overwrite=True,
+    )
+    array[...] = values
+    nbytes = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+    return path, nbytes
+
+
+def measure(path: str, dims, patterns: Sequence[AccessPattern], repeats: int) -> Dict[str, Tuple[float, int]]:
+    """Median read seconds and decoded bytes of each pattern."""
+    results = {}
+    for pattern in patterns:
+        timings = []
+        nbytes = 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            array = zarr.open_array(LocalStore(path, read_only=True), path="sample", mode="r")
+            values = read_selection(array, dims, pattern.indexer)
+            timings.append(time.perf_counter() - start)
+            nbytes = values.nbytes
+        results[pattern.name] = (float(np.median(timings)), nbytes)
+    return results
+
+
+def max_error(path: str, sample: np.ndarray, dims) -> float:
+    array = zarr.open_array(LocalStore(path, read_only=True), path="sample", mode="r")
+    stored = read_selection(array, dims, {})
+    finite = np.isfinite(sample)
+    return float(np.max(np.abs(stored[finite].astype("float64") - sample[finite]))) if finite.any() else 0.0
+
+
+def run(
+        sample: np.ndarray,
+        dims: Tuple[str, ...],
+        candidates: Sequence[Candidate],
+        patterns: Sequence[AccessPattern],
+        repeats: int = 3,
+        directory: Optional[str] = None,
+) -> List[Result]:
+    """Benchmark every candidate layout; results sorted by weighted latency."""
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for candidate in candidates:
+            path, nbytes = write_candidate(tmp, sample, dims, candidate)
+            result = Result(candidate=candidate, nbytes=nbytes)
+            for name, (seconds, read_bytes) in measure(path, dims, patterns, repeats).items():
+                result.seconds[name] = seconds
+                result.mb_per_s[name] = read_bytes / seconds / 1e6 if seconds else 0.0
+            if candidate.dtype != "float32":
+                result.max_error = max_error(path, sample, dims)
+            results.append(result)
+            shutil.rmtree(path)
+    return sorted(results, key=lambda r: (r.weighted_seconds(patterns), r.nbytes))
+
+
+def recommendation(best: Result, patterns: Sequence[AccessPattern]) -> dict:
+    """Recommendation document for app.tools.rechunk --recommendation."""
+    return {
+        "candidate": asdict(best.candidate),
+        "rechunk": {
+            "tile": best.candidate.tile,
+            "time_chunk": best.candidate.time_chunk,
+            "compressor": best.candidate.compressor,
+        },
+        "weighted_ms": best.weighted_seconds(patterns) * 1000.0,
+        "patterns": [p.name for p in patterns],
+    }
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Storage layout and codec benchmark")
+    parser.add_argument("source", help="Store path or URL")
+    parser.add_argument("variable", help="Variable to sample")
+    parser.add_argument("--patterns", help="JSON file of access patterns")
+    parser.add_argument("--sample-times", type=int, default=4, help="Base times to sample")
+    parser.add_argument("--tiles", type=int, nargs="+", default=[0, 32, 64], help="0 = whole field")
+    parser.add_argument("--time-chunks", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--compressors", nargs="+", default=list(COMPRESSORS), choices=COMPRESSORS)
+    parser.add_argument("--shards", nargs="+", default=list(SHARDS), choices=SHARDS)
+    parser.add_argument("--dtypes", nargs="+", default=["float32"], choices=DTYPES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workdir", help="Directory for the temporary copies")
+    parser.add_argument("--output", help="Write the recommendation to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    sample, dims = load_sample(args.source, args.variable, args.sample_times)
+    patterns = load_patterns(args.patterns) if args.patterns else default_patterns(dims, sample.shape)
+    candidates = [
+        Candidate(tile, time_chunk, compressor, shards, dtype)
+        for tile, time_chunk, compressor, shards, dtype in itertools.product(
+            args.tiles, args.time_chunks, args.compressors, args.shards, args.dtypes
+        )
+        # A whole-field chunk is already its own shard
+        if not (tile == 0 and shards != "none")
+    ]
+    results = run(sample, dims, candidates, patterns, args.repeats, args.workdir)
+
+    header = f"{'layout':<40} {'MB':>8} " + " ".join(f"{p.name + ' ms':>16}" for p in patterns)
+    print(header + f" {'max err':>9}")
+    for result in results:
+        print(
+            f"{result.candidate.name:<40} {result.nbytes / 1e6:>8.1f} "
+            + " ".join(
+                f"{result.seconds[p.name] * 1000:>8.2f} ({result.mb_per_s[p.name]:>6.1f}/s)" for p in patterns
+            )
+            + f" {result.max_error:>9.3g}"
+        )
+
+    best = recommendation(results[0], patterns)
+    print(f"\nRecommended: {results[0].candidate.name}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(best, f, indent=2)
+        print(f"Wrote {args.output}; apply with python -m app.tools.rechunk SOURCE TARGET --recommendation {args.output}")
+
+
+if __name__ == "__main__":
+    main()
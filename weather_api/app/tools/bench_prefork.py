@@ -0,0 +1,107 @@
+"""Measure pre-fork server startup time and worker memory for several worker counts.
+
+Starts ``run.py --workers N`` with and without preloading, waits until every
+worker serves, reads the server's startup report and shuts it down.
+
+Example:
+    python -m app.tools.bench_prefork --workers 1 2 4 8 16
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(workers: int, preload: bool, timeout: float) -> Iterator[Tuple[int, Optional[dict]]]:
+    """Run the pre-fork server until the block exits.
+
+    Yields:
+        Tuple[int, Optional[dict]]: Port and startup report (None if it did not start)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, "report.json")
+        port = free_port()
+        command = [
+            sys.executable, "run.py", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--preload" if preload else "--no-preload",
+            "--report", report_path, "--log-level", "ERROR",
+        ]
+        server = subprocess.Popen(command, cwd=_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            report = None
+            deadline = time.monotonic() + timeout
+            while server.poll() is None and time.monotonic() < deadline:
+                if os.path.exists(report_path):
+                    with open(report_path) as f:
+                        report = json.load(f)
+                    break
+                time.sleep(0.1)
+            yield port, report
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+def start_report(workers: int, preload: bool, timeout: float) -> Optional[dict]:
+    """Start the server, return its startup report and stop it."""
+    with serve(workers, preload, timeout) as (_, report):
+        return report
+
+
+def summarize(report: dict) -> str:
+    memory = list(report["worker_memory"].values())
+    rss = np.mean([m["rss"] for m in memory]) / 1e6
+    pss = np.mean([m["pss"] for m in memory]) / 1e6
+    shared = np.mean([m["shared_clean"] + m["shared_dirty"] for m in memory]) / 1e6
+    total = (sum(m["pss"] for m in memory) + report["master"].get("pss", 0)) / 1e6
+    mode = "preload" if report["preload"] else "fork"
+    return (
+        f"{report['workers']:>7} {mode:>8} {report['startup_seconds']:>9.2f} "
+        f"{rss:>8.0f} {pss:>8.0f} {shared:>9.0f} {total:>9.0f}"
+    )
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Pre-fork server startup and memory benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for startup")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    print(f"{'workers':>7} {'mode':>8} {'startup s':>9} {'RSS MB':>8} {'PSS MB':>8} {'shared MB':>9} {'total MB':>9}")
+    for workers in args.workers:
+        for preload in (False, True):
+            report = start_report(workers, preload, args.timeout)
+            if report is None:
+                print(f"{workers:>7} {'preload' if preload else 'fork':>8} failed to start")
+                continue
+            print(summarize(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Load test: request throughput of the pre-fork server for several worker counts.
+
+Every request names its model, so workers are interchangeable; throughput
+should grow linearly with the worker count until the host's cores (or the
+load generator) saturate. Client processes send requests over keep-alive
+connections in a closed loop, cycling through the paths with every model.
+
+Example:
+    python -m app.tools.bench_scaling --workers 1 2 4 8 --clients 32 --seconds 20
+    python -m app.tools.bench_scaling --path "/valid-times/{model}?variableType=rain"
+"""
+import argparse
+import http.client
+import itertools
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.tools.bench_prefork import serve
+
+DEFAULT_PATHS = ["/base-times/{model}?variableType=temp_wind", "/current-model"]
+DEFAULT_MODELS = ["cerrora", "graphcast"]
+
+
+def expand_paths(paths: Sequence[str], models: Sequence[str]) -> List[str]:
+    """API paths with ``{model}`` filled in for every model."""
+    expanded = []
+    for path in (settings.API_V1_STR + path for path in paths):
+        if "{model}" in path:
+            expanded += [path.format(model=model) for model in models]
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def _client(port: int, paths: List[str], offset: int, seconds: float, results) -> None:
+    latencies, errors = [], 0
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    cycle = itertools.islice(itertools.cycle(paths), offset, None)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", next(cycle))
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    results.put((latencies, errors))
+
+
+def load(port: int, paths: List[str], clients: int, seconds: float) -> Dict[str, float]:
+    """Run the closed-loop load and summarize it.
+
+    Args:
+        port: Server port on 127.0.0.1
+        paths: Request paths, cycled through by every client
+        clients: Concurrent client processes
+        seconds: Duration of the load
+
+    Returns:
+        Dict[str, float]: Requests, errors, requests per second and latency percentiles
+    """
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [
+        context.Process(target=_client, args=(port, paths, i, seconds, results))
+        for i in range(clients)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    latencies = np.concatenate([np.asarray(l, dtype=float) for l, _ in collected])
+    return {
+        "requests": len(latencies),
+        "errors": sum(e for _, e in collected),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1e3 if len(latencies) else float("nan"),
+        "p99_ms": float(np.percentile(latencies, 99)) * 1e3 if len(latencies) else float("nan"),
+    }
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Multi-worker throughput load test")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent client processes")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Load duration per worker count")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured load before each run")
+    parser.add_argument("--path", action="append", help="Request path; {model} is replaced by each model")
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for startup")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the load test."""
+    args = parse_args()
+    paths = expand_paths(args.path or DEFAULT_PATHS, args.models)
+    print(f"{len(paths)} paths, {args.clients} clients, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'scaling':>8}")
+    baseline = None
+    for workers in args.workers:
+        with serve(workers, preload=True, timeout=args.timeout) as (port, report):
+            if report is None:
+                print(f"{workers:>7} failed to start")
+                continue
+            if args.warmup:
+                load(port, paths, args.clients, args.warmup)
+            result = load(port, paths, args.clients, args.seconds)
+        per_worker = result["rps"] / workers
+        baseline = baseline or per_worker
+        print(
+            f"{workers:>7} {result['requests']:>9} {result['errors']:>7} {result['rps']:>9.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {per_worker / baseline:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compare a zarr v2 store with its sharded v3 conversion.
+
+Reports the object count and size of each store, the time to open it the
+way DataLoader does (consolidated metadata, catalog) and the per-frame
+latency of direct reads, first cold (new store per frame) and then warm.
+
+Example:
+    python -m app.tools.bench_sharding --times 8 --leads 8 --size 512 --shard-times 4
+    python -m app.tools.bench_sharding --v2 /data/cerrora.zarr --v3 /data/cerrora_v3.zarr --variable t2m
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import fsspec
+import numpy as np
+import zarr
+
+from app.core.catalog import StoreCatalog
+from app.core.direct_read import read_selection
+from app.core.storage import open_store
+from app.tools.bench_fetch import write_sample_store
+from app.tools.convert_v3 import convert
+
+
+def store_objects(path: str) -> tuple:
+    """Number of objects and total bytes under a store."""
+    fs, root = fsspec.core.url_to_fs(path)
+    sizes = fs.du(root, total=False)
+    return len(sizes), sum(sizes.values())
+
+
+def open_seconds(path: str, repeats: int) -> float:
+    """Median seconds to open a store and build its catalog."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        StoreCatalog.from_store(path, open_store(path))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def frame_seconds(path: str, variable: str, reads: int, cold: bool) -> np.ndarray:
+    """Per-frame seconds of direct reads over cycling (time, lead) pairs."""
+    store = open_store(path)
+    catalog = StoreCatalog.from_store(path, store)
+    dims = catalog.variables[variable].dims
+    n_times, n_leads = catalog.variables[variable].shape[:2]
+    timings = []
+    for i in range(reads):
+        if cold:
+            store = open_store(path)
+        start = time.perf_counter()
+        array = zarr.open_group(store, mode="r")[variable]
+        indexer = {"time": (i // n_leads) % n_times, "prediction_timedelta": i % n_leads}
+        read_selection(array, dims, indexer)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings)
+
+
+def report(name: str, path: str, variable: str, reads: int, repeats: int) -> None:
+    objects, nbytes = store_objects(path)
+    cold = frame_seconds(path, variable, reads, cold=True) * 1000.0
+    warm = frame_seconds(path, variable, reads, cold=False) * 1000.0
+    print(
+        f"{name:>4} {objects:>8} {nbytes / 1e6:>9.1f} {open_seconds(path, repeats) * 1000.0:>8.1f} "
+        f"{np.median(cold):>10.2f} {np.median(warm):>10.2f} {np.percentile(warm, 95):>10.2f}"
+    )
+
+
+def run(v2: str, v3: str, variable: str, reads: int, repeats: int) -> None:
+    print(f"{'':>4} {'objects':>8} {'MB':>9} {'open ms':>8} {'cold p50':>10} {'warm p50':>10} {'warm p95':>10}")
+    report("v2", v2, variable, reads, repeats)
+    report("v3", v3, variable, reads, repeats)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="zarr v2 vs sharded v3 benchmark")
+    parser.add_argument("--v2", help="Existing v2 store (default: a synthetic one)")
+    parser.add_argument("--v3", help="Existing converted store (default: convert --v2)")
+    parser.add_argument("--variable", default="t2m")
+    parser.add_argument("--times", type=int, default=8)
+    parser.add_argument("--leads", type=int, default=8)
+    parser.add_argument("--size", type=int, default=512, help="Grid points per side")
+    parser.add_argument("--shard-times", type=int, default=4, help="Base time chunks per shard")
+    parser.add_argument("--reads", type=int, default=32, help="Frames read per store")
+    parser.add_argument("--repeats", type=int, default=5, help="Opens per store")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        v2 = args.v2
+        if v2 is None:
+            v2 = os.path.join(tmp, "bench.zarr")
+            write_sample_store(v2, args.times, args.leads, args.size)
+        v3 = args.v3
+        if v3 is None:
+            v3 = os.path.join(tmp, "bench_v3.zarr")
+            convert(v2, v3, [args.variable], args.shard_times)
+        run(v2, v3, args.variable, args.reads, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Precompute the bundles of the extreme events for the event pages.
+
+For every event of the extreme events dataset (EXTREME_EVENTS_PATH), extracts
+the event's lat/lon box of each relevant variable for all models and the
+ground truth, renders cropped frames, computes region statistics and
+verification scores, and writes one zip bundle per event to
+EVENT_BUNDLE_DIR. Bundles built from the same event definition and stores
+are skipped.
+
+Example:
+    python -m app.tools.build_event_bundles --events 202002-ciara 202010-alex
+"""
+import argparse
+import logging
+import time
+
+from app.config import settings
+from app.core.d_loader import DataLoader
+from app.core.events import build_event_bundle, bundle_is_current, load_events
+
+MODELS = ("cerrora", "graphcast")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Build the extreme event bundles")
+    parser.add_argument("--events", nargs="+", help="Event ids (default: all)")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--dataset", default=settings.EXTREME_EVENTS_PATH, help="Extreme events JSON")
+    parser.add_argument("--output", default=settings.EVENT_BUNDLE_DIR, help="Bundle directory")
+    parser.add_argument("--no-frames", action="store_true", help="Skip rendering the cropped frames")
+    parser.add_argument("--force", action="store_true", help="Rebuild bundles that are up to date")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the event bundle tool."""
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    events = load_events(args.dataset)
+    unknown = sorted(set(args.events or []) - set(events))
+    if unknown:
+        raise SystemExit(f"Unknown events {unknown}")
+    forecasts = {model: DataLoader(model_type=model) for model in args.models}
+    truth = DataLoader(model_type="cerrora_gt")
+    for event_id in args.events or sorted(events):
+        event = events[event_id]
+        if not args.force and bundle_is_current(event, {**forecasts, "ground_truth": truth}, args.output):
+            print(f"{event_id}: up to date")
+            continue
+        start = time.perf_counter()
+        path = build_event_bundle(event, forecasts, truth, args.output, frames=not args.no_frames)
+        print(f"{event_id}: {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
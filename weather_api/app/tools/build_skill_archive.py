@@ -0,0 +1,55 @@
+"""Score the forecast archive against the ground truth into the skill archive.
+
+Computes per (model, variable, lead, base time, region) error sums and
+scores and writes them to a partitioned Parquet dataset (SKILL_ARCHIVE_DIR).
+Only base times that are new, or whose leads gained ground truth since the
+last run, are computed, so the tool can run after every store update.
+
+Example:
+    python -m app.tools.build_skill_archive --variables t2m 10u 10v --regions domain Germany France
+"""
+import argparse
+import logging
+import time
+
+from app.config import settings
+from app.core.d_loader import DataLoader
+from app.core.skill_archive import SkillArchive
+from app.core.Utility.Utilities import get_country_region, get_domain_region
+
+MODELS = ("cerrora", "graphcast")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Update the Parquet skill archive")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--variables", nargs="+", default=["t2m", "10u", "10v", "tp"])
+    parser.add_argument("--regions", nargs="+", default=["domain"],
+                        help="domain and/or country names or ISO codes")
+    parser.add_argument("--archive", default=settings.SKILL_ARCHIVE_DIR, help="Archive directory")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the skill archive tool."""
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    archive = SkillArchive(args.archive)
+    truth = DataLoader(model_type="cerrora_gt")
+    regions = [get_domain_region() if name == "domain" else get_country_region(name) for name in args.regions]
+    computed = 0
+    for model in args.models:
+        forecast = DataLoader(model_type=model)
+        for variable in args.variables:
+            for region in regions:
+                updated = archive.update(model, forecast, truth, variable, region)
+                computed += sum(updated.values())
+                print(f"{model} {variable} {region.name}: {sum(updated.values())} base times "
+                      f"in {len(updated)} partitions")
+    print(f"computed {computed} base times into {args.archive} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
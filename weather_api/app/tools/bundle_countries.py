@@ -0,0 +1,67 @@
+"""Bundle country boundaries so lookups never need the network.
+
+Reads Natural Earth admin 0 countries (through cartopy, which downloads them
+once into its data directory) or any boundaries file, keeps the name and
+code columns, optionally clips to a latitude/longitude box and writes a
+GeoPackage for COUNTRY_BOUNDARIES_PATH. Run it at deploy time: the server
+only reads the bundle and fails clearly without it.
+
+Example:
+    python -m app.tools.bundle_countries --output data/countries.gpkg --bbox 15 -60 75 75
+"""
+import argparse
+import logging
+import os
+import time
+
+import geopandas as gpd
+import shapely
+
+from app.config import settings
+from app.core.geometry import BUNDLE_COLUMNS, CountryGeometries
+
+
+def natural_earth_path(resolution: str) -> str:
+    """Natural Earth admin 0 countries in cartopy's data directory (downloaded there on first use)."""
+    import cartopy.io.shapereader as shapereader
+
+    return shapereader.natural_earth(resolution=resolution, category="cultural", name="admin_0_countries")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Bundle country boundaries as a GeoPackage")
+    parser.add_argument("--source", help="Boundaries file (default: Natural Earth via cartopy)")
+    parser.add_argument("--resolution", default=settings.COUNTRY_BOUNDARIES_RESOLUTION, choices=("10m", "50m", "110m"),
+                        help="Natural Earth resolution")
+    parser.add_argument("--output", default=settings.COUNTRY_BOUNDARIES_PATH)
+    parser.add_argument("--bbox", type=float, nargs=4, metavar=("MIN_LAT", "MIN_LON", "MAX_LAT", "MAX_LON"),
+                        help="Keep only countries intersecting this box")
+    parser.add_argument("--simplify", type=float, default=0.0, help="Simplification tolerance in degrees")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the bundle tool."""
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    frame = gpd.read_file(args.source or natural_earth_path(args.resolution))
+    frame = frame.rename(columns={column: column.upper() for column in frame.columns if column != "geometry"})
+    frame = frame[[column for column in BUNDLE_COLUMNS if column in frame.columns] + ["geometry"]]
+    if args.bbox:
+        min_lat, min_lon, max_lat, max_lon = args.bbox
+        frame = frame[frame.intersects(shapely.box(min_lon, min_lat, max_lon, max_lat))]
+    if args.simplify:
+        frame = frame.set_geometry(frame.simplify(args.simplify, preserve_topology=True))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    frame.to_file(args.output, driver="GPKG")
+    countries = CountryGeometries.from_file(args.output)
+    print(
+        f"bundled {len(countries.countries)} countries ({os.path.getsize(args.output) / 1e6:.1f} MB) "
+        f"to {args.output} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
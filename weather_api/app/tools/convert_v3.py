@@ -0,0 +1,124 @@
+"""Convert a zarr v2 forecast store to a sharded zarr v3 store.
+
+The inner chunks keep the source's chunk shape, so a single frame still
+decodes only its own chunk. Chunks are packed into shards of ``shard_times``
+base times x all lead times x the whole field, which turns thousands of
+chunk files into a few large objects that are read with ranged requests
+(the shard index at the end, then each inner chunk). The copy reuses the
+rechunk tool's work units: one shard row of one variable per unit, recorded
+in the target so conversions resume and can be rerun as the source grows.
+
+Example:
+    python -m app.tools.convert_v3 /data/cerrora.zarr /data/cerrora_v3.zarr --shard-times 4 --workers 4
+
+Point ``CERRORA_ZARR_PATH`` at the converted store; DataLoader opens either format.
+"""
+import argparse
+import functools
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import xarray as xr
+
+from app.core.storage import open_store, open_zarr_dataset
+from app.core.zarr_layout import COMPRESSORS
+from app.tools.rechunk import TargetLayout, copy_store
+
+logger = logging.getLogger("weather_api")
+
+
+def source_chunks(var: xr.DataArray) -> Tuple[int, ...]:
+    """Chunk shape of a variable in the source store (whole array if unchunked)."""
+    chunks = var.encoding.get("chunks") or var.encoding.get("preferred_chunks")
+    if isinstance(chunks, dict):
+        chunks = tuple(chunks.get(dim, size) for dim, size in zip(var.dims, var.shape))
+    return tuple(chunks) if chunks else tuple(var.shape)
+
+
+def shard_shape(var: xr.DataArray, shard_times: int) -> Tuple[int, ...]:
+    """Shard shape: ``shard_times`` base times, everything else whole.
+
+    Each dimension is rounded up to a multiple of the inner chunk, as zarr
+    requires shards to hold a whole number of chunks.
+    """
+    shards = []
+    for dim, size, chunk in zip(var.dims, var.shape, source_chunks(var)):
+        extent = min(shard_times * chunk, size) if dim == "time" else size
+        shards.append(-(-extent // chunk) * chunk)
+    return tuple(shards)
+
+
+def sharded_layout(sample: xr.DataArray, shard_times: int, compressor: Optional[str] = None) -> TargetLayout:
+    """Target layout of the conversion, given one of the store's variables."""
+    time_axis = sample.dims.index("time")
+    return TargetLayout(
+        chunks=source_chunks,
+        time_block=shard_shape(sample, shard_times)[time_axis],
+        compressor=compressor,
+        zarr_format=3,
+        shards=functools.partial(shard_shape, shard_times=shard_times),
+    )
+
+
+def convert(
+        source: str,
+        target: str,
+        variables: Optional[List[str]] = None,
+        shard_times: int = 4,
+        workers: int = 4,
+        compressor: Optional[str] = None,
+) -> Dict[str, int]:
+    """Bring the sharded v3 copy of a store up to date.
+
+    Args:
+        source: Source (v2) store path or URL
+        target: Target store path or URL
+        variables: Variables to copy (defaults to every time-dependent one)
+        shard_times: Base time chunks per shard
+        workers: Parallel worker processes
+        compressor: Compressor name (defaults to blosc-lz4)
+
+    Returns:
+        Dict with the number of units written and skipped and bytes copied
+
+    Raises:
+        ValueError: If the variables do not share their time chunking
+    """
+    ds = open_zarr_dataset(open_store(source), chunks=None)
+    names = variables or [name for name, var in ds.data_vars.items() if "time" in var.dims]
+    layouts = {sharded_layout(ds[name], shard_times).time_block for name in names}
+    if len(layouts) != 1:
+        raise ValueError(f"Variables {names} have different time chunks; convert them separately")
+    layout = sharded_layout(ds[names[0]], shard_times, compressor)
+    return copy_store(source, target, layout, names, workers)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Convert a zarr v2 store to a sharded zarr v3 store")
+    parser.add_argument("source", help="Source store path or URL")
+    parser.add_argument("target", help="Target store path or URL")
+    parser.add_argument("--variables", nargs="+", default=None)
+    parser.add_argument("--shard-times", type=int, default=4, help="Base time chunks per shard")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel worker processes")
+    parser.add_argument("--compressor", choices=COMPRESSORS, help="Compressor of the inner chunks")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the conversion tool."""
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    result = convert(
+        args.source, args.target, args.variables, args.shard_times, args.workers, args.compressor
+    )
+    print(
+        f"wrote {result['written']} units ({result['bytes'] / 1e6:.1f} MB), "
+        f"skipped {result['skipped']} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
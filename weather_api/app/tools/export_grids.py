@@ -0,0 +1,41 @@
+"""Export the shared coordinate grids before starting the server.
+
+Workers export the grids themselves on first use when none exist, but
+running this once at deploy time keeps zarr out of every worker's startup.
+
+Example:
+    python -m app.tools.export_grids --source /data/cerrora_example.zarr --output grid_cache
+"""
+import argparse
+import logging
+import os
+import time
+
+from app.config import settings
+from app.core.grids import SharedGrids, export_grids
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Export memory-mapped coordinate grids")
+    parser.add_argument("--source", default=settings.CERRORA_EXAMPLE_ZARR_PATH, help="Store with 2D lat/lon")
+    parser.add_argument("--output", default=settings.GRID_CACHE_DIR, help="Output directory")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the export tool."""
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    manifest = export_grids(args.source, args.output)
+    grids = SharedGrids(args.output)
+    nbytes = sum(os.path.getsize(os.path.join(args.output, f)) for f in manifest["files"].values())
+    print(
+        f"exported {', '.join(grids.arrays)} {tuple(grids.shape)} "
+        f"({nbytes / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Write a time-series-optimized copy of a forecast store.
+
+Every variable is rechunked to small spatial tiles spanning a block of base
+times and all lead times, so a point series reads a few small chunks instead
+of decompressing whole fields. Work is split into one unit per (variable,
+time block). Finished units are recorded in the target, so an interrupted
+run resumes where it stopped and a rerun after the source grew only writes
+the new (or previously partial) time blocks. The target's committed time
+extent (the ``committed_time`` attribute) only advances once the blocks
+before it are written; the loader reads times past it from the main store.
+
+Each unit holds one time block of one variable in memory:
+time_chunk x leads x levels x grid x itemsize bytes per worker.
+
+Example:
+    python -m app.tools.rechunk /data/cerrora.zarr /data/cerrora_ts.zarr --tile 32 --time-chunk 16 --workers 4
+
+Register the copy with ``TIMESERIES_ZARR_PATHS='{"cerrora": "/data/cerrora_ts.zarr"}'``.
+"""
+import argparse
+import functools
+import itertools
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fsspec
+import xarray as xr
+import zarr
+
+from app.core.storage import open_store, open_zarr_dataset
+from app.core.zarr_layout import COMMITTED_TIME_ATTR, COMPRESSORS, compressors_for
+
+logger = logging.getLogger("weather_api")
+
+PROGRESS_KEY = "rechunk_progress.json"
+
+# Encoding entries carried over from the source so raw values copy unchanged
+_KEPT_ENCODING = ("compressors", "filters", "serializer", "_FillValue", "dtype",
+                  "scale_factor", "add_offset", "units", "calendar")
+_KEPT_ENCODING_V3 = ("_FillValue", "dtype", "scale_factor", "add_offset", "units", "calendar")
+
+Unit = Tuple[str, int, int, int]  # (variable, block, start time, stop time)
+
+
+def timeseries_chunks(var: xr.DataArray, tile: int, time_chunk: int) -> Tuple[int, ...]:
+    """Chunk shape of a variable in the time-series layout.
+
+    Time is cut into blocks of ``time_chunk``, lead time is kept whole, other
+    leading dimensions (e.g. level) get one entry per chunk and the two
+    trailing spatial dimensions are cut into ``tile`` x ``tile`` tiles.
+    """
+    chunks = []
+    for axis, (dim, size) in enumerate(zip(var.dims, var.shape)):
+        if dim == "time":
+            chunks.append(min(time_chunk, size))
+        elif dim == "prediction_timedelta":
+            chunks.append(size)
+        elif axis >= var.ndim - 2:
+            chunks.append(min(tile, size))
+        else:
+            chunks.append(1)
+    return tuple(chunks)
+
+
+@dataclass
+class TargetLayout:
+    """Chunking and encoding of a copy's data variables."""
+
+    chunks: Callable[[xr.DataArray], Tuple[int, ...]]
+    # Base times per work unit; a multiple of the time chunk (or shard)
+    time_block: int
+    compressor: Optional[str] = None
+    zarr_format: int = 2
+    shards: Optional[Callable[[xr.DataArray], Optional[Tuple[int, ...]]]] = None
+
+    def encoding(self, var: xr.DataArray) -> dict:
+        kept = _KEPT_ENCODING if self.zarr_format == 2 else _KEPT_ENCODING_V3
+        encoding = {key: value for key, value in var.encoding.items() if key in kept}
+        encoding["chunks"] = self.chunks(var)
+        if self.shards is not None:
+            encoding["shards"] = self.shards(var)
+        if self.compressor or self.zarr_format == 3:
+            encoding["compressors"] = compressors_for(self.compressor or "blosc-lz4", self.zarr_format)
+        return encoding
+
+    def write_chunks(self, var: xr.DataArray) -> Tuple[int, ...]:
+        """Dask chunks for the template: whole shards where the layout shards."""
+        shards = self.shards(var) if self.shards is not None else None
+        return shards or self.chunks(var)
+
+
+def _source_dataset(source: str, variables: Optional[List[str]], zarr_format: int) -> xr.Dataset:
+    ds = open_zarr_dataset(open_store(source), chunks={})
+    names = variables or [name for name, var in ds.data_vars.items() if "time" in var.dims]
+    ds = ds[names]
+    # Coordinates are written eagerly; only data variables are deferred
+    ds = ds.assign_coords({name: ds[name].load() for name in ds.coords})
+    if zarr_format == 3:
+        # v2 codecs of the source coordinates do not carry over to a v3 target
+        for var in ds.coords.values():
+            var.encoding = {k: v for k, v in var.encoding.items() if k in _KEPT_ENCODING_V3}
+    return ds
+
+
+def _with_chunks(ds: xr.Dataset, layout: TargetLayout) -> xr.Dataset:
+    return ds.assign({
+        name: var.chunk(dict(zip(var.dims, layout.write_chunks(var))))
+        for name, var in ds.data_vars.items()
+    })
+
+
+def prepare_target(
+        source: str,
+        target: str,
+        variables: Optional[List[str]],
+        layout: TargetLayout,
+) -> xr.Dataset:
+    """Create the target's metadata and coordinates, or extend them along time.
+
+    Zarr only writes inside an array's shape, so the arrays are extended
+    before the new blocks are copied; the committed time extent written with
+    them still ends at the blocks already copied.
+
+    Args:
+        source: Source store path or URL
+        target: Target store path or URL
+        variables: Variables to copy (defaults to every time-dependent one)
+        layout: Chunking and encoding of the target
+
+    Returns:
+        xr.Dataset: The lazily opened source (restricted to the variables)
+    """
+    ds = _source_dataset(source, variables, layout.zarr_format)
+    store = open_store(target, read_only=False)
+    try:
+        existing = open_zarr_dataset(store, chunks=None)
+    except (FileNotFoundError, KeyError, ValueError):
+        existing = None
+
+    if existing is None:
+        encoding = {name: layout.encoding(var) for name, var in ds.data_vars.items()}
+        ds.attrs[COMMITTED_TIME_ATTR] = {name: 0 for name in ds.data_vars}
+        _with_chunks(ds, layout).to_zarr(
+            store, mode="w", compute=False, encoding=encoding, consolidated=True,
+            zarr_format=layout.zarr_format,
+        )
+        logger.info(f"Created {target} with {ds.sizes['time']} times")
+    elif ds.sizes["time"] > existing.sizes["time"]:
+        new = ds.isel(time=slice(existing.sizes["time"], None))
+        # Appending rewrites the root attributes; keep the extent already copied
+        new.attrs[COMMITTED_TIME_ATTR] = committed_times(load_progress(target), list(ds.data_vars), layout.time_block)
+        _with_chunks(new, layout).to_zarr(store, append_dim="time", compute=False, consolidated=True)
+        logger.info(f"Extended {target} by {new.sizes['time']} times")
+    return ds
+
+
+def committed_times(done: Dict[str, int], names: List[str], time_block: int) -> Dict[str, int]:
+    """Per variable, the time entries copied without a gap from the start."""
+    committed = {}
+    for name in names:
+        committed[name] = 0
+        for block in itertools.count():
+            stop = done.get(f"{name}/{block}")
+            if stop is None:
+                break
+            committed[name] = stop
+            if stop < (block + 1) * time_block:
+                break  # a partial last block; later blocks did not exist when it was copied
+    return committed
+
+
+def save_committed(target: str, done: Dict[str, int], names: List[str], time_block: int) -> None:
+    """Record the committed time extent in the target's (consolidated) root attributes."""
+    store = open_store(target, read_only=False)
+    group = zarr.open_group(store, mode="r+")
+    group.attrs[COMMITTED_TIME_ATTR] = committed_times(done, names, time_block)
+    zarr.consolidate_metadata(store)
+
+
+def plan_units(ds: xr.Dataset, time_block: int, done: Dict[str, int]) -> List[Unit]:
+    """Work units not yet written (or written before their block was full)."""
+    units = []
+    n_times = ds.sizes["time"]
+    for name in ds.data_vars:
+        for block, start in enumerate(range(0, n_times, time_block)):
+            stop = min(start + time_block, n_times)
+            if done.get(f"{name}/{block}") != stop:
+                units.append((name, block, start, stop))
+    return units
+
+
+def copy_unit(source: str, target: str, unit: Unit) -> int:
+    """Copy one time block of one variable; returns the bytes written."""
+    name, _, start, stop = unit
+    src = zarr.open_group(open_store(source), mode="r")[name]
+    dst = zarr.open_group(open_store(target, read_only=False), mode="r+")[name]
+    block = src[start:stop]
+    dst[start:stop] = block
+    return block.nbytes
+
+
+def load_progress(target: str) -> Dict[str, int]:
+    fs, root = fsspec.core.url_to_fs(target)
+    path = f"{root.rstrip('/')}/{PROGRESS_KEY}"
+    if not fs.exists(path):
+        return {}
+    return json.loads(fs.cat_file(path))
+
+
+def save_progress(target: str, done: Dict[str, int]) -> None:
+    fs, root = fsspec.core.url_to_fs(target)
+    fs.pipe_file(f"{root.rstrip('/')}/{PROGRESS_KEY}", json.dumps(done, sort_keys=True).encode())
+
+
+def copy_store(
+        source: str,
+        target: str,
+        layout: TargetLayout,
+        variables: Optional[List[str]] = None,
+        workers: int = 4,
+) -> Dict[str, int]:
+    """Bring a re-laid-out copy of a store up to date, resumably and in parallel.
+
+    Args:
+        source: Source store path or URL
+        target: Target store path or URL
+        layout: Chunking and encoding of the target
+        variables: Variables to copy (defaults to every time-dependent one)
+        workers: Parallel worker processes
+
+    Returns:
+        Dict with the number of units written and skipped and bytes copied
+    """
+    ds = prepare_target(source, target, variables, layout)
+    done = load_progress(target)
+    # Copies made before the extent was recorded get it before any unit rewrites them
+    save_committed(target, done, list(ds.data_vars), layout.time_block)
+    units = plan_units(ds, layout.time_block, done)
+    n_blocks = sum(-(-ds.sizes["time"] // layout.time_block) for _ in ds.data_vars)
+    logger.info(f"{len(units)} of {n_blocks} units to write")
+
+    written = 0
+    # Spawn: by now the parent runs zarr's and fsspec's IO threads, and forking a threaded
+    # process can copy locks those threads hold into the workers
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(workers, 1), mp_context=context) as pool:
+        futures = {pool.submit(copy_unit, source, target, unit): unit for unit in units}
+        for future in as_completed(futures):
+            name, block, _, stop = futures[future]
+            written += future.result()
+            done[f"{name}/{block}"] = stop
+            save_progress(target, done)
+            save_committed(target, done, list(ds.data_vars), layout.time_block)
+    return {"written": len(units), "skipped": n_blocks - len(units), "bytes": written}
+
+
+def rechunk(
+        source: str,
+        target: str,
+        variables: Optional[List[str]] = None,
+        tile: int = 32,
+        time_chunk: int = 16,
+        workers: int = 4,
+        compressor: Optional[str] = None,
+) -> Dict[str, int]:
+    """Bring the time-series copy of a store up to date.
+
+    Args:
+        source: Source store path or URL
+        target: Target store path or URL
+        variables: Variables to copy (defaults to every time-dependent one)
+        tile: Spatial tile size
+        time_chunk: Base times per chunk
+        workers: Parallel worker processes
+        compressor: Compressor name for a new target (defaults to the source's)
+
+    Returns:
+        Dict with the number of units written and skipped and bytes copied
+    """
+    layout = TargetLayout(
+        chunks=functools.partial(timeseries_chunks, tile=tile, time_chunk=time_chunk),
+        time_block=time_chunk,
+        compressor=compressor,
+    )
+    return copy_store(source, target, layout, variables, workers)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Write a time-series-optimized copy of a zarr store")
+    parser.add_argument("source", help="Source store path or URL")
+    parser.add_argument("target", help="Target store path or URL")
+    parser.add_argument("--variables", nargs="+", default=None)
+    parser.add_argument("--tile", type=int, default=32, help="Spatial tile size")
+    parser.add_argument("--time-chunk", type=int, default=16, help="Base times per chunk")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel worker processes")
+    parser.add_argument("--compressor", choices=COMPRESSORS, help="Compressor of a new target")
+    parser.add_argument(
+        "--recommendation",
+        help="JSON written by app.tools.bench_layout; sets tile, time chunk and compressor",
+    )
+    args = parser.parse_args()
+    if args.recommendation:
+        with open(args.recommendation) as f:
+            recommended = json.load(f)["rechunk"]
+        if recommended["tile"] == 0:
+            parser.error("The recommended layout keeps whole fields; no time-series copy is needed")
+        args.tile = recommended["tile"]
+        args.time_chunk = recommended["time_chunk"]
+        args.compressor = recommended["compressor"]
+    return args
+
+
+def main():
+    """Main entry point for the rechunk tool."""
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    result = rechunk(
+        args.source, args.target, args.variables, args.tile, args.time_chunk, args.workers, args.compressor
+    )
+    print(
+        f"wrote {result['written']} units ({result['bytes'] / 1e6:.1f} MB), "
+        f"skipped {result['skipped']} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
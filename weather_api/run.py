@@ -1,6 +1,7 @@
 import argparse
 import uvicorn
 from app.config import settings
+from app.prefork import PreforkServer
 import logging
 from app.utils.logger import setup_logger
 def parse_args():
@@ -18,6 +19,24 @@ def parse_args():
         default=settings.RELOAD,
         help="Enable auto-reload",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes; more than one starts the pre-fork server",
+    )
+    parser.add_argument(
+        "--preload",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Use the pre-fork server (also with one worker) and load shared state before forking",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Write the pre-fork startup time and worker memory as JSON to this file",
+    )
     parser.add_argument(
         "--log-level",
         type=str,
@@ -43,6 +62,19 @@ def main():
     logger = setup_logger(args.log_level)
     logger.info(f"Starting server on {args.host}:{args.port}")
 
+    if args.workers > 1 or args.preload is not None:
+        if args.reload:
+            raise SystemExit("--reload cannot be combined with the pre-fork server")
+        PreforkServer(
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            preload=args.preload is not False,
+            log_level=args.log_level.lower(),
+            report_path=args.report,
+        ).run()
+        return
+
     uvicorn.run(
         "app.main:app",
         host=args.host,
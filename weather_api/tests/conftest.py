@@ -9,4 +9,117 @@ sys.path.insert(0, project_root)
 # Set test environment variables
 os.environ["TESTING"] = "True"
 os.environ["GCS_PROJECT"] = "test-project"
-os.environ["ZARR_PATH"] = "test-path"
\ No newline at end of file
+os.environ["ZARR_PATH"] = "test-path"
+
+# Settings requires the store paths to be defined
+for _name in (
+    "GRAPHCAST_ZARR_PATH",
+    "GRAPHCAST_INTERPOLATED_ZARR_PATH",
+    "CERRORA_EXAMPLE_ZARR_PATH",
+    "CERRORA_GT_ZARR_PATH",
+    "CERRORA_ZARR_PATH",
+    "EXPERIMENTAL_ZARR_PATH",
+):
+    os.environ.setdefault(_name, "test-path")
+os.environ.setdefault("CORS_ORIGINS", '["*"]')
+# Tests that use the shared memory hot field store enable it themselves
+os.environ.setdefault("HOT_FIELDS_ENABLED", "false")
+
+# Imported once the environment above is set: Settings reads it on import
+import geopandas as gpd  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+import shapely  # noqa: E402
+import xarray as xr  # noqa: E402
+
+from app.api import routes  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.core import geometry, grids, metrics, regions  # noqa: E402
+
+
+def epoch(timestamp: str) -> int:
+    return int(pd.Timestamp(timestamp).timestamp())
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    """Write a store with a pressure-level variable and a packed integer one."""
+    times = pd.date_range("2021-01-01", periods=3, freq="12h")
+    leads = pd.to_timedelta([6, 12, 18], unit="h")
+    levels = [500, 850]
+    shape = (len(times), len(leads), 6, 5)
+    z = np.random.rand(len(times), len(leads), len(levels), 6, 5).astype("float32")
+    msl = 95000.0 + 0.5 * np.random.randint(0, 1000, size=shape)
+    msl[0, 0, 0, 0] = np.nan
+    ds = xr.Dataset(
+        {
+            "z": (("time", "prediction_timedelta", "level", "y", "x"), z),
+            "msl": (("time", "prediction_timedelta", "y", "x"), msl),
+        },
+        coords={"time": times, "prediction_timedelta": leads, "level": levels, "y": np.arange(6)},
+    )
+    ds["msl"].encoding = {"scale_factor": 0.5, "add_offset": 95000.0, "_FillValue": -1, "dtype": "int16"}
+    path = str(tmp_path / "store.zarr")
+    ds.to_zarr(path, mode="w", zarr_format=2, consolidated=True)
+    return path
+
+
+@pytest.fixture
+def boundaries(tmp_path, monkeypatch):
+    """Serve three box-shaped countries with Natural Earth columns, France without ISO_A2."""
+    frame = gpd.GeoDataFrame(
+        {
+            "NAME": ["France", "Germany", "Denmark"],
+            "NAME_LONG": ["French Republic", "Federal Republic of Germany", "Kingdom of Denmark"],
+            "ISO_A2": ["-99", "DE", "DK"],
+            "ISO_A2_EH": ["FR", "DE", "DK"],
+            "ISO_A3": ["-99", "DEU", "DNK"],
+            "geometry": [shapely.box(-5, 42, 8, 51), shapely.box(6, 47, 15, 55), shapely.box(8, 54.5, 13, 58)],
+        },
+        crs="EPSG:4326",
+    )
+    path = str(tmp_path / "countries.geojson")
+    frame.to_file(path, driver="GeoJSON")
+    monkeypatch.setattr(settings, "COUNTRY_BOUNDARIES_PATH", path)
+    geometry.reset_country_geometries()
+    yield geometry.country_geometries()
+    geometry.reset_country_geometries()
+
+
+@pytest.fixture
+def region_stores(tmp_path, monkeypatch, boundaries):
+    """Serve a Cerrora forecast (stored upside down) and ground truth on a 2 degree lat/lon grid."""
+    lat, lon = np.meshgrid(np.linspace(40, 60, 11), np.linspace(-10, 30, 21), indexing="ij")
+    coords = {"latitude": (("y", "x"), lat), "longitude": (("y", "x"), lon)}
+    times = pd.date_range("2021-01-01", periods=3, freq="6h")
+    rng = np.random.default_rng(0)
+    fields = lambda *shape: (("time",) + (("prediction_timedelta",) if len(shape) == 4 else ()) + ("y", "x"),
+                             rng.random(shape, dtype="float32"))
+    forecast = xr.Dataset(
+        {name: fields(3, 2, 11, 21) for name in ("t2m", "10u", "10v", "tp")},
+        coords={"time": times, "prediction_timedelta": pd.to_timedelta([6, 12], unit="h"), **coords},
+    )
+    forecast["tp"][0, 0, 0, 0] = np.nan
+    truth = xr.Dataset({name: fields(3, 11, 21) for name in ("t2m", "10u", "10v")}, coords={"time": times, **coords})
+    forecast_path, truth_path = str(tmp_path / "forecast.zarr"), str(tmp_path / "truth.zarr")
+    forecast.to_zarr(forecast_path, mode="w", zarr_format=2, consolidated=True)
+    truth.to_zarr(truth_path, mode="w", zarr_format=2, consolidated=True)
+    monkeypatch.setattr(routes.cerrora_loader.settings, "zarr_path", forecast_path)
+    monkeypatch.setattr(routes.cerrora_gt_loader.settings, "zarr_path", truth_path)
+    monkeypatch.setattr(settings, "GRID_CACHE_DIR", str(tmp_path / "grids"))
+    monkeypatch.setattr(settings, "CERRORA_EXAMPLE_ZARR_PATH", forecast_path)
+    grids.reset_shared_grids()
+    regions.reset_regions()
+    yield forecast, truth, lat, lon
+    grids.reset_shared_grids()
+    regions.reset_regions()
+
+
+@pytest.fixture
+def metric_stores(region_stores, tmp_path, monkeypatch):
+    """Region stores with a fresh metrics engine and climatology cache."""
+    monkeypatch.setattr(settings, "METRICS_CACHE_DIR", str(tmp_path / "metrics"))
+    monkeypatch.setattr(metrics, "_climatologies", {})
+    monkeypatch.setattr(metrics, "_engine", None)
+    return region_stores
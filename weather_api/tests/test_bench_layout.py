@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from app.tools.bench_layout import Candidate, default_patterns, recommendation, run
+from app.tools.rechunk import rechunk
+
+
+def test_benchmark_ranks_candidates():
+    """Test that every candidate is measured and ranked by weighted latency."""
+    rng = np.random.default_rng(0)
+    sample = (280 + 10 * rng.random((2, 3, 40, 40))).astype("float32")
+    dims = ("time", "prediction_timedelta", "y", "x")
+    patterns = default_patterns(dims, sample.shape)
+    candidates = [
+        Candidate(0, 1, "blosc-lz4"),
+        Candidate(16, 2, "zstd-3", shards="field"),
+        Candidate(16, 2, "none", dtype="int16"),
+    ]
+
+    results = run(sample, dims, candidates, patterns, repeats=1)
+    assert {r.candidate for r in results} == set(candidates)
+    weighted = [r.weighted_seconds(patterns) for r in results]
+    assert weighted == sorted(weighted)
+    for result in results:
+        assert set(result.seconds) == {"frame", "point_leads", "point_series", "region"}
+        assert result.nbytes > 0
+    packed = next(r for r in results if r.candidate.dtype == "int16")
+    assert 0 < packed.max_error < 1e-3
+
+    best = recommendation(results[0], patterns)
+    assert best["rechunk"]["compressor"] == results[0].candidate.compressor
+    json.dumps(best)
+
+
+def test_rechunk_applies_compressor(tmp_path):
+    """Test that a recommended compressor is used for a new time-series copy."""
+    source = str(tmp_path / "source.zarr")
+    target = str(tmp_path / "target.zarr")
+    xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), np.ones((2, 2, 8, 8), "float32"))},
+        coords={"time": pd.date_range("2021-01-01", periods=2), "prediction_timedelta": pd.to_timedelta([6, 12], unit="h")},
+    ).to_zarr(source, zarr_format=2, consolidated=True)
+
+    rechunk(source, target, tile=4, time_chunk=2, workers=1, compressor="zstd-3")
+    with open(f"{target}/t2m/.zarray") as f:
+        assert json.load(f)["compressor"]["id"] == "zstd"
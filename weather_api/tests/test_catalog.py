@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from zarr.storage import LocalStore, WrapperStore
+
+from app.core.catalog import CatalogService, StoreCatalog, catalog_service
+from app.core.d_loader import DataLoader
+
+
+class RecordingStore(WrapperStore):
+    """Local store that records every key read."""
+
+    def __init__(self, store):
+        super().__init__(store)
+        self.keys = []
+
+    def _with_store(self, store):
+        return type(self)(store)
+
+    async def get(self, key, prototype, byte_range=None):
+        self.keys.append(key)
+        return await self._store.get(key, prototype, byte_range)
+
+
+def forecast_dataset(periods=4):
+    times = pd.date_range("2021-01-01", periods=periods, freq="12h")
+    leads = pd.to_timedelta([6, 12, 18, 24, 30], unit="h")
+    data = np.random.rand(len(times), len(leads), 4, 4).astype("float32")
+    return xr.Dataset(
+        {"2m_temperature": (("time", "prediction_timedelta", "y", "x"), data)},
+        coords={"time": times, "prediction_timedelta": leads},
+    )
+
+
+@pytest.fixture
+def forecast_store_path(tmp_path):
+    path = str(tmp_path / "store.zarr")
+    forecast_dataset().to_zarr(path, mode="w", zarr_format=2, consolidated=True)
+    return path
+
+
+def test_catalog_reads_no_data_chunks(forecast_store_path):
+    """Test that building the catalog only touches metadata and coordinates."""
+    store = RecordingStore(LocalStore(forecast_store_path, read_only=True))
+    catalog = StoreCatalog.from_store(forecast_store_path, store)
+
+    assert not any(key.startswith("2m_temperature/") for key in store.keys)
+    assert catalog.variables["2m_temperature"].shape == (4, 5, 4, 4)
+    assert catalog.variables["2m_temperature"].dims[:2] == ("time", "prediction_timedelta")
+    np.testing.assert_array_equal(catalog.leads / 3600, [6, 12, 18, 24, 30])
+
+
+def test_time_entries(forecast_store_path):
+    """Test labels and values of base times, and misses."""
+    catalog = StoreCatalog.from_store(forecast_store_path, LocalStore(forecast_store_path, read_only=True))
+    times = pd.date_range("2021-01-01", "2021-01-02", freq="12h")
+
+    entries = catalog.time_entries(times)
+    assert entries[0] == {"label": "Fri 01 Jan 2021 00 UTC", "value": "1609459200"}
+    assert len(entries) == 3
+
+    with pytest.raises(KeyError):
+        catalog.time_entries(pd.date_range("2021-01-01", "2021-01-03", freq="12h"))
+    with pytest.raises(KeyError):
+        catalog.require_variables(["geopotential"])
+    with pytest.raises(KeyError):
+        catalog.require_leads([np.timedelta64(36, "h")])
+    catalog.require_leads([np.timedelta64(h, "h") for h in range(6, 31, 6)])
+
+
+def test_catalog_refreshes_on_fingerprint_change(forecast_store_path):
+    """Test that a catalog is cached until the store's metadata changes."""
+    service = CatalogService(refresh_seconds=0)
+    store = LocalStore(forecast_store_path, read_only=True)
+    first = service.get(forecast_store_path, store)
+    assert service.get(forecast_store_path, store) is first
+
+    forecast_dataset(periods=6).isel(time=slice(4, 6)).to_zarr(
+        forecast_store_path, append_dim="time", zarr_format=2, consolidated=True
+    )
+    second = service.get(forecast_store_path, store)
+    assert second is not first
+    assert len(second.times) == 6
+
+
+def test_data_loader_catalog_reopens_changed_dataset(forecast_store_path):
+    """Test that the loader drops its dataset when the store changes."""
+    loader = DataLoader("cerrora")
+    loader.settings.zarr_path = forecast_store_path
+
+    assert len(loader.catalog.times) == 4
+    assert loader.dataset.sizes["time"] == 4
+
+    forecast_dataset(periods=6).isel(time=slice(4, 6)).to_zarr(
+        forecast_store_path, append_dim="time", zarr_format=2, consolidated=True
+    )
+    catalog_service.invalidate(forecast_store_path)
+    assert len(loader.catalog.times) == 6
+    assert loader.dataset.sizes["time"] == 6
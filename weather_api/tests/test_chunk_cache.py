@@ -0,0 +1,151 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+import fsspec
+from zarr.storage import FsspecStore
+
+from app.core.chunk_cache import ORPHAN_GRACE_SECONDS, CachedStore, DiskChunkTier, MemoryChunkTier
+
+
+@pytest.fixture
+def remote_store_path(tmp_path):
+    """Write a small v2 store that stands in for the GCS bucket."""
+    times = pd.date_range("2021-01-01", periods=3, freq="12h")
+    deltas = pd.to_timedelta([6, 12], unit="h")
+    data = np.random.rand(len(times), len(deltas), 16, 16).astype("float32")
+    ds = xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), data)},
+        coords={"time": times, "prediction_timedelta": deltas},
+    )
+    path = str(tmp_path / "remote.zarr")
+    ds.to_zarr(
+        path,
+        mode="w",
+        zarr_format=2,
+        consolidated=True,
+        encoding={"t2m": {"chunks": (1, 1, 16, 16)}},
+    )
+    return path
+
+
+def open_cached(path, cache_dir, memory_bytes=1 << 20, disk_bytes=1 << 20):
+    store = FsspecStore.from_mapper(fsspec.get_mapper(path), read_only=True)
+    cached = CachedStore(
+        store,
+        cache_dir=str(cache_dir),
+        memory_bytes=memory_bytes,
+        disk_bytes=disk_bytes,
+        namespace="test",
+    )
+    return cached, xr.open_zarr(cached, consolidated=True)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    """Test that the RAM tier stays under its byte cap."""
+    tier = MemoryChunkTier(max_bytes=10)
+    tier.put("a", b"xxxx")
+    tier.put("b", b"xxxx")
+    assert tier.get("a") == b"xxxx"
+    tier.put("c", b"xxxx")
+
+    assert tier.get("b") is None
+    assert tier.get("a") is not None
+    assert tier.nbytes == 8
+
+
+def test_disk_tier_evicts_and_persists_index(tmp_path):
+    """Test disk eviction and that the index survives a restart."""
+    tier = DiskChunkTier(str(tmp_path), max_bytes=3 * 400, flush_every=1)
+    for i in range(4):
+        tier.put(f"chunk/{i}", np.full(100, i, dtype="float32"))
+
+    assert len(tier) == 3
+    assert "chunk/0" not in tier
+
+    reopened = DiskChunkTier(str(tmp_path), max_bytes=3 * 400)
+    assert len(reopened) == 3
+    cached = reopened.get("chunk/3")
+    assert isinstance(cached, np.memmap)
+    assert np.all(cached == 3)
+
+
+def test_disk_tier_merges_indexes_of_processes_and_sweeps_orphans(tmp_path):
+    """Test that workers sharing a directory keep each other's entries and that unreferenced files are swept."""
+    first = DiskChunkTier(str(tmp_path), max_bytes=1 << 20)
+    second = DiskChunkTier(str(tmp_path), max_bytes=1 << 20)
+    first.put("chunk/a", np.zeros(10, dtype="float32"))
+    second.put("chunk/b", np.ones(10, dtype="float32"))
+    first.flush()
+    second.flush()
+    first.discard("chunk/a")
+    first.flush()
+    assert set(DiskChunkTier(str(tmp_path), max_bytes=1 << 20)._index) == {"chunk/b"}
+
+    orphan = tmp_path / "0123.npy"
+    orphan.write_bytes(b"left by a crashed worker")
+    recent = tmp_path / "4567.npy"
+    recent.write_bytes(b"not flushed yet")
+    old = time.time() - ORPHAN_GRACE_SECONDS - 1
+    os.utime(orphan, (old, old))
+    reopened = DiskChunkTier(str(tmp_path), max_bytes=1 << 20)
+    assert not orphan.exists() and recent.exists()
+    assert np.all(reopened.get("chunk/b") == 1)
+
+
+def test_cached_store_matches_source(remote_store_path, tmp_path):
+    """Test that data read through the cache is identical to the source."""
+    expected = xr.open_zarr(remote_store_path).t2m.values
+    cached, ds = open_cached(remote_store_path, tmp_path / "cache")
+
+    np.testing.assert_array_equal(ds.t2m.values, expected)
+    # Six t2m chunks plus the time and prediction_timedelta coordinates
+    assert cached.hits["miss"] == 8
+    assert len(cached.disk) == 8
+
+
+def test_cached_store_serves_from_disk_after_restart(remote_store_path, tmp_path):
+    """Test that a new process reads chunks from the disk tier."""
+    cached, ds = open_cached(remote_store_path, tmp_path / "cache")
+    expected = ds.t2m.values
+    cached.close()
+
+    restarted, ds = open_cached(remote_store_path, tmp_path / "cache")
+    np.testing.assert_array_equal(ds.t2m.values, expected)
+    assert restarted.hits["miss"] == 0
+    assert restarted.hits["disk"] == 8
+
+    # A second read is answered by the RAM tier, which holds views of the memory maps
+    ds.t2m.values
+    assert restarted.hits["disk"] == 8
+    assert restarted.hits["memory"] >= 6
+    assert isinstance(restarted.memory.get("t2m/0.0.0.0").base, np.memmap)
+
+
+def test_cached_store_drops_chunks_of_a_rewritten_store(remote_store_path, tmp_path):
+    """Test that chunks cached for an older version of the store are never served."""
+    cached, ds = open_cached(remote_store_path, tmp_path / "cache")
+    ds.t2m.values
+    stale = cached.disk.directory
+
+    rewritten = xr.open_zarr(remote_store_path).load()
+    rewritten["t2m"] = rewritten.t2m + 1
+    rewritten.attrs["version"] = 2
+    rewritten.to_zarr(remote_store_path, mode="w", zarr_format=2, consolidated=True)
+    ds = xr.open_zarr(cached, consolidated=True)
+    np.testing.assert_array_equal(ds.t2m.values, rewritten.t2m.values)
+    assert cached.disk.directory != stale and not os.path.exists(stale)
+
+
+def test_cached_store_serves_uncompressed_metadata(remote_store_path, tmp_path):
+    """Test that served v2 metadata no longer declares a compressor."""
+    cached, ds = open_cached(remote_store_path, tmp_path / "cache")
+    assert ds.t2m.encoding.get("compressor") is None
+
+    ds.t2m.values
+    cached.close()
+    assert cached.disk.directory.startswith(str(tmp_path / "cache" / "test"))
+    assert os.path.exists(os.path.join(cached.disk.directory, DiskChunkTier.INDEX_FILE))
@@ -0,0 +1,69 @@
+import os
+
+import fsspec
+import numpy as np
+import pytest
+import xarray as xr
+import zarr
+from zarr.storage import FsspecStore
+
+from app.core.chunk_cache import CachedStore
+from app.core.d_loader import DataLoader
+from app.tools.convert_v3 import convert
+from tests.conftest import epoch
+from tests.test_rechunk import write_source
+
+
+@pytest.fixture
+def converted(tmp_path):
+    source = str(tmp_path / "source.zarr")
+    target = str(tmp_path / "sharded.zarr")
+    write_source(source, 6)
+    result = convert(source, target, shard_times=4, workers=2)
+    assert result["written"] == 2
+    return source, target
+
+
+def test_conversion_packs_chunks_into_shards(converted):
+    """Test that the copy keeps inner chunks, packs them into shards and resumes."""
+    source, target = converted
+    array = zarr.open_group(target, mode="r")["t2m"]
+    assert array.metadata.zarr_format == 3
+    assert (array.chunks, array.shards) == ((1, 1, 16, 16), (4, 3, 16, 16))
+    # Two shard files instead of eighteen chunk files
+    assert len(os.listdir(os.path.join(target, "t2m", "c"))) == 2
+    xr.testing.assert_equal(xr.open_zarr(target).t2m, xr.open_zarr(source).t2m)
+
+    assert convert(source, target, shard_times=4, workers=1)["written"] == 0
+    write_source(source, 10)
+    assert convert(source, target, shard_times=4, workers=1) == {"written": 2, "skipped": 1, "bytes": 6 * 3 * 16 * 16 * 4}
+    xr.testing.assert_equal(xr.open_zarr(target).t2m, xr.open_zarr(source).t2m)
+
+
+def test_loader_reads_sharded_store(converted):
+    """Test that frames and point series decode the same from a sharded store."""
+    source, target = converted
+    loader = DataLoader("cerrora")
+    loader.settings.zarr_path = target
+    expected = xr.open_zarr(source).t2m.values
+
+    frame = loader.get_frame("t2m", epoch("2021-01-02"), epoch("2021-01-02T12:00"))
+    np.testing.assert_array_equal(frame.values, expected[2, 1])
+    series = loader.read_indexed("t2m", {"time": slice(0, 6), "y": 3, "x": 5})
+    np.testing.assert_array_equal(series, expected[:, :, 3, 5])
+
+
+def test_cached_store_caches_shard_reads(converted, tmp_path):
+    """Test that shard index (suffix) and inner chunk (range) reads hit the cache."""
+    _, target = converted
+    store = FsspecStore.from_mapper(fsspec.get_mapper(target), read_only=True)
+    cached = CachedStore(
+        store, cache_dir=str(tmp_path / "cache"), memory_bytes=1 << 20, disk_bytes=1 << 20, namespace="test"
+    )
+    array = zarr.open_group(cached, mode="r")["t2m"]
+
+    first = array[1, 2]
+    misses = cached.hits["miss"]
+    assert misses >= 2
+    np.testing.assert_array_equal(array[1, 2], first)
+    assert cached.hits["miss"] == misses
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+import xarray as xr
+import zarr
+
+from app.core.d_loader import DataLoader
+from app.core.direct_read import read_selection
+from tests.conftest import epoch
+
+
+def test_direct_frame_matches_xarray(store_path):
+    """Test that direct reads decode exactly like xarray's lazy selection."""
+    loader = DataLoader("cerrora")
+    loader.settings.zarr_path = store_path
+    expected = xr.open_zarr(store_path)
+    base, valid = epoch("2021-01-01T12:00"), epoch("2021-01-02T06:00")
+
+    frame = loader.get_frame("z", base, valid)
+    assert frame.dims == ("level", "y", "x")
+    np.testing.assert_array_equal(
+        frame.sel(level=500).values,
+        expected.z.isel(time=1, prediction_timedelta=2).sel(level=500).values,
+    )
+    np.testing.assert_allclose(
+        loader.read_frame("msl", epoch("2021-01-01"), epoch("2021-01-01T06:00")),
+        expected.msl.isel(time=0, prediction_timedelta=0).values,
+    )
+    assert np.isnan(loader.get_frame("msl", epoch("2021-01-01"), epoch("2021-01-01T06:00")).values[0, 0])
+
+
+def test_read_into_preallocated_buffer(store_path):
+    """Test that reads fill the caller's buffer and reject a mismatched one."""
+    array = zarr.open_group(store_path, mode="r")["z"]
+    dims = ("time", "prediction_timedelta", "level", "y", "x")
+    out = np.empty((6, 5), dtype="float32")
+
+    result = read_selection(array, dims, {"time": 2, "prediction_timedelta": 1, "level": 1}, out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, xr.open_zarr(store_path).z.values[2, 1, 1])
+
+    with pytest.raises(ValueError):
+        read_selection(array, dims, {"time": 2}, out=out)
+    with pytest.raises(KeyError):
+        read_selection(array, dims, {"member": 0})
+
+
+def test_v3_default_fill_value_is_not_masked(tmp_path):
+    """Test that real zeros of v3 arrays without _FillValue stay values, as in xarray."""
+    group = zarr.open_group(str(tmp_path / "v3.zarr"), mode="w", zarr_format=3)
+    values = np.arange(16, dtype="float32").reshape(4, 4)
+    values[1:] = 0.0
+    field = group.create_array("field", shape=(4, 4), chunks=(2, 2), dtype="float32", dimension_names=("y", "x"))
+    field[:] = values
+    mask = group.create_array("mask", shape=(4, 4), chunks=(2, 2), dtype="int8", dimension_names=("y", "x"))
+    mask[:] = values > 0
+
+    np.testing.assert_array_equal(read_selection(field, ("y", "x"), {}), values)
+    decoded = read_selection(mask, ("y", "x"), {})
+    assert decoded.dtype == np.int8
+    np.testing.assert_array_equal(decoded, values > 0)
+    np.testing.assert_array_equal(xr.open_zarr(str(tmp_path / "v3.zarr"), consolidated=False).field.values, values)
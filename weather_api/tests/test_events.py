@@ -0,0 +1,94 @@
+import io
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.config import settings
+from app.core import events, metrics
+from app.core.Utility.Utilities import get_bbox_region
+from app.main import app
+from tests.conftest import epoch
+
+client = TestClient(app)
+URL = f"{settings.API_V1_STR}/events"
+
+
+@pytest.fixture
+def event_stores(region_stores, tmp_path, monkeypatch):
+    """Region stores with an events dataset: one event on the grid, one off it."""
+    dataset = {
+        "202101-storm": {
+            "type": ["windstorm", "heatwave", "rainfall"], "description": "Storm", "start_time": "2021-01-01",
+            "end_time": "2021-01-01", "lat_slice": [45, 56], "lon_slice": [0, 20], "location": ["Germany"],
+        },
+        "202101-japan": {
+            "type": ["rainfall"], "description": "Rain", "start_time": "2021-01-01", "end_time": "2021-01-01",
+            "lat_slice": [30, 40], "lon_slice": [126, 142], "location": ["Japan"],
+        },
+    }
+    path = tmp_path / "events.json"
+    path.write_text(json.dumps(dataset))
+    monkeypatch.setattr(settings, "EXTREME_EVENTS_PATH", str(path))
+    monkeypatch.setattr(settings, "EVENT_BUNDLE_DIR", str(tmp_path / "bundles"))
+    monkeypatch.setattr(settings, "METRICS_CACHE_DIR", str(tmp_path / "metrics"))
+    monkeypatch.setattr(metrics, "_climatologies", {})
+    monkeypatch.setattr(metrics, "_engine", None)
+    return region_stores
+
+
+def test_bundle_holds_fields_stats_frames_and_metrics(event_stores):
+    """Test the bundle's cropped fields, statistics, peaks, scores and frames against direct computations."""
+    forecast, truth, lat, lon = event_stores
+    event = events.load_events()["202101-storm"]
+    assert event.variables == ["10u", "10v", "wind_speed", "t2m", "tp"]
+    sources = {"cerrora": routes.cerrora_loader, "ground_truth": routes.cerrora_gt_loader}
+    assert not events.bundle_is_current(event, sources)
+    events.build_event_bundle(event, {"cerrora": routes.cerrora_loader}, routes.cerrora_gt_loader)
+    assert events.bundle_is_current(event, sources)
+
+    bundle = client.get(f"{URL}/202101-storm").json()
+    region = get_bbox_region(45, 0, 56, 20)
+    assert bundle["covered"] and bundle["region"]["cells"] == region.cells
+    assert bundle["sources"]["cerrora"] == {
+        "base_time": epoch("2021-01-01"), "valid_times": [epoch("2021-01-01T06:00"), epoch("2021-01-01T12:00")],
+    }
+    # The ground truth store has no precipitation
+    assert "tp" in bundle["fields"]["cerrora"] and "tp" not in bundle["fields"]["ground_truth"]
+
+    rows, cols = slice(*region.rows), slice(*region.cols)
+    response = client.get(f"{URL}/202101-storm/{bundle['fields']['cerrora']['t2m']}")
+    fields = np.load(io.BytesIO(response.content))
+    expected = forecast.t2m.values[0, :, ::-1, :][:, rows, cols]
+    np.testing.assert_array_equal(fields, expected)
+    latitude = np.load(io.BytesIO(client.get(f"{URL}/202101-storm/fields/latitude.npy").content))
+    np.testing.assert_array_equal(latitude, lat[rows, cols])
+
+    speed = np.hypot(truth["10u"].values, truth["10v"].values)[:, rows, cols]
+    stats = bundle["stats"]["ground_truth"]["wind_speed"]
+    np.testing.assert_allclose(stats["mean"], region.reduce(speed, "mean"), rtol=1e-6)
+    peak = bundle["peaks"]["ground_truth"]["wind_speed"]
+    assert peak["value"] == pytest.approx(max(stats["max"])) and peak["units"] == "m/s"
+    t2m = bundle["peaks"]["cerrora"]["t2m"]
+    assert t2m["units"] == "°C" and t2m["display"] == pytest.approx(t2m["value"] - 273.15)
+    assert bundle["metrics"]["cerrora"]["t2m"]["base_times"] == 3
+    assert set(bundle["metrics"]["cerrora"]) == {"10u", "10v", "t2m"}
+
+    frame = client.get(f"{URL}/202101-storm/{bundle['frames']['ground_truth']['t2m'][0]}")
+    assert frame.status_code == 200 and frame.headers["content-type"] == "image/webp"
+    assert len(bundle["frames"]["cerrora"]["wind_speed"]) == 2
+
+
+def test_events_outside_the_grid_and_missing_bundles(event_stores):
+    """Test that an off-grid event gets an empty bundle and that the routes 404 on what is missing."""
+    assert client.get(f"{URL}/202101-japan").status_code == 404
+    event = events.load_events()["202101-japan"]
+    events.build_event_bundle(event, {"cerrora": routes.cerrora_loader}, routes.cerrora_gt_loader)
+    listing = client.get(URL).json()
+    assert listing["202101-japan"]["bundled"] and not listing["202101-storm"]["bundled"]
+    bundle = client.get(f"{URL}/202101-japan").json()
+    assert not bundle["covered"] and bundle["fields"] == {} and bundle["metrics"] == {}
+    assert client.get(f"{URL}/202101-japan/fields/latitude.npy").status_code == 404
+    assert client.get(f"{URL}/nope").status_code == 404
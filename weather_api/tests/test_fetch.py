@@ -0,0 +1,114 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from zarr.storage import LocalStore, WrapperStore
+
+from app.core.chunk_cache import CachedStore
+from app.core.fetch import ConcurrentFetchStore
+
+
+class SlowStore(WrapperStore):
+    """Local store that sleeps on every read and tracks requests in flight."""
+
+    def __init__(self, store, delay=0.01):
+        super().__init__(store)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.keys = []
+
+    def _with_store(self, store):
+        return type(self)(store, delay=self.delay)
+
+    async def get(self, key, prototype, byte_range=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.keys.append(key)
+        try:
+            await asyncio.sleep(self.delay)
+            return await self._store.get(key, prototype, byte_range)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def field_store_path(tmp_path):
+    """Write a store with one chunk per (time, lead) field."""
+    times = pd.date_range("2021-01-01", periods=2, freq="12h")
+    leads = pd.to_timedelta([6, 12, 18, 24, 30], unit="h")
+    data = np.random.rand(len(times), len(leads), 8, 8).astype("float32")
+    ds = xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), data)},
+        coords={"time": times, "prediction_timedelta": leads},
+    )
+    path = str(tmp_path / "store.zarr")
+    ds.to_zarr(
+        path,
+        mode="w",
+        zarr_format=2,
+        consolidated=True,
+        encoding={"t2m": {"chunks": (1, 1, 8, 8)}},
+    )
+    return path
+
+
+def test_concurrency_is_bounded(field_store_path):
+    """Test that no more than `concurrency` reads are in flight."""
+    slow = SlowStore(LocalStore(field_store_path, read_only=True))
+    store = ConcurrentFetchStore(slow, concurrency=2)
+    ds = xr.open_zarr(store, consolidated=True)
+
+    expected = xr.open_zarr(field_store_path).t2m.values
+    np.testing.assert_array_equal(ds.t2m.values, expected)
+    assert 1 <= slow.max_in_flight <= 2
+
+
+def test_prefetches_along_lead_time(field_store_path):
+    """Test that reading one lead time prefetches the following ones."""
+    slow = SlowStore(LocalStore(field_store_path, read_only=True))
+    store = ConcurrentFetchStore(slow, concurrency=8, prefetch_window=2)
+    ds = xr.open_zarr(store, consolidated=True, chunks=None)
+
+    ds.t2m.isel(time=1, prediction_timedelta=0).values
+    assert store.stats["prefetched"] == 2
+    assert "t2m/1.1.0.0" in slow.keys
+
+    for lead in range(1, 5):
+        np.testing.assert_array_equal(
+            ds.t2m.isel(time=1, prediction_timedelta=lead).values,
+            xr.open_zarr(field_store_path).t2m.isel(time=1, prediction_timedelta=lead).values,
+        )
+    assert store.stats["prefetch_hits"] == 4
+    # Every lead time was requested from the slow store exactly once
+    assert sum(key.startswith("t2m/1.") for key in slow.keys) == 5
+
+
+def test_prefetch_goes_through_the_chunk_cache(field_store_path, tmp_path):
+    """Test that read-ahead under a cache fills the cache and skips chunks it already holds."""
+    def open_cached():
+        slow = SlowStore(LocalStore(field_store_path, read_only=True))
+        fetch = ConcurrentFetchStore(slow, concurrency=8, prefetch_window=2)
+        cached = CachedStore(fetch, cache_dir=str(tmp_path / "cache"), memory_bytes=1 << 20,
+                             disk_bytes=1 << 20, namespace="test")
+        return slow, fetch, cached, xr.open_zarr(cached, consolidated=True, chunks=None)
+
+    slow, fetch, cached, ds = open_cached()
+    expected = xr.open_zarr(field_store_path).t2m.isel(time=1).values
+    for lead in range(5):
+        np.testing.assert_array_equal(ds.t2m.isel(time=1, prediction_timedelta=lead).values, expected[lead])
+    assert fetch.stats["prefetched"] >= 4
+    # Read ahead or not, every chunk was fetched once and went to the disk tier
+    assert sum(key.startswith("t2m/1.") for key in slow.keys) == 5
+    assert all(f"t2m/1.{lead}.0.0" in cached.disk for lead in range(5))
+    cached.disk.discard("t2m/1.0.0.0")
+    cached.close()
+
+    # Restarted: the first lead is fetched, but its read-ahead finds the next ones on disk
+    slow, fetch, cached, ds = open_cached()
+    for lead in range(5):
+        np.testing.assert_array_equal(ds.t2m.isel(time=1, prediction_timedelta=lead).values, expected[lead])
+    assert [key for key in slow.keys if key.startswith("t2m/1.")] == ["t2m/1.0.0.0"]
+    assert cached.hits["miss"] == 1
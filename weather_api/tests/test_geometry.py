@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core import geometry
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_lookups_by_name_code_and_location(boundaries):
+    """Test name/code lookups, the Natural Earth -99 codes and the R-tree queries."""
+    assert boundaries.lookup("germany").iso_a3 == "DEU"
+    assert boundaries.lookup(" Federal  Republic of Germany").name == "Germany"
+    assert boundaries.country_code("France") == "FR"
+    assert boundaries.lookup("fr").name == "France"
+    with pytest.raises(KeyError):
+        boundaries.lookup("Atlantis")
+
+    assert boundaries.country_at(50.0, 0.0).name == "France"
+    assert boundaries.country_at(57.0, 10.0).name == "Denmark"
+    assert boundaries.country_at(30.0, 0.0) is None
+    assert [c.name for c in boundaries.countries_in(53, 9, 56, 10)] == ["Germany", "Denmark"]
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        boundaries.bounds("Germany")
+    assert (time.perf_counter() - start) / 1000 < 1e-4
+
+
+def test_route_answers_offline_and_refreshes_through_the_client(boundaries, monkeypatch):
+    """Test that the route needs no network and that a refresh replaces the local box."""
+    def offline(request):
+        raise httpx.ConnectError("offline", request=request)
+
+    monkeypatch.setattr(geometry, "_client", httpx.AsyncClient(transport=httpx.MockTransport(offline)))
+    url = f"{settings.API_V1_STR}/get_cordinates"
+    assert client.get(f"{url}/Germany").json() == {"minlat": 47, "minlon": 6, "maxlat": 55, "maxlon": 15}
+    # A failed refresh falls back to the local boundaries
+    assert client.get(f"{url}/Germany", params={"refresh": True}).json()["maxlat"] == 55
+    assert client.get(f"{url}/Atlantis").status_code == 404
+
+    def overpass(request):
+        assert "DE" in request.url.params["data"]
+        bounds = {"minlat": 47.27, "minlon": 5.87, "maxlat": 55.06, "maxlon": 15.04}
+        return httpx.Response(200, json={"elements": [{"bounds": bounds}]})
+
+    remote = httpx.AsyncClient(transport=httpx.MockTransport(overpass))
+    assert asyncio.run(boundaries.refresh("Germany", remote))["maxlat"] == 55.06
+    assert client.get(f"{url}/DEU").json()["minlon"] == 5.87
+
+
+def test_missing_bundle_fails_clearly_without_downloading(tmp_path, monkeypatch):
+    """Test that lookups name the missing bundle and the tool building it instead of downloading."""
+    missing = str(tmp_path / "countries.gpkg")
+    monkeypatch.setattr(settings, "COUNTRY_BOUNDARIES_PATH", missing)
+    geometry.reset_country_geometries()
+    try:
+        with pytest.raises(RuntimeError, match="app.tools.bundle_countries"):
+            geometry.country_geometries()
+        response = client.get(f"{settings.API_V1_STR}/get_cordinates/Germany")
+        assert response.status_code == 501 and missing in response.json()["detail"]
+    finally:
+        geometry.reset_country_geometries()
@@ -0,0 +1,127 @@
+import cartopy.crs as ccrs
+import numpy as np
+import pytest
+import xarray as xr
+
+from app.config import settings
+from app.core import grids
+from app.core.catalog import catalog_service
+from app.core.grids import SharedGrids, export_grids, lambert_projection, shared_grids, unit_vectors
+from app.core.storage import open_store
+
+
+@pytest.fixture
+def example_store(tmp_path):
+    """Write a store with CERRA-like 2D latitude/longitude coordinates."""
+    lat, lon = np.meshgrid(np.linspace(40, 60, 12), np.linspace(-10, 30, 10), indexing="ij")
+    ds = xr.Dataset(
+        {"t2m": (("y", "x"), np.zeros(lat.shape, dtype="float32"))},
+        coords={"latitude": (("y", "x"), lat), "longitude": (("y", "x"), lon)},
+    )
+    path = str(tmp_path / "example.zarr")
+    ds.to_zarr(path, mode="w", zarr_format=2, consolidated=True)
+    return path, lat, lon
+
+
+def test_exported_grids_are_memory_mapped(example_store, tmp_path):
+    """Test that grids are mapped read-only and match the store and projection."""
+    path, lat, lon = example_store
+    export_grids(path, str(tmp_path / "grids"))
+    mapped = SharedGrids(str(tmp_path / "grids"))
+
+    assert isinstance(mapped.longitude, np.memmap)
+    assert not mapped.latitude.flags.writeable
+    np.testing.assert_array_equal(mapped.latitude, lat)
+    np.testing.assert_array_equal(mapped.longitude, lon)
+    # The projection is centred on 8E 50N (rows 5 and 6 lie at 49.1N and 50.9N)
+    row, col = mapped.nearest_index(49.5, 8.0)
+    assert abs(mapped.x[row, col]) < 250e3 and abs(mapped.y[row, col]) < 250e3
+    assert (row, col) == (5, 4)
+
+
+def test_shared_grids_export_once_per_source(example_store, tmp_path, monkeypatch):
+    """Test that the first use exports and later uses only map the files."""
+    path, _, _ = example_store
+    monkeypatch.setattr(settings, "GRID_CACHE_DIR", str(tmp_path / "grids"))
+    monkeypatch.setattr(settings, "CERRORA_EXAMPLE_ZARR_PATH", path)
+    monkeypatch.setattr(grids, "_grids", None)
+    exports = []
+    monkeypatch.setattr(grids, "export_grids", lambda *args: exports.append(args) or export_grids(*args))
+
+    assert shared_grids() is shared_grids()
+    grids.reset_shared_grids()
+    assert shared_grids().shape == (12, 10)
+    assert len(exports) == 1
+    grids.reset_shared_grids()
+
+
+def test_shared_grids_follow_rewritten_store(example_store, tmp_path, monkeypatch):
+    """Test that mapping an export skips the store and a rewrite is picked up on the catalog refresh."""
+    path, lat, lon = example_store
+    monkeypatch.setattr(settings, "GRID_CACHE_DIR", str(tmp_path / "grids"))
+    monkeypatch.setattr(settings, "CERRORA_EXAMPLE_ZARR_PATH", path)
+    monkeypatch.setattr(settings, "CATALOG_REFRESH_S", 3600.0)
+    monkeypatch.setattr(catalog_service, "refresh_seconds", 0.0)
+    monkeypatch.setattr(grids, "_grids", None)
+    monkeypatch.setattr(grids, "_grids_store", None)
+    catalog_service.invalidate(path)
+    export_grids(path, str(tmp_path / "grids"))
+
+    # A worker starting on an existing export maps it without opening the store
+    opened = []
+    monkeypatch.setattr(grids, "open_store", lambda *args: opened.append(args) or open_store(*args))
+    np.testing.assert_array_equal(shared_grids().latitude, lat)
+    assert opened == []
+
+    shifted = xr.Dataset(
+        {"t2m": (("y", "x"), np.zeros(lat.shape, dtype="float32"), {"units": "K"})},
+        coords={"latitude": (("y", "x"), lat + 1.0), "longitude": (("y", "x"), lon)},
+    )
+    shifted.to_zarr(path, mode="w", zarr_format=2, consolidated=True)
+    np.testing.assert_array_equal(shared_grids().latitude, lat)  # until the next check
+    monkeypatch.setattr(settings, "CATALOG_REFRESH_S", 0.0)
+    refreshed = shared_grids()
+    np.testing.assert_array_equal(refreshed.latitude, lat + 1.0)
+    assert refreshed.manifest["fingerprint"] == catalog_service.get(path, open_store(path)).fingerprint
+    assert shared_grids() is refreshed
+    grids.reset_shared_grids()
+    catalog_service.invalidate(path)
+
+
+def _brute_force(grids, lat, lon):
+    distance = ((unit_vectors(grids.latitude, grids.longitude)[None] - unit_vectors(lat, lon)[:, None, None]) ** 2).sum(-1)
+    return np.unravel_index(distance.reshape(len(lat), -1).argmin(axis=1), grids.shape)
+
+
+def test_batch_lookup_matches_brute_force(tmp_path):
+    """Test that batch lookups on a Lambert grid find the great-circle nearest point."""
+    # A CERRA-like grid: regular on the Lambert plane, curvilinear in lat/lon
+    x, y = np.meshgrid(np.arange(-40, 41) * 50e3, np.arange(-30, 31) * 50e3)
+    points = ccrs.PlateCarree().transform_points(lambert_projection(), x, y)
+    ds = xr.Dataset(coords={"latitude": (("y", "x"), points[..., 1]), "longitude": (("y", "x"), points[..., 0])})
+    path = str(tmp_path / "lambert.zarr")
+    ds.to_zarr(path, mode="w", zarr_format=2, consolidated=True)
+    manifest = export_grids(path, str(tmp_path / "grids"))
+    mapped = SharedGrids(str(tmp_path / "grids"))
+    # The fit is exact for a Lambert grid, so the search window stays small
+    assert manifest["plane_to_index"]["radius"] <= 2
+
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(30, 70, 2000), rng.uniform(-40, 60, 2000)
+    rows, cols = mapped.nearest_indices(lat, lon)
+    expected_rows, expected_cols = _brute_force(mapped, lat, lon)
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_array_equal(cols, expected_cols)
+
+
+def test_lookup_on_grid_without_exact_fit(example_store, tmp_path):
+    """Test that the window search also finds nearest points on a lat/lon grid."""
+    path, _, _ = example_store
+    export_grids(path, str(tmp_path / "grids"))
+    mapped = SharedGrids(str(tmp_path / "grids"))
+    lat, lon = np.random.default_rng(1).uniform(35, 65, 500), np.random.default_rng(2).uniform(-15, 35, 500)
+
+    rows, cols = mapped.nearest_indices(lat, lon)
+    expected_rows, expected_cols = _brute_force(mapped, lat, lon)
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_array_equal(cols, expected_cols)
@@ -0,0 +1,104 @@
+import asyncio
+
+import numpy as np
+import pytest
+from zarr.core.buffer import default_buffer_prototype
+from zarr.storage import MemoryStore, WrapperStore
+
+from app.core.fetch import RequestLimiter
+from app.core.hedging import HedgedStore, LatencyHistogram, get_latency_histogram
+
+
+class FakeLatencyStore(WrapperStore):
+    """In-memory store that injects a configurable delay per read."""
+
+    def __init__(self, store, delays):
+        super().__init__(store)
+        self.delays = list(delays)
+        self.calls = 0
+
+    def _with_store(self, store):
+        return type(self)(store, self.delays)
+
+    async def get(self, key, prototype, byte_range=None):
+        delay = self.delays[self.calls] if self.calls < len(self.delays) else 0.0
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return await self._store.get(key, prototype, byte_range)
+
+
+async def _populated_store():
+    store = MemoryStore()
+    await store.set("t2m/0.0", default_buffer_prototype().buffer.from_bytes(b"chunk"))
+    return store
+
+
+def test_histogram_percentiles():
+    """Test that percentiles land within one bucket of the true value."""
+    histogram = LatencyHistogram()
+    for seconds in np.linspace(0.001, 0.1, 1000):
+        histogram.record(seconds)
+
+    assert histogram.count == 1000
+    assert 0.095 <= histogram.percentile(95) <= 0.095 * 1.2
+    assert 0.05 <= histogram.percentile(50) <= 0.05 * 1.2
+    assert histogram.snapshot()["p99"] >= histogram.snapshot()["p50"]
+
+
+def test_hedged_read_beats_slow_primary():
+    """Test that a slow read is duplicated and the fast copy wins."""
+    async def run():
+        fake = FakeLatencyStore(await _populated_store(), delays=[1.0, 0.0])
+        store = HedgedStore(fake, name="test-slow", initial_delay=0.02, max_hedge_ratio=1.0)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        buffer = await store.get("t2m/0.0", default_buffer_prototype())
+        return store, fake, buffer, loop.time() - start
+
+    store, fake, buffer, elapsed = asyncio.run(run())
+    assert buffer.to_bytes() == b"chunk"
+    assert elapsed < 0.5
+    assert fake.calls == 2
+    assert store.stats == {"reads": 1, "hedged": 1, "hedge_wins": 1}
+
+
+def test_backup_requests_wait_for_the_concurrency_limit():
+    """Test that a backup request does not start while the limit is used up."""
+    async def run():
+        fake = FakeLatencyStore(await _populated_store(), delays=[0.3, 0.0])
+        limiter = RequestLimiter(1)
+        store = HedgedStore(fake, name="test-limited", initial_delay=0.02, max_hedge_ratio=1.0, limiter=limiter)
+        # The primary's slot, as taken by ConcurrentFetchStore
+        async with limiter:
+            buffer = await store.get("t2m/0.0", default_buffer_prototype())
+        return store, fake, buffer
+
+    store, fake, buffer = asyncio.run(run())
+    assert buffer.to_bytes() == b"chunk"
+    assert fake.calls == 1
+    assert store.stats == {"reads": 1, "hedged": 1, "hedge_wins": 0}
+
+
+def test_fast_reads_are_not_hedged():
+    """Test that reads under the threshold are issued once."""
+    async def run():
+        fake = FakeLatencyStore(await _populated_store(), delays=[0.0] * 5)
+        store = HedgedStore(fake, name="test-fast", initial_delay=0.5)
+        for _ in range(5):
+            await store.get("t2m/0.0", default_buffer_prototype())
+        return store, fake
+
+    store, fake = asyncio.run(run())
+    assert fake.calls == 5
+    assert store.stats["hedged"] == 0
+    assert get_latency_histogram("test-fast").count == 5
+
+
+def test_threshold_adapts_to_observed_latency():
+    """Test that the threshold follows the store's latency percentile."""
+    histogram = get_latency_histogram("test-adaptive")
+    for _ in range(100):
+        histogram.record(0.05)
+    store = HedgedStore(MemoryStore(), name="test-adaptive", initial_delay=1.0, min_samples=10)
+
+    assert store.hedge_delay() == pytest.approx(0.05, rel=0.25)
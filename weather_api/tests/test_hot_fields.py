@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.core import hot_fields as hot_fields_module
+from app.core.d_loader import DataLoader
+from app.core.hot_fields import HotFieldStore
+from tests.conftest import epoch
+
+
+@pytest.fixture
+def store():
+    hot = HotFieldStore(f"weather_api_test_{os.getpid()}", max_bytes=3 * 400, slots=4)
+    yield hot
+    hot.destroy()
+
+
+def _put_in_child(name: str, key: str) -> None:
+    HotFieldStore(name, max_bytes=1 << 20, slots=4).put(key, np.arange(100, dtype="float32"))
+
+
+def test_fields_are_shared_across_processes(store):
+    """Test that a field put by another process is read as a read-only view."""
+    process = multiprocessing.get_context("spawn").Process(target=_put_in_child, args=(store.name, "a"))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+    values = store.get("a")
+    np.testing.assert_array_equal(values, np.arange(100, dtype="float32"))
+    assert not values.flags.writeable
+    assert store.get("b") is None
+    assert store.hits == {"hit": 1, "miss": 1}
+
+
+def test_eviction_by_budget_slots_and_age(store):
+    """Test LRU eviction over the byte budget and slot count, and TTL expiry."""
+    field = np.zeros(100, dtype="float32")  # 400 bytes
+    for key in "abc":
+        store.put(key, field)
+    store.get("a")
+    store.put("d", field)
+    # Over the 3-field budget: "b" was least recently used
+    assert store.get("b") is None
+    assert store.stats()["fields"] == 3
+
+    view = store.get("a")
+    store.ttl_seconds = 1e-9
+    assert store.evict() == 3
+    assert store.stats() == {"fields": 0, "bytes": 0, "hit": 2, "miss": 1}
+    # Views taken before eviction stay valid
+    np.testing.assert_array_equal(view, field)
+
+
+def test_lookups_drop_mappings_of_fields_evicted_elsewhere(store):
+    """Test that a process that only reads releases its mappings of fields another process evicted."""
+    reader = HotFieldStore(store.name, max_bytes=store.max_bytes, slots=store.slots)
+    field = np.zeros(100, dtype="float32")
+    store.put("a", field)
+    store.put("b", field)
+    assert reader.get("a") is not None and reader.get("b") is not None
+    assert len(reader._mapped) == 2
+    store.ttl_seconds = 1e-9
+    store.evict()
+    store.ttl_seconds = 0.0
+    store.put("c", field)
+    assert reader.get("c") is not None
+    # Only the mapping of "c" is left
+    assert len(reader._mapped) == 1
+
+
+def test_fields_that_do_not_fit_in_shm_are_not_stored(store, monkeypatch):
+    """Test that no segment is created when /dev/shm lacks the room (writing it would raise SIGBUS)."""
+    store.stats()  # the index exists already
+    monkeypatch.setattr(hot_fields_module, "_shm_free_bytes", lambda: 100)
+    assert store.put("a", np.zeros(100, dtype="float32")) is None
+    assert store.stats()["fields"] == 0
+
+
+def test_loader_frames_come_from_shared_memory(store_path, monkeypatch):
+    """Test that repeated frame reads are served from the hot field store."""
+    monkeypatch.setattr(settings, "HOT_FIELDS_ENABLED", True)
+    monkeypatch.setattr(settings, "HOT_FIELDS_NAME", f"weather_api_test_loader_{os.getpid()}")
+    monkeypatch.setattr(hot_fields_module, "_store", None)
+    loader = DataLoader("cerrora")
+    loader.settings.zarr_path = store_path
+    base, valid = epoch("2021-01-01T12:00"), epoch("2021-01-02T06:00")
+    try:
+        first = loader.get_frame("z", base, valid)
+        second = loader.get_frame("z", base, valid)
+        np.testing.assert_array_equal(first.values, second.values)
+        assert hot_fields_module.hot_fields().hits == {"hit": 1, "miss": 1}
+        assert not second.values.flags.writeable
+    finally:
+        hot_fields_module.hot_fields().destroy()
+        monkeypatch.setattr(hot_fields_module, "_store", None)
+
+
+def test_eviction_daemon_expires_fields(store):
+    """Test that the elected daemon evicts expired fields in the background."""
+    store.ttl_seconds = 0.05
+    store.put("a", np.zeros(10, dtype="float32"))
+    store.start_daemon(interval=0.02)
+    try:
+        deadline = time.time() + 5
+        while store.stats()["fields"] and time.time() < deadline:
+            time.sleep(0.02)
+        assert store.stats()["fields"] == 0
+    finally:
+        store.stop_daemon()
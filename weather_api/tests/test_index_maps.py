@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from app.core.d_loader import DataLoader
+from app.core.index_maps import CoordinateIndexMap, IndexMaps, get_index_maps
+from tests.conftest import epoch
+
+
+@pytest.fixture
+def forecast_dataset():
+    """Create a forecast dataset with 12-hourly base times and 6-hourly leads."""
+    times = pd.date_range("2021-01-01", periods=4, freq="12h")
+    leads = pd.to_timedelta([6, 12, 18, 24, 30], unit="h")
+    data = np.arange(len(times) * len(leads) * 4).reshape(len(times), len(leads), 2, 2)
+    return xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), data.astype("float32"))},
+        coords={"time": times, "prediction_timedelta": leads},
+    )
+
+
+def test_exact_lookup():
+    """Test exact matches on an unsorted coordinate."""
+    index_map = CoordinateIndexMap("time", np.array([30, 10, 20]))
+    assert index_map.lookup(10) == 1
+    assert index_map.lookup(30) == 0
+    assert 20 in index_map
+
+
+def test_tolerance_policy():
+    """Test that nearest matches are only taken within the tolerance."""
+    index_map = CoordinateIndexMap("time", np.array([0, 100, 200]), tolerance=10)
+    assert index_map.lookup(105) == 1
+    assert index_map.lookup(195) == 2
+    with pytest.raises(KeyError):
+        index_map.lookup(150)
+    with pytest.raises(KeyError):
+        index_map.lookup(105, tolerance=0)
+
+
+def test_frame_indexer_matches_sel(forecast_dataset):
+    """Test that isel with the maps selects the same frame as sel."""
+    maps = IndexMaps.from_dataset(forecast_dataset)
+    base = epoch("2021-01-01T12:00")
+    valid = epoch("2021-01-02T06:00")
+
+    frame = maps.frame_indexer(base, valid)
+    expected = forecast_dataset.t2m.sel(
+        time="2021-01-01T12:00", prediction_timedelta=pd.Timedelta(hours=18)
+    )
+    np.testing.assert_array_equal(forecast_dataset.t2m.isel(frame).values, expected.values)
+    assert maps.lead.lookup_hours(30) == 4
+
+
+def test_missing_lead_time_raises(forecast_dataset):
+    """Test that a lead time outside the store is an error, not a snap."""
+    maps = IndexMaps.from_dataset(forecast_dataset)
+    base = epoch("2021-01-01")
+    with pytest.raises(KeyError):
+        maps.frame_indexer(base, base + 72 * 3600)
+
+
+def test_index_maps_cached_per_dataset(forecast_dataset):
+    """Test that the maps are built once per dataset object."""
+    assert get_index_maps(forecast_dataset) is get_index_maps(forecast_dataset)
+
+
+def test_data_loader_rebuilds_maps_on_new_dataset(forecast_dataset):
+    """Test that DataLoader maps follow the dataset they were built from."""
+    loader = DataLoader(model_type="cerrora")
+    loader.dataset = forecast_dataset
+    assert loader.valid_time_indexer(epoch("2021-01-02T12:00")) == {"time": 3}
+
+    loader.dataset = forecast_dataset.isel(time=slice(2, None))
+    assert loader.valid_time_indexer(epoch("2021-01-02T12:00")) == {"time": 1}
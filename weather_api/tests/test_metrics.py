@@ -0,0 +1,82 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.config import settings
+from app.core import metrics
+from app.core.grids import shared_grids
+from app.core.metrics import MetricsEngine
+from app.core.regions import cell_areas, domain_weights
+from app.main import app
+from tests.conftest import epoch
+
+client = TestClient(app)
+
+
+def reference_scores(forecast, truth, weights, base_indices):
+    """Pooled scores per lead computed the slow, obvious way."""
+    flipped = forecast.t2m.values[:, :, ::-1, :].astype(float)
+    observed = truth.t2m.values.astype(float)
+    clim = observed.mean(axis=0)
+    sums = {name: np.zeros(2) for name in metrics.SUMS}
+    for b in base_indices:
+        for lead in range(2):
+            valid = b + lead + 1  # 6 hourly truth, leads of 6 and 12 hours
+            if valid >= len(observed):
+                continue
+            f, o = flipped[b, lead], observed[valid]
+            sums["weight"][lead] += weights.sum()
+            sums["error"][lead] += (weights * (f - o)).sum()
+            sums["squared"][lead] += (weights * (f - o) ** 2).sum()
+            sums["absolute"][lead] += (weights * np.abs(f - o)).sum()
+            sums["cross"][lead] += (weights * (f - clim) * (o - clim)).sum()
+            sums["forecast_anomaly"][lead] += (weights * (f - clim) ** 2).sum()
+            sums["truth_anomaly"][lead] += (weights * (o - clim) ** 2).sum()
+    return metrics.MetricSums(np.array(base_indices), np.array([6.0, 12.0]), {k: v[None] for k, v in sums.items()}).scores()
+
+
+def test_engine_matches_reference_and_caches_base_times(metric_stores, monkeypatch):
+    """Test the dask reductions against a direct computation, and that cached base times are not recomputed."""
+    forecast, truth, lat, lon = metric_stores
+    weights = cell_areas(lat, lon)
+    weights /= weights.sum()
+    engine = MetricsEngine()
+    region = domain_weights(shared_grids())
+    sums = engine.sums(routes.cerrora_loader, routes.cerrora_gt_loader, "t2m", region, end=epoch("2021-01-01T06:00"))
+    assert sums.base_times.tolist() == [epoch("2021-01-01"), epoch("2021-01-01T06:00")]
+    expected = reference_scores(forecast, truth, weights, [0, 1])
+    for name, values in sums.scores().items():
+        np.testing.assert_allclose(values, expected[name], rtol=1e-5)
+    # The second base time has no ground truth for its 12 hour lead
+    assert np.isnan(sums.scores(per_base_time=True)["rmse"][1, 1])
+
+    computed = []
+    metric_sums = metrics.metric_sums
+
+    def recording_metric_sums(forecast, truth, variable, base_times, *args):
+        computed.append(list(base_times))
+        return metric_sums(forecast, truth, variable, base_times, *args)
+
+    monkeypatch.setattr(metrics, "metric_sums", recording_metric_sums)
+    cached = engine.sums(routes.cerrora_loader, routes.cerrora_gt_loader, "t2m", region, epoch("2021-01-01T06:00"),
+                         epoch("2021-01-01T06:00"))
+    np.testing.assert_array_equal(cached.sums["squared"], sums.sums["squared"][1:])
+    engine.sums(routes.cerrora_loader, routes.cerrora_gt_loader, "t2m", region)
+    assert computed == [[epoch("2021-01-01T12:00")]]
+    assert engine.hits == {"hit": 3, "miss": 3}
+
+
+def test_metrics_route_for_a_country(metric_stores):
+    """Test the route's per-lead scores for a country and its errors."""
+    url = f"{settings.API_V1_STR}/metrics"
+    response = client.post(url, json={"country": "Germany", "models": ["cerrora"], "perBaseTime": True})
+    assert response.status_code == 200
+    scores = response.json()["cerrora"]["t2m"]
+    assert scores["lead_hours"] == [6.0, 12.0] and scores["base_times"] == 3
+    assert len(scores["per_base_time"]["rmse"]) == 3
+    assert scores["per_base_time"]["rmse"][2] == [None, None]
+    assert all(-1 <= acc <= 1 for acc in scores["acc"])
+    assert scores["rmse"][0] >= abs(scores["bias"][0])
+
+    assert client.post(url, json={"models": ["persistence"]}).status_code == 400
+    assert client.post(url, json={"models": ["cerrora"], "variables": ["nope"]}).status_code == 404
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.config import settings
+from app.main import app
+from app.tools.bench_scaling import expand_paths
+
+client = TestClient(app)
+API = settings.API_V1_STR
+TIME_RANGE = {"baseTime": 1609459200, "validTime": [1609480800]}
+
+
+@pytest.fixture
+def rain_models(monkeypatch):
+    """Record which model's loaders the rain route is called with."""
+    models = []
+
+    async def fake_fetch_rain_data(time_range, loaders):
+        models.append(loaders[2])
+        return {"images": []}
+
+    def fake_get_loaders(model_type):
+        if model_type not in routes.model_manager.models:
+            return get_loaders(model_type)  # invalid models still raise
+        return None, None, model_type
+
+    get_loaders = routes.model_manager.get_loaders
+    monkeypatch.setattr(routes, "fetch_rain_data", fake_fetch_rain_data)
+    monkeypatch.setattr(routes.model_manager, "get_loaders", fake_get_loaders)
+    return models
+
+
+def test_switch_model_keeps_no_server_state():
+    """Test that switching only validates; the server default stays the same."""
+    default = client.get(f"{API}/current-model").json()
+    other = next(m for m in routes.model_manager.models if m != default)
+
+    response = client.post(f"{API}/switch-model", json={"model_type": other})
+    assert response.status_code == 200
+    assert response.json()["model_type"] == other
+    assert client.get(f"{API}/current-model").json() == default
+    assert client.post(f"{API}/switch-model", json={"model_type": "unknown"}).status_code == 400
+
+
+def test_rain_route_uses_requested_model(rain_models):
+    """Test that every rain request is served with the model it names."""
+    assert client.post(f"{API}/data/rain/graphcast", json=TIME_RANGE).status_code == 200
+    assert client.post(f"{API}/data/rain?modelType=graphcast", json=TIME_RANGE).status_code == 200
+    assert client.post(f"{API}/data/rain", json=TIME_RANGE).status_code == 200
+    assert client.post(f"{API}/data/rain/unknown", json=TIME_RANGE).status_code == 400
+    assert rain_models == ["graphcast", "graphcast", settings.DEFAULT_MODEL]
+
+
+def test_load_paths_cover_every_model():
+    """Test that model templated paths are expanded for each model."""
+    assert expand_paths(["/base-times/{model}", "/current-model"], ["cerrora", "graphcast"]) == [
+        f"{API}/base-times/cerrora", f"{API}/base-times/graphcast", f"{API}/current-model",
+    ]
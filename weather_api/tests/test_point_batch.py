@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.config import settings
+from app.core import grids
+from app.core.Utility.Utilities import temp_compare
+from app.main import app
+from tests.conftest import epoch
+
+client = TestClient(app)
+BASE_TIME = epoch("2021-01-01T12:00")
+
+
+@pytest.fixture(params=[None, {}], ids=["numpy", "dask"])
+def compare_stores(request, tmp_path, monkeypatch):
+    """Write forecast and ground truth stores on a small grid and serve them, opened with and without dask."""
+    lat, lon = np.meshgrid(np.linspace(40, 60, 21), np.linspace(-10, 30, 17), indexing="ij")
+    coords = {"latitude": (("y", "x"), lat), "longitude": (("y", "x"), lon)}
+    times = pd.date_range("2021-01-01", periods=2, freq="12h")
+    leads = pd.to_timedelta([6, 12, 18, 24, 30], unit="h")
+    rng = np.random.default_rng(0)
+
+    def forecast():
+        return xr.Dataset(
+            {"t2m": (("time", "prediction_timedelta", "y", "x"), rng.random((2, 5, 21, 17), dtype="float32"))},
+            coords={"time": times, "prediction_timedelta": leads, **coords},
+        ).chunk({"time": 1, "prediction_timedelta": 1, "y": 8, "x": 8})
+
+    truth = xr.Dataset(
+        {"t2m": (("time", "y", "x"), rng.random((12, 21, 17), dtype="float32"))},
+        coords={"time": pd.date_range("2021-01-01", periods=12, freq="6h"), **coords},
+    ).chunk({"time": 1})
+    datasets = {}
+    for name, ds in (("pred", forecast()), ("graphcast", forecast()), ("gt", truth)):
+        path = str(tmp_path / f"{name}.zarr")
+        ds.to_zarr(path, mode="w", zarr_format=2, consolidated=True)
+        datasets[name] = xr.open_zarr(path, chunks=request.param)
+        monkeypatch.setattr(routes, f"get_{'actual' if name == 'gt' else name}_ds", lambda ds=datasets[name]: ds)
+
+    monkeypatch.setattr(settings, "GRID_CACHE_DIR", str(tmp_path / "grids"))
+    monkeypatch.setattr(settings, "CERRORA_EXAMPLE_ZARR_PATH", str(tmp_path / "gt.zarr"))
+    grids.reset_shared_grids()
+    yield datasets
+    grids.reset_shared_grids()
+
+
+def test_batch_matches_single_city_comparison(compare_stores):
+    """Test that the batch table holds the same values as per-city comparisons."""
+    response = client.post(f"{settings.API_V1_STR}/temp_compare/batch", json={
+        "baseTime": BASE_TIME, "cities": ["Berlin", "Amsterdam"], "points": [[50.1, 8.7]],
+    })
+    assert response.status_code == 200
+    result = response.json()
+    assert result["locations"]["location"] == ["Berlin", "Amsterdam", "50.1,8.7"]
+
+    for source in ("cerrora", "graphcast", "ground_truth"):
+        table = result[source]
+        assert len(table["location"]) == len(table["forecast_time"]) == len(table["t2m"]) == 15
+    graphcast, cerrora, truth = temp_compare(
+        compare_stores["graphcast"], compare_stores["pred"], compare_stores["gt"], "Amsterdam", BASE_TIME)
+    rows = [i for i, name in enumerate(result["cerrora"]["location"]) if name == "Amsterdam"]
+    np.testing.assert_allclose([result["cerrora"]["t2m"][i] for i in rows], cerrora.temperature_2m, rtol=1e-6)
+    np.testing.assert_allclose([result["graphcast"]["t2m"][i] for i in rows], graphcast.temperature_2m, rtol=1e-6)
+    np.testing.assert_allclose([result["ground_truth"]["t2m"][i] for i in rows], truth.temperature_2m, rtol=1e-6)
+
+
+def test_batch_rejects_unknown_cities(compare_stores):
+    """Test that unknown cities are reported instead of silently dropped."""
+    response = client.post(f"{settings.API_V1_STR}/temp_compare/batch", json={
+        "baseTime": BASE_TIME, "cities": ["Berlin", "Atlantis"],
+    })
+    assert response.status_code == 400
+    assert "Atlantis" in response.json()["detail"]
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from app.core.points import forecast_point_series, observed_point_series
+from tests.conftest import epoch
+
+
+@pytest.fixture
+def point_stores(tmp_path):
+    """Write a forecast store and a ground truth store chunked per field."""
+    times = pd.date_range("2021-01-01", periods=2, freq="12h")
+    leads = pd.to_timedelta([6, 12, 18, 24], unit="h")
+    forecast = xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), np.random.rand(2, 4, 8, 6).astype("float32"))},
+        coords={"time": times, "prediction_timedelta": leads},
+    )
+    truth = xr.Dataset(
+        {"t2m": (("time", "y", "x"), np.random.rand(8, 8, 6).astype("float32"))},
+        coords={"time": pd.date_range("2021-01-01", periods=8, freq="6h")},
+    )
+    paths = str(tmp_path / "forecast.zarr"), str(tmp_path / "truth.zarr")
+    forecast.chunk({"time": 1, "prediction_timedelta": 1}).to_zarr(paths[0], mode="w", zarr_format=2, consolidated=True)
+    truth.chunk({"time": 1}).to_zarr(paths[1], mode="w", zarr_format=2, consolidated=True)
+    return [xr.open_zarr(path, chunks=None) for path in paths]
+
+
+def test_forecast_point_matches_flipped_field(point_stores):
+    """Test that the point series equals indexing each flipped full field."""
+    forecast, _ = point_stores
+    base = epoch("2021-01-01T12:00")
+    series = forecast_point_series(forecast, "t2m", (2, 3), base, lead_hours=(6, 12, 30, 24), flip_y=True)
+
+    # The 30h lead is not in the store and is skipped
+    assert list(series.forecast_time) == [pd.Timestamp("2021-01-01T12:00") + pd.Timedelta(hours=h) for h in (6, 12, 24)]
+    expected = [forecast.t2m.isel(time=1, prediction_timedelta=i).values[::-1, :][2, 3] for i in (0, 1, 3)]
+    np.testing.assert_array_equal(series.value, expected)
+
+
+def test_observed_point_series(point_stores):
+    """Test that ground truth points are read at their valid times."""
+    _, truth = point_stores
+    valid = [epoch("2021-01-01T06:00"), epoch("2021-01-01T18:00"), epoch("2021-01-05")]
+    series = observed_point_series(truth, "t2m", (5, 1), valid)
+
+    assert list(series.time) == [pd.Timestamp("2021-01-01T06:00"), pd.Timestamp("2021-01-01T18:00")]
+    np.testing.assert_array_equal(series.value, truth.t2m.values[[1, 3], 5, 1])
@@ -0,0 +1,12 @@
+from app.tools.bench_prefork import start_report
+
+
+def test_prefork_workers_share_preloaded_pages():
+    """Test that preloaded workers start, serve and share pages with the master."""
+    report = start_report(workers=2, preload=True, timeout=120)
+    assert report is not None
+    assert report["ready"] == 2
+    assert set(report["preload_seconds"]) == {"app", "catalogs", "grids", "basemaps"}
+    for memory in report["worker_memory"].values():
+        assert memory["shared_clean"] + memory["shared_dirty"] > 0
+        assert memory["pss"] < memory["rss"]
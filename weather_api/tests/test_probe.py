@@ -0,0 +1,81 @@
+import cartopy.crs as ccrs
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.config import settings
+from app.core import grids
+from app.core.probe import pixel_to_plane
+from app.main import app
+from tests.conftest import epoch
+
+client = TestClient(app)
+EXTENT = routes.graphcast_visualizer.extent
+
+
+@pytest.fixture
+def probe_stores(tmp_path, monkeypatch):
+    """Serve a Cerrora forecast and ground truth on a grid regular in the map projection."""
+    x_min, x_max, y_min, y_max = EXTENT
+    x, y = np.meshgrid(np.linspace(x_min, x_max, 8), np.linspace(y_min, y_max, 6))
+    points = ccrs.PlateCarree().transform_points(grids.lambert_projection(), x, y)
+    coords = {"latitude": (("y", "x"), points[..., 1]), "longitude": (("y", "x"), points[..., 0])}
+    times = pd.date_range("2021-01-01", periods=3, freq="12h")
+    rng = np.random.default_rng(0)
+    forecast = xr.Dataset(
+        {
+            "t2m": (("time", "prediction_timedelta", "y", "x"), rng.random((3, 2, 6, 8), dtype="float32")),
+            "z": (("time", "prediction_timedelta", "level", "y", "x"), rng.random((3, 2, 2, 6, 8), dtype="float32")),
+        },
+        coords={"time": times, "prediction_timedelta": pd.to_timedelta([6, 12], unit="h"), "level": [500, 850], **coords},
+    )
+    truth = xr.Dataset({"t2m": (("time", "y", "x"), rng.random((3, 6, 8), dtype="float32"))}, coords={"time": times, **coords})
+    forecast_path, truth_path = str(tmp_path / "forecast.zarr"), str(tmp_path / "truth.zarr")
+    forecast.to_zarr(forecast_path, mode="w", zarr_format=2, consolidated=True)
+    truth.to_zarr(truth_path, mode="w", zarr_format=2, consolidated=True)
+    monkeypatch.setattr(routes.cerrora_loader.settings, "zarr_path", forecast_path)
+    monkeypatch.setattr(routes.cerrora_gt_loader.settings, "zarr_path", truth_path)
+    monkeypatch.setattr(settings, "GRID_CACHE_DIR", str(tmp_path / "grids"))
+    monkeypatch.setattr(settings, "CERRORA_EXAMPLE_ZARR_PATH", forecast_path)
+    grids.reset_shared_grids()
+    yield forecast, truth
+    grids.reset_shared_grids()
+
+
+def test_pixel_to_plane_spans_the_extent():
+    """Test that the image corners map onto the corners of the extent."""
+    x_min, x_max, y_min, y_max = EXTENT
+    np.testing.assert_allclose(pixel_to_plane(-0.5, -0.5, 100, 50, EXTENT), (x_min, y_max))
+    np.testing.assert_allclose(pixel_to_plane(99.5, 49.5, 100, 50, EXTENT), (x_max, y_min))
+
+
+def test_probe_reads_every_source_under_the_pixel(probe_stores):
+    """Test that a pixel is mapped to its grid point and every readable source reports it."""
+    forecast, truth = probe_stores
+    # Centre of grid point (row 2, col 5) on a 700 x 500 pixel map
+    width, height = 700, 500
+    px, py = 5 / 7 * width - 0.5, (1 - 2 / 5) * height - 0.5
+    base, valid = epoch("2021-01-01T12:00"), epoch("2021-01-02")
+    response = client.get(f"{settings.API_V1_STR}/probe", params={
+        "px": px, "py": py, "width": width, "height": height, "baseTime": base, "validTime": valid,
+        "variables": ["t2m", "z@850"],
+    })
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inside"] and (result["row"], result["col"]) == (2, 5)
+    # Cerrora fields are stored upside down relative to the grids
+    assert result["values"]["cerrora"] == pytest.approx({
+        "t2m": float(forecast.t2m.values[1, 1, 3, 5]),
+        "z@850": float(forecast.z.values[1, 1, 1, 3, 5]),
+    })
+    assert result["values"]["ground_truth"] == pytest.approx({"t2m": float(truth.t2m.values[2, 2, 5])})
+    # The GraphCast store is not available here
+    assert "graphcast" not in result["values"]
+
+    outside = client.get(f"{settings.API_V1_STR}/probe", params={
+        "px": -100, "py": py, "width": width, "height": height, "baseTime": base, "validTime": valid,
+    }).json()
+    assert not outside["inside"] and outside["values"] == {}
@@ -0,0 +1,112 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from app.config import settings
+from app.core.catalog import catalog_service
+from app.core.d_loader import DataLoader
+from app.tools.rechunk import TargetLayout, copy_unit, load_progress, plan_units, prepare_target, rechunk, \
+    save_committed, save_progress, timeseries_chunks
+
+
+def forecast_dataset(periods):
+    times = pd.date_range("2021-01-01", periods=periods, freq="12h")
+    leads = pd.to_timedelta([6, 12, 18], unit="h")
+    rng = np.random.default_rng(0)
+    data = rng.random((periods, len(leads), 16, 16)).astype("float32")
+    return xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), data)},
+        coords={"time": times, "prediction_timedelta": leads},
+    )
+
+
+def write_source(path, periods):
+    forecast_dataset(periods).to_zarr(
+        path, mode="w", zarr_format=2, consolidated=True,
+        encoding={"t2m": {"chunks": (1, 1, 16, 16)}},
+    )
+
+
+@pytest.fixture
+def stores(tmp_path):
+    source = str(tmp_path / "source.zarr")
+    target = str(tmp_path / "timeseries.zarr")
+    write_source(source, 6)
+    return source, target
+
+
+def test_rechunk_is_resumable_and_incremental(stores):
+    """Test a full copy, a resumed copy and a copy after the source grew."""
+    source, target = stores
+    result = rechunk(source, target, tile=8, time_chunk=4, workers=2)
+    assert result == {"written": 2, "skipped": 0, "bytes": 6 * 3 * 16 * 16 * 4}
+
+    copy = xr.open_zarr(target)
+    assert copy.t2m.encoding["chunks"] == (4, 3, 8, 8)
+    xr.testing.assert_equal(copy.t2m, xr.open_zarr(source).t2m)
+
+    # An interrupted run only redoes the units it did not record
+    done = load_progress(target)
+    del done["t2m/0"]
+    save_progress(target, done)
+    assert rechunk(source, target, tile=8, time_chunk=4, workers=1)["written"] == 1
+
+    # New times rewrite the partial last block and add new ones
+    write_source(source, 10)
+    result = rechunk(source, target, tile=8, time_chunk=4, workers=2)
+    assert (result["written"], result["skipped"]) == (2, 1)
+    xr.testing.assert_equal(xr.open_zarr(target).t2m, xr.open_zarr(source).t2m)
+
+
+def test_loader_picks_layout_by_query_shape(stores, monkeypatch):
+    """Test that frames come from the spatial store and point series from the copy."""
+    source, target = stores
+    rechunk(source, target, tile=8, time_chunk=4, workers=1)
+    write_source(source, 10)
+    monkeypatch.setitem(settings.TIMESERIES_ZARR_PATHS, "cerrora", target)
+    loader = DataLoader("cerrora")
+    loader.settings.zarr_path = source
+
+    frame = {"time": 2, "prediction_timedelta": 1}
+    series = {"time": slice(0, 6), "y": 3, "x": 5}
+    assert loader.layout_for("t2m", frame) == source
+    assert loader.layout_for("t2m", series) == target
+    # Times the copy does not hold yet are read from the main store
+    assert loader.layout_for("t2m", {"time": slice(4, 8), "y": 3, "x": 5}) == source
+
+    expected = xr.open_zarr(source).t2m.values
+    np.testing.assert_array_equal(loader.read_indexed("t2m", series), expected[:6, :, 3, 5])
+    np.testing.assert_array_equal(loader.read_indexed("t2m", frame), expected[2, 1])
+
+
+def test_interrupted_extension_reads_match_the_source(stores, monkeypatch):
+    """Test that times a copy is still being extended with are read from the main store."""
+    source, target = stores
+    rechunk(source, target, tile=8, time_chunk=4, workers=1)
+    write_source(source, 10)
+    layout = TargetLayout(chunks=functools.partial(timeseries_chunks, tile=8, time_chunk=4), time_block=4)
+    # Interrupted after extending the arrays and copying only the last block
+    ds = prepare_target(source, target, None, layout)
+    done = load_progress(target)
+    unit = plan_units(ds, layout.time_block, done)[-1]
+    assert unit == ("t2m", 2, 8, 10)
+    copy_unit(source, target, unit)
+    done["t2m/2"] = 10
+    save_progress(target, done)
+    save_committed(target, done, ["t2m"], layout.time_block)
+    assert xr.open_zarr(target).sizes["time"] == 10
+
+    catalog_service.invalidate()
+    monkeypatch.setitem(settings.TIMESERIES_ZARR_PATHS, "cerrora", target)
+    loader = DataLoader("cerrora")
+    loader.settings.zarr_path = source
+    expected = xr.open_zarr(source).t2m.values
+    # The partially copied block 1 keeps the copy's committed extent at 6 times
+    assert loader.layout_for("t2m", {"time": slice(0, 6), "y": 3, "x": 5}) == target
+    for selection in (slice(0, 10), slice(4, 8), slice(8, 10)):
+        series = {"time": selection, "y": 3, "x": 5}
+        assert loader.layout_for("t2m", series) == source
+        np.testing.assert_array_equal(loader.read_indexed("t2m", series), expected[selection, :, 3, 5])
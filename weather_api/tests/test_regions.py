@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+import shapely
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core import grids, regions
+from app.core.regions import cell_areas
+from app.core.Utility.Utilities import get_bbox_region, get_country_region
+from app.main import app
+from tests.conftest import epoch
+
+client = TestClient(app)
+URL = f"{settings.API_V1_STR}/regions/aggregate"
+
+
+def test_region_weights_are_area_weights(region_stores):
+    """Test membership, area weights and the reductions (NaN cells skipped)."""
+    _, _, lat, lon = region_stores
+    region = regions.region_weights("box", grids.shared_grids(), shapely.box(6, 47, 15, 55))
+    inside = (lat > 47) & (lat < 55) & (lon > 6) & (lon < 15)
+    assert region.cells == inside.sum() == 16
+    areas = cell_areas(lat, lon)[inside]
+    np.testing.assert_allclose(region.weights, areas / areas.sum())
+    assert region.weights[0] > region.weights[-1]  # cells shrink towards the pole
+
+    full = np.arange(2 * 11 * 21, dtype=float).reshape(2, 11, 21)
+    window = full[(slice(None),) + tuple(region.window_indexer(11).values())]
+    np.testing.assert_allclose(region.reduce(window), full[:, inside] @ (areas / areas.sum()))
+    np.testing.assert_array_equal(region.reduce(window, "max"), full[:, inside].max(axis=1))
+    window[1] = np.nan
+    window[0].flat[region.indices[0]] = np.nan
+    expected = full[0, inside][1:] @ (areas[1:] / areas[1:].sum())
+    assert region.reduce(window)[0] == pytest.approx(expected)
+    assert np.isnan(region.reduce(window, "min")[1])
+    with pytest.raises(ValueError):
+        region.reduce(window, "median")
+
+
+def test_box_weights_are_snapped_and_bounded(region_stores, monkeypatch):
+    """Test that nearly equal boxes share an entry and that boxes, unlike countries, are evicted."""
+    monkeypatch.setattr(settings, "REGION_CACHE_BOXES", 2)
+    germany = get_country_region("Germany")
+    box = get_bbox_region(47, 6, 55, 15)
+    assert get_bbox_region(47.0000001, 5.9999999, 55.001, 15) is box
+    get_bbox_region(41, 0, 45, 4)
+    get_bbox_region(51, 0, 55, 4)
+    assert get_bbox_region(47, 6, 55, 15) is not box
+    assert get_country_region("Germany") is germany
+    with pytest.raises(ValueError):
+        get_bbox_region(47, 6, 47.001, 15)
+
+
+def test_country_aggregate_per_lead(region_stores):
+    """Test country statistics of the forecast and ground truth per lead time."""
+    forecast, truth, lat, lon = region_stores
+    base = epoch("2021-01-01T06:00")
+    response = client.post(URL, json={"baseTime": base, "country": "Germany", "sources": ["cerrora", "ground_truth"]})
+    assert response.status_code == 200
+    result = response.json()
+    inside = (lat > 47) & (lat < 55) & (lon > 6) & (lon < 15)
+    weights = cell_areas(lat, lon)[inside]
+    weights /= weights.sum()
+    assert result["region"]["cells"] == 16
+    cerrora = result["cerrora"]
+    assert cerrora["lead_hours"] == [6.0, 12.0]
+    assert cerrora["valid_time"] == [epoch("2021-01-01T12:00"), epoch("2021-01-01T18:00")]
+    # Cerrora fields are stored upside down relative to the grids
+    flipped = forecast.isel(time=1, y=slice(None, None, -1))
+    np.testing.assert_allclose(cerrora["t2m"], flipped.t2m.values[:, inside] @ weights, rtol=1e-6)
+    speed = np.hypot(flipped["10u"].values, flipped["10v"].values)
+    np.testing.assert_allclose(cerrora["wind_speed"], speed[:, inside].max(axis=1), rtol=1e-6)
+    truth_t2m = truth.t2m.values[2, inside] @ weights
+    assert result["ground_truth"]["t2m"] == [pytest.approx(truth_t2m, rel=1e-6), None]
+    assert result["ground_truth"]["tp"] == [None, None]
+
+    box = client.post(URL, json={"baseTime": base, "bbox": [47, 6, 55, 15], "sources": ["cerrora"]}).json()
+    assert box["cerrora"]["t2m"] == pytest.approx(cerrora["t2m"])
+    assert client.post(URL, json={"baseTime": base, "country": "Atlantis"}).status_code == 404
+    assert client.post(URL, json={"baseTime": base}).status_code == 400
+    bad_statistic = {"baseTime": base, "country": "Germany", "statistics": {"t2m": "median"}, "sources": ["cerrora"]}
+    assert client.post(URL, json=bad_statistic).status_code == 400
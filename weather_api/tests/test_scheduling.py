@@ -0,0 +1,67 @@
+import threading
+
+import dask
+import dask.array as da
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from app.config import settings
+from app.core.d_loader import DataLoader
+from app.core.scheduling import get_profile
+
+
+@pytest.fixture
+def tiled_store_path(tmp_path):
+    times = pd.date_range("2021-01-01", periods=2, freq="12h")
+    leads = pd.to_timedelta([6, 12], unit="h")
+    data = np.random.rand(len(times), len(leads), 8, 8).astype("float32")
+    ds = xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), data)},
+        coords={"time": times, "prediction_timedelta": leads},
+    )
+    path = str(tmp_path / "store.zarr")
+    ds.to_zarr(path, mode="w", zarr_format=2, consolidated=True,
+               encoding={"t2m": {"chunks": (1, 1, 4, 8)}})
+    return path
+
+
+def test_profiles_from_settings(monkeypatch):
+    """Test profile lookup, the default fallback and scheduler validation."""
+    monkeypatch.setattr(settings, "DASK_PROFILES", {
+        "default": {"chunks": {}, "scheduler": "threads"},
+        "point": {"chunks": None, "scheduler": "synchronous"},
+        "broken": {"scheduler": "gpu"},
+    })
+    assert get_profile("point").chunks is None
+    assert get_profile("unknown").name == "default"
+    with pytest.raises(ValueError):
+        get_profile("broken")
+
+
+def test_profile_compute_passes_its_scheduler():
+    """Test that a profile's scheduler applies to its own computes only, not to the global dask config."""
+    profile = get_profile("field")
+    assert profile.compute_options() == {"scheduler": "threads", "num_workers": profile.num_workers}
+    assert get_profile("point").compute_options() == {"scheduler": "synchronous"}
+    assert profile.compute(da.ones(4, chunks=2).sum(), da.zeros(2, chunks=1))[0] == 4
+
+    caller = threading.current_thread()
+    ran_in = dask.delayed(threading.current_thread)
+    (point_thread,) = get_profile("point").compute(ran_in())
+    assert point_thread is caller
+    (field_thread,) = profile.compute(ran_in())
+    assert field_thread is not caller
+    assert dask.config.get("scheduler", None) is None
+
+
+def test_loader_chunks_per_workload(tiled_store_path):
+    """Test that each workload gets a dataset with its profile's chunks."""
+    loader = DataLoader("cerrora")
+    loader.settings.zarr_path = tiled_store_path
+
+    assert loader.get_variable_data("t2m").chunks[2] == (4, 4)
+    assert loader.get_variable_data("t2m", workload="point").chunks is None
+    assert loader.dataset_for("field") is loader.dataset
+    assert loader.get_variable_data("t2m", workload="point").isel(time=0).shape == (2, 8, 8)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.config import settings
+from app.core import skill_archive
+from app.core.grids import shared_grids
+from app.core.metrics import MetricsEngine
+from app.core.regions import domain_weights
+from app.core.skill_archive import partition_key, plan_updates, skill_rows
+from app.main import app
+from tests.conftest import epoch
+
+client = TestClient(app)
+
+HOUR = 3600
+
+
+def test_plan_updates_only_schedules_new_base_times_and_new_truth():
+    """Test that only unarchived base times, and those whose leads gained ground truth, are planned."""
+    times = [epoch("2021-01-31T12:00"), epoch("2021-01-31T18:00"), epoch("2021-02-01")]
+    leads = [6 * HOUR, 12 * HOUR]
+    january = partition_key("cerrora", "t2m", "domain", "2021-01")
+    february = partition_key("cerrora", "t2m", "domain", "2021-02")
+
+    plan = plan_updates({}, "cerrora", "t2m", "domain", times, times, leads)
+    # The last base time has no ground truth for any lead yet
+    assert plan == {january: times[:2]}
+
+    recorded = {january: {str(times[0]): 2, str(times[1]): 1}}
+    assert plan_updates(recorded, "cerrora", "t2m", "domain", times, times, leads) == {}
+    truth = times + [epoch("2021-02-01T06:00")]
+    plan = plan_updates(recorded, "cerrora", "t2m", "domain", times, truth, leads)
+    assert plan == {january: [times[1]], february: [times[2]]}
+
+
+def test_skill_rows_keep_verified_leads(metric_stores):
+    """Test that archive rows carry scores and sums of the (base time, lead) pairs with ground truth."""
+    region = domain_weights(shared_grids())
+    sums = MetricsEngine().sums(routes.cerrora_loader, routes.cerrora_gt_loader, "t2m", region)
+    rows = skill_rows(sums)
+    assert rows[["base_time", "lead_hours"]].values.tolist() == [
+        [epoch("2021-01-01"), 6.0], [epoch("2021-01-01"), 12.0], [epoch("2021-01-01T06:00"), 6.0],
+    ]
+    assert (rows["valid_time"] - rows["base_time"]).tolist() == [6 * HOUR, 12 * HOUR, 6 * HOUR]
+    np.testing.assert_allclose(rows["rmse"], np.sqrt(rows["squared"] / rows["weight"]))
+
+
+def test_archive_updates_incrementally_and_serves_leaderboards(metric_stores, tmp_path, monkeypatch):
+    """Test the Parquet roundtrip, incremental updates and the leaderboard and time series routes."""
+    monkeypatch.setattr(settings, "SKILL_ARCHIVE_DIR", str(tmp_path / "skill"))
+    monkeypatch.setattr(skill_archive, "_archive", None)
+    url = f"{settings.API_V1_STR}/skill/leaderboard"
+    pytest.importorskip("pyarrow")
+
+    # Score the same store as a second model
+    monkeypatch.setattr(routes.graphcast_interpolated_loader.settings, "zarr_path", routes.cerrora_loader.settings.zarr_path)
+    archive = skill_archive.skill_archive()
+    region = domain_weights(shared_grids())
+    for model, loader in (("cerrora", routes.cerrora_loader), ("graphcast", routes.graphcast_interpolated_loader)):
+        assert archive.update(model, loader, routes.cerrora_gt_loader, "t2m", region) == {
+            partition_key(model, "t2m", "domain", "2021-01"): 2,
+        }
+    assert archive.update("cerrora", routes.cerrora_loader, routes.cerrora_gt_loader, "t2m", region) == {}
+    frame = archive.query(models=["cerrora"], start=epoch("2021-01-01T06:00"))
+    assert frame["base_time"].tolist() == [epoch("2021-01-01T06:00")]
+
+    board = client.get(url, params={"variable": "t2m", "leadHours": [6]}).json()
+    assert board["lead_hours"] == [6.0] and sorted(board["ranking"]) == ["cerrora", "graphcast"]
+    assert board["models"]["cerrora"]["base_times"] == 2
+    series = client.get(f"{settings.API_V1_STR}/skill/timeseries", params={"variable": "t2m"}).json()
+    assert series["models"]["cerrora"]["base_time"] == [epoch("2021-01-01"), epoch("2021-01-01T06:00")]
+    assert client.get(url, params={"variable": "10u"}).status_code == 404
+    assert client.get(url, params={"variable": "t2m", "region": "Atlantis"}).status_code == 404
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from app.config import settings
+from app.core.d_loader import DataLoader
+from app.core.storage import backend_config, is_remote_path, open_zarr_dataset
+
+
+@pytest.fixture
+def sample_dataset():
+    """Create a small forecast dataset."""
+    times = pd.date_range("2021-01-01", periods=2, freq="12h")
+    leads = pd.to_timedelta([6, 12], unit="h")
+    data = np.random.rand(len(times), len(leads), 4, 4).astype("float32")
+    return xr.Dataset(
+        {"t2m": (("time", "prediction_timedelta", "y", "x"), data)},
+        coords={"time": times, "prediction_timedelta": leads},
+    )
+
+
+@pytest.mark.parametrize("path,expected", [
+    ("gs://bucket/store.zarr", True),
+    ("s3://bucket/store.zarr", True),
+    ("https://example.com/store.zarr", True),
+    ("memory://store.zarr", True),
+    ("/data/store.zarr", False),
+    ("file:///data/store.zarr", False),
+])
+def test_is_remote_path(path, expected):
+    """Test which paths go through the object store backend."""
+    assert is_remote_path(path) is expected
+
+
+def test_s3_backend_options(monkeypatch):
+    """Test that S3 options come from Settings with pooling sized to concurrency."""
+    monkeypatch.setattr(settings, "S3_ENDPOINT_URL", "http://localhost:9000")
+    monkeypatch.setattr(settings, "STORAGE_CONCURRENCY", {"s3": 48})
+    monkeypatch.setattr(settings, "STORAGE_BLOCK_SIZES", {"s3": 1024})
+    monkeypatch.setattr(settings, "STORAGE_OPTIONS", {"s3": {"key": "minio"}})
+
+    config = backend_config("s3")
+
+    assert config.concurrency == 48
+    assert config.storage_options["key"] == "minio"
+    assert config.storage_options["default_block_size"] == 1024
+    assert config.storage_options["client_kwargs"]["endpoint_url"] == "http://localhost:9000"
+    assert config.storage_options["config_kwargs"]["max_pool_connections"] == 48
+    # The settings dict itself is left untouched
+    assert settings.STORAGE_OPTIONS == {"s3": {"key": "minio"}}
+
+
+def test_gcs_backend_uses_alias_settings(monkeypatch):
+    """Test that gcs:// shares the gs entries."""
+    monkeypatch.setattr(settings, "STORAGE_BLOCK_SIZES", {"gs": 2048})
+    config = backend_config("gcs")
+    assert config.storage_options == {"block_size": 2048}
+
+
+def test_open_without_consolidated_metadata(sample_dataset, tmp_path):
+    """Test the fallback for stores without consolidated metadata."""
+    path = str(tmp_path / "plain.zarr")
+    sample_dataset.to_zarr(path, zarr_format=2, consolidated=False)
+
+    ds = open_zarr_dataset(path)
+    np.testing.assert_array_equal(ds.t2m.values, sample_dataset.t2m.values)
+
+
+def test_data_loader_opens_any_fsspec_url(sample_dataset, tmp_path, monkeypatch):
+    """Test that DataLoader reads a non-GCS fsspec URL through the remote path."""
+    monkeypatch.setattr(settings, "CHUNK_CACHE_DIR", str(tmp_path / "cache"))
+    sample_dataset.to_zarr("memory://loader/store.zarr", zarr_format=2, consolidated=True, mode="w")
+
+    loader = DataLoader(model_type="graphcast")
+    loader.settings.zarr_path = "memory://loader/store.zarr"
+
+    np.testing.assert_array_equal(loader.dataset.t2m.values, sample_dataset.t2m.values)
+    assert "memory" in loader._fs.protocol
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.config import settings
+from app.core import grids
+from app.main import app
+from tests.conftest import epoch
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def forecast_store(tmp_path, monkeypatch):
+    """Serve a forecast store with surface and level variables as the Cerrora model."""
+    lat, lon = np.meshgrid(np.linspace(40, 60, 9), np.linspace(-10, 30, 7), indexing="ij")
+    times = pd.date_range("2021-01-01", periods=4, freq="12h")
+    leads = pd.to_timedelta([6, 12, 18], unit="h")
+    rng = np.random.default_rng(0)
+    ds = xr.Dataset(
+        {
+            "t2m": (("time", "prediction_timedelta", "y", "x"), rng.random((4, 3, 9, 7), dtype="float32")),
+            "z": (("time", "prediction_timedelta", "level", "y", "x"), rng.random((4, 3, 2, 9, 7), dtype="float32")),
+        },
+        coords={"time": times, "prediction_timedelta": leads, "level": [500, 850],
+                "latitude": (("y", "x"), lat), "longitude": (("y", "x"), lon)},
+    )
+    path = str(tmp_path / "forecast.zarr")
+    ds.to_zarr(path, mode="w", zarr_format=2, consolidated=True)
+    monkeypatch.setattr(routes.cerrora_loader.settings, "zarr_path", path)
+    monkeypatch.setattr(settings, "GRID_CACHE_DIR", str(tmp_path / "grids"))
+    monkeypatch.setattr(settings, "CERRORA_EXAMPLE_ZARR_PATH", path)
+    grids.reset_shared_grids()
+    yield ds
+    grids.reset_shared_grids()
+
+
+def test_timeseries_covers_base_times_and_leads(forecast_store):
+    """Test that the series holds every lead of the base times in range at the nearest point."""
+    response = client.get(f"{settings.API_V1_STR}/timeseries/cerrora", params={
+        "lat": 50, "lon": 10, "variable": "z", "level": 850,
+        "start": epoch("2021-01-01T12:00"), "end": epoch("2021-01-02T00:00"),
+    })
+    assert response.status_code == 200
+    result = response.json()
+    row, col = result["row"], result["col"]
+    assert (row, col) == (4, 3)
+    columns = result["columns"]
+    assert columns["base_time"] == [epoch("2021-01-01T12:00")] * 3 + [epoch("2021-01-02")] * 3
+    assert columns["lead_hours"] == [6.0, 12.0, 18.0] * 2
+    assert columns["valid_time"][1] == epoch("2021-01-02")
+    # Cerrora fields are stored upside down relative to the grids
+    expected = forecast_store.z.sel(level=850).values[1:3, :, 8 - row, col].ravel()
+    np.testing.assert_allclose(columns["value"], expected)
+
+
+def test_timeseries_rejects_bad_queries(forecast_store):
+    """Test unknown variables, missing levels and unavailable Arrow output."""
+    query = {"lat": 50, "lon": 10}
+    url = f"{settings.API_V1_STR}/timeseries/cerrora"
+    assert client.get(url, params={**query, "variable": "nope"}).status_code == 404
+    assert client.get(url, params={**query, "variable": "z"}).status_code == 400
+    assert client.get(url, params={**query, "variable": "t2m", "level": 500}).status_code == 400
+    assert client.get(url, params={**query, "variable": "z", "level": 700}).status_code == 404
+    arrow = client.get(url, params={**query, "variable": "t2m", "format": "arrow"})
+    try:
+        import pyarrow  # noqa: F401
+        assert arrow.status_code == 200
+    except ImportError:
+        assert arrow.status_code == 501
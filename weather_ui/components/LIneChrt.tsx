@@ -1,7 +1,7 @@
 "use client"
 import React, {useEffect, useState} from 'react';
 import { LineChart, Line, CartesianGrid, XAxis, YAxis, Legend, Tooltip, ResponsiveContainer } from 'recharts';
-import {fetchTempMetrics} from "@/lib/api-client";
+import {fetchTempMetricsBatch, PointCompareBatch} from "@/lib/api-client";
 import {EUROPEAN_COUNTRIES} from "@/components/EuropeanCountries";
 import {Select, SelectContent, SelectItem, SelectTrigger, SelectValue} from "@/components/ui/select";
 import {useSelector} from "react-redux";
@@ -17,24 +17,34 @@ const LIneChrt: React.FC = (): React.JSX.Element => {
     const appGlobalState = useSelector((state: any)=>state.weatherReducer);
     const {selectedBaseTime} = appGlobalState;
     
-    const fetch_metrics = async(countryName:string,baseTime:number)=>{
+    const [batch, setBatch] = useState<PointCompareBatch | null>(null);
+
+    const cityPoints = (tempMetrics: PointCompareBatch, countryName: string) => {
+        const dataPoints = []
+        const {cerrora, graphcast, ground_truth} = tempMetrics;
+        for(let i = 0; i < cerrora.location.length; i++){
+            if (cerrora.location[i] !== countryName) continue;
+            const j = ground_truth.forecast_time.findIndex(
+                (t, k) => ground_truth.location[k] === countryName && t === cerrora.forecast_time[i]);
+            const k = graphcast.forecast_time.findIndex(
+                (t, n) => graphcast.location[n] === countryName && t === cerrora.forecast_time[i]);
+            dataPoints.push({
+                time: cerrora.forecast_time[i].replace("T"," "),
+                Ground_Truth: j >= 0 && ground_truth.t2m[j] !== null ? kelvinToCelsius(ground_truth.t2m[j] as number) : null,
+                Cerrora: cerrora.t2m[i] !== null ? kelvinToCelsius(cerrora.t2m[i] as number) : null,
+                graphcast: k >= 0 && graphcast.t2m[k] !== null ? kelvinToCelsius(graphcast.t2m[k] as number) : null,
+            });
+        }
+        return dataPoints;
+    }
+
+    // All capitals are fetched in one request per base time; switching city reuses it
+    const fetch_metrics = async(baseTime:number)=>{
         setIsLoading(true);
         try {
-            const tempMetrics = await fetchTempMetrics(countryName,baseTime);
-            const metricKeyLength = Object.keys(tempMetrics.cerrora.forecast_time).length
-            const dataPoints = []
-            console.log(tempMetrics.ground_truth)
-            console.log(tempMetrics.cerrora.forecast_time)
-            for(let i = 0; i < metricKeyLength; i++){
-                const tempPoint = {
-                    time: tempMetrics.ground_truth.forecast_time[i].replace("T"," "),
-                    Ground_Truth: kelvinToCelsius(tempMetrics.ground_truth.temperature_2m[i]),
-                    Cerrora: kelvinToCelsius(tempMetrics.cerrora.temperature_2m[i]),
-                    graphcast: kelvinToCelsius(tempMetrics.graphcast.temperature_2m[i]),
-                };
-                dataPoints.push(tempPoint);
-            }
-            setWeatherMetrics(dataPoints);
+            const tempMetrics = await fetchTempMetricsBatch(EUROPEAN_COUNTRIES, baseTime);
+            setBatch(tempMetrics);
+            setWeatherMetrics(cityPoints(tempMetrics, country));
         } catch (error) {
             console.error('Error fetching metrics:', error);
         } finally {
@@ -43,13 +53,14 @@ const LIneChrt: React.FC = (): React.JSX.Element => {
     }
     
     useEffect(() => {
-        fetch_metrics(country,selectedBaseTime);
-    },[])
+        fetch_metrics(selectedBaseTime);
+    },[selectedBaseTime])
 
     const onCountryChange = async (val: string)=>{
-        console.log(val)
         setCountry(val)
-        await fetch_metrics(val,selectedBaseTime);
+        if (batch) {
+            setWeatherMetrics(cityPoints(batch, val));
+        }
     }
     
     // Custom tooltip
@@ -22,15 +22,23 @@ export function Header({toggleValue}:IHeader) {
     const appGlobalState = useSelector((state: any)=>state.weatherReducer);
     const {selectedBaseTime,modelSwitchVariable,app_model,validTimeList} = appGlobalState;
 
+  // The model choice lives in the browser; the API only suggests a default
   const checkCurrentModel = async()=>{
+    const storedModel = window.localStorage.getItem('app_model');
+    if (storedModel) {
+      setSelectedModel(storedModel);
+      dispatcher(updateAppModel(storedModel));
+      return;
+    }
     const response = await fetch(`${process.env.NEXT_PUBLIC_API_BASE_URL}/current-model`);
     const curModel = await response.json();
     setSelectedModel(curModel);
+    dispatcher(updateAppModel(curModel));
   }
 
   useEffect(() => {
     checkCurrentModel().then(e=>{})
-  }, [selectedModel]);
+  }, []);
     const safeDispatchEvent = useCallback((eventName: string, detail: any) => {
         if (typeof window === 'undefined') return;
         try {
@@ -60,6 +68,7 @@ export function Header({toggleValue}:IHeader) {
       console.log(data)
         */
       setSelectedModel(value)
+      window.localStorage.setItem('app_model', value)
 
       // Dispatch event to notify other components
       window.dispatchEvent(new CustomEvent('modelChange', { detail: { model: value } }))
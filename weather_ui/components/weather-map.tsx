@@ -1,6 +1,6 @@
 "use client"
 
-import React, { useEffect, useState, useCallback } from 'react'
+import React, { useEffect, useState, useCallback, useRef } from 'react'
 import Image from 'next/image'
 import { Button } from '@/components/ui/button'
 import { Slider } from '@/components/ui/slider'
@@ -8,7 +8,7 @@ import { Play, Pause, SkipBack, SkipForward } from 'lucide-react'
 import { useToast } from '@/hooks/use-toast'
 import {useSelector} from "react-redux"
 import {MoonLoader} from "react-spinners";
-import {fetchRandomImage} from "@/lib/api-client";
+import {fetchProbe, fetchRandomImage, ProbeResult} from "@/lib/api-client";
 
 interface WeatherImage {
     timestamp: string  // Format: "baseTime_validTime"
@@ -71,6 +71,11 @@ export function WeatherMap() {
     const [isAnalyzing, setIsAnalyzing] = useState(false)
     const [initRandomImagePath,setInitRandomImagePath] = useState("");
     const [imageLoadErrors, setImageLoadErrors] = useState<Record<string, boolean>>({})
+    const [probe, setProbe] = useState<{ x: number; y: number; result: ProbeResult } | null>(null)
+    // Hover probing: at most one request in flight, the latest position waits for it
+    const probeInFlight = useRef(false)
+    const mapHovered = useRef(false)
+    const pendingProbe = useRef<{ x: number; y: number; params: Parameters<typeof fetchProbe>[0] } | null>(null)
 
     const BACKEND_URL = process.env.NEXT_PUBLIC_IMAGE_BASE_URL;
 
@@ -399,6 +404,60 @@ export function WeatherMap() {
         setLoadingStates(prev => ({ ...prev, [imageUrl]: true }));
     }, []);
 
+    const sendProbe = useCallback(async () => {
+        const next = pendingProbe.current
+        if (!next || probeInFlight.current) {
+            return
+        }
+        pendingProbe.current = null
+        probeInFlight.current = true
+        try {
+            const result = await fetchProbe(next.params)
+            if (mapHovered.current) {
+                setProbe(result.inside ? { x: next.x, y: next.y, result } : null)
+            }
+        } catch (error) {
+            console.error('Probe failed:', error)
+        } finally {
+            probeInFlight.current = false
+            sendProbe()
+        }
+    }, [])
+
+    const handleMapHover = useCallback((event: React.MouseEvent<HTMLDivElement>) => {
+        const frame = images[currentIndex]
+        const img = event.currentTarget.querySelectorAll('img')[currentIndex]
+        if (!frame || !img || !img.naturalWidth) {
+            return
+        }
+        mapHovered.current = true
+        const [baseTime, validTime] = frame.timestamp.split('_').map(Number)
+        // The map is drawn with objectFit 'contain': find where the image sits in the box
+        const box = event.currentTarget.getBoundingClientRect()
+        const scale = Math.min(box.width / img.naturalWidth, box.height / img.naturalHeight)
+        const x = event.clientX - box.left
+        const y = event.clientY - box.top
+        pendingProbe.current = {
+            x,
+            y,
+            params: {
+                px: (x - (box.width - img.naturalWidth * scale) / 2) / scale,
+                py: (y - (box.height - img.naturalHeight * scale) / 2) / scale,
+                width: img.naturalWidth,
+                height: img.naturalHeight,
+                baseTime,
+                validTime,
+            },
+        }
+        sendProbe()
+    }, [images, currentIndex, sendProbe])
+
+    const handleMapLeave = useCallback(() => {
+        mapHovered.current = false
+        pendingProbe.current = null
+        setProbe(null)
+    }, [])
+
     // Modify the render condition for the loading overlay
     const isCurrentImageLoading = useCallback(() => {
         if (!images[currentIndex]) {
@@ -444,7 +503,11 @@ export function WeatherMap() {
                         <div className="relative flex-1 p-3 sm:p-4 lg:p-6">
                             {images.length > 0 ? (
                                 <>
-                                    <div className="relative w-full h-full rounded-2xl overflow-hidden bg-card border border-border shadow-medium">
+                                    <div
+                                        className="relative w-full h-full rounded-2xl overflow-hidden bg-card border border-border shadow-medium"
+                                        onMouseMove={handleMapHover}
+                                        onMouseLeave={handleMapLeave}
+                                    >
                                         {images.map((image, index) => {
                                             const imageUrl = getAbsoluteUrl(image.url);
                                             return (
@@ -467,6 +530,26 @@ export function WeatherMap() {
                                                 />
                                             );
                                         })}
+                                        {probe && (
+                                            <div
+                                                className="absolute z-10 pointer-events-none glass-panel rounded-lg px-3 py-2 text-xs shadow-medium"
+                                                style={{ left: probe.x + 12, top: probe.y + 12 }}
+                                            >
+                                                <p className="font-semibold text-foreground mb-1">
+                                                    {probe.result.latitude?.toFixed(2)}°, {probe.result.longitude?.toFixed(2)}°
+                                                </p>
+                                                {Object.entries(probe.result.values).map(([source, values]) => (
+                                                    <div key={source} className="mb-1">
+                                                        <p className="font-medium text-muted-foreground">{source}</p>
+                                                        {Object.entries(values).map(([variable, value]) => (
+                                                            <p key={variable} className="text-foreground">
+                                                                {variable}: {value === null ? '–' : value.toFixed(2)}
+                                                            </p>
+                                                        ))}
+                                                    </div>
+                                                ))}
+                                            </div>
+                                        )}
                                     </div>
                                     {(isAnalyzing || isCurrentImageLoading()) && (
                                         <div className="absolute inset-0 flex flex-col items-center justify-center gap-4 bg-background/90 backdrop-blur-sm rounded-2xl">
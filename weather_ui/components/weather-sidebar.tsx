@@ -4,7 +4,7 @@ import React, {useState, useEffect, useCallback, useMemo, JSX} from 'react'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
 import { Button } from '@/components/ui/button'
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger, DialogFooter } from '@/components/ui/dialog'
-import {fetchBaseTimes, fetchFiles, fetchValidTimes, fetchWeatherData} from '@/lib/api-client'
+import {eventBundleUrl, fetchBaseTimes, fetchEventBundle, fetchFiles, fetchValidTimes, fetchWeatherData} from '@/lib/api-client'
 import { useQuery } from '@tanstack/react-query'
 import extremeEvents from '@/extreme_events_dataset.json'
 import { Calendar, Clock, Layers, Zap, AlertTriangle, X, ArrowLeftRight } from 'lucide-react'
@@ -117,6 +117,14 @@ export function WeatherSidebar({toggleDisplay,toggleValue,onDisplayChangedImg}):
   });
 
   // Fetch weather data when valid times are available
+  // Precomputed region statistics of the selected event
+  const { data: eventBundle } = useQuery({
+    queryKey: ['eventBundle', selectedEvent],
+    queryFn: () => fetchEventBundle(selectedEvent),
+    enabled: !!selectedEvent,
+    staleTime: Infinity,
+  });
+
   const { data: weatherData,isFetching } = useQuery<WeatherData | null>({
     queryKey: ['weatherData', selectedVariable, baseTime, validTimes],
     queryFn: async () => {
@@ -370,6 +378,34 @@ export function WeatherSidebar({toggleDisplay,toggleValue,onDisplayChangedImg}):
                       <span>End: {formatTime(selectedEventDetails.end_time)}</span>
                     </div>
                   </div>
+                  {eventBundle?.covered && (
+                    <div className="pt-2 mt-2 border-t border-border/50 space-y-1 text-xs text-muted-foreground">
+                      {Object.entries(eventBundle.peaks.ground_truth ?? {}).map(([variable, peak]) => {
+                        if (!peak) return null;
+                        // Frame of the ground truth at the peak, when the bundle has frames of the variable
+                        const index = eventBundle.sources.ground_truth?.valid_times.indexOf(peak.valid_time) ?? -1;
+                        const frame = index >= 0 ? eventBundle.frames.ground_truth?.[variable]?.[index] : undefined;
+                        return (
+                          <div key={variable} className="space-y-1">
+                            <div className="flex justify-between gap-2">
+                              <span>Peak {variable}</span>
+                              <span>
+                                {(peak.display ?? peak.value).toFixed(peak.units === 'm' ? 3 : 1)} {peak.units ?? ''} at {formatTime(peak.valid_time.toString())}
+                              </span>
+                            </div>
+                            {frame && (
+                              <img
+                                src={eventBundleUrl(eventBundle.event_id, frame)}
+                                alt={`${variable} at the peak`}
+                                className="w-full rounded border border-border/50"
+                                loading="lazy"
+                              />
+                            )}
+                          </div>
+                        );
+                      })}
+                    </div>
+                  )}
                 </div>
               </div>
           )}
@@ -93,3 +93,83 @@ export const fetchTempMetrics = async (countryName:string="Amsterdam",baseTime:n
     return response.json();
 }
 
+export interface PointTable {
+    location: string[];
+    forecast_time: string[];
+    [variable: string]: (string | number | null)[];
+}
+
+export interface PointCompareBatch {
+    locations: { location: string[]; latitude: number[]; longitude: number[] };
+    cerrora: PointTable;
+    graphcast: PointTable;
+    ground_truth: PointTable;
+}
+
+// One request for many cities: the API reads each model's chunks once for all of them
+export const fetchTempMetricsBatch = async (cities: string[], baseTime: number, variables: string[] = ["t2m"]): Promise<PointCompareBatch> => {
+    const response = await fetch(`${API_BASE_URL}/temp_compare/batch`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({baseTime, cities, variables}),
+    });
+    if (!response.ok) {
+        throw new Error(`Failed to fetch Temp Metrics with Error. ${response.status}`);
+    }
+    return response.json();
+}
+
+export interface ProbeResult {
+    inside: boolean;
+    row: number;
+    col: number;
+    latitude?: number;
+    longitude?: number;
+    values: Record<string, Record<string, number | null>>;
+    server_ms: number;
+}
+
+// Values of every model under a pixel of the rendered map (pixel units of the image itself)
+export const fetchProbe = async (
+    params: { px: number; py: number; width: number; height: number; baseTime: number; validTime: number },
+    signal?: AbortSignal,
+): Promise<ProbeResult> => {
+    const url = new URL(`${API_BASE_URL}/probe`);
+    Object.entries(params).forEach(([key, value]) => url.searchParams.append(key, value.toString()));
+    const response = await fetch(url.toString(), {signal});
+    if (!response.ok) {
+        throw new Error(`Failed to probe map: ${response.status}`);
+    }
+    return response.json();
+}
+
+export interface EventBundle {
+    event_id: string;
+    covered: boolean;
+    region: { cells: number; area_km2: number; shape: number[] };
+    variables: string[];
+    sources: Record<string, { base_time: number | null; valid_times: number[] }>;
+    stats: Record<string, Record<string, Record<string, (number | null)[]>>>;
+    peaks: Record<string, Record<string, { value: number; valid_time: number; display?: number; units?: string } | null>>;
+    metrics: Record<string, Record<string, { lead_hours: number[]; base_times: number; rmse: (number | null)[] }>>;
+    fields: Record<string, Record<string, string>>;
+    frames: Record<string, Record<string, string[]>>;
+}
+
+// Precomputed bundle of an extreme event (null until the bundle has been built)
+export const fetchEventBundle = async (eventId: string): Promise<EventBundle | null> => {
+    const response = await fetch(`${API_BASE_URL}/events/${encodeURIComponent(eventId)}`);
+    if (response.status === 404) {
+        return null;
+    }
+    if (!response.ok) {
+        throw new Error(`Failed to fetch event bundle: ${response.status}`);
+    }
+    return response.json();
+}
+
+// URL of a field or cropped frame named in an event bundle
+export const eventBundleUrl = (eventId: string, member: string): string =>
+    `${API_BASE_URL}/events/${encodeURIComponent(eventId)}/${member}`;